@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+告警批次解析模型
+
+同一个 webhook payload 原先会被 extract_all_labels / extract_alertids / extract_fingerprints /
+extract_alertname / extract_alert_raw / alert_data_api / save_dbdata / 去重 key 计算等
+各自遍历一遍，拆分时还会为每条 alert 复制整个 payload dict。
+
+AlertBatch 在入口处一次性解析 payload：
+- Alert 使用 __slots__，label key 经 sys.intern 驻留，同名 key 在所有 alert 间共享
+- 噪声 label 过滤（LABEL_FILTER_PREFIXES）编译为单个正则，每条 alert 只过滤一次
+- fingerprint 列表、去重 key、路由标签、入库 matchers 等派生视图按需计算并缓存
+- 拆分 / 聚合只重组 Alert 引用，不复制 payload；仅电话告警等需要原始 dict 时才通过 to_payload() 物化
+
+批次在流水线中视为只读：alerts 为 tuple，派生视图缓存后不再变化。
+"""
+
+import hashlib
+import json
+import re
+import sys
+from functools import cached_property
+
+from common_utils import jsoncodec
+
+# 定义要过滤的label前缀
+LABEL_FILTER_PREFIXES = [
+    'feature_node_kubernetes_io_',
+    'beta_kubernetes_io_',
+    'nvidia_',
+    'app_kubernetes_io_',
+    'pod_template_hash',
+    'pod_template_generation',
+    'controller_revision_hash',
+    'statefulset_kubernetes_io_pod_name'
+]
+
+_LABEL_FILTER_RE = re.compile('|'.join(re.escape(p) for p in LABEL_FILTER_PREFIXES))
+
+# Grafana 无效占位时间
+_ZERO_TIME = '0001-01-01T00:00:00Z'
+
+_intern = sys.intern
+
+# 数字级别映射（1=最低，5=最高）
+NUMERIC_SEVERITY_MAP = {
+    "5": "critical",
+    "4": "critical",
+    "3": "warning",
+    "2": "info",
+    "1": "info",
+}
+
+# 告警级别优先级（数值越大越紧急）
+SEVERITY_PRIORITY = {
+    "critical": 4,
+    "warning": 3,
+    "info": 2,
+    "success": 1,
+    "resolved": 0,
+    # P 级别：p0 最高，p3 最低
+    "p0": 5,
+    "p1": 4,
+    "p2": 3,
+    "p3": 2,
+    # 电话告警，与 p0 同优先级
+    "phone": 5,
+}
+
+
+def normalize_severity(severity) -> str:
+    """级别名称小写化，数字级别映射为名称"""
+    sev_str = str(severity)
+    if sev_str.isdigit():
+        return NUMERIC_SEVERITY_MAP.get(sev_str, "warning")
+    return sev_str.lower()
+
+
+def severity_priority(severity, default: int = 0) -> int:
+    """级别优先级，未知级别返回 default"""
+    return SEVERITY_PRIORITY.get(normalize_severity(severity), default)
+
+
+def should_filter_label(label_key: str) -> bool:
+    """检查label是否应该被过滤"""
+    return _LABEL_FILTER_RE.match(label_key) is not None
+
+
+def _as_dict(value) -> dict:
+    return value if isinstance(value, dict) else {}
+
+
+def _fingerprint_key(fingerprints) -> str:
+    """fingerprint 组合去重 key
+
+    key 为标准库 json.dumps 结果的 md5，格式必须与历史 key 逐字节一致
+    （共享去重后端 / 快照中的旧 key 仍然有效），因此不走 jsoncodec。
+    """
+    raw = json.dumps(sorted(fingerprints), ensure_ascii=False, sort_keys=True)
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+class Alert:
+    """单条告警实例"""
+
+    __slots__ = ('status', 'labels', 'annotations', 'starts_at', 'ends_at', 'fingerprint',
+                 'raw', '_filtered_labels')
+
+    def __init__(self, raw: dict):
+        self.raw = raw
+        self.status = raw.get('status', '')
+        self.labels = {_intern(k) if isinstance(k, str) else k: v
+                       for k, v in _as_dict(raw.get('labels')).items()}
+        self.annotations = _as_dict(raw.get('annotations'))
+        self.starts_at = raw.get('startsAt', '')
+        self.ends_at = raw.get('endsAt', '')
+        self.fingerprint = raw.get('fingerprint', '')
+        self._filtered_labels = None
+
+    @property
+    def matcher(self) -> dict:
+        """alert_data.alertlabels 中该实例的静默 matchers（全部 label 精确匹配）"""
+        return {"matchers": [
+            {"name": k, "value": v, "isRegex": False, "isEqual": True}
+            for k, v in self.labels.items()
+        ]}
+
+    @property
+    def filtered_labels(self) -> dict:
+        """去除 alertid 与噪声前缀后的 labels（首次访问时计算）"""
+        if self._filtered_labels is None:
+            self._filtered_labels = {k: v for k, v in self.labels.items()
+                                     if k != 'alertid' and not should_filter_label(k)}
+        return self._filtered_labels
+
+
+class AlertBatch:
+    """一次 webhook 推送（或拆分 / 聚合后的子批次）"""
+
+    def __init__(self, payload: dict, alerts: tuple, common_labels, original_status: str = None,
+                 aggregated: bool = False, derived: bool = True):
+        """
+        Args:
+            payload: 原始 payload（顶层字段来源，不会被修改）
+            alerts: Alert 元组
+            common_labels: 批次公共标签（原始 commonLabels 可能不是 dict，保持原样）
+            original_status: 拆分前的顶层 status，默认取 payload.status
+            aggregated: 是否为聚合后的批次（不再拆分）
+            derived: 是否由拆分 / 聚合产生（False 表示与 payload 完全对应）
+        """
+        self.payload = payload
+        self.derived = derived
+        self.alerts = alerts
+        self.common_labels = common_labels
+        self.status = payload.get('status', '')
+        self.original_status = self.status if original_status is None else original_status
+        self.aggregated = aggregated
+
+    @classmethod
+    def from_payload(cls, payload: dict) -> 'AlertBatch':
+        alerts = tuple(Alert(a) for a in payload.get('alerts', []) if isinstance(a, dict))
+        return cls(payload, alerts, payload.get('commonLabels', {}),
+                   original_status=payload.get('_original_status'),
+                   aggregated=bool(payload.get('_aggregated')), derived=False)
+
+    @classmethod
+    def of(cls, data) -> 'AlertBatch':
+        """兼容入口：已解析的批次原样返回，dict 现场解析"""
+        return data if isinstance(data, AlertBatch) else cls.from_payload(data)
+
+    # ── 拆分 / 聚合 ──
+    def split(self) -> list:
+        """按 alert 拆分为单条子批次，公共标签替换为该 alert 自身的 labels"""
+        if len(self.alerts) <= 1:
+            return [self]
+        return [AlertBatch(self.payload, (alert,), alert.labels, original_status=self.status)
+                for alert in self.alerts]
+
+    @classmethod
+    def merge(cls, batches: list) -> 'AlertBatch':
+        """合并子批次，公共标签取各子批次的交集（相同 key 且相同 value 才保留）"""
+        first = batches[0]
+        label_dicts = [_as_dict(b.common_labels) for b in batches]
+        merged_common = {k: v for k, v in label_dicts[0].items()
+                         if all(d.get(k) == v for d in label_dicts[1:])}
+        alerts = tuple(alert for b in batches for alert in b.alerts)
+        return cls(first.payload, alerts, merged_common,
+                   original_status=first.original_status, aggregated=True)
+
+    def to_payload(self) -> dict:
+        """物化为 webhook dict（供仍按原始格式消费的下游，如 Flashcat 电话告警）"""
+        if not self.derived:
+            return self.payload
+        payload = dict(self.payload)
+        payload['alerts'] = [alert.raw for alert in self.alerts]
+        payload['commonLabels'] = self.common_labels
+        payload['_original_status'] = self.original_status
+        if self.aggregated:
+            payload['_aggregated'] = True
+        return payload
+
+    # ── 派生视图 ──
+    @cached_property
+    def common_labels_dict(self) -> dict:
+        return _as_dict(self.common_labels)
+
+    @cached_property
+    def is_all_resolved(self) -> bool:
+        """纯 resolved 批次：原始顶层 status=resolved 且所有 alert 都是 resolved
+
+        Grafana 未开启恢复通知时顶层 status='firing'，即使批次中混有 resolved 实例
+        （或拆分后产生的 resolved 子批次），也不应走恢复通知路径。
+        """
+        return (self.original_status == 'resolved'
+                and bool(self.alerts)
+                and all(a.status == 'resolved' for a in self.alerts))
+
+    @cached_property
+    def fingerprints(self) -> list:
+        """去重后的 fingerprint 列表（保持出现顺序）"""
+        return list(dict.fromkeys(a.fingerprint for a in self.alerts if a.fingerprint))
+
+    @cached_property
+    def firing_dedup_key(self) -> str:
+        """所有 firing alert 的 fingerprint 组合 key"""
+        return _fingerprint_key(a.fingerprint for a in self.alerts if a.status == 'firing')
+
+    @cached_property
+    def resolved_dedup_key(self) -> str:
+        """所有 resolved alert 的 fingerprint 组合 key"""
+        return _fingerprint_key(a.fingerprint for a in self.alerts if a.status == 'resolved')
+
+    @cached_property
+    def all_fingerprint_key(self) -> str:
+        """全部 alert 的 fingerprint 组合 key（假设这些指纹全部 firing 时的 firing key）"""
+        return _fingerprint_key(a.fingerprint for a in self.alerts)
+
+    @cached_property
+    def label_alertname(self) -> str:
+        """语义去重使用的 alertname（无则为空串）"""
+        alertname = self.common_labels_dict.get('alertname', '')
+        if not alertname and self.alerts:
+            alertname = self.alerts[0].labels.get('alertname', '')
+        return alertname
+
+    def label_dedup_key(self, group_id: str) -> str:
+        """alertname + group_id 语义去重 key"""
+        raw = json.dumps({'alertname': self.label_alertname, 'group_id': group_id},
+                         ensure_ascii=False, sort_keys=True)
+        return hashlib.md5(raw.encode()).hexdigest()
+
+    @cached_property
+    def alertname(self) -> str:
+        """卡片标题使用的 alertname（无则为默认标题）"""
+        return self.label_alertname or "告警通知"
+
+    @cached_property
+    def alertids(self) -> list:
+        return list({a.labels['alertid'] for a in self.alerts if a.labels.get('alertid')})
+
+    @cached_property
+    def routing_labels(self) -> dict:
+        """路由匹配标签：过滤后的公共标签 + 第一条 alert 的过滤后标签（公共标签优先）"""
+        labels = {k: v for k, v in self.common_labels_dict.items()
+                  if k != 'alertid' and not should_filter_label(k)}
+        if self.alerts:
+            for k, v in self.alerts[0].filtered_labels.items():
+                labels.setdefault(k, v)
+        return labels
+
+    @cached_property
+    def severities(self) -> list:
+        return [a.labels['severity'] for a in self.alerts if a.labels.get('severity')]
+
+    @cached_property
+    def grafana_urls(self) -> dict:
+        """取第一条告警的 Grafana URL"""
+        first = self.alerts[0].raw if self.alerts else {}
+        return {
+            'dashboardURL': first.get('dashboardURL', ''),
+            'panelURL': first.get('panelURL', ''),
+            'generatorURL': first.get('generatorURL', ''),
+            'silenceURL': first.get('silenceURL', ''),
+        }
+
+    @cached_property
+    def firing_record(self):
+        """alert_data 入库内容：(matchers JSON, fingerprint 列表, 最早 startsAt)，无 firing 实例时为 None
+
+        多路由时每个路由各写一行，JSON 序列化只做一次。
+        """
+        matchers = []
+        fingerprints = {}
+        min_starts_at = None
+        for alert in self.alerts:
+            if alert.status == 'resolved':
+                continue
+            matchers.append(alert.matcher)
+            if alert.fingerprint:
+                fingerprints[alert.fingerprint] = None
+            sa = alert.starts_at
+            if sa and sa != _ZERO_TIME and (min_starts_at is None or sa < min_starts_at):
+                min_starts_at = sa
+        if not matchers:
+            return None
+        # alertlabels 按 ASCII 转义写入，与存量数据及 SQLite 的 LIKE 粗筛保持一致
+        return jsoncodec.dumps({"matchers": matchers}, ensure_ascii=True), list(fingerprints), min_starts_at
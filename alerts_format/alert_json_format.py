@@ -2,87 +2,45 @@
 # -*- coding: utf-8 -*-
 
 from .savedb import save_dbdata
+from .alert_batch import AlertBatch, LABEL_FILTER_PREFIXES, should_filter_label  # noqa: F401
 
-# 定义要过滤的label前缀
-LABEL_FILTER_PREFIXES = [
-    'feature_node_kubernetes_io_',
-    'beta_kubernetes_io_',
-    'nvidia_',
-    'app_kubernetes_io_',
-    'pod_template_hash',
-    'pod_template_generation',
-    'controller_revision_hash',
-    'statefulset_kubernetes_io_pod_name'
-]
 
-
-def should_filter_label(label_key):
-    """检查label是否应该被过滤"""
-    for prefix in LABEL_FILTER_PREFIXES:
-        if label_key.startswith(prefix):
-            return True
-    return False
-
-
-def is_grafana_alert(alert_info_data: dict) -> bool:
+def is_grafana_alert(alert_info_data) -> bool:
     """检测是否为 Grafana Alerting 格式（含 generatorURL 字段）"""
-    for alert in alert_info_data.get('alerts', []):
-        if alert.get('generatorURL'):
-            return True
-    return False
+    return any(alert.raw.get('generatorURL') for alert in AlertBatch.of(alert_info_data).alerts)
 
 
-def extract_grafana_urls(alert_info_data: dict) -> dict:
+def extract_grafana_urls(alert_info_data) -> dict:
     """
     提取 Grafana 告警的相关 URL（取第一条告警的值）
     :return: dict, 键包含 dashboardURL / panelURL / generatorURL / silenceURL
     """
-    urls = {
-        'dashboardURL': '',
-        'panelURL': '',
-        'generatorURL': '',
-        'silenceURL': '',
-    }
-    alerts = alert_info_data.get('alerts', [])
-    if alerts:
-        first = alerts[0]
-        urls['dashboardURL'] = first.get('dashboardURL', '')
-        urls['panelURL'] = first.get('panelURL', '')
-        urls['generatorURL'] = first.get('generatorURL', '')
-        urls['silenceURL'] = first.get('silenceURL', '')
-    return urls
-
-
-def extract_fingerprints(alert_info_data: dict) -> list:
+    return dict(AlertBatch.of(alert_info_data).grafana_urls)
+
+
+def extract_fingerprints(alert_info_data) -> list:
     """提取所有 alert 的 fingerprint，用于 resolved 时反查原始消息"""
-    fps = []
-    for alert in alert_info_data.get('alerts', []):
-        fp = alert.get('fingerprint')
-        if fp and fp not in fps:
-            fps.append(fp)
-    return fps
+    return list(AlertBatch.of(alert_info_data).fingerprints)
 
 
 def alert_data_api(alert_info_data, project, alertmanager_url, group_id=None):
     """
     处理告警数据并格式化（ops 模板使用）
-    :param alert_info_data: dict, alertmanager推送的json数据
+    :param alert_info_data: AlertBatch 或 alertmanager推送的json数据
     :param project: str, 项目名称
     :param alertmanager_url: str, alertmanager地址
     :param group_id: str, 发送目标群组ID（用于 resolved 反查）
     :return: tuple, (alerts列表, severities列表, maid, grafana_urls)
     """
-    dbid = save_dbdata(alert_info_data, project, group_id=group_id)
+    batch = AlertBatch.of(alert_info_data)
+    dbid = save_dbdata(batch, project, group_id=group_id)
     alerts = []
-    severities = []
 
     # 提取 Grafana URL 信息
-    grafana_urls = extract_grafana_urls(alert_info_data)
+    grafana_urls = extract_grafana_urls(batch)
 
     # 获取原始公共标签用于比较
-    original_common_labels = alert_info_data.get('commonLabels', {})
-    if isinstance(original_common_labels, str):
-        original_common_labels = {}
+    original_common_labels = batch.common_labels_dict
 
     # 获取过滤后的公共标签
     common_labels = {k: v for k, v in original_common_labels.items()
@@ -96,66 +54,51 @@ def alert_data_api(alert_info_data, project, alertmanager_url, group_id=None):
 
     alerts.append("✨✨✨✨✨✨✨✨✨✨✨✨")
 
-    for alert in alert_info_data.get('alerts', []):
-        alert_labels = alert.get('labels', {})
-        if isinstance(alert_labels, str):
-            alert_labels = {}
-
+    for alert in batch.alerts:
         specific_labels = {
-            k: v for k, v in alert_labels.items()
-            if k != 'alertid' and not should_filter_label(k)
-            and (k not in original_common_labels or original_common_labels.get(k) != v)
+            k: v for k, v in alert.filtered_labels.items()
+            if k not in original_common_labels or original_common_labels.get(k) != v
         }
 
-        alerts.append("🔥🔥🔥" if alert.get('status') == 'firing' else "✅✅✅")
+        alerts.append("🔥🔥🔥" if alert.status == 'firing' else "✅✅✅")
 
         for key, value in specific_labels.items():
             if value is not None:
                 alerts.append(f"{key}: {value}")
 
-        alert_annotations = alert.get('annotations', {})
-        if isinstance(alert_annotations, dict):
-            if 'description' in alert_annotations:
-                alerts.append(f"description: {alert_annotations['description']}")
-            if 'summary' in alert_annotations:
-                alerts.append(f"summary: {alert_annotations['summary']}")
+        alert_annotations = alert.annotations
+        if 'description' in alert_annotations:
+            alerts.append(f"description: {alert_annotations['description']}")
+        if 'summary' in alert_annotations:
+            alerts.append(f"summary: {alert_annotations['summary']}")
 
-        if alert.get('status') == 'resolved' and alert.get('endsAt'):
-            end_time = alert.get('endsAt').replace('T', ' ').replace('Z', '')
+        if alert.status == 'resolved' and alert.ends_at:
+            end_time = alert.ends_at.replace('T', ' ').replace('Z', '')
             alerts.append(f"endsAt: {end_time}")
-        elif alert.get('startsAt'):
-            start_time = alert.get('startsAt').replace('T', ' ').replace('Z', '')
+        elif alert.starts_at:
+            start_time = alert.starts_at.replace('T', ' ').replace('Z', '')
             alerts.append(f"startsAt: {start_time}")
 
-        severity = alert.get('labels', {}).get('severity')
-        if severity:
-            severities.append(severity)
-
     if alertmanager_url and dbid:
         alerts.append(f"⚠️ **MAID:** {dbid}")
 
-    return alerts, severities, dbid, grafana_urls
+    return alerts, list(batch.severities), dbid, grafana_urls
 
 
-def extract_alert_raw(alert_info_data: dict) -> list:
+def extract_alert_raw(alert_info_data) -> list:
     """
     提取原始 alert 列表（供 biz 模板使用），包含 labels/annotations/startsAt/endsAt/status
-    只过滤噪声 label，不做文本格式化。
+    只过滤噪声 label，不做文本格式化。每次返回新列表，调用方可修改。
     """
-    original_common_labels = alert_info_data.get('commonLabels', {})
-    if isinstance(original_common_labels, str):
-        original_common_labels = {}
+    batch = AlertBatch.of(alert_info_data)
+    original_common_labels = batch.common_labels_dict
 
     raw_alerts = []
-    for alert in alert_info_data.get('alerts', []):
-        labels = alert.get('labels', {})
-        if isinstance(labels, str):
-            labels = {}
-
+    for alert in batch.alerts:
+        labels = alert.labels
         specific = {
-            k: v for k, v in labels.items()
-            if not should_filter_label(k)
-            and k not in ('alertid', 'alertname', 'severity')
+            k: v for k, v in alert.filtered_labels.items()
+            if k not in ('alertname', 'severity')
             and (k not in original_common_labels or original_common_labels.get(k) != v)
         }
 
@@ -164,17 +107,13 @@ def extract_alert_raw(alert_info_data: dict) -> list:
         if 'model_name' in labels and labels['model_name'] and 'model_name' not in specific:
             specific['model_name'] = labels['model_name']
 
-        annotations = alert.get('annotations', {})
-        if isinstance(annotations, str):
-            annotations = {}
-
         raw_alerts.append({
-            'status': alert.get('status', ''),
+            'status': alert.status,
             'labels': specific,
-            'annotations': annotations,
-            'startsAt': alert.get('startsAt', ''),
-            'endsAt': alert.get('endsAt', ''),
-            'fingerprint': alert.get('fingerprint', ''),
+            'annotations': alert.annotations,
+            'startsAt': alert.starts_at,
+            'endsAt': alert.ends_at,
+            'fingerprint': alert.fingerprint,
         })
     return raw_alerts
 
@@ -182,39 +121,26 @@ def extract_alert_raw(alert_info_data: dict) -> list:
 def extract_alertids(alert_info_data):
     """
     从alertmanager的json数据中提取所有alert的alertid
-    :param alert_info_data: dict, alertmanager推送的json
+    :param alert_info_data: AlertBatch 或 alertmanager推送的json
     :return: list, 所有alertid（如果没有alertid则返回空列表）
     """
-    alertids = set()
-    for alert in alert_info_data.get('alerts', []):
-        labels = alert.get('labels', {})
-        alertid = labels.get('alertid')
-        if alertid:
-            alertids.add(alertid)
-    return list(alertids)
+    return list(AlertBatch.of(alert_info_data).alertids)
 
 
 def extract_labrador_project(alert_info_data):
     """
     从alertmanager的json数据中提取labrador_project字段
-    :param alert_info_data: dict, alertmanager推送的json
+    :param alert_info_data: AlertBatch 或 alertmanager推送的json
     :return: str, labrador_project值，如果没有则返回None
     """
-    common_labels = alert_info_data.get('commonLabels', {})
-    if isinstance(common_labels, dict):
-        labrador_project = common_labels.get('labrador_project')
+    batch = AlertBatch.of(alert_info_data)
+    labrador_project = batch.common_labels_dict.get('labrador_project')
+    if labrador_project:
+        return labrador_project
+    if batch.alerts:
+        labrador_project = batch.alerts[0].labels.get('labrador_project')
         if labrador_project:
             return labrador_project
-
-    alerts = alert_info_data.get('alerts', [])
-    if alerts:
-        first_alert = alerts[0]
-        labels = first_alert.get('labels', {})
-        if isinstance(labels, dict):
-            labrador_project = labels.get('labrador_project')
-            if labrador_project:
-                return labrador_project
-
     return None
 
 
@@ -222,48 +148,16 @@ def extract_all_labels(alert_info_data):
     """
     从alertmanager的json数据中提取所有标签（包括commonLabels和每个alert的labels）
     用于标签路由匹配
-    :param alert_info_data: dict, alertmanager推送的json
+    :param alert_info_data: AlertBatch 或 alertmanager推送的json
     :return: dict, 合并后的所有标签（排除alertid）
     """
-    all_labels = {}
-
-    common_labels = alert_info_data.get('commonLabels', {})
-    if isinstance(common_labels, dict):
-        for key, value in common_labels.items():
-            if key != 'alertid' and not should_filter_label(key):
-                all_labels[key] = value
-
-    alerts = alert_info_data.get('alerts', [])
-    if alerts:
-        first_alert = alerts[0]
-        labels = first_alert.get('labels', {})
-        if isinstance(labels, dict):
-            for key, value in labels.items():
-                if key != 'alertid' and not should_filter_label(key) and key not in all_labels:
-                    all_labels[key] = value
-
-    return all_labels
+    return dict(AlertBatch.of(alert_info_data).routing_labels)
 
 
 def extract_alertname(alert_info_data):
     """
     从alertmanager的json数据中提取alertname
-    :param alert_info_data: dict, alertmanager推送的json
+    :param alert_info_data: AlertBatch 或 alertmanager推送的json
     :return: str, alertname值，如果没有则返回默认值
     """
-    common_labels = alert_info_data.get('commonLabels', {})
-    if isinstance(common_labels, dict):
-        alertname = common_labels.get('alertname')
-        if alertname:
-            return alertname
-
-    alerts = alert_info_data.get('alerts', [])
-    if alerts:
-        first_alert = alerts[0]
-        labels = first_alert.get('labels', {})
-        if isinstance(labels, dict):
-            alertname = labels.get('alertname')
-            if alertname:
-                return alertname
-
-    return "告警通知"
+    return AlertBatch.of(alert_info_data).alertname
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+告警状态内存索引
+
+resolved 处理需要按 fingerprint 反查话题 message_id、原始触发时间以及同批次的全部
+fingerprint（部分恢复检测），原先每次都通过 JSON_CONTAINS 查询 alert_data。
+本模块在进程内维护 (group_id, fingerprint) → AlertState 的映射：
+
+- 写穿：save_dbdata / update_message_id 写库的同时更新内存（firing 写入路径不查库）
+- 懒加载：未命中时按 fingerprint 查一次库重建记录并缓存；重启 / 淘汰后新写入的记录
+  尚未与库中历史记录合并（partial），在首次读取时查库补齐
+- 恢复状态：恢复通知发送（或部分恢复跳过）后标记 resolved，部分恢复检测不再等待已恢复的实例
+- 内存上界：按 LRU 淘汰，超出 ALERT_STATE_MAX_ENTRIES 时丢弃最久未访问的记录
+
+语义与原 SQL 查询保持一致：
+- message_id  取最新一条非空 message_id（新记录发送失败时保留上一条话题）
+- starts_at   取最新一条记录的 alerttime
+- siblings    取所有包含该 fingerprint 的记录中 fingerprint 的并集
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+
+from config.config import Config
+from common_utils import jsoncodec
+from .storage import get_storage, StorageError
+
+logger = logging.getLogger(__name__)
+
+
+class AlertState:
+    """单个 fingerprint 的状态记录（__slots__ 紧凑存储，siblings 在同批次间共享同一 frozenset）"""
+
+    __slots__ = ('maid', 'group_id', 'message_id', 'starts_at', 'siblings', 'status', 'partial')
+
+    def __init__(self, maid, group_id, message_id, starts_at, siblings, status='firing', partial=False):
+        self.maid = maid
+        self.group_id = group_id
+        self.message_id = message_id
+        self.starts_at = starts_at
+        self.siblings = siblings
+        self.status = status
+        # True 表示尚未与库中的历史记录合并（读取时补齐）
+        self.partial = partial
+
+
+def _format_alerttime(val) -> str:
+    if not val:
+        return ''
+    # alerttime 为 VARCHAR，兼容历史 DATETIME 列返回 datetime 的情况
+    if hasattr(val, 'strftime'):
+        return val.strftime('%Y-%m-%dT%H:%M:%S')
+    return str(val)
+
+
+class AlertStateStore:
+    """(group_id, fingerprint) → AlertState 的 LRU 索引"""
+
+    def __init__(self, max_entries: int = None, storage=None):
+        self._max_entries = max_entries or Config.ALERT_STATE_MAX_ENTRIES
+        self._storage = storage
+        self._lock = threading.Lock()
+        self._records = OrderedDict()
+        # maid → (group_id, {fingerprint})，用于 message_id 回写（每个路由单独入库，maid 只属于一个群组）
+        self._by_maid = {}
+        self._hits = 0
+        self._misses = 0
+        self._rebuilds = 0
+        self._evictions = 0
+
+    @property
+    def storage(self):
+        return self._storage or get_storage()
+
+    # ── 写入 ──
+    def record_firing(self, maid: str, group_id: str, fingerprints: list, starts_at: str) -> None:
+        """新 firing 记录入库后调用，与 alert_data 新行保持一致"""
+        if not maid or not group_id or not fingerprints:
+            return
+        batch = frozenset(fingerprints)
+        with self._lock:
+            for fp in batch:
+                key = (group_id, fp)
+                old = self._records.get(key)
+                if old is None:
+                    # 内存中没有（首次触发，或重启 / LRU 淘汰后）：不在写入路径查库，
+                    # 标记为 partial，首次读取时再与库中历史记录合并
+                    siblings, message_id, partial = batch, None, True
+                else:
+                    siblings = batch if old.siblings <= batch else old.siblings | batch
+                    # 新记录的 message_id 回写前沿用上一条话题（与 SQL 取最新非空 message_id 一致）
+                    message_id, partial = old.message_id, old.partial
+                    self._unindex(old.maid, fp)
+                self._records[key] = AlertState(maid, group_id, message_id, starts_at, siblings, partial=partial)
+                self._records.move_to_end(key)
+                self._index(maid, group_id, fp)
+            self._evict_overflow()
+
+    def set_message_id(self, maid: str, message_id: str) -> None:
+        if not maid or not message_id:
+            return
+        with self._lock:
+            group_id, fps = self._by_maid.get(maid, (None, ()))
+            for fp in fps:
+                state = self._records.get((group_id, fp))
+                if state is not None and state.maid == maid:
+                    state.message_id = message_id
+
+    def mark_resolved(self, group_id: str, fingerprints: list) -> None:
+        if not group_id:
+            return
+        with self._lock:
+            for fp in fingerprints:
+                state = self._records.get((group_id, fp))
+                if state is not None:
+                    state.status = 'resolved'
+
+    # ── 读取 ──
+    def get(self, fingerprint: str, group_id: str):
+        """返回 AlertState，内存未命中时查库重建；库中也没有时返回 None"""
+        key = (group_id, fingerprint)
+        with self._lock:
+            state = self._records.get(key)
+            if state is not None and not state.partial:
+                self._hits += 1
+                self._records.move_to_end(key)
+                return state
+            self._misses += 1
+        if state is not None:
+            return self._complete(key, state)
+        return self._rebuild(fingerprint, group_id)
+
+    def get_message_id(self, fingerprint: str, group_id: str) -> str:
+        state = self.get(fingerprint, group_id)
+        return state.message_id or '' if state else ''
+
+    def get_starts_at(self, fingerprint: str, group_id: str) -> str:
+        state = self.get(fingerprint, group_id)
+        return state.starts_at or '' if state else ''
+
+    def still_firing(self, fingerprints: list, group_id: str) -> list:
+        """过滤掉已标记恢复的实例（内存中没有记录的实例按未恢复处理）"""
+        with self._lock:
+            return [fp for fp in fingerprints
+                    if getattr(self._records.get((group_id, fp)), 'status', 'firing') != 'resolved']
+
+    def get_siblings(self, fingerprints: list, group_id: str) -> set:
+        result = set()
+        for fp in fingerprints:
+            if not fp:
+                continue
+            state = self.get(fp, group_id)
+            if state is not None:
+                result.update(state.siblings)
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "size": len(self._records),
+                "max_entries": self._max_entries,
+                "maids": len(self._by_maid),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / total, 4) if total else 0.0,
+                "rebuilds": self._rebuilds,
+                "evictions": self._evictions,
+            }
+
+    # ── 内部 ──
+    def _rebuild(self, fingerprint: str, group_id: str):
+        """按 fingerprint 查库重建记录并缓存"""
+        state = self._load(fingerprint, group_id)
+        if state is None:
+            return None
+        key = (group_id, fingerprint)
+        with self._lock:
+            # 重建期间可能已有新记录写入，以内存中的为准
+            existing = self._records.get(key)
+            if existing is not None:
+                return existing
+            self._records[key] = state
+            self._index(state.maid, group_id, fingerprint)
+            self._rebuilds += 1
+            self._evict_overflow()
+        return state
+
+    def _complete(self, key: tuple, state: AlertState) -> AlertState:
+        """partial 记录首次读取：查库并合并历史记录的 siblings / message_id"""
+        loaded = self._load(key[1], key[0])
+        with self._lock:
+            if loaded is not None:
+                if not loaded.siblings <= state.siblings:
+                    state.siblings = state.siblings | loaded.siblings
+                if not state.message_id:
+                    state.message_id = loaded.message_id
+                self._rebuilds += 1
+            # 查库失败时同样不再重试，避免每次读取都查库（与未命中重建失败时的行为一致）
+            state.partial = False
+            if key in self._records:
+                self._records.move_to_end(key)
+        return state
+
+    def _load(self, fingerprint: str, group_id: str):
+        """按 fingerprint 查库构建记录（一次查询覆盖 message_id / alerttime / siblings），不写入缓存"""
+        try:
+            rows = self.storage.list_alert_data_by_fingerprint(fingerprint, group_id)
+        except StorageError as e:
+            logger.error("告警状态重建失败 fingerprint=%s: %s", fingerprint, e)
+            return None
+        if not rows:
+            return None
+        siblings = set()
+        message_id = None
+        for row in rows:
+            fps = row.get('fingerprints')
+            if isinstance(fps, (str, bytes)):
+                fps = jsoncodec.loads(fps)
+            siblings.update(fps or ())
+            if message_id is None and row.get('message_id'):
+                message_id = row['message_id']
+        latest = rows[0]
+        return AlertState(latest['id'], group_id, message_id,
+                          _format_alerttime(latest.get('alerttime')), frozenset(siblings))
+
+    def _index(self, maid: str, group_id: str, fp: str) -> None:
+        entry = self._by_maid.get(maid)
+        if entry is None:
+            entry = self._by_maid[maid] = (group_id, set())
+        entry[1].add(fp)
+
+    def _unindex(self, maid: str, fp: str) -> None:
+        entry = self._by_maid.get(maid)
+        if entry is not None:
+            entry[1].discard(fp)
+            if not entry[1]:
+                del self._by_maid[maid]
+
+    def _evict_overflow(self) -> None:
+        while len(self._records) > self._max_entries:
+            (_, fp), state = self._records.popitem(last=False)
+            self._unindex(state.maid, fp)
+            self._evictions += 1
+
+
+_alert_state = None
+_alert_state_lock = threading.Lock()
+
+
+def get_alert_state():
+    """获取进程级告警状态索引（ALERT_STATE_ENABLED=false 时返回 None）"""
+    global _alert_state
+    if not Config.ALERT_STATE_ENABLED:
+        return None
+    if _alert_state is None:
+        with _alert_state_lock:
+            if _alert_state is None:
+                _alert_state = AlertStateStore()
+    return _alert_state
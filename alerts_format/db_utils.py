@@ -1,9 +1,13 @@
+import functools
+import re
+
 import mysql.connector
-import json
 from config import config
+from common_utils import jsoncodec
+from .storage import get_storage
 
 def get_db_conn():
-    """获取配置数据库连接"""
+    """获取 MySQL 配置数据库连接（兼容旧代码，业务查询请使用 get_storage()）"""
     db_config = config.get_config_db_config()
     return mysql.connector.connect(**db_config)
 
@@ -11,16 +15,7 @@ def get_alert_config_by_alertid(alertid: str) -> dict:
     """
     根据alertid查询alert_config表，返回该行的配置信息
     """
-    conn = get_db_conn()
-    try:
-        cursor = conn.cursor(dictionary=True)
-        sql = "SELECT * FROM alert_config WHERE alert_id = %s"
-        cursor.execute(sql, (alertid,))
-        result = cursor.fetchone()
-        cursor.close()
-        return result
-    finally:
-        conn.close()
+    return get_storage().get_alert_config_by_alertid(alertid)
 
 
 def get_alert_config_by_project(project: str) -> dict:
@@ -28,16 +23,7 @@ def get_alert_config_by_project(project: str) -> dict:
     根据project字段查询alert_config表，返回该行的配置信息
     如果有多个匹配项，返回第一个
     """
-    conn = get_db_conn()
-    try:
-        cursor = conn.cursor(dictionary=True)
-        sql = "SELECT * FROM alert_config WHERE project = %s LIMIT 1"
-        cursor.execute(sql, (project,))
-        result = cursor.fetchone()
-        cursor.close()
-        return result
-    finally:
-        conn.close()
+    return get_storage().get_alert_config_by_project(project)
 
 
 def get_alert_config_by_labels(alert_labels: dict) -> list:
@@ -50,37 +36,62 @@ def get_alert_config_by_labels(alert_labels: dict) -> list:
     if not alert_labels:
         return []
     
-    conn = get_db_conn()
-    try:
-        cursor = conn.cursor(dictionary=True)
-        # 查询所有有 label_rules 配置的记录，按优先级降序、id升序排序
-        sql = "SELECT * FROM alert_config WHERE label_rules IS NOT NULL ORDER BY id ASC"
-        cursor.execute(sql)
-        configs = cursor.fetchall()
-        cursor.close()
-        
-        matched_configs = []
+    # 查询所有有 label_rules 配置的记录，按id升序排序
+    configs = get_storage().list_label_rule_configs()
+    
+    matched_configs = []
+    
+    # 遍历每个配置，检查是否匹配
+    for config_item in configs:
+        label_rules = config_item.get('label_rules')
+        if not label_rules:
+            continue
         
-        # 遍历每个配置，检查是否匹配
-        for config_item in configs:
-            label_rules = config_item.get('label_rules')
-            if not label_rules:
+        # 字符串形式的 label_rules 按原文缓存解析 + 正则编译结果，规则未修改时不再重复解析
+        if isinstance(label_rules, str):
+            compiled = _compile_label_rules_json(label_rules)
+            if compiled is None:
                 continue
-            
-            # 如果 label_rules 是字符串，尝试解析为JSON
-            if isinstance(label_rules, str):
-                try:
-                    label_rules = json.loads(label_rules)
-                except (json.JSONDecodeError, ValueError):
-                    continue
-            
-            # 检查是否所有规则都匹配
-            if _match_label_rules(alert_labels, label_rules):
-                matched_configs.append(config_item)
+        else:
+            compiled = _compile_label_rules(label_rules)
         
-        return matched_configs
-    finally:
-        conn.close()
+        # 检查是否所有规则都匹配
+        if _match_compiled_rules(alert_labels, compiled):
+            matched_configs.append(config_item)
+    
+    return matched_configs
+
+
+@functools.lru_cache(maxsize=1024)
+def _compile_label_rules_json(label_rules_json: str):
+    """解析并编译 JSON 字符串形式的 label_rules，解析失败返回 None"""
+    try:
+        label_rules = jsoncodec.loads(label_rules_json)
+    except (jsoncodec.JSONDecodeError, ValueError):
+        return None
+    if not isinstance(label_rules, dict):
+        return None
+    return _compile_label_rules(label_rules)
+
+
+def _compile_label_rules(label_rules: dict) -> tuple:
+    """
+    将规则编译为 ((rule_key, rule_value_str, key_pattern, value_pattern), ...)
+    - 键正则（不区分大小写）/ 值正则无效时对应 pattern 为 None，匹配时降级为精确匹配
+    """
+    compiled = []
+    for rule_key, rule_value in label_rules.items():
+        try:
+            key_pattern = re.compile(rule_key, re.IGNORECASE)
+        except re.error:
+            key_pattern = None
+        rule_value = str(rule_value)
+        try:
+            value_pattern = re.compile(rule_value)
+        except re.error:
+            value_pattern = None
+        compiled.append((rule_key, rule_value, key_pattern, value_pattern))
+    return tuple(compiled)
 
 
 def _match_label_rules(alert_labels: dict, label_rules: dict) -> bool:
@@ -94,51 +105,37 @@ def _match_label_rules(alert_labels: dict, label_rules: dict) -> bool:
     :param label_rules: dict, 数据库中配置的标签匹配规则（支持正则表达式）
     :return: bool, 是否所有规则都匹配
     """
-    import re
-    
     if not label_rules:
         return False
+    return _match_compiled_rules(alert_labels, _compile_label_rules(label_rules))
+
+
+def _match_compiled_rules(alert_labels: dict, compiled: tuple) -> bool:
+    """用编译后的规则匹配告警标签，所有规则都命中才返回 True"""
+    if not compiled:
+        return False
     
     # 遍历所有规则
-    for rule_key, rule_value in label_rules.items():
+    for rule_key, rule_value, key_pattern, value_pattern in compiled:
         matched = False
         
-        try:
-            # 编译键的正则表达式（不区分大小写）
-            key_pattern = re.compile(rule_key, re.IGNORECASE)
-        except re.error:
-            # 如果正则表达式无效，使用精确匹配
-            key_pattern = None
-        
-        try:
-            # 编译值的正则表达式
-            value_pattern = re.compile(str(rule_value))
-        except re.error:
-            # 如果正则表达式无效，使用精确匹配
-            value_pattern = None
-        
         # 在告警标签中查找匹配的键
         for alert_key, alert_value in alert_labels.items():
-            key_matched = False
-            
-            # 键匹配（支持正则表达式）
+            # 键匹配（支持正则表达式，无效时降级到精确匹配）
             if key_pattern:
                 key_matched = key_pattern.search(alert_key) is not None
             else:
-                # 降级到精确匹配
                 key_matched = rule_key.lower() == alert_key.lower()
             
             if key_matched:
-                # 值匹配（支持正则表达式）
+                # 值匹配（支持正则表达式，无效时降级到精确匹配）
                 if value_pattern:
                     if value_pattern.search(str(alert_value)):
                         matched = True
                         break
-                else:
-                    # 降级到精确匹配
-                    if str(rule_value) == str(alert_value):
-                        matched = True
-                        break
+                elif rule_value == str(alert_value):
+                    matched = True
+                    break
         
         # 如果任何一个规则不匹配，返回False
         if not matched:
@@ -161,15 +158,7 @@ def get_open_id_by_name(name: str) -> str:
     Returns:
         str: open_id，未找到返回空字符串
     """
-    conn = get_db_conn()
-    try:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT open_id FROM feishu_users WHERE name = %s LIMIT 1", (name,))
-        row = cursor.fetchone()
-        cursor.close()
-        return row["open_id"] if row else ""
-    finally:
-        conn.close()
+    return get_storage().get_open_ids_by_names([name]).get(name, "")
 
 
 def get_open_ids_by_names(names: list) -> dict:
@@ -183,13 +172,4 @@ def get_open_ids_by_names(names: list) -> dict:
     """
     if not names:
         return {}
-    conn = get_db_conn()
-    try:
-        cursor = conn.cursor(dictionary=True)
-        placeholders = ",".join(["%s"] * len(names))
-        cursor.execute(f"SELECT name, open_id FROM feishu_users WHERE name IN ({placeholders})", names)
-        rows = cursor.fetchall()
-        cursor.close()
-        return {row["name"]: row["open_id"] for row in rows}
-    finally:
-        conn.close()
\ No newline at end of file
+    return get_storage().get_open_ids_by_names(names)
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+告警去重状态存储模块
+
+alert_handler 的三层去重（fingerprint / resolved / alertname+group_id）统一通过 DedupStore
+读写，支持多副本共享去重状态，避免多实例部署时同一告警被每个副本各发一次：
+
+- MemoryDedupStore  : 进程内 TTLCache（默认，单副本部署）
+- DatabaseDedupStore: alert_dedup 表，INSERT IGNORE + owner 令牌判定占用（MySQL / SQLite，随 STORAGE_BACKEND）
+- RedisDedupStore   : SET NX PX，兼容任何 Redis 协议服务（测试时可注入本地 fake 客户端）
+
+所有实现均提供批量接口，一个批次内多个 key 的检查 / 撤销只产生一次往返。
+共享后端不可用时按"不重复"处理（宁可重复发送，也不丢告警）。
+
+通过环境变量 DEDUP_BACKEND=memory|db|redis 选择实现，get_dedup_store() 返回进程级单例。
+"""
+
+import logging
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+
+from config.config import Config
+from common_utils.ttl_cache import TTLCache
+from common_utils.snapshot import register_cache
+from .storage import get_storage, StorageError
+
+try:
+    import redis
+except ImportError:  # 仅 DEDUP_BACKEND=redis 时需要
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+class DedupStore(ABC):
+    """去重存储接口
+
+    entries 中的 namespace 区分去重层级（如 alert / resolved / label），
+    同一 key 在不同 namespace 下互不影响。
+    """
+
+    name = 'base'
+
+    def __init__(self):
+        self._stats_lock = threading.Lock()
+        self._checks = 0
+        self._duplicates = 0
+        self._evictions = 0
+        self._errors = 0
+
+    def check_and_set_many(self, entries: list) -> list:
+        """批量原子检查并占用
+
+        Args:
+            entries: [(namespace, key, ttl_seconds), ...]
+
+        Returns:
+            list[bool]: 与 entries 一一对应，True 表示重复（已被占用），False 表示本次占用成功
+        """
+        if not entries:
+            return []
+        try:
+            result = self._check_and_set_many(entries)
+        except Exception as e:
+            logger.error("去重存储 [%s] 检查失败，按不重复处理: %s", self.name, e)
+            with self._stats_lock:
+                self._errors += 1
+            return [False] * len(entries)
+        with self._stats_lock:
+            self._checks += len(entries)
+            self._duplicates += sum(1 for dup in result if dup)
+        return result
+
+    def evict_many(self, entries: list) -> None:
+        """批量撤销占用
+
+        Args:
+            entries: [(namespace, key), ...]
+        """
+        entries = [(ns, key) for ns, key in entries if key]
+        if not entries:
+            return
+        try:
+            self._evict_many(entries)
+        except Exception as e:
+            logger.error("去重存储 [%s] 撤销失败: %s", self.name, e)
+            with self._stats_lock:
+                self._errors += 1
+            return
+        with self._stats_lock:
+            self._evictions += len(entries)
+
+    def check_and_set(self, namespace: str, key: str, ttl: float) -> bool:
+        return self.check_and_set_many([(namespace, key, ttl)])[0]
+
+    def evict(self, namespace: str, key: str) -> None:
+        self.evict_many([(namespace, key)])
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "backend": self.name,
+                "checks": self._checks,
+                "duplicates": self._duplicates,
+                "evictions": self._evictions,
+                "errors": self._errors,
+            }
+
+    @abstractmethod
+    def _check_and_set_many(self, entries: list) -> list:
+        ...
+
+    @abstractmethod
+    def _evict_many(self, entries: list) -> None:
+        ...
+
+
+class MemoryDedupStore(DedupStore):
+    """进程内实现，每个 namespace 一个 TTLCache"""
+
+    name = 'memory'
+
+    def __init__(self, maxsize: int = None):
+        super().__init__()
+        self._maxsize = maxsize or Config.DEDUP_CACHE_MAX_ENTRIES
+        self._caches = {}
+        self._caches_lock = threading.Lock()
+
+    def cache(self, namespace: str, ttl: float = None) -> TTLCache:
+        """获取 namespace 对应的缓存，不存在且给定 ttl 时创建"""
+        cache = self._caches.get(namespace)
+        if cache is None and ttl is not None:
+            with self._caches_lock:
+                cache = self._caches.get(namespace)
+                if cache is None:
+                    cache = TTLCache(ttl, maxsize=self._maxsize, name=f'{namespace}_dedup')
+                    self._caches[namespace] = cache
+                    # 纳入本地快照，重启后恢复去重状态
+                    register_cache(f'{namespace}_dedup', cache)
+        return cache
+
+    def namespaces(self) -> list:
+        return list(self._caches)
+
+    def _check_and_set_many(self, entries: list) -> list:
+        return [self.cache(ns, ttl).check_and_set(key, ttl=ttl) for ns, key, ttl in entries]
+
+    def _evict_many(self, entries: list) -> None:
+        for ns, key in entries:
+            cache = self.cache(ns)
+            if cache is not None:
+                cache.pop(key)
+
+
+class DatabaseDedupStore(DedupStore):
+    """数据库实现（alert_dedup 表）
+
+    每批次生成一个 owner 令牌，INSERT IGNORE 后按 owner 反查，
+    反查命中的 key 即本副本占用成功，其余为其他副本 / 更早请求已占用。
+    """
+
+    name = 'db'
+
+    # 全表过期清理间隔（秒），占用时只清理本批次 key 的过期行
+    PURGE_INTERVAL = 300
+
+    def __init__(self, storage=None):
+        super().__init__()
+        self._storage = storage
+        self._last_purge = time.monotonic()
+
+    def verify(self) -> bool:
+        """启动时检查 alert_dedup 表可用（顺带清理过期记录），不可用时去重将全部失效"""
+        try:
+            self.storage.purge_expired_dedup_keys(int(time.time() * 1000))
+            return True
+        except StorageError as e:
+            logger.error("去重表 alert_dedup 不可用，DEDUP_BACKEND=db 时所有告警都按不重复处理"
+                         "（请执行 init.sql 建表）: %s", e)
+            return False
+
+    @property
+    def storage(self):
+        return self._storage or get_storage()
+
+    @staticmethod
+    def _row_key(namespace: str, key: str) -> str:
+        return f"{namespace}:{key}"
+
+    def _check_and_set_many(self, entries: list) -> list:
+        now_ms = int(time.time() * 1000)
+        row_keys = [self._row_key(ns, key) for ns, key, _ in entries]
+        # 批次内重复的 key 只占用一次，后出现的视为重复
+        rows = {}
+        for row_key, (_, _, ttl) in zip(row_keys, entries):
+            rows.setdefault(row_key, now_ms + int(ttl * 1000))
+        claimed = self.storage.claim_dedup_keys(list(rows.items()), uuid.uuid4().hex, now_ms)
+        self._maybe_purge(now_ms)
+        result = []
+        seen = set()
+        for row_key in row_keys:
+            result.append(row_key not in claimed or row_key in seen)
+            seen.add(row_key)
+        return result
+
+    def _evict_many(self, entries: list) -> None:
+        self.storage.release_dedup_keys(list({self._row_key(ns, key) for ns, key in entries}))
+
+    def _maybe_purge(self, now_ms: int) -> None:
+        if time.monotonic() - self._last_purge < self.PURGE_INTERVAL:
+            return
+        self._last_purge = time.monotonic()
+        try:
+            removed = self.storage.purge_expired_dedup_keys(now_ms)
+            if removed:
+                logger.debug("清理过期去重记录 %d 条", removed)
+        except StorageError as e:
+            logger.warning("清理过期去重记录失败: %s", e)
+
+
+class RedisDedupStore(DedupStore):
+    """Redis 协议实现（SET NX PX，pipeline 批量提交）"""
+
+    name = 'redis'
+
+    def __init__(self, client=None, url: str = None, prefix: str = None):
+        """
+        Args:
+            client: redis-py 兼容客户端（需支持 pipeline / set(nx, px) / delete），
+                    为空时按 url 创建
+            url: Redis 地址，默认 DEDUP_REDIS_URL
+            prefix: key 前缀，默认 DEDUP_KEY_PREFIX
+        """
+        super().__init__()
+        if client is None:
+            if redis is None:
+                raise RuntimeError("DEDUP_BACKEND=redis 需要安装 redis 包")
+            client = redis.Redis.from_url(url or Config.DEDUP_REDIS_URL,
+                                          socket_timeout=2, socket_connect_timeout=2)
+        self._client = client
+        self._prefix = prefix if prefix is not None else Config.DEDUP_KEY_PREFIX
+
+    def _redis_key(self, namespace: str, key: str) -> str:
+        return f"{self._prefix}{namespace}:{key}"
+
+    def _check_and_set_many(self, entries: list) -> list:
+        pipe = self._client.pipeline(transaction=False)
+        for ns, key, ttl in entries:
+            pipe.set(self._redis_key(ns, key), 1, nx=True, px=max(1, int(ttl * 1000)))
+        # SET NX 成功返回 True，key 已存在返回 None
+        return [not ok for ok in pipe.execute()]
+
+    def _evict_many(self, entries: list) -> None:
+        self._client.delete(*{self._redis_key(ns, key) for ns, key in entries})
+
+
+_dedup_store = None
+_dedup_store_lock = threading.Lock()
+
+
+def create_dedup_store(backend: str = None) -> DedupStore:
+    """按名称创建去重存储（memory / db / redis）"""
+    backend = (backend or Config.DEDUP_BACKEND).lower()
+    if backend == 'memory':
+        return MemoryDedupStore()
+    if backend == 'db':
+        store = DatabaseDedupStore()
+        store.verify()
+        return store
+    if backend == 'redis':
+        return RedisDedupStore()
+    raise ValueError(f"不支持的 DEDUP_BACKEND: {backend}")
+
+
+def get_dedup_store() -> DedupStore:
+    """获取进程级去重存储单例"""
+    global _dedup_store
+    if _dedup_store is None:
+        with _dedup_store_lock:
+            if _dedup_store is None:
+                _dedup_store = create_dedup_store()
+                logger.info("去重存储后端: %s", _dedup_store.name)
+    return _dedup_store
+
+
+def set_dedup_store(store: DedupStore) -> None:
+    """替换全局去重存储（测试脚本使用）"""
+    global _dedup_store
+    with _dedup_store_lock:
+        _dedup_store = store
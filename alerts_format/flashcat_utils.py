@@ -6,27 +6,34 @@ Flashcat oncall 工具模块
 1. 调用 Flashcat schedule/info API 获取当前 oncall 的 person_id 列表
 2. 调用 Flashcat person/infos API 获取对应的人员姓名
 3. 查询本地 feishu_users 表，将姓名转换为飞书 open_id
+
+启用 oncall_cache 时以上结果按排班缓存到班次结束，告警路径通常不发起请求。
 """
 
 import copy
 import time
 import logging
-import requests
+
+from common_utils.circuit_breaker import guarded_session
 
 logger = logging.getLogger(__name__)
 
 FLASHCAT_API_BASE = "https://api.flashcat.cloud"
 
+# 经熔断与并发隔离的会话，Flashcat 不可用时快速失败
+_session = guarded_session('flashcat')
 
-def get_oncall_person_ids(app_key: str, schedule_id: int) -> list:
-    """从 Flashcat 获取当前 oncall 的 person_id 列表
+
+def get_oncall_shift(app_key: str, schedule_id: int):
+    """从 Flashcat 获取当前班次的 oncall person_id 列表与班次结束时间
 
     Args:
         app_key: Flashcat API key
         schedule_id: 排班 ID
 
     Returns:
-        list: person_id 列表，失败返回空列表
+        tuple: (person_ids, ends_at)，ends_at 为班次结束的 Unix 秒（响应中缺失时为 None）；
+        请求失败返回 None
     """
     now = int(time.time())
     url = f"{FLASHCAT_API_BASE}/schedule/info?app_key={app_key}"
@@ -36,23 +43,38 @@ def get_oncall_person_ids(app_key: str, schedule_id: int) -> list:
         "end": now + 86400,
     }
     try:
-        resp = requests.post(url, json=payload, timeout=10)
+        resp = _session.post(url, json=payload, timeout=10)
         resp.raise_for_status()
         data = resp.json()
 
-        cur_oncall = data.get("data", {}).get("cur_oncall", {})
+        cur_oncall = data.get("data", {}).get("cur_oncall", {}) or {}
         members = cur_oncall.get("group", {}).get("members", [])
         person_ids = []
         for member in members:
             person_ids.extend(member.get("person_ids", []))
 
-        logger.info("Flashcat oncall person_ids: %s", person_ids)
-        return person_ids
+        ends_at = cur_oncall.get("end")
+        ends_at = float(ends_at) if isinstance(ends_at, (int, float)) and ends_at > now else None
+        logger.info("Flashcat oncall person_ids: %s（班次结束: %s）", person_ids,
+                    time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ends_at)) if ends_at else "未知")
+        return person_ids, ends_at
     except Exception as e:
         logger.error("获取 Flashcat oncall person_ids 失败: %s", e)
-        return []
+        return None
 
 
+def get_oncall_person_ids(app_key: str, schedule_id: int) -> list:
+    """从 Flashcat 获取当前 oncall 的 person_id 列表
+
+    Args:
+        app_key: Flashcat API key
+        schedule_id: 排班 ID
+
+    Returns:
+        list: person_id 列表，失败返回空列表
+    """
+    shift = get_oncall_shift(app_key, schedule_id)
+    return shift[0] if shift else []
 
 
 def get_person_names(app_key: str, person_ids: list) -> list:
@@ -61,7 +83,7 @@ def get_person_names(app_key: str, person_ids: list) -> list:
         return []
     url = f"{FLASHCAT_API_BASE}/person/infos?app_key={app_key}"
     try:
-        resp = requests.post(url, json={"person_ids": person_ids}, timeout=10)
+        resp = _session.post(url, json={"person_ids": person_ids}, timeout=10)
         resp.raise_for_status()
         items = resp.json().get("data", {}).get("items", [])
         names = [item["person_name"] for item in items if item.get("person_name")]
@@ -72,42 +94,64 @@ def get_person_names(app_key: str, person_ids: list) -> list:
         return []
 
 
-def get_oncall_open_ids(app_key: str, schedule_id: int) -> list:
-    """完整流程：从 Flashcat 获取 oncall 人员，查询本地 feishu_users 表转换为 open_id
-
-    不依赖任何飞书 API token，直接查库。
-
-    Args:
-        app_key: Flashcat API key
-        schedule_id: Flashcat 排班 ID
+def get_oncall_roster(app_key: str, schedule_id: int):
+    """获取当前班次的 oncall 人员姓名与班次结束时间（两次 Flashcat 调用）
 
     Returns:
-        list: 飞书 open_id 列表
+        tuple: (names, ends_at)；任一请求失败返回 None（区别于当前班次无人值班的空列表）
     """
-    from alerts_format.db_utils import get_open_ids_by_names
-
-    person_ids = get_oncall_person_ids(app_key, schedule_id)
+    shift = get_oncall_shift(app_key, schedule_id)
+    if shift is None:
+        return None
+    person_ids, ends_at = shift
     if not person_ids:
-        logger.warning("未获取到 oncall person_ids，跳过 oncall 艾特")
-        return []
-
+        return [], ends_at
     names = get_person_names(app_key, person_ids)
     if not names:
-        logger.warning("未获取到 oncall 人员姓名，跳过 oncall 艾特")
-        return []
+        return None
+    return names, ends_at
+
 
-    name_to_id = get_open_ids_by_names(names)
+def map_oncall_open_ids(names: list, name_to_id: dict) -> list:
+    """按姓名顺序转换为 open_id，不在 feishu_users 表中的姓名跳过"""
     open_ids = []
     for name in names:
         oid = name_to_id.get(name, "")
         if oid:
-            logger.info("用户 '%s' -> open_id: %s", name, oid)
             open_ids.append(oid)
         else:
             logger.warning(
                 "用户 '%s' 不在 feishu_users 表中，已跳过（请在管理页面添加该用户）", name
             )
+    return open_ids
+
+
+def get_oncall_open_ids(app_key: str, schedule_id: int) -> list:
+    """完整流程：从 Flashcat 获取 oncall 人员，查询本地 feishu_users 表转换为 open_id
+
+    不依赖任何飞书 API token，直接查库。启用 oncall 缓存（ONCALL_CACHE_MAX_TTL>0）时
+    经 oncall_cache 按排班缓存到班次结束，通常不发起任何请求。
+
+    Args:
+        app_key: Flashcat API key
+        schedule_id: Flashcat 排班 ID
+
+    Returns:
+        list: 飞书 open_id 列表
+    """
+    from alerts_format.oncall_cache import get_oncall_cache
+    from alerts_format.db_utils import get_open_ids_by_names
+
+    cache = get_oncall_cache()
+    if cache is not None:
+        return cache.open_ids(app_key, schedule_id)
 
+    roster = get_oncall_roster(app_key, schedule_id)
+    if not roster or not roster[0]:
+        logger.warning("未获取到 oncall 人员，跳过 oncall 艾特")
+        return []
+    names = roster[0]
+    open_ids = map_oncall_open_ids(names, get_open_ids_by_names(names))
     logger.info("oncall 艾特 open_id 列表: %s", open_ids)
     return open_ids
 
@@ -145,7 +189,7 @@ def send_phone_alert(data: dict, integration_key: str) -> bool:
 
     url = f"{FLASHCAT_API_BASE}/event/push/alert/grafana?integration_key={integration_key}"
     try:
-        resp = requests.post(url, json=phone_data, timeout=10)
+        resp = _session.post(url, json=phone_data, timeout=10)
         resp.raise_for_status()
         logger.info("电话告警发送成功: status=%s body=%s", resp.status_code, resp.text[:200])
         return True
@@ -211,7 +255,7 @@ def create_phone_incident(data: dict, app_key: str, channel_id: str) -> str:
 
     url = f"{FLASHCAT_API_BASE}/incident/create?app_key={app_key}"
     try:
-        resp = requests.post(url, json=payload, timeout=10)
+        resp = _session.post(url, json=payload, timeout=10)
         resp.raise_for_status()
         result = resp.json()
         incident_id = result.get("data", {}).get("incident_id", "")
@@ -227,7 +271,7 @@ def create_phone_incident(data: dict, app_key: str, channel_id: str) -> str:
 
 
 def ack_incident(app_key: str, incident_id: str) -> bool:
-    """认领（ack）Flashcat incident
+    """认领（ack）Flashcat incident（单次请求，重试由调用方通过延迟重试调度器进行）
 
     Args:
         app_key: Flashcat API key
@@ -245,18 +289,11 @@ def ack_incident(app_key: str, incident_id: str) -> bool:
 
     url = f"{FLASHCAT_API_BASE}/incident/ack?app_key={app_key}"
     payload = {"incident_ids": [incident_id]}
-    max_retries = 3
-    for attempt in range(1, max_retries + 1):
-        try:
-            resp = requests.post(url, json=payload, timeout=10)
-            resp.raise_for_status()
-            logger.info("Flashcat incident 认领成功: incident_id=%s (attempt %d/%d)", incident_id, attempt, max_retries)
-            return True
-        except Exception as e:
-            if attempt < max_retries:
-                wait = attempt * 2
-                logger.warning("认领 Flashcat incident 失败 (attempt %d/%d): %s, %d秒后重试", attempt, max_retries, e, wait)
-                time.sleep(wait)
-            else:
-                logger.error("认领 Flashcat incident 失败 (已重试 %d 次): %s", max_retries, e)
-                return False
+    try:
+        resp = _session.post(url, json=payload, timeout=10)
+        resp.raise_for_status()
+        logger.info("Flashcat incident 认领成功: incident_id=%s", incident_id)
+        return True
+    except Exception as e:
+        logger.warning("认领 Flashcat incident 失败: incident_id=%s: %s", incident_id, e)
+        return False
@@ -7,80 +7,42 @@ Grafana 内置 Alertmanager 的 silence 接口路径：
                <grafana_url>/api/alertmanager/grafana/api/v2/silence/<id>
 """
 
-import json
 import logging
 from datetime import datetime, timedelta
 
-import mysql.connector
-import requests
-
 from config.config import Config
+from common_utils import jsoncodec
+from .storage import get_storage, StorageError
+from .silence_api import create_silences, delete_silences
+from .silence_planner import plan_silences
+from .silence_index import grafana_api, drop_silenced, record_created, record_deleted
 
 logger = logging.getLogger(__name__)
 
 
 def _get_alert_data(maid: str) -> dict:
     """从 alert_data 取 alertlabels / project / silenceid"""
-    from config import config
-    connection = None
     try:
-        db_config = config.get_alert_db_config()
-        connection = mysql.connector.connect(**db_config)
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute(
-            "SELECT alertlabels, project, silenceid FROM alert_data WHERE id = %s",
-            (maid,)
-        )
-        return cursor.fetchone() or {}
-    except Exception as e:
+        return get_storage().get_alert_data(maid, columns=('alertlabels', 'project', 'silenceid')) or {}
+    except StorageError as e:
         logger.error("读取 alert_data 失败: %s", e)
         return {}
-    finally:
-        if connection and connection.is_connected():
-            cursor.close()
-            connection.close()
 
 
 def _save_silence_ids(maid: str, silence_ids: list) -> None:
     """将 silence ID 列表写入 alert_data.silenceid"""
-    from config import config
-    connection = None
     try:
-        db_config = config.get_alert_db_config()
-        connection = mysql.connector.connect(**db_config)
-        cursor = connection.cursor()
-        cursor.execute(
-            "UPDATE alert_data SET silenceid = %s WHERE id = %s",
-            (json.dumps(silence_ids), maid)
-        )
-        connection.commit()
-    except Exception as e:
+        get_storage().update_alert_data(maid, silenceid=jsoncodec.dumps(silence_ids))
+    except StorageError as e:
         logger.error("保存 silence ID 失败: %s", e)
-    finally:
-        if connection and connection.is_connected():
-            cursor.close()
-            connection.close()
 
 
 def _clear_silence_ids(maid: str) -> None:
     """清空 alert_data.silenceid"""
-    from config import config
-    connection = None
     try:
-        db_config = config.get_alert_db_config()
-        connection = mysql.connector.connect(**db_config)
-        cursor = connection.cursor()
-        cursor.execute(
-            "UPDATE alert_data SET silenceid = NULL WHERE id = %s",
-            (maid,)
-        )
-        connection.commit()
-    except Exception as e:
+        get_storage().update_alert_data(maid, silenceid=None)
+    except StorageError as e:
         logger.error("清空 silence ID 失败: %s", e)
-    finally:
-        if connection and connection.is_connected():
-            cursor.close()
-            connection.close()
 
 
 def grafana_create_silence(maid: str, duration_hours: int, grafana_url: str) -> dict:
@@ -103,56 +65,64 @@ def grafana_create_silence(maid: str, duration_hours: int, grafana_url: str) ->
         return {"success": False, "message": f"未找到 MAID={maid} 的记录"}
 
     alertlabels_data = row.get('alertlabels') or '{}'
-    alertlabels_dict = json.loads(alertlabels_data) if isinstance(alertlabels_data, str) else alertlabels_data
+    alertlabels_dict = jsoncodec.loads(alertlabels_data) if isinstance(alertlabels_data, str) else alertlabels_data
     matchers_list = alertlabels_dict.get('matchers', [])
 
     if not matchers_list:
         return {"success": False, "message": "该告警无 matchers 数据"}
 
     now = datetime.now().astimezone()
+    end = now + timedelta(hours=duration_hours)
     starts_at = now.isoformat(timespec='milliseconds')
-    ends_at = (now + timedelta(hours=duration_hours)).isoformat(timespec='milliseconds')
+    ends_at = end.isoformat(timespec='milliseconds')
+
+    # 已被现有静默覆盖到结束时间的实例不再重复创建
+    api = grafana_api(grafana_url)
+    pending, covering_ids = drop_silenced(api, matchers_list, end.timestamp())
+    if not pending:
+        # 覆盖的静默不是本次创建的，不写入 silenceid（取消静默不应删除它们）
+        logger.info("告警 %s 的 %d 个实例均已被现有 Grafana 静默覆盖，跳过创建", maid, len(matchers_list))
+        return {"success": True, "already_silenced": True, "silence_ids": [], "covering_ids": covering_ids,
+                "message": "告警实例均已被现有静默覆盖，无需重复创建"}
 
     headers = {
         "Content-Type": "application/json",
         "Authorization": f"Bearer {api_key}",
     }
-    url = f"{grafana_url.rstrip('/')}/api/alertmanager/grafana/api/v2/silences"
-
-    silence_ids = []
-    for matchers_item in matchers_list:
-        matchers = matchers_item.get('matchers', [])
-        if not matchers:
-            continue
-
-        # Grafana silence 的 matchers 格式：[{"name":"..","value":"..","isRegex":false,"isEqual":true}]
-        body = {
+    url = f"{api}/silences"
+
+    # Grafana silence 的 matchers 格式：[{"name":"..","value":"..","isRegex":false,"isEqual":true}]
+    # 逐实例 matchers 合并为少量覆盖静默
+    planned = plan_silences(pending)
+    logger.info("%d 个实例合并为 %d 条 Grafana 静默", len(matchers_list), len(planned))
+    bodies = [
+        {
             "matchers": matchers,
             "startsAt": starts_at,
             "endsAt": ends_at,
             "comment": f"Feishu Bot - MAID: {maid}",
             "createdBy": "feishu_bot",
         }
-        try:
-            resp = requests.post(url, headers=headers, json=body, timeout=30)
-            if resp.status_code in (200, 201, 202):
-                sid = resp.json().get('silenceID') or resp.json().get('id', '')
-                if sid:
-                    silence_ids.append(sid)
-                    logger.info("Grafana 静默创建成功: %s", sid)
-            else:
-                logger.error("Grafana 静默创建失败: %s %s", resp.status_code, resp.text)
-        except Exception as e:
-            logger.error("调用 Grafana silence API 异常: %s", e)
+        for matchers in planned
+    ]
+    results = create_silences(url, bodies, headers)
+    record_created(api, bodies, results)
+    silence_ids = [r['silence_id'] for r in results if r['success']]
+    errors = [r['error'] for r in results if not r['success']]
 
     if silence_ids:
         _save_silence_ids(maid, silence_ids)
+        message = f"成功创建 {len(silence_ids)} 个 Grafana 静默规则"
+        if errors:
+            message += f"，{len(errors)} 个创建失败"
         return {
             "success": True,
             "silence_ids": silence_ids,
-            "message": f"成功创建 {len(silence_ids)} 个 Grafana 静默规则",
+            "failed_count": len(errors),
+            "errors": errors,
+            "message": message,
         }
-    return {"success": False, "message": "所有静默规则创建失败"}
+    return {"success": False, "message": "所有静默规则创建失败" + (f"：{errors[0]}" if errors else "")}
 
 
 def grafana_delete_silence(maid: str, grafana_url: str) -> dict:
@@ -177,28 +147,27 @@ def grafana_delete_silence(maid: str, grafana_url: str) -> dict:
     if not silenceid_raw:
         return {"success": False, "message": "该告警没有关联的静默规则"}
 
-    silence_ids = json.loads(silenceid_raw) if isinstance(silenceid_raw, str) else silenceid_raw
+    silence_ids = jsoncodec.loads(silenceid_raw) if isinstance(silenceid_raw, str) else silenceid_raw
 
     headers = {
         "Authorization": f"Bearer {api_key}",
     }
-    base_url = f"{grafana_url.rstrip('/')}/api/alertmanager/grafana/api/v2/silence"
-
-    deleted = 0
-    for sid in silence_ids:
-        try:
-            resp = requests.delete(f"{base_url}/{sid}", headers=headers, timeout=30)
-            if resp.status_code in (200, 204):
-                deleted += 1
-            else:
-                logger.error("Grafana 删除静默失败: %s %s", resp.status_code, resp.text)
-        except Exception as e:
-            logger.error("调用 Grafana delete silence 异常: %s", e)
-
-    _clear_silence_ids(maid)
+    api = grafana_api(grafana_url)
+    results = delete_silences(f"{api}/silence", silence_ids, headers)
+    record_deleted(api, [sid for sid, r in zip(silence_ids, results) if r['success']])
+    failed_ids = [sid for sid, r in zip(silence_ids, results) if not r['success']]
+    deleted = len(silence_ids) - len(failed_ids)
+
+    # 删除失败的 silence ID 保留，可再次取消
+    if failed_ids:
+        _save_silence_ids(maid, failed_ids)
+    else:
+        _clear_silence_ids(maid)
     return {
         "success": deleted > 0,
         "deleted_count": deleted,
         "total_count": len(silence_ids),
+        "failed_count": len(failed_ids),
+        "errors": [r['error'] for r in results if not r['success']],
         "message": f"成功删除 {deleted}/{len(silence_ids)} 个 Grafana 静默规则",
     }
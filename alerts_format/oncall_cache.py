@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+oncall 名单缓存
+
+oncall_sync 路由的每条告警、每条电话告警原先都要调用两次 Flashcat API
+（schedule/info、person/infos）并查询 feishu_users 表。值班名单只在换班时变化，
+本模块按排班缓存当前班次的人员姓名：
+
+- 过期时间取 Flashcat 返回的班次结束时间，且不超过 ONCALL_CACHE_MAX_TTL（兼顾临时调班）
+- 后台线程在过期前 ONCALL_REFRESH_LEAD 秒刷新，告警路径通常不发起任何请求
+- Flashcat 不可用时沿用过期名单（宁可艾特上一班，也不漏艾特），每 60 秒重试一次
+- 姓名 → open_id 按姓名缓存（含不在表中的姓名），/api/feishu_users 变更后整体失效
+"""
+
+import logging
+import threading
+import time
+
+from config.config import Config
+from .flashcat_utils import get_oncall_roster, map_oncall_open_ids
+from .storage import get_storage, StorageError
+
+logger = logging.getLogger(__name__)
+
+# 刷新失败后的重试间隔（秒）
+_RETRY_INTERVAL = 60
+
+
+class _Roster:
+    """单个排班的当前班次名单"""
+
+    __slots__ = ('app_key', 'names', 'expires_at', 'refresh_at', 'failures')
+
+    def __init__(self, app_key: str, names: list, expires_at: float, refresh_at: float):
+        self.app_key = app_key
+        self.names = names
+        self.expires_at = expires_at
+        self.refresh_at = refresh_at
+        self.failures = 0
+
+
+class OncallCache:
+    """schedule_id → 当前班次名单，姓名 → open_id"""
+
+    def __init__(self, max_ttl: float = None, lead: float = None, fetch=get_oncall_roster,
+                 lookup=None, clock=time.time):
+        """
+        Args:
+            max_ttl: 名单最长缓存秒数（班次结束更早时以班次结束为准）
+            lead: 过期前提前刷新的秒数
+            fetch: 拉取函数 fetch(app_key, schedule_id) → (names, ends_at) / None
+            lookup: 姓名查询函数 lookup(names) → {name: open_id}，默认查 feishu_users 表
+            clock: 墙钟函数（班次结束时间为 Unix 秒）
+        """
+        self._max_ttl = Config.ONCALL_CACHE_MAX_TTL if max_ttl is None else max_ttl
+        self._lead = Config.ONCALL_REFRESH_LEAD if lead is None else lead
+        self._fetch = fetch
+        self._lookup = lookup or (lambda names: get_storage().get_open_ids_by_names(names))
+        self._clock = clock
+        self._lock = threading.Lock()
+        # 串行化 Flashcat 拉取，并发未命中只请求一次
+        self._fetch_lock = threading.Lock()
+        self._rosters = {}
+        # name → open_id（'' 表示不在 feishu_users 表中）
+        self._names = {}
+        self._generation = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        # 计数器
+        self._hits = 0
+        self._stale_hits = 0
+        self._fetches = 0
+        self._fetch_errors = 0
+        self._user_lookups = 0
+
+    def open_ids(self, app_key: str, schedule_id: int) -> list:
+        """当前班次 oncall 人员的飞书 open_id 列表"""
+        self._ensure_thread()
+        now = self._clock()
+        with self._lock:
+            roster = self._rosters.get(schedule_id)
+        if roster is None or (now >= roster.expires_at and now >= roster.refresh_at):
+            # 首次查询 / 后台刷新未赶上：同步拉取，失败时沿用过期名单
+            roster = self._refresh(app_key, schedule_id)
+        else:
+            with self._lock:
+                self._hits += 1
+        if now >= roster.expires_at:
+            with self._lock:
+                self._stale_hits += 1
+        if not roster.names:
+            logger.warning("未获取到 oncall 人员，跳过 oncall 艾特")
+            return []
+        open_ids = map_oncall_open_ids(roster.names, self._resolve(roster.names))
+        logger.info("oncall 艾特 open_id 列表: %s", open_ids)
+        return open_ids
+
+    def invalidate_users(self) -> None:
+        """feishu_users 变更后清空姓名映射"""
+        with self._lock:
+            self._names.clear()
+            self._generation += 1
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    def stats(self) -> dict:
+        now = self._clock()
+        with self._lock:
+            return {
+                "max_ttl_seconds": self._max_ttl,
+                "refresh_lead_seconds": self._lead,
+                "schedules": {
+                    str(schedule_id): {
+                        "names": len(roster.names),
+                        "expires_in": round(roster.expires_at - now, 1),
+                        "failures": roster.failures,
+                    }
+                    for schedule_id, roster in self._rosters.items()
+                },
+                "cached_names": len(self._names),
+                "hits": self._hits,
+                "stale_hits": self._stale_hits,
+                "fetches": self._fetches,
+                "fetch_errors": self._fetch_errors,
+                "user_lookups": self._user_lookups,
+            }
+
+    # ── 内部 ──
+    def _refresh(self, app_key: str, schedule_id: int) -> _Roster:
+        """拉取名单；失败时保留旧名单（无旧名单时登记空名单）并在 60 秒后重试"""
+        with self._fetch_lock:
+            now = self._clock()
+            with self._lock:
+                current = self._rosters.get(schedule_id)
+            if current is not None and now < current.refresh_at:
+                # 等锁期间已被其他线程刷新
+                return current
+            result = self._fetch(app_key, schedule_id)
+            now = self._clock()
+            with self._lock:
+                self._fetches += 1
+                if result is None:
+                    self._fetch_errors += 1
+                    if current is None:
+                        current = self._rosters[schedule_id] = _Roster(app_key, [], now, now)
+                    current.failures += 1
+                    current.refresh_at = now + _RETRY_INTERVAL
+                    if current.names:
+                        logger.warning("Flashcat 不可用，排班 %s 沿用%s oncall 名单（%d 人）", schedule_id,
+                                       "已过期的" if now >= current.expires_at else "", len(current.names))
+                    return current
+                names, ends_at = result
+                expires_at = now + self._max_ttl
+                if ends_at:
+                    expires_at = min(expires_at, ends_at)
+                # 班次很短时提前量不超过剩余时间的一半，避免刷新过于频繁
+                refresh_at = expires_at - min(self._lead, (expires_at - now) / 2)
+                roster = self._rosters[schedule_id] = _Roster(app_key, list(names), expires_at, refresh_at)
+        if current is None or current.names != roster.names:
+            logger.info("排班 %s oncall 名单: %s（有效至 %s）", schedule_id, roster.names,
+                        time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(expires_at)))
+        self._wake.set()
+        return roster
+
+    def _resolve(self, names: list) -> dict:
+        """姓名 → open_id，未缓存的姓名批量查库"""
+        with self._lock:
+            missing = [name for name in names if name not in self._names]
+            generation = self._generation
+            mapping = {name: self._names.get(name, '') for name in names}
+        if missing:
+            try:
+                found = self._lookup(missing)
+            except StorageError as e:
+                logger.error("查询 feishu_users 失败: %s", e)
+                return mapping
+            mapping.update({name: found.get(name, '') for name in missing})
+            with self._lock:
+                self._user_lookups += 1
+                # 查询期间发生过失效则不回填，避免缓存变更前的结果
+                if generation == self._generation:
+                    self._names.update({name: found.get(name, '') for name in missing})
+        return mapping
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._loop, name='oncall-refresh', daemon=True)
+                    self._thread.start()
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            now = self._clock()
+            with self._lock:
+                due = [(schedule_id, roster.app_key) for schedule_id, roster in self._rosters.items()
+                       if now >= roster.refresh_at]
+                upcoming = [roster.refresh_at for roster in self._rosters.values() if now < roster.refresh_at]
+            for schedule_id, app_key in due:
+                try:
+                    self._refresh(app_key, schedule_id)
+                except Exception as e:
+                    logger.error("oncall 名单后台刷新异常: %s", e, exc_info=True)
+            if due:
+                continue
+            self._wake.wait(min(upcoming) - now if upcoming else None)
+            self._wake.clear()
+
+
+_oncall_cache = None
+_oncall_cache_lock = threading.Lock()
+
+
+def get_oncall_cache():
+    """获取进程级 oncall 名单缓存（ONCALL_CACHE_MAX_TTL=0 时返回 None）"""
+    global _oncall_cache
+    if Config.ONCALL_CACHE_MAX_TTL <= 0:
+        return None
+    if _oncall_cache is None:
+        with _oncall_cache_lock:
+            if _oncall_cache is None:
+                _oncall_cache = OncallCache()
+    return _oncall_cache
+
+
+def invalidate_oncall_users() -> None:
+    """feishu_users 表变更后调用"""
+    if _oncall_cache is not None:
+        _oncall_cache.invalidate_users()
@@ -1,29 +1,25 @@
-import json
 import random
-import mysql.connector
-from mysql.connector import Error
 import string
 import datetime
 import logging
 
-from config import config
+from common_utils import jsoncodec
+from .storage import get_storage, StorageError
+from .alert_state import get_alert_state
+from .alert_batch import AlertBatch
 
 logger = logging.getLogger(__name__)
 
 
 def save_dbdata(post_data, project, group_id=None):
-    json_data = [post_data]
+    batch = AlertBatch.of(post_data)
+    record = batch.firing_record
+    if record is None:
+        logger.info("没有告警的数据，不写入数据库")
+        return None
+    json_data_to_insert, fingerprints, min_starts_at = record
 
     # 使用 Grafana 发送的最早 startsAt（已配置为上海时区），直接使用原始值不做转换
-    min_starts_at = None
-    for alert in post_data.get('alerts', []):
-        if alert.get('status') == 'resolved':
-            continue
-        sa = alert.get('startsAt', '')
-        # 过滤无效占位时间
-        if sa and sa != '0001-01-01T00:00:00Z':
-            if min_starts_at is None or sa < min_starts_at:
-                min_starts_at = sa
     if min_starts_at:
         startsAtTime = min_starts_at
     else:
@@ -31,254 +27,125 @@ def save_dbdata(post_data, project, group_id=None):
         startsAtTime = datetime.datetime.now().astimezone().isoformat()
 
     random_number = ''.join(random.choice(string.ascii_letters + string.digits) for _ in range(20))
+    fingerprints_json = jsoncodec.dumps(fingerprints)
 
-    matchers = []
-    fingerprints = []
-
-    for alert_group in json_data:
-        for alert in alert_group.get('alerts', []):
-            if alert.get('status') == 'resolved':
-                continue
-            labels = alert.get('labels', {})
-            matchers_object = {"matchers": []}
-            for label_name, label_value in labels.items():
-                matchers_object["matchers"].append({
-                    "name": label_name,
-                    "value": label_value,
-                    "isRegex": False,
-                    "isEqual": True
-                })
-            matchers.append(matchers_object)
-            fp = alert.get('fingerprint')
-            if fp and fp not in fingerprints:
-                fingerprints.append(fp)
-
-    if not matchers:
-        logger.info("没有告警的数据，不写入数据库")
+    try:
+        get_storage().insert_alert_data(
+            random_number, json_data_to_insert, project, startsAtTime, fingerprints_json, group_id
+        )
+    except StorageError as e:
+        logger.error("插入告警数据时出错：%s", e)
         return None
+    state = get_alert_state()
+    if state is not None and group_id:
+        state.record_firing(random_number, group_id, fingerprints, startsAtTime)
+    return random_number
 
-    output_mysql = {"matchers": matchers}
-    json_data_to_insert = json.dumps(output_mysql)
-    fingerprints_json = json.dumps(fingerprints)
 
-    connection = None
+def update_message_id(maid: str, message_id: str, card_content: str = None) -> None:
+    """将飞书消息 ID（及原始卡片 JSON，卡片回调渲染新状态时使用）写入 alert_data，用于话题回复"""
+    if not maid or not message_id:
+        return
     try:
-        db_config = config.get_alert_db_config()
-        connection = mysql.connector.connect(**db_config)
+        if card_content:
+            get_storage().update_alert_data(maid, message_id=message_id, card_content=card_content)
+        else:
+            get_storage().update_alert_data(maid, message_id=message_id)
+        logger.debug("已将 message_id=%s 写入 maid=%s", message_id, maid)
+    except StorageError as e:
+        logger.error("更新 message_id 失败: %s", e)
+        return
+    state = get_alert_state()
+    if state is not None:
+        state.set_message_id(maid, message_id)
 
-        if connection.is_connected():
-            logger.info("成功连接到MySQL数据库")
-            cursor = connection.cursor()
-            insert_query = """
-                INSERT INTO alert_data (id, alertlabels, project, alerttime, fingerprints, group_id)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """
-            cursor.execute(insert_query, (
-                random_number, json_data_to_insert, project, startsAtTime, fingerprints_json, group_id
-            ))
-            connection.commit()
-            return random_number
 
-    except Error as e:
-        logger.error("连接或插入数据时出错：%s", e)
-        return None
+def index_merged_fingerprints(maid: str, group_id: str, fingerprints: list, starts_at: str,
+                              message_id: str) -> None:
+    """新实例并入已有卡片时立即更新告警状态索引（resolved 反查不必等待防抖写库）"""
+    state = get_alert_state()
+    if state is not None and group_id:
+        state.record_firing(maid, group_id, fingerprints, starts_at)
+        state.set_message_id(maid, message_id)
 
-    finally:
-        if connection and connection.is_connected():
-            cursor.close()
-            connection.close()
 
-
-def update_message_id(maid: str, message_id: str) -> None:
-    """将飞书消息 ID 写入 alert_data，用于话题回复"""
-    if not maid or not message_id:
-        return
-    connection = None
+def save_merged_alert(maid: str, matchers: list, fingerprints: list, card_content: str) -> bool:
+    """并入新实例后的卡片写回 alert_data（alertlabels / fingerprints / card_content 一次 UPDATE）"""
     try:
-        db_config = config.get_alert_db_config()
-        connection = mysql.connector.connect(**db_config)
-        cursor = connection.cursor()
-        cursor.execute(
-            "UPDATE alert_data SET message_id = %s WHERE id = %s",
-            (message_id, maid)
+        get_storage().update_alert_data(
+            maid,
+            # alertlabels 按 ASCII 转义写入，与 save_dbdata 保持一致
+            alertlabels=jsoncodec.dumps({"matchers": matchers}, ensure_ascii=True),
+            fingerprints=jsoncodec.dumps(fingerprints),
+            card_content=card_content,
         )
-        connection.commit()
-        logger.debug("已将 message_id=%s 写入 maid=%s", message_id, maid)
-    except Error as e:
-        logger.error("更新 message_id 失败: %s", e)
-    finally:
-        if connection and connection.is_connected():
-            cursor.close()
-            connection.close()
+        return True
+    except StorageError as e:
+        logger.error("写回合并卡片失败 maid=%s: %s", maid, e)
+        return False
 
 
 def update_incident_id(maid: str, incident_id: str) -> None:
     """将 Flashcat incident_id 写入 alert_data，用于后续认领操作"""
     if not maid or not incident_id:
         return
-    connection = None
     try:
-        db_config = config.get_alert_db_config()
-        connection = mysql.connector.connect(**db_config)
-        cursor = connection.cursor()
-        cursor.execute(
-            "UPDATE alert_data SET incident_id = %s WHERE id = %s",
-            (incident_id, maid)
-        )
-        connection.commit()
+        get_storage().update_alert_data(maid, incident_id=incident_id)
         logger.debug("已将 incident_id=%s 写入 maid=%s", incident_id, maid)
-    except Error as e:
+    except StorageError as e:
         logger.error("更新 incident_id 失败: %s", e)
-    finally:
-        if connection and connection.is_connected():
-            cursor.close()
-            connection.close()
 
 
 def get_incident_id_by_maid(maid: str) -> str:
     """通过 maid 查询 alert_data 中的 Flashcat incident_id"""
     if not maid:
         return ''
-    connection = None
     try:
-        db_config = config.get_alert_db_config()
-        connection = mysql.connector.connect(**db_config)
-        cursor = connection.cursor()
-        cursor.execute(
-            "SELECT incident_id FROM alert_data WHERE id = %s",
-            (maid,)
-        )
-        row = cursor.fetchone()
-        return row[0] if row and row[0] else ''
-    except Error as e:
+        row = get_storage().get_alert_data(maid, columns=('incident_id',))
+        return row['incident_id'] if row and row.get('incident_id') else ''
+    except StorageError as e:
         logger.error("查询 incident_id 失败: %s", e)
         return ''
-    finally:
-        if connection and connection.is_connected():
-            cursor.close()
-            connection.close()
 
 
 def save_card_content(maid: str, card_content: str) -> None:
-    """将原始卡片 JSON 存入 alert_data，认领时原地更新卡片使用"""
+    """将卡片当前 JSON 存入 alert_data，卡片回调渲染新状态时使用"""
     if not maid or not card_content:
         return
-    connection = None
     try:
-        db_config = config.get_alert_db_config()
-        connection = mysql.connector.connect(**db_config)
-        cursor = connection.cursor()
-        cursor.execute(
-            "UPDATE alert_data SET card_content = %s WHERE id = %s",
-            (card_content, maid)
-        )
-        connection.commit()
+        get_storage().update_alert_data(maid, card_content=card_content)
         logger.debug("已将 card_content 写入 maid=%s (len=%d)", maid, len(card_content))
-    except Error as e:
+    except StorageError as e:
         logger.error("保存 card_content 失败: %s", e)
-    finally:
-        if connection and connection.is_connected():
-            cursor.close()
-            connection.close()
-
-
-def get_card_content(maid: str) -> str:
-    """从 alert_data 读取原始卡片 JSON"""
-    if not maid:
-        return ''
-    connection = None
-    try:
-        db_config = config.get_alert_db_config()
-        connection = mysql.connector.connect(**db_config)
-        cursor = connection.cursor()
-        cursor.execute(
-            "SELECT card_content FROM alert_data WHERE id = %s",
-            (maid,)
-        )
-        row = cursor.fetchone()
-        return row[0] if row and row[0] else ''
-    except Error as e:
-        logger.error("查询 card_content 失败: %s", e)
-        return ''
-    finally:
-        if connection and connection.is_connected():
-            cursor.close()
-            connection.close()
 
 
 def get_alerttime_by_fingerprint(fingerprint: str, group_id: str = None) -> str:
     """通过 fingerprint（+可选 group_id）查找对应告警的 alerttime（ISO 字符串，取最早一条触发时间用于计算时长）"""
     if not fingerprint:
         return ''
-    connection = None
+    state = get_alert_state()
+    if state is not None and group_id:
+        return state.get_starts_at(fingerprint, group_id)
     try:
-        db_config = config.get_alert_db_config()
-        connection = mysql.connector.connect(**db_config)
-        cursor = connection.cursor()
-        if group_id:
-            cursor.execute(
-                "SELECT alerttime FROM alert_data "
-                "WHERE JSON_CONTAINS(fingerprints, %s) AND group_id = %s "
-                "ORDER BY created_at DESC, alerttime DESC LIMIT 1",
-                (json.dumps(fingerprint), group_id)
-            )
-        else:
-            cursor.execute(
-                "SELECT alerttime FROM alert_data "
-                "WHERE JSON_CONTAINS(fingerprints, %s) "
-                "ORDER BY created_at DESC, alerttime DESC LIMIT 1",
-                (json.dumps(fingerprint),)
-            )
-        row = cursor.fetchone()
-        if row and row[0]:
-            val = row[0]
-            # DB alerttime 存的是 Grafana 原始 startsAt（上海时区）
-            # MySQL DATETIME 返回 naive datetime，直接格式化返回即可
-            if hasattr(val, 'strftime'):
-                return val.strftime('%Y-%m-%dT%H:%M:%S')
-            return str(val)
-        return ''
-    except Error as e:
+        # DB alerttime 存的是 Grafana 原始 startsAt（上海时区）
+        return get_storage().get_alerttime_by_fingerprint(fingerprint, group_id=group_id)
+    except StorageError as e:
         logger.error("查询 alerttime 失败: %s", e)
         return ''
-    finally:
-        if connection and connection.is_connected():
-            cursor.close()
-            connection.close()
 
 
 def get_message_id_by_fingerprint(fingerprint: str, group_id: str = None) -> str:
     """通过 fingerprint（+可选 group_id）查找对应告警的飞书消息 ID（取最新记录，即最后一次告警对应的话题）"""
     if not fingerprint:
         return ''
-    connection = None
+    state = get_alert_state()
+    if state is not None and group_id:
+        return state.get_message_id(fingerprint, group_id)
     try:
-        db_config = config.get_alert_db_config()
-        connection = mysql.connector.connect(**db_config)
-        cursor = connection.cursor()
-        if group_id:
-            cursor.execute(
-                "SELECT message_id FROM alert_data "
-                "WHERE JSON_CONTAINS(fingerprints, %s) AND message_id IS NOT NULL AND group_id = %s "
-                "ORDER BY created_at DESC, alerttime DESC LIMIT 1",
-                (json.dumps(fingerprint), group_id)
-            )
-        else:
-            cursor.execute(
-                "SELECT message_id FROM alert_data "
-                "WHERE JSON_CONTAINS(fingerprints, %s) AND message_id IS NOT NULL "
-                "ORDER BY created_at DESC, alerttime DESC LIMIT 1",
-                (json.dumps(fingerprint),)
-            )
-        row = cursor.fetchone()
-        return row[0] if row else ''
-    except Error as e:
+        return get_storage().get_message_id_by_fingerprint(fingerprint, group_id=group_id)
+    except StorageError as e:
         logger.error("查询 message_id 失败: %s", e)
         return ''
-    finally:
-        if connection and connection.is_connected():
-            cursor.close()
-            connection.close()
 
 
 def get_all_fingerprints_by_fingerprint(fingerprints: list, group_id: str = None) -> list:
@@ -298,41 +165,26 @@ def get_all_fingerprints_by_fingerprint(fingerprints: list, group_id: str = None
     """
     if not fingerprints:
         return []
-    connection = None
+    state = get_alert_state()
+    if state is not None and group_id:
+        return list(state.get_siblings(fingerprints, group_id))
     try:
-        db_config = config.get_alert_db_config()
-        connection = mysql.connector.connect(**db_config)
-        cursor = connection.cursor()
-        all_fps = set()
-        for fp in fingerprints:
-            if not fp:
-                continue
-            if group_id:
-                cursor.execute(
-                    "SELECT fingerprints FROM alert_data "
-                    "WHERE JSON_CONTAINS(fingerprints, %s) AND group_id = %s "
-                    "ORDER BY created_at DESC, alerttime DESC",
-                    (json.dumps(fp), group_id)
-                )
-            else:
-                cursor.execute(
-                    "SELECT fingerprints FROM alert_data "
-                    "WHERE JSON_CONTAINS(fingerprints, %s) "
-                    "ORDER BY created_at DESC, alerttime DESC",
-                    (json.dumps(fp),)
-                )
-            for row in cursor.fetchall():
-                if row and row[0]:
-                    fps = row[0]
-                    if isinstance(fps, str):
-                        fps = json.loads(fps)
-                    if fps:
-                        all_fps.update(fps)
-        return list(all_fps)
-    except Error as e:
+        return list(get_storage().get_all_fingerprints_by_fingerprints(fingerprints, group_id=group_id))
+    except StorageError as e:
         logger.error("查询全部 fingerprint 失败: %s", e)
         return []
-    finally:
-        if connection and connection.is_connected():
-            cursor.close()
-            connection.close()
+
+
+def filter_still_firing(fingerprints: list, group_id: str) -> list:
+    """过滤掉告警状态索引中已标记恢复的实例（未启用索引时原样返回）"""
+    state = get_alert_state()
+    if state is None or not group_id:
+        return fingerprints
+    return state.still_firing(fingerprints, group_id)
+
+
+def mark_fingerprints_resolved(fingerprints: list, group_id: str) -> None:
+    """实例恢复后标记内存状态（alert_data 不记录恢复状态，仅更新告警状态索引）"""
+    state = get_alert_state()
+    if state is not None and fingerprints:
+        state.mark_resolved(group_id, fingerprints)
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+静默 API 批量调用
+
+静默按钮按 alertlabels.matchers 中的每个实例各创建一条 silence，原先逐条串行请求、
+每条超时 30 秒，100 个实例的告警静默 / 取消静默需要数分钟。本模块供 ma.py（Alertmanager）
+与 grafana_silence.py（Grafana 内置 Alertmanager）共用：
+
+- 进程级 requests.Session（Alertmanager 与 Grafana 各一个，经熔断与并发隔离），
+  连接池大小与并发数一致，复用 TCP / TLS 连接
+- 有界线程池并发执行（SILENCE_API_PARALLELISM）
+- 整体截止时间（SILENCE_API_DEADLINE）：到期后未开始的请求不再发出；已发出的删除请求
+  读超时收敛到剩余时间，已发出的创建请求仍按 SILENCE_API_TIMEOUT 等待结果
+  （避免服务端已创建、本地却拿不到 silenceID 而无法取消的静默）
+- 逐条返回结果，调用方据此汇总部分失败
+
+另提供 list_silences 供静默索引（silence_index）同步使用，复用同一连接池。
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from config.config import Config
+from common_utils import jsoncodec
+from common_utils.circuit_breaker import guarded_session
+
+logger = logging.getLogger(__name__)
+
+# 建连超时（秒）
+_CONNECT_TIMEOUT = 3.05
+
+# 依赖名 → 会话
+_sessions = {}
+_executor = None
+_init_lock = threading.Lock()
+
+
+def _dependency(url: str) -> str:
+    """按 API 地址区分依赖（Grafana 内置 Alertmanager 与独立 Alertmanager 分别熔断）"""
+    return 'grafana' if '/api/alertmanager/grafana/' in url else 'alertmanager'
+
+
+def _get_session(url: str):
+    """进程级连接池（线程安全的惰性初始化）"""
+    global _executor
+    dependency = _dependency(url)
+    session = _sessions.get(dependency)
+    if session is None:
+        with _init_lock:
+            session = _sessions.get(dependency)
+            if session is None:
+                workers = max(1, Config.SILENCE_API_PARALLELISM)
+                if _executor is None:
+                    _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='silence-api')
+                session = _sessions[dependency] = guarded_session(dependency, pool_maxsize=workers)
+    return session
+
+
+def _run_all(func, items: list, cap_to_deadline: bool) -> list:
+    """在有界线程池中对每个 item 执行 func(session, item, read_timeout)，按输入顺序返回结果"""
+    if not items:
+        return []
+    session = _get_session(items[0][0])
+    deadline = time.monotonic() + Config.SILENCE_API_DEADLINE
+
+    def call(item):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return {"success": False, "error": "超过整体截止时间，未发出请求"}
+        read_timeout = Config.SILENCE_API_TIMEOUT
+        if cap_to_deadline:
+            read_timeout = min(read_timeout, remaining)
+        try:
+            return func(session, item, read_timeout)
+        except requests.exceptions.Timeout:
+            return {"success": False, "error": "请求超时"}
+        except requests.exceptions.RequestException as e:
+            return {"success": False, "error": f"网络请求失败: {e}"}
+
+    if len(items) == 1:
+        # 单条直接在当前线程执行
+        return [call(items[0])]
+    futures = [_executor.submit(call, item) for item in items]
+    return [f.result() for f in futures]
+
+
+def _create_one(session, item, read_timeout) -> dict:
+    url, headers, body = item
+    resp = session.post(url, data=jsoncodec.dumps(body, ensure_ascii=True), headers=headers,
+                        timeout=(_CONNECT_TIMEOUT, read_timeout))
+    if resp.status_code not in (200, 201, 202):
+        return {"success": False, "error": f"状态码 {resp.status_code}: {resp.text[:200]}"}
+    try:
+        data = resp.json()
+    except ValueError:
+        return {"success": False, "error": "响应解析失败"}
+    sid = (data.get('silenceID') or data.get('id', '')) if isinstance(data, dict) else ''
+    if not sid:
+        return {"success": False, "error": "响应缺少 silenceID"}
+    return {"success": True, "silence_id": sid}
+
+
+def _delete_one(session, item, read_timeout) -> dict:
+    url, headers = item
+    resp = session.delete(url, headers=headers, timeout=(_CONNECT_TIMEOUT, read_timeout))
+    if resp.status_code in (200, 204):
+        return {"success": True}
+    return {"success": False, "error": f"状态码 {resp.status_code}: {resp.text[:200]}"}
+
+
+def create_silences(url: str, bodies: list, headers: dict = None) -> list:
+    """
+    并发创建静默规则
+
+    Args:
+        url: silences 接口地址（POST）
+        bodies: 每条静默的请求体
+        headers: 请求头（Content-Type 默认 application/json）
+
+    Returns:
+        list: 与 bodies 一一对应的 {"success": bool, "silence_id": str} / {"success": False, "error": str}
+    """
+    headers = dict(headers or {})
+    headers.setdefault("Content-Type", "application/json")
+    started = time.monotonic()
+    results = _run_all(_create_one, [(url, headers, body) for body in bodies], cap_to_deadline=False)
+    _log_summary("创建", results, started)
+    return results
+
+
+def delete_silences(base_url: str, silence_ids: list, headers: dict = None) -> list:
+    """
+    并发删除静默规则
+
+    Args:
+        base_url: silence 接口地址（DELETE <base_url>/<silence_id>）
+        silence_ids: 待删除的 silence ID 列表
+        headers: 请求头
+
+    Returns:
+        list: 与 silence_ids 一一对应的 {"success": bool[, "error": str]}
+    """
+    base_url = base_url.rstrip('/')
+    started = time.monotonic()
+    results = _run_all(_delete_one, [(f"{base_url}/{sid}", headers or {}) for sid in silence_ids],
+                       cap_to_deadline=True)
+    _log_summary("删除", results, started)
+    return results
+
+
+def _log_summary(action: str, results: list, started: float) -> None:
+    failed = [(idx, r['error']) for idx, r in enumerate(results, 1) if not r['success']]
+    for idx, error in failed:
+        logger.error("静默%s失败 [%d/%d]: %s", action, idx, len(results), error)
+    logger.info("静默%s完成: %d/%d 成功 (%.2fs)", action, len(results) - len(failed), len(results),
+                time.monotonic() - started)
+
+
+def list_silences(url: str, headers: dict = None) -> list:
+    """
+    拉取全部静默（GET silences 接口，含已过期的），失败时抛出 requests 异常
+
+    Args:
+        url: silences 接口地址
+        headers: 请求头
+    """
+    resp = _get_session(url).get(url, headers=headers or {},
+                              timeout=(_CONNECT_TIMEOUT, Config.SILENCE_API_TIMEOUT))
+    resp.raise_for_status()
+    data = jsoncodec.loads(resp.content)
+    return data if isinstance(data, list) else []
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+活跃静默本地索引
+
+机器人原先看不到上游已有的静默：Alertmanager / Grafana 在静默生效前后的竞争窗口内
+仍会投递已被静默的告警，静默按钮也总是重复创建。本模块后台周期（SILENCE_SYNC_INTERVAL）
+从各路由配置的 alertmanager_url / grafana_url 拉取静默，维护进程内 matcher 索引：
+
+- 增量同步：按 silence id + updatedAt 比对，只重新编译新增 / 变更的静默，删除已过期的
+- 按 alertname 精确匹配分桶，查询时只检查同名及无 alertname 限定的静默
+- 告警管道：firing 实例全部被活跃静默覆盖的路由跳过发送
+- 静默按钮：已被覆盖到目标结束时间的实例不再重复创建；本地创建 / 删除后立即更新索引
+
+同步失败超过 3 个周期的数据源视为未知，查询一律返回未静默（宁可多发，不漏发）。
+"""
+
+import logging
+import re
+import threading
+import time
+from datetime import datetime
+
+from config.config import Config
+from .silence_api import list_silences
+from .storage import get_storage, StorageError
+
+logger = logging.getLogger(__name__)
+
+
+def alertmanager_api(alertmanager_url: str) -> str:
+    """Alertmanager v2 API 根地址"""
+    return f"{alertmanager_url.rstrip('/')}/api/v2"
+
+
+def grafana_api(grafana_url: str) -> str:
+    """Grafana 内置 Alertmanager v2 API 根地址"""
+    return f"{grafana_url.rstrip('/')}/api/alertmanager/grafana/api/v2"
+
+
+def silence_source(config_row: dict) -> str:
+    """路由配置对应的静默数据源（API 根地址），未配置时返回空字符串"""
+    if config_row.get('silence_type') == 'grafana':
+        url = config_row.get('grafana_url')
+        return grafana_api(url) if url and Config.GRAFANA_API_KEY else ''
+    url = config_row.get('alertmanager_url')
+    return alertmanager_api(url) if url else ''
+
+
+def _parse_time(value) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return 0.0
+
+
+class _Silence:
+    """编译后的单条静默"""
+
+    __slots__ = ('id', 'updated', 'starts', 'ends', 'matchers', 'alertname')
+
+    def __init__(self, silence_id: str, updated: str, starts: float, ends: float, matchers: list):
+        self.id = silence_id
+        self.updated = updated
+        self.starts = starts
+        self.ends = ends
+        # [(name, value, 编译后的正则或 None, isEqual)]
+        self.matchers = []
+        self.alertname = None
+        for m in matchers:
+            name, value = m['name'], str(m.get('value', ''))
+            is_equal = m.get('isEqual', True)
+            # Alertmanager 正则 matcher 隐式全匹配
+            pattern = re.compile(value) if m.get('isRegex') else None
+            if name == 'alertname' and pattern is None and is_equal:
+                self.alertname = value
+            self.matchers.append((name, value, pattern, is_equal))
+
+    def matches(self, labels: dict) -> bool:
+        for name, value, pattern, is_equal in self.matchers:
+            actual = labels.get(name, '')
+            hit = pattern.fullmatch(actual) is not None if pattern is not None else actual == value
+            if hit != is_equal:
+                return False
+        return True
+
+
+def _compile(raw: dict):
+    """Alertmanager silence JSON → _Silence，已过期或无法编译时返回 None"""
+    if (raw.get('status') or {}).get('state') == 'expired':
+        return None
+    try:
+        return _Silence(raw['id'], raw.get('updatedAt', ''), _parse_time(raw.get('startsAt')),
+                        _parse_time(raw.get('endsAt')), raw.get('matchers') or [])
+    except (KeyError, TypeError, re.error) as e:
+        logger.warning("静默 %s 无法编译，忽略: %s", raw.get('id'), e)
+        return None
+
+
+class _Source:
+    """单个数据源的静默集合"""
+
+    __slots__ = ('silences', 'by_alertname', 'generic', 'headers', 'synced_at', 'failures')
+
+    def __init__(self, headers: dict):
+        self.silences = {}
+        self.by_alertname = {}
+        self.generic = []
+        self.headers = headers
+        self.synced_at = None
+        self.failures = 0
+
+    def rebuild(self) -> None:
+        by_alertname, generic = {}, []
+        for silence in self.silences.values():
+            if silence.alertname is not None:
+                by_alertname.setdefault(silence.alertname, []).append(silence)
+            else:
+                generic.append(silence)
+        self.by_alertname, self.generic = by_alertname, generic
+
+    def find(self, labels: dict, now: float, until: float):
+        for silence in self.by_alertname.get(labels.get('alertname', ''), ()):
+            if silence.starts <= now < silence.ends and silence.ends >= until and silence.matches(labels):
+                return silence.id
+        for silence in self.generic:
+            if silence.starts <= now < silence.ends and silence.ends >= until and silence.matches(labels):
+                return silence.id
+        return ''
+
+
+class SilenceIndex:
+    """数据源 API 根地址 → 活跃静默"""
+
+    def __init__(self, interval: float = None, fetch=list_silences, clock=time.monotonic):
+        """
+        Args:
+            interval: 同步周期（秒）
+            fetch: 拉取函数 fetch(silences_url, headers) → list
+            clock: 时钟函数（判断数据源是否过期），默认 time.monotonic
+        """
+        self._interval = interval or Config.SILENCE_SYNC_INTERVAL
+        self._fetch = fetch
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._sources = {}
+        self._stop = threading.Event()
+        self._thread = None
+        # 计数器
+        self._syncs = 0
+        self._sync_errors = 0
+        self._compiled = 0
+        self._hits = 0
+        self._lookups = 0
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='silence-sync', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def sync(self) -> None:
+        """拉取全部数据源（后台线程周期调用）"""
+        for api, headers in self._discover().items():
+            with self._lock:
+                source = self._sources.get(api)
+                if source is None:
+                    source = self._sources[api] = _Source(headers)
+                source.headers = headers
+                known = dict(source.silences)
+            try:
+                raws = self._fetch(f"{api}/silences", headers)
+            except Exception as e:
+                with self._lock:
+                    source.failures += 1
+                    self._sync_errors += 1
+                logger.warning("静默同步失败 %s: %s", api, e)
+                continue
+            silences, compiled = {}, 0
+            for raw in raws:
+                silence_id = raw.get('id') if isinstance(raw, dict) else None
+                if not silence_id or (raw.get('status') or {}).get('state') == 'expired':
+                    continue
+                old = known.get(silence_id)
+                if old is not None and old.updated == raw.get('updatedAt', '') and old.updated:
+                    silences[silence_id] = old
+                    continue
+                silence = _compile(raw)
+                if silence is not None:
+                    silences[silence_id] = silence
+                    compiled += 1
+            with self._lock:
+                source.silences = silences
+                source.rebuild()
+                source.synced_at = self._clock()
+                source.failures = 0
+                self._syncs += 1
+                self._compiled += compiled
+            if compiled or len(silences) != len(known):
+                logger.info("静默同步 %s: 活跃 %d 条（新增 / 变更 %d 条）", api, len(silences), compiled)
+
+    def silenced(self, source: str, labels_list: list, until: float = 0.0) -> list:
+        """
+        逐个 label 集合查询覆盖它的活跃静默
+
+        Args:
+            source: 数据源 API 根地址（silence_source / alertmanager_api / grafana_api）
+            labels_list: [labels dict, ...]
+            until: 要求静默至少持续到该时间戳（0 表示仅要求当前生效）
+
+        Returns:
+            list: 与 labels_list 一一对应的 silence id，未覆盖或数据源状态未知时为空字符串
+        """
+        now = time.time()
+        with self._lock:
+            src = self._sources.get(source)
+            fresh = (src is not None and src.synced_at is not None
+                     and self._clock() - src.synced_at <= 3 * self._interval)
+            result = [src.find(labels, now, until) if fresh else '' for labels in labels_list]
+            self._lookups += len(labels_list)
+            self._hits += sum(1 for sid in result if sid)
+        return result
+
+    def add(self, source: str, silence_id: str, matchers: list, starts_at: str, ends_at: str) -> None:
+        """本地创建静默成功后立即登记（不必等待下次同步）"""
+        silence = _compile({'id': silence_id, 'matchers': matchers, 'startsAt': starts_at, 'endsAt': ends_at})
+        if silence is None:
+            return
+        with self._lock:
+            src = self._sources.get(source)
+            if src is not None:
+                src.silences[silence_id] = silence
+                src.rebuild()
+
+    def remove(self, source: str, silence_ids: list) -> None:
+        """本地删除静默成功后立即移除"""
+        with self._lock:
+            src = self._sources.get(source)
+            if src is not None and any(src.silences.pop(sid, None) for sid in silence_ids):
+                src.rebuild()
+
+    def stats(self) -> dict:
+        now = self._clock()
+        with self._lock:
+            return {
+                "interval_seconds": self._interval,
+                "sources": {
+                    api: {
+                        "silences": len(src.silences),
+                        "synced_ago": round(now - src.synced_at, 1) if src.synced_at is not None else None,
+                        "failures": src.failures,
+                    }
+                    for api, src in self._sources.items()
+                },
+                "syncs": self._syncs,
+                "sync_errors": self._sync_errors,
+                "compiled": self._compiled,
+                "lookups": self._lookups,
+                "hits": self._hits,
+            }
+
+    # ── 内部 ──
+    def _discover(self) -> dict:
+        """从路由配置收集数据源：API 根地址 → 请求头"""
+        try:
+            rows = get_storage().list_alert_configs()
+        except StorageError as e:
+            logger.error("读取路由配置失败，沿用已知静默数据源: %s", e)
+            with self._lock:
+                return {api: src.headers for api, src in self._sources.items()}
+        sources = {}
+        for row in rows:
+            api = silence_source(row)
+            if api and api not in sources:
+                grafana = row.get('silence_type') == 'grafana'
+                sources[api] = {"Authorization": f"Bearer {Config.GRAFANA_API_KEY}"} if grafana else {}
+        return sources
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.sync()
+            except Exception as e:
+                logger.error("静默同步周期任务异常: %s", e, exc_info=True)
+            self._stop.wait(self._interval)
+
+
+_silence_index = None
+_silence_index_lock = threading.Lock()
+
+
+def get_silence_index():
+    """获取进程级静默索引（SILENCE_SYNC_INTERVAL=0 时返回 None）"""
+    global _silence_index
+    if Config.SILENCE_SYNC_INTERVAL <= 0:
+        return None
+    if _silence_index is None:
+        with _silence_index_lock:
+            if _silence_index is None:
+                _silence_index = SilenceIndex()
+    return _silence_index
+
+
+def drop_silenced(source: str, matchers_list: list, until: float) -> tuple:
+    """
+    去掉已被活跃静默覆盖到 until 的实例（仅全精确匹配的实例参与判断）
+
+    Returns:
+        tuple: (未覆盖的实例, 覆盖其余实例的 silence id 列表)，未启用索引时实例原样返回
+    """
+    index = get_silence_index()
+    if index is None or not source:
+        return matchers_list, []
+    labels_list = []
+    for item in matchers_list:
+        matchers = item.get('matchers') or []
+        plain = matchers and all(not m.get('isRegex') and m.get('isEqual', True) for m in matchers)
+        labels_list.append({m['name']: str(m.get('value', '')) for m in matchers} if plain else None)
+    checked = [labels for labels in labels_list if labels is not None]
+    covering = index.silenced(source, checked, until)
+    covered = iter(covering)
+    pending = [item for item, labels in zip(matchers_list, labels_list)
+               if labels is None or not next(covered)]
+    return pending, list(dict.fromkeys(sid for sid in covering if sid))
+
+
+def record_created(source: str, bodies: list, results: list) -> None:
+    """静默创建成功后登记到索引"""
+    index = get_silence_index()
+    if index is None or not source:
+        return
+    for body, result in zip(bodies, results):
+        if result['success']:
+            index.add(source, result['silence_id'], body['matchers'], body['startsAt'], body['endsAt'])
+
+
+def record_deleted(source: str, silence_ids: list) -> None:
+    """静默删除成功后从索引移除"""
+    index = get_silence_index()
+    if index is not None and source:
+        index.remove(source, silence_ids)
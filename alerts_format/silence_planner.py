@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+静默 matchers 最小化
+
+alert_data.alertlabels 为每个实例保存一组全 label 精确匹配的 matchers，静默按钮原先逐实例
+创建 silence：N 个实例就是 N 条几乎相同的静默，既拖慢按钮响应，也让 Alertmanager 的
+silence 存储与匹配开销随之膨胀。
+
+plan_silences 把实例 label 集合合并为少量覆盖静默：
+- 各实例取值相同的 label → 精确匹配（isRegex=False）
+- 取值不同的维度 → 锚定正则交替 ^(?:v1|v2|...)$（值经转义）
+
+合并只在"其余维度取值集合完全相同"的静默之间进行，每条静默始终是各维度取值集合的笛卡尔积，
+且积中的每个组合都是原有实例：静默覆盖的 label 组合与原先逐实例静默完全一致，不会多匹配任何序列。
+label 名集合不同的实例互不合并；含非精确匹配的 matchers 原样保留。
+"""
+
+from config.config import Config
+
+# RE2 / Python 正则共有的元字符，其余字符按字面匹配
+_REGEX_SPECIAL = frozenset('\\.+*?()|[]{}^$')
+
+
+def _escape(value: str) -> str:
+    return ''.join('\\' + c if c in _REGEX_SPECIAL else c for c in value)
+
+
+def _is_plain(matchers: list) -> bool:
+    """是否全部为精确相等匹配（可参与合并）"""
+    return bool(matchers) and all(
+        not m.get('isRegex') and m.get('isEqual', True) and 'name' in m for m in matchers
+    )
+
+
+def _merge_once(silences: list, name: str) -> list:
+    """沿 name 维度合并：其余维度取值集合完全相同的静默合为一条（name 取值取并集）"""
+    groups = {}
+    for silence in silences:
+        key = tuple(sorted((k, v) for k, v in silence.items() if k != name))
+        merged = groups.get(key)
+        if merged is None:
+            groups[key] = dict(silence)
+        else:
+            merged[name] = merged[name] | silence[name]
+    return list(groups.values())
+
+
+def _minimize(silences: list) -> list:
+    """贪心：每轮选合并后条数最少的维度，直到任何维度都无法再减少条数"""
+    names = sorted(set().union(*silences)) if silences else []
+    while len(silences) > 1:
+        best = None
+        for name in names:
+            merged = _merge_once(silences, name)
+            if len(merged) < len(silences) and (best is None or len(merged) < len(best)):
+                best = merged
+        if best is None:
+            break
+        silences = best
+    return silences
+
+
+def _split(silence: dict, max_values: int) -> list:
+    """取值数超过 max_values 的维度按块拆分（各块之积仍覆盖原静默，不多不少）"""
+    parts = [{}]
+    for name in sorted(silence):
+        values = sorted(silence[name])
+        chunks = [values[i:i + max_values] for i in range(0, len(values), max_values)]
+        parts = [dict(part, **{name: chunk}) for part in parts for chunk in chunks]
+    return parts
+
+
+def _to_matchers(silence: dict) -> list:
+    matchers = []
+    for name in sorted(silence):
+        values = silence[name]
+        if len(values) == 1:
+            matchers.append({"name": name, "value": values[0], "isRegex": False, "isEqual": True})
+        else:
+            pattern = '^(?:' + '|'.join(_escape(v) for v in values) + ')$'
+            matchers.append({"name": name, "value": pattern, "isRegex": True, "isEqual": True})
+    return matchers
+
+
+def plan_silences(matchers_list: list, max_values: int = None) -> list:
+    """
+    将逐实例 matchers 合并为覆盖静默
+
+    Args:
+        matchers_list: alertlabels.matchers，形如 [{"matchers": [{"name", "value", "isRegex", "isEqual"}]}, ...]
+        max_values: 单个正则交替的取值数上限（默认 SILENCE_MATCHER_MAX_VALUES）
+
+    Returns:
+        list: 每条静默的 matchers 列表（可直接作为 silences 接口请求体的 matchers）
+    """
+    max_values = max(1, max_values or Config.SILENCE_MATCHER_MAX_VALUES)
+    # label 名集合 → 该集合下的实例（每个实例为 {name: frozenset({value})}）
+    by_names = {}
+    passthrough = []
+    seen = set()
+    for item in matchers_list:
+        matchers = item.get('matchers', [])
+        if not _is_plain(matchers):
+            if matchers:
+                passthrough.append(matchers)
+            continue
+        labels = {m['name']: str(m.get('value', '')) for m in matchers}
+        key = tuple(sorted(labels.items()))
+        if key in seen:
+            continue
+        seen.add(key)
+        by_names.setdefault(frozenset(labels), []).append({k: frozenset((v,)) for k, v in labels.items()})
+
+    planned = []
+    for names in sorted(by_names, key=sorted):
+        for silence in _minimize(by_names[names]):
+            for part in _split(silence, max_values):
+                planned.append(_to_matchers(part))
+    return planned + passthrough
@@ -0,0 +1,730 @@
+#!/usr/bin/env python3
+"""
+存储层（Repository）模块
+
+将告警配置、告警记录、飞书用户映射的持久化操作统一收敛到 AlertStorage 接口，
+业务代码不再直接调用 mysql.connector。提供两种实现：
+
+- MySQLStorage : 生产环境默认实现，每次操作独立短连接（与原有行为一致）
+- SQLiteStorage: 嵌入式实现（WAL 模式，线程级长连接），用于边缘小规模部署和本地压测，
+                 无需网络数据库即可跑通完整告警链路
+
+通过环境变量 STORAGE_BACKEND=mysql|sqlite 选择实现，get_storage() 返回进程级单例。
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+import mysql.connector
+
+from config.config import Config
+from common_utils import jsoncodec
+
+logger = logging.getLogger(__name__)
+
+# alert_config 表允许写入/更新的列
+ALERT_CONFIG_COLUMNS = (
+    'group_id', 'users', 'alert_id', 'rank', 'alertmanager_url', 'project', 'remark',
+    'label_rules', 'template_type', 'silence_type', 'grafana_url', 'oncall_sync',
+    'flashcat_schedule_id', 'coalesce_window',
+)
+
+# alert_data 表允许按 maid 更新的列
+ALERT_DATA_UPDATABLE_COLUMNS = ('message_id', 'incident_id', 'card_content', 'silenceid', 'alertlabels', 'fingerprints')
+
+# feishu_users 表允许更新的列
+FEISHU_USER_COLUMNS = ('name', 'open_id', 'remark')
+
+
+class StorageError(Exception):
+    """存储层异常（屏蔽底层驱动差异）"""
+
+
+class DuplicateKeyError(StorageError):
+    """唯一键冲突"""
+
+
+def _quote(column: str) -> str:
+    """列名加反引号（rank 为 MySQL 保留字，SQLite 同样兼容反引号）"""
+    return f"`{column}`"
+
+
+class AlertStorage(ABC):
+    """存储接口定义（缺少任一方法的实现在实例化时即报错），所有实现需保证相同的返回结构：
+
+    - 行数据统一为 dict
+    - JSON 列以字符串形式返回（与 mysql-connector 行为一致），由调用方解析
+    - 写入冲突抛出 DuplicateKeyError，其他驱动错误抛出 StorageError
+    """
+
+    name = 'base'
+
+    # ── alert_config ──
+    @abstractmethod
+    def list_alert_configs(self) -> list:
+        ...
+
+    @abstractmethod
+    def list_label_rule_configs(self) -> list:
+        ...
+
+    @abstractmethod
+    def get_alert_config_by_alertid(self, alert_id: str) -> dict:
+        ...
+
+    @abstractmethod
+    def get_alert_config_by_project(self, project: str) -> dict:
+        ...
+
+    @abstractmethod
+    def create_alert_config(self, values: dict) -> int:
+        ...
+
+    @abstractmethod
+    def update_alert_config(self, rule_id: int, fields: dict) -> None:
+        ...
+
+    @abstractmethod
+    def delete_alert_config(self, rule_id: int) -> None:
+        ...
+
+    # ── feishu_users ──
+    @abstractmethod
+    def list_feishu_users(self) -> list:
+        ...
+
+    @abstractmethod
+    def upsert_feishu_users(self, items: list) -> list:
+        ...
+
+    @abstractmethod
+    def update_feishu_user(self, user_id: int, fields: dict) -> None:
+        ...
+
+    @abstractmethod
+    def delete_feishu_user(self, user_id: int) -> None:
+        ...
+
+    @abstractmethod
+    def get_open_ids_by_names(self, names: list) -> dict:
+        ...
+
+    # ── alert_data ──
+    @abstractmethod
+    def insert_alert_data(self, maid: str, alertlabels: str, project: str, alerttime: str,
+                          fingerprints: str, group_id: str = None) -> None:
+        ...
+
+    @abstractmethod
+    def update_alert_data(self, maid: str, **fields) -> int:
+        ...
+
+    @abstractmethod
+    def get_alert_data(self, maid: str, columns=('alertlabels', 'project', 'silenceid')) -> dict:
+        ...
+
+    @abstractmethod
+    def get_alerttime_by_fingerprint(self, fingerprint: str, group_id: str = None) -> str:
+        ...
+
+    @abstractmethod
+    def get_message_id_by_fingerprint(self, fingerprint: str, group_id: str = None) -> str:
+        ...
+
+    @abstractmethod
+    def get_all_fingerprints_by_fingerprints(self, fingerprints: list, group_id: str = None) -> set:
+        ...
+
+    @abstractmethod
+    def list_alert_data_between(self, start: str, end: str, columns: tuple, alertname: str = None) -> list:
+        ...
+
+    @abstractmethod
+    def list_alert_data_by_fingerprint(self, fingerprint: str, group_id: str = None,
+                                       columns=('id', 'message_id', 'alerttime', 'fingerprints')) -> list:
+        """返回 fingerprints 包含指定指纹的记录，按插入时间倒序（最新在前）"""
+
+    # ── alert_dedup ──
+    @abstractmethod
+    def claim_dedup_keys(self, entries: list, owner: str, now_ms: int) -> set:
+        """批量占用去重 key，entries 为 [(dedup_key, expires_at_ms), ...]，返回本次占用成功的 key 集合"""
+
+    @abstractmethod
+    def release_dedup_keys(self, keys: list) -> None:
+        ...
+
+    @abstractmethod
+    def purge_expired_dedup_keys(self, now_ms: int) -> int:
+        ...
+
+
+class _SQLStorage(AlertStorage):
+    """基于 DB-API 的通用实现，SQL 统一使用 %s 占位符，由子类处理方言差异"""
+
+    @abstractmethod
+    def _connection(self):
+        ...
+
+    def _sql(self, sql: str) -> str:
+        return sql
+
+    @abstractmethod
+    def _fingerprint_clause(self, fingerprint: str) -> tuple:
+        """返回 (where 子句, 参数)，判断 alert_data.fingerprints JSON 数组是否包含指定指纹"""
+
+    @abstractmethod
+    def _alertname_clause(self, alertname: str) -> tuple:
+        """返回 (where 子句, 参数)，按 alertname 粗筛 alertlabels"""
+
+    @abstractmethod
+    def _upsert_user_sql(self) -> str:
+        ...
+
+    @abstractmethod
+    def _insert_ignore(self) -> str:
+        """唯一键冲突时忽略的 INSERT 前缀"""
+
+    @abstractmethod
+    def _translate_error(self, e: Exception) -> StorageError:
+        ...
+
+    @abstractmethod
+    def _cursor(self, conn, dictionary: bool):
+        ...
+
+    # ── 通用执行辅助 ──
+    def _fetch(self, sql: str, params=(), one: bool = False, dictionary: bool = True):
+        try:
+            with self._connection() as conn:
+                cursor = self._cursor(conn, dictionary)
+                try:
+                    cursor.execute(self._sql(sql), params)
+                    rows = cursor.fetchall()
+                finally:
+                    cursor.close()
+        except StorageError:
+            raise
+        except Exception as e:
+            raise self._translate_error(e) from e
+        if dictionary:
+            rows = [dict(r) for r in rows]
+        if one:
+            return rows[0] if rows else None
+        return rows
+
+    def _execute(self, sql: str, params=()) -> tuple:
+        """执行写操作并提交，返回 (rowcount, lastrowid)"""
+        try:
+            with self._connection() as conn:
+                cursor = self._cursor(conn, False)
+                try:
+                    cursor.execute(self._sql(sql), params)
+                    result = (cursor.rowcount, cursor.lastrowid)
+                finally:
+                    cursor.close()
+                conn.commit()
+                return result
+        except StorageError:
+            raise
+        except Exception as e:
+            raise self._translate_error(e) from e
+
+    # ── alert_config ──
+    def list_alert_configs(self) -> list:
+        return self._fetch("SELECT * FROM alert_config ORDER BY id DESC")
+
+    def list_label_rule_configs(self) -> list:
+        return self._fetch("SELECT * FROM alert_config WHERE label_rules IS NOT NULL ORDER BY id ASC")
+
+    def get_alert_config_by_alertid(self, alert_id: str) -> dict:
+        return self._fetch("SELECT * FROM alert_config WHERE alert_id = %s", (alert_id,), one=True)
+
+    def get_alert_config_by_project(self, project: str) -> dict:
+        return self._fetch("SELECT * FROM alert_config WHERE project = %s LIMIT 1", (project,), one=True)
+
+    def create_alert_config(self, values: dict) -> int:
+        columns = [c for c in ALERT_CONFIG_COLUMNS if c in values]
+        sql = (
+            f"INSERT INTO alert_config ({', '.join(_quote(c) for c in columns)}) "
+            f"VALUES ({', '.join(['%s'] * len(columns))})"
+        )
+        _, lastrowid = self._execute(sql, tuple(values[c] for c in columns))
+        return lastrowid
+
+    def update_alert_config(self, rule_id: int, fields: dict) -> None:
+        columns = [c for c in ALERT_CONFIG_COLUMNS if c in fields]
+        if not columns:
+            return
+        sql = f"UPDATE alert_config SET {', '.join(f'{_quote(c)} = %s' for c in columns)} WHERE id = %s"
+        self._execute(sql, tuple(fields[c] for c in columns) + (rule_id,))
+
+    def delete_alert_config(self, rule_id: int) -> None:
+        self._execute("DELETE FROM alert_config WHERE id = %s", (rule_id,))
+
+    # ── feishu_users ──
+    def list_feishu_users(self) -> list:
+        return self._fetch(
+            "SELECT id, name, open_id, remark, created_at, updated_at FROM feishu_users ORDER BY id ASC"
+        )
+
+    def upsert_feishu_users(self, items: list) -> list:
+        """批量写入 (name, open_id, remark)，同一连接内逐行执行，返回每行的错误信息（成功为 None）"""
+        errors = []
+        try:
+            with self._connection() as conn:
+                cursor = self._cursor(conn, False)
+                try:
+                    for item in items:
+                        try:
+                            cursor.execute(self._sql(self._upsert_user_sql()), tuple(item))
+                            errors.append(None)
+                        except Exception as row_err:
+                            errors.append(str(self._translate_error(row_err)))
+                finally:
+                    cursor.close()
+                conn.commit()
+        except StorageError:
+            raise
+        except Exception as e:
+            raise self._translate_error(e) from e
+        return errors
+
+    def update_feishu_user(self, user_id: int, fields: dict) -> None:
+        columns = [c for c in FEISHU_USER_COLUMNS if c in fields]
+        if not columns:
+            return
+        sql = f"UPDATE feishu_users SET {', '.join(f'{c} = %s' for c in columns)} WHERE id = %s"
+        self._execute(sql, tuple(fields[c] for c in columns) + (user_id,))
+
+    def delete_feishu_user(self, user_id: int) -> None:
+        self._execute("DELETE FROM feishu_users WHERE id = %s", (user_id,))
+
+    def get_open_ids_by_names(self, names: list) -> dict:
+        if not names:
+            return {}
+        placeholders = ",".join(["%s"] * len(names))
+        rows = self._fetch(f"SELECT name, open_id FROM feishu_users WHERE name IN ({placeholders})", tuple(names))
+        return {row["name"]: row["open_id"] for row in rows}
+
+    # ── alert_data ──
+    def insert_alert_data(self, maid: str, alertlabels: str, project: str, alerttime: str,
+                          fingerprints: str, group_id: str = None) -> None:
+        self._execute(
+            "INSERT INTO alert_data (id, alertlabels, project, alerttime, fingerprints, group_id) "
+            "VALUES (%s, %s, %s, %s, %s, %s)",
+            (maid, alertlabels, project, alerttime, fingerprints, group_id),
+        )
+
+    def update_alert_data(self, maid: str, **fields) -> int:
+        columns = [c for c in ALERT_DATA_UPDATABLE_COLUMNS if c in fields]
+        if not columns:
+            return 0
+        sql = f"UPDATE alert_data SET {', '.join(f'{c} = %s' for c in columns)} WHERE id = %s"
+        rowcount, _ = self._execute(sql, tuple(fields[c] for c in columns) + (maid,))
+        return rowcount
+
+    def get_alert_data(self, maid: str, columns=('alertlabels', 'project', 'silenceid')) -> dict:
+        return self._fetch(
+            f"SELECT {', '.join(columns)} FROM alert_data WHERE id = %s", (maid,), one=True
+        )
+
+    def _latest_by_fingerprint(self, column: str, fingerprint: str, group_id: str = None,
+                               not_null: bool = False):
+        clause, param = self._fingerprint_clause(fingerprint)
+        sql = f"SELECT {column} FROM alert_data WHERE {clause}"
+        params = [param]
+        if not_null:
+            sql += f" AND {column} IS NOT NULL"
+        if group_id:
+            sql += " AND group_id = %s"
+            params.append(group_id)
+        sql += " ORDER BY created_at DESC, alerttime DESC LIMIT 1"
+        row = self._fetch(sql, tuple(params), one=True, dictionary=False)
+        return row[0] if row else None
+
+    def get_alerttime_by_fingerprint(self, fingerprint: str, group_id: str = None) -> str:
+        val = self._latest_by_fingerprint('alerttime', fingerprint, group_id)
+        if not val:
+            return ''
+        # alerttime 为 VARCHAR，兼容历史 DATETIME 列返回 datetime 的情况
+        if hasattr(val, 'strftime'):
+            return val.strftime('%Y-%m-%dT%H:%M:%S')
+        return str(val)
+
+    def get_message_id_by_fingerprint(self, fingerprint: str, group_id: str = None) -> str:
+        return self._latest_by_fingerprint('message_id', fingerprint, group_id, not_null=True) or ''
+
+    def get_all_fingerprints_by_fingerprints(self, fingerprints: list, group_id: str = None) -> set:
+        all_fps = set()
+        try:
+            with self._connection() as conn:
+                cursor = self._cursor(conn, False)
+                try:
+                    for fp in fingerprints:
+                        if not fp:
+                            continue
+                        clause, param = self._fingerprint_clause(fp)
+                        sql = f"SELECT fingerprints FROM alert_data WHERE {clause}"
+                        params = [param]
+                        if group_id:
+                            sql += " AND group_id = %s"
+                            params.append(group_id)
+                        cursor.execute(self._sql(sql), tuple(params))
+                        for row in cursor.fetchall():
+                            if row and row[0]:
+                                fps = jsoncodec.loads(row[0]) if isinstance(row[0], (str, bytes)) else row[0]
+                                if fps:
+                                    all_fps.update(fps)
+                finally:
+                    cursor.close()
+        except StorageError:
+            raise
+        except Exception as e:
+            raise self._translate_error(e) from e
+        return all_fps
+
+    def list_alert_data_between(self, start: str, end: str, columns: tuple, alertname: str = None) -> list:
+        sql = f"SELECT {', '.join(columns)} FROM alert_data WHERE alerttime >= %s AND alerttime < %s"
+        params = [start, end]
+        if alertname:
+            clause, param = self._alertname_clause(alertname)
+            sql += f" AND {clause}"
+            params.append(param)
+        sql += " ORDER BY alerttime DESC"
+        return self._fetch(sql, tuple(params))
+
+    def list_alert_data_by_fingerprint(self, fingerprint: str, group_id: str = None,
+                                       columns=('id', 'message_id', 'alerttime', 'fingerprints')) -> list:
+        clause, param = self._fingerprint_clause(fingerprint)
+        sql = f"SELECT {', '.join(columns)} FROM alert_data WHERE {clause}"
+        params = [param]
+        if group_id:
+            sql += " AND group_id = %s"
+            params.append(group_id)
+        sql += " ORDER BY created_at DESC, alerttime DESC"
+        return self._fetch(sql, tuple(params))
+
+    # ── alert_dedup ──
+    def claim_dedup_keys(self, entries: list, owner: str, now_ms: int) -> set:
+        """同一连接内完成：清理这些 key 中已过期的行 → INSERT IGNORE → 按 owner 反查占用结果"""
+        if not entries:
+            return set()
+        keys = [k for k, _ in entries]
+        placeholders = ",".join(["%s"] * len(keys))
+        try:
+            with self._connection() as conn:
+                cursor = self._cursor(conn, False)
+                try:
+                    cursor.execute(
+                        self._sql(f"DELETE FROM alert_dedup WHERE dedup_key IN ({placeholders}) AND expires_at <= %s"),
+                        tuple(keys) + (now_ms,),
+                    )
+                    values = ",".join(["(%s, %s, %s)"] * len(entries))
+                    params = []
+                    for key, expires_at in entries:
+                        params.extend((key, owner, expires_at))
+                    cursor.execute(
+                        self._sql(f"{self._insert_ignore()} alert_dedup (dedup_key, owner, expires_at) VALUES {values}"),
+                        tuple(params),
+                    )
+                    cursor.execute(
+                        self._sql(f"SELECT dedup_key FROM alert_dedup WHERE owner = %s AND dedup_key IN ({placeholders})"),
+                        (owner,) + tuple(keys),
+                    )
+                    claimed = {row[0] for row in cursor.fetchall()}
+                finally:
+                    cursor.close()
+                conn.commit()
+        except StorageError:
+            raise
+        except Exception as e:
+            raise self._translate_error(e) from e
+        return claimed
+
+    def release_dedup_keys(self, keys: list) -> None:
+        if not keys:
+            return
+        placeholders = ",".join(["%s"] * len(keys))
+        self._execute(f"DELETE FROM alert_dedup WHERE dedup_key IN ({placeholders})", tuple(keys))
+
+    def purge_expired_dedup_keys(self, now_ms: int) -> int:
+        rowcount, _ = self._execute("DELETE FROM alert_dedup WHERE expires_at <= %s", (now_ms,))
+        return rowcount
+
+
+# MySQL 已有库补表：(表, 建表语句)，与 init.sql 一致
+_MYSQL_ADDED_TABLES = (
+    ('alert_dedup', """CREATE TABLE IF NOT EXISTS alert_dedup (
+    dedup_key VARCHAR(191) PRIMARY KEY COMMENT '去重 key（命名空间:哈希）',
+    owner CHAR(32) NOT NULL COMMENT '占用方令牌（同批次 INSERT IGNORE 后据此判断是否占用成功）',
+    expires_at BIGINT NOT NULL COMMENT '过期时间（Unix 毫秒）',
+    KEY idx_expires_at (expires_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='告警去重表'"""),
+)
+
+# MySQL 已有库补列：(表, 列, 定义)，与 init.sql 中的升级语句一致
+_MYSQL_ADDED_COLUMNS = (
+    ('alert_config', 'coalesce_window',
+     "INT NOT NULL DEFAULT 0 COMMENT '合并窗口秒数: 同名告警多次推送在窗口内合并为一张卡片, 0=不合并'"),
+)
+
+
+class MySQLStorage(_SQLStorage):
+    """MySQL 实现（每次操作独立短连接，首次连接时补齐新增表与列）"""
+
+    name = 'mysql'
+
+    def __init__(self, db_config: dict = None):
+        self._db_config = db_config or Config.get_config_db_config()
+        self._schema_checked = False
+        self._schema_lock = threading.Lock()
+
+    @contextmanager
+    def _connection(self):
+        conn = mysql.connector.connect(**self._db_config)
+        try:
+            if not self._schema_checked:
+                self._ensure_schema(conn)
+            yield conn
+        finally:
+            if conn.is_connected():
+                conn.close()
+
+    def _ensure_schema(self, conn) -> None:
+        """已有库缺少新增表 / 列时补齐（未执行 init.sql 升级语句的部署）"""
+        with self._schema_lock:
+            if self._schema_checked:
+                return
+            cursor = conn.cursor()
+            try:
+                for table, ddl in _MYSQL_ADDED_TABLES:
+                    cursor.execute(
+                        "SELECT COUNT(*) FROM information_schema.TABLES "
+                        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+                        (table,),
+                    )
+                    if cursor.fetchone()[0]:
+                        continue
+                    cursor.execute(ddl)
+                    logger.warning("MySQL 缺少表 %s，已自动创建", table)
+                for table, column, definition in _MYSQL_ADDED_COLUMNS:
+                    cursor.execute(
+                        "SELECT COUNT(*) FROM information_schema.COLUMNS "
+                        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s",
+                        (table, column),
+                    )
+                    if cursor.fetchone()[0]:
+                        continue
+                    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {_quote(column)} {definition}")
+                    logger.warning("MySQL 表 %s 缺少列 %s，已自动补齐", table, column)
+                conn.commit()
+            except mysql.connector.Error as e:
+                logger.error("MySQL 补表 / 补列失败（请执行 init.sql 中的升级语句）: %s", e)
+            finally:
+                cursor.close()
+            self._schema_checked = True
+
+    def _cursor(self, conn, dictionary: bool):
+        return conn.cursor(dictionary=dictionary)
+
+    def _fingerprint_clause(self, fingerprint: str) -> tuple:
+        return "JSON_CONTAINS(fingerprints, %s)", jsoncodec.dumps(fingerprint, ensure_ascii=True)
+
+    def _alertname_clause(self, alertname: str) -> tuple:
+        return "JSON_SEARCH(alertlabels, 'one', %s, NULL, '$**.value') IS NOT NULL", alertname
+
+    def _upsert_user_sql(self) -> str:
+        return (
+            "INSERT INTO feishu_users (name, open_id, remark) VALUES (%s, %s, %s) "
+            "ON DUPLICATE KEY UPDATE open_id=VALUES(open_id), remark=VALUES(remark)"
+        )
+
+    def _insert_ignore(self) -> str:
+        return "INSERT IGNORE INTO"
+
+    def _translate_error(self, e: Exception) -> StorageError:
+        if isinstance(e, mysql.connector.Error) and e.errno == 1062:
+            return DuplicateKeyError(str(e))
+        return StorageError(str(e))
+
+
+# SQLite 表结构（与 init.sql 对齐，JSON 列以 TEXT 存储）
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS alert_config (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    group_id TEXT NOT NULL,
+    users TEXT NOT NULL,
+    alert_id TEXT NOT NULL UNIQUE,
+    `rank` TEXT NOT NULL,
+    telephone_url TEXT DEFAULT NULL,
+    telephone_rank TEXT DEFAULT NULL,
+    alertmanager_url TEXT NULL,
+    project TEXT NOT NULL,
+    remark TEXT DEFAULT NULL,
+    label_rules TEXT DEFAULT NULL,
+    template_type TEXT NOT NULL DEFAULT 'ops',
+    silence_type TEXT NOT NULL DEFAULT 'alertmanager',
+    grafana_url TEXT DEFAULT NULL,
+    oncall_sync INTEGER NOT NULL DEFAULT 0,
+    flashcat_schedule_id TEXT DEFAULT NULL,
+    coalesce_window INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS alert_data (
+    id TEXT PRIMARY KEY,
+    alertlabels TEXT NOT NULL,
+    project TEXT NOT NULL,
+    alerttime TEXT NOT NULL,
+    silenceid TEXT DEFAULT NULL,
+    message_id TEXT DEFAULT NULL,
+    fingerprints TEXT DEFAULT NULL,
+    group_id TEXT DEFAULT NULL,
+    incident_id TEXT DEFAULT NULL,
+    card_content TEXT DEFAULT NULL,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_alert_data_alerttime ON alert_data (alerttime);
+CREATE INDEX IF NOT EXISTS idx_alert_data_group_id ON alert_data (group_id);
+
+CREATE TABLE IF NOT EXISTS feishu_users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE,
+    open_id TEXT NOT NULL UNIQUE,
+    remark TEXT DEFAULT NULL,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TRIGGER IF NOT EXISTS trg_feishu_users_updated_at
+AFTER UPDATE ON feishu_users
+BEGIN
+    UPDATE feishu_users SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
+END;
+
+CREATE TABLE IF NOT EXISTS alert_dedup (
+    dedup_key TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_alert_dedup_expires_at ON alert_dedup (expires_at);
+"""
+
+# SQLite 已有库补列：(表, 列, 定义)
+_SQLITE_ADDED_COLUMNS = (
+    ('alert_config', 'coalesce_window', 'INTEGER NOT NULL DEFAULT 0'),
+)
+
+
+class SQLiteStorage(_SQLStorage):
+    """SQLite 嵌入式实现
+
+    - WAL 模式：读写互不阻塞，多线程并发读
+    - 每个线程持有独立长连接，避免每次操作的建连开销
+    - 首次使用时自动建表
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path: str = None):
+        self._path = path or Config.SQLITE_PATH
+        self._local = threading.local()
+        if self._path != ':memory:':
+            directory = os.path.dirname(os.path.abspath(self._path))
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.executescript(_SQLITE_SCHEMA)
+            for table, column, definition in _SQLITE_ADDED_COLUMNS:
+                existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+            conn.commit()
+        logger.info("SQLite 存储已就绪: %s", self._path)
+
+    def _open(self):
+        conn = sqlite3.connect(self._path, timeout=10, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._open()
+            self._local.conn = conn
+        try:
+            yield conn
+        except Exception:
+            conn.rollback()
+            raise
+
+    def _sql(self, sql: str) -> str:
+        return sql.replace('%s', '?')
+
+    def _cursor(self, conn, dictionary: bool):
+        cursor = conn.cursor()
+        if not dictionary:
+            cursor.row_factory = None
+        return cursor
+
+    def _fingerprint_clause(self, fingerprint: str) -> tuple:
+        return (
+            "EXISTS (SELECT 1 FROM json_each(alert_data.fingerprints) WHERE json_each.value = %s)",
+            fingerprint,
+        )
+
+    def _alertname_clause(self, alertname: str) -> tuple:
+        # SQLite 无 JSON_SEARCH，用 LIKE 粗筛，调用方在 Python 层精确过滤
+        # alertlabels 写入时非 ASCII 字符已转义（ensure_ascii=True），匹配串需按同样方式转义
+        return "alertlabels LIKE %s", f'%{jsoncodec.dumps(alertname, ensure_ascii=True)[1:-1]}%'
+
+    def _upsert_user_sql(self) -> str:
+        return (
+            "INSERT INTO feishu_users (name, open_id, remark) VALUES (%s, %s, %s) "
+            "ON CONFLICT(name) DO UPDATE SET open_id=excluded.open_id, remark=excluded.remark"
+        )
+
+    def _insert_ignore(self) -> str:
+        return "INSERT OR IGNORE INTO"
+
+    def _translate_error(self, e: Exception) -> StorageError:
+        if isinstance(e, sqlite3.IntegrityError) and 'UNIQUE' in str(e):
+            return DuplicateKeyError(str(e))
+        return StorageError(str(e))
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def create_storage(backend: str = None) -> AlertStorage:
+    """按名称创建存储实例（mysql / sqlite）"""
+    backend = (backend or Config.STORAGE_BACKEND).lower()
+    if backend == 'sqlite':
+        return SQLiteStorage()
+    if backend == 'mysql':
+        return MySQLStorage()
+    raise ValueError(f"不支持的 STORAGE_BACKEND: {backend}")
+
+
+def get_storage() -> AlertStorage:
+    """获取进程级存储单例"""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                _storage = create_storage()
+                logger.info("存储后端: %s", _storage.name)
+    return _storage
+
+
+def set_storage(storage: AlertStorage) -> None:
+    """替换全局存储实例（一致性测试 / 压测脚本使用）"""
+    global _storage
+    with _storage_lock:
+        _storage = storage
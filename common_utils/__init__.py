@@ -0,0 +1,13 @@
+"""
+通用基础组件模块
+与具体业务无关的并发 / 缓存等基础设施
+"""
+
+from .ttl_cache import TTLCache, cache_stats
+from . import jsoncodec
+
+__all__ = [
+    'TTLCache',
+    'cache_stats',
+    'jsoncodec',
+]
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+外部依赖熔断与并发隔离
+
+Flashcat、Alertmanager、Grafana 或飞书不可用时，每次调用仍要等满 10~30 秒的读超时，
+告警处理线程、路由线程与后台任务线程随之堆积，一个慢依赖拖住整条告警链路。
+本模块按依赖（feishu / flashcat / alertmanager / grafana）提供：
+
+- 熔断器（按 依赖 + 主机 区分，多个 Alertmanager 互不影响）：最近 CIRCUIT_WINDOW 次调用中
+  失败率达到 CIRCUIT_FAILURE_RATE，或慢调用（≥ CIRCUIT_SLOW_CALL_SECONDS）比例达到
+  CIRCUIT_SLOW_CALL_RATE 时打开，打开期间直接失败；CIRCUIT_OPEN_SECONDS 后进入半开，
+  放行 CIRCUIT_HALF_OPEN_PROBES 个探测请求，全部成功则关闭，任一失败重新打开
+- 并发隔离（按依赖）：同时进行中的请求数不超过 CIRCUIT_BULKHEAD_LIMITS，
+  已满时最多等待 CIRCUIT_BULKHEAD_WAIT 秒，仍无空位则直接失败
+- GuardedAdapter：挂载到 requests.Session 上，对该会话的全部请求生效；
+  网络异常、5xx 与 429 计为失败，其余响应计为成功
+
+熔断 / 隔离拒绝抛出 requests 异常的子类，调用方沿用原有的网络异常处理逻辑。
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config.config import Config
+from .executor import _parse_limits
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# 未在 CIRCUIT_BULKHEAD_LIMITS 中配置的依赖的并发上限
+_DEFAULT_BULKHEAD = 16
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """依赖熔断中，请求未发出"""
+
+
+class BulkheadFullError(requests.exceptions.RequestException):
+    """依赖并发已满，请求未发出"""
+
+
+class Bulkhead:
+    """单个依赖的并发上限"""
+
+    def __init__(self, name: str, limit: int, wait: float = None):
+        self.name = name
+        self._limit = max(1, limit)
+        self._wait = Config.CIRCUIT_BULKHEAD_WAIT if wait is None else wait
+        self._slots = threading.BoundedSemaphore(self._limit)
+        self._lock = threading.Lock()
+        self._active = 0
+        self._rejected = 0
+
+    def acquire(self) -> None:
+        if self._wait > 0:
+            acquired = self._slots.acquire(timeout=self._wait)
+        else:
+            acquired = self._slots.acquire(blocking=False)
+        if not acquired:
+            with self._lock:
+                self._rejected += 1
+            raise BulkheadFullError(f"{self.name} 并发已满（上限 {self._limit}）")
+        with self._lock:
+            self._active += 1
+
+    def release(self) -> None:
+        with self._lock:
+            self._active -= 1
+        self._slots.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"limit": self._limit, "active": self._active, "rejected": self._rejected}
+
+
+class CircuitBreaker:
+    """单个 依赖 + 主机 的熔断器"""
+
+    def __init__(self, name: str, bulkhead: Bulkhead = None, window: int = None, min_calls: int = None,
+                 failure_rate: float = None, slow_call_seconds: float = None, slow_call_rate: float = None,
+                 open_seconds: float = None, half_open_probes: int = None, clock=time.monotonic):
+        """
+        Args:
+            name: 熔断器名称（日志与统计用）
+            bulkhead: 所属依赖的并发隔离，None 时不限制并发
+            window: 统计最近多少次调用
+            min_calls: 窗口内调用数不足时不打开
+            failure_rate: 失败率阈值（0~1）
+            slow_call_seconds: 慢调用耗时阈值（秒）
+            slow_call_rate: 慢调用比例阈值（0~1）
+            open_seconds: 打开后多久进入半开
+            half_open_probes: 半开时放行的探测请求数（全部成功才关闭）
+            clock: 单调时钟
+        """
+        self.name = name
+        self._bulkhead = bulkhead
+        self._window = max(1, window or Config.CIRCUIT_WINDOW)
+        self._min_calls = max(1, min_calls or Config.CIRCUIT_MIN_CALLS)
+        self._failure_rate = Config.CIRCUIT_FAILURE_RATE if failure_rate is None else failure_rate
+        self._slow_call_seconds = Config.CIRCUIT_SLOW_CALL_SECONDS if slow_call_seconds is None else slow_call_seconds
+        self._slow_call_rate = Config.CIRCUIT_SLOW_CALL_RATE if slow_call_rate is None else slow_call_rate
+        self._open_seconds = Config.CIRCUIT_OPEN_SECONDS if open_seconds is None else open_seconds
+        self._probes = max(1, half_open_probes or Config.CIRCUIT_HALF_OPEN_PROBES)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        # 最近调用结果：(failed, slow)
+        self._outcomes = deque(maxlen=self._window)
+        self._failures = 0
+        self._slow = 0
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        # 计数器
+        self._calls = 0
+        self._rejected = 0
+        self._opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(self._clock())
+
+    def call(self, fn, *args, **kwargs):
+        """
+        经熔断器与并发隔离调用 fn
+
+        Raises:
+            CircuitOpenError: 熔断中（或半开时探测名额已满）
+            BulkheadFullError: 依赖并发已满
+        """
+        probe = self._admit()
+        try:
+            if self._bulkhead is not None:
+                self._bulkhead.acquire()
+        except BulkheadFullError:
+            if probe:
+                with self._lock:
+                    self._probes_in_flight -= 1
+            raise
+        started = self._clock()
+        try:
+            result = fn(*args, **kwargs)
+        except requests.exceptions.RequestException:
+            self._record(probe, True, self._clock() - started)
+            raise
+        except Exception:
+            # 非网络异常（编码错误等）不反映依赖健康状况
+            self._record(probe, False, 0.0)
+            raise
+        finally:
+            if self._bulkhead is not None:
+                self._bulkhead.release()
+        status = getattr(result, 'status_code', 0)
+        self._record(probe, status >= 500 or status == 429, self._clock() - started)
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            now = self._clock()
+            state = self._current_state(now)
+            calls = len(self._outcomes)
+            return {
+                "state": state,
+                "window_calls": calls,
+                "failure_rate": round(self._failures / calls, 3) if calls else 0.0,
+                "slow_call_rate": round(self._slow / calls, 3) if calls else 0.0,
+                "open_remaining": round(max(0.0, self._opened_at + self._open_seconds - now), 1)
+                if state == OPEN else 0.0,
+                "calls": self._calls,
+                "rejected": self._rejected,
+                "opened": self._opened,
+            }
+
+    # ── 内部 ──
+    def _current_state(self, now: float) -> str:
+        if self._state == OPEN and now - self._opened_at >= self._open_seconds:
+            self._state = HALF_OPEN
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+            logger.info("熔断器 %s 进入半开状态，放行 %d 个探测请求", self.name, self._probes)
+        return self._state
+
+    def _admit(self) -> bool:
+        """判断是否放行，返回该请求是否为半开探测"""
+        with self._lock:
+            state = self._current_state(self._clock())
+            if state == CLOSED:
+                self._calls += 1
+                return False
+            if state == HALF_OPEN and self._probes_in_flight + self._probe_successes < self._probes:
+                self._probes_in_flight += 1
+                self._calls += 1
+                return True
+            self._rejected += 1
+            remaining = max(0.0, self._opened_at + self._open_seconds - self._clock())
+        raise CircuitOpenError(f"{self.name} 熔断中" + (f"，{remaining:.0f}s 后探测" if state == OPEN else "，探测进行中"))
+
+    def _record(self, probe: bool, failed: bool, elapsed: float) -> None:
+        slow = elapsed >= self._slow_call_seconds > 0
+        with self._lock:
+            if probe:
+                self._probes_in_flight -= 1
+                if self._state != HALF_OPEN:
+                    return
+                if failed or slow:
+                    self._trip("探测请求" + ("失败" if failed else f"耗时 {elapsed:.1f}s"))
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self._probes:
+                    self._state = CLOSED
+                    self._outcomes.clear()
+                    self._failures = self._slow = 0
+                    logger.info("熔断器 %s 探测成功，恢复关闭状态", self.name)
+                return
+            if self._state != CLOSED:
+                return
+            if len(self._outcomes) == self._outcomes.maxlen:
+                old_failed, old_slow = self._outcomes[0]
+                self._failures -= old_failed
+                self._slow -= old_slow
+            self._outcomes.append((failed, slow))
+            self._failures += failed
+            self._slow += slow
+            calls = len(self._outcomes)
+            if calls < self._min_calls:
+                return
+            if self._failures / calls >= self._failure_rate:
+                self._trip(f"最近 {calls} 次调用失败率 {self._failures / calls:.0%}")
+            elif self._slow_call_rate > 0 and self._slow / calls >= self._slow_call_rate:
+                self._trip(f"最近 {calls} 次调用慢调用比例 {self._slow / calls:.0%}")
+
+    def _trip(self, reason: str) -> None:
+        """打开熔断器（持有锁时调用）"""
+        self._state = OPEN
+        self._opened_at = self._clock()
+        self._opened += 1
+        self._outcomes.clear()
+        self._failures = self._slow = 0
+        logger.warning("熔断器 %s 打开（%s），%.0fs 内直接失败", self.name, reason, self._open_seconds)
+
+
+class GuardedAdapter(HTTPAdapter):
+    """经熔断器与并发隔离发送请求的连接适配器"""
+
+    def __init__(self, dependency: str, **kwargs):
+        self._dependency = dependency
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        breaker = get_breaker(self._dependency, urlsplit(request.url).netloc)
+        return breaker.call(super().send, request, **kwargs)
+
+
+_breakers = {}
+_bulkheads = {}
+_registry_lock = threading.Lock()
+
+
+def get_breaker(dependency: str, host: str = '') -> CircuitBreaker:
+    """获取 依赖 + 主机 的熔断器（同一依赖的各主机共用并发隔离）"""
+    key = (dependency, host)
+    breaker = _breakers.get(key)
+    if breaker is None:
+        with _registry_lock:
+            breaker = _breakers.get(key)
+            if breaker is None:
+                bulkhead = _bulkheads.get(dependency)
+                if bulkhead is None:
+                    limit = _parse_limits(Config.CIRCUIT_BULKHEAD_LIMITS).get(dependency, _DEFAULT_BULKHEAD)
+                    bulkhead = _bulkheads[dependency] = Bulkhead(dependency, limit)
+                name = f"{dependency}:{host}" if host else dependency
+                breaker = _breakers[key] = CircuitBreaker(name, bulkhead)
+    return breaker
+
+
+def guarded_session(dependency: str, pool_maxsize: int = 10) -> requests.Session:
+    """创建挂载熔断与并发隔离的会话（CIRCUIT_BREAKER_ENABLED=false 时为普通会话）"""
+    session = requests.Session()
+    if Config.CIRCUIT_BREAKER_ENABLED:
+        adapter = GuardedAdapter(dependency, pool_connections=4, pool_maxsize=pool_maxsize)
+    else:
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def circuit_breaker_stats() -> dict:
+    """各依赖的并发隔离与熔断器状态（健康检查用）"""
+    with _registry_lock:
+        breakers = list(_breakers.items())
+        bulkheads = dict(_bulkheads)
+    result = {"enabled": Config.CIRCUIT_BREAKER_ENABLED}
+    for dependency, bulkhead in sorted(bulkheads.items()):
+        result[dependency] = dict(bulkhead.stats(), breakers={
+            breaker.name: breaker.stats()
+            for (dep, _), breaker in sorted(breakers, key=lambda item: item[0]) if dep == dependency
+        })
+    return result
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+有界后台任务执行器
+
+卡片按钮回调（静默 / 取消静默 / 认领）、飞书事件、电话告警回退原先每次都新建一个线程，
+点击或事件突发时线程数不受控，每个线程还各自占用数据库连接与 socket。
+BoundedExecutor 为这些任务提供共享的固定大小线程池：
+
+- 按任务类型（kind）限制排队 + 执行中的任务数，超出时拒绝并计数，由调用方决定降级方式
+- 任务异常统一记录日志，不影响工作线程
+- 退出时停止接收新任务，在超时内等待已提交的任务执行完毕
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class BoundedExecutor:
+    """固定线程数 + 按类型限额的后台任务池"""
+
+    def __init__(self, name: str, workers: int, default_limit: int, limits: dict = None):
+        """
+        Args:
+            name: 线程名前缀
+            workers: 工作线程数
+            default_limit: 每种任务类型默认的未完成任务上限（排队 + 执行中）
+            limits: 按类型覆盖的上限 {kind: limit}
+        """
+        self._name = name
+        self._workers = max(1, workers)
+        self._default_limit = max(1, default_limit)
+        self._limits = dict(limits or {})
+        self._pool = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._stopping = False
+        # kind → 计数
+        self._pending = {}
+        self._submitted = {}
+        self._completed = {}
+        self._failed = {}
+        self._rejected = {}
+
+    def submit(self, kind: str, fn, *args, **kwargs) -> bool:
+        """
+        提交任务
+
+        Returns:
+            bool: False 表示该类型已达上限或执行器正在退出，任务未提交
+        """
+        with self._lock:
+            limit = self._limits.get(kind, self._default_limit)
+            if self._stopping or self._pending.get(kind, 0) >= limit:
+                self._rejected[kind] = self._rejected.get(kind, 0) + 1
+                logger.warning("后台任务被拒绝 kind=%s（未完成 %d / 上限 %d%s）", kind,
+                               self._pending.get(kind, 0), limit, "，执行器退出中" if self._stopping else "")
+                return False
+            self._pending[kind] = self._pending.get(kind, 0) + 1
+            self._submitted[kind] = self._submitted.get(kind, 0) + 1
+        try:
+            self._pool.submit(self._run, kind, fn, args, kwargs)
+        except RuntimeError:
+            # 线程池已关闭
+            self._done(kind, self._rejected)
+            return False
+        return True
+
+    def shutdown(self, timeout: float = 10) -> bool:
+        """停止接收新任务并等待已提交任务完成，返回是否在超时内全部完成"""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            self._stopping = True
+            while sum(self._pending.values()) > 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.warning("后台任务未在 %.0fs 内完成，放弃等待: %s", timeout,
+                                   {k: v for k, v in self._pending.items() if v})
+                    return False
+                self._idle.wait(remaining)
+        self._pool.shutdown(wait=False)
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            kinds = set(self._submitted) | set(self._rejected)
+            return {
+                "workers": self._workers,
+                "stopping": self._stopping,
+                "kinds": {
+                    kind: {
+                        "limit": self._limits.get(kind, self._default_limit),
+                        "pending": self._pending.get(kind, 0),
+                        "submitted": self._submitted.get(kind, 0),
+                        "completed": self._completed.get(kind, 0),
+                        "failed": self._failed.get(kind, 0),
+                        "rejected": self._rejected.get(kind, 0),
+                    }
+                    for kind in sorted(kinds)
+                },
+            }
+
+    # ── 内部 ──
+    def _run(self, kind, fn, args, kwargs) -> None:
+        counter = self._completed
+        try:
+            fn(*args, **kwargs)
+        except Exception as e:
+            counter = self._failed
+            logger.error("后台任务异常 kind=%s: %s", kind, e, exc_info=True)
+        finally:
+            self._done(kind, counter)
+
+    def _done(self, kind: str, counter: dict) -> None:
+        with self._lock:
+            self._pending[kind] -= 1
+            counter[kind] = counter.get(kind, 0) + 1
+            if counter is self._rejected:
+                self._submitted[kind] -= 1
+            self._idle.notify_all()
+
+
+def _parse_limits(spec: str) -> dict:
+    """解析 "kind=limit,kind=limit" 形式的按类型上限"""
+    limits = {}
+    for item in (spec or '').split(','):
+        kind, _, value = item.partition('=')
+        if kind.strip() and value.strip().isdigit():
+            limits[kind.strip()] = int(value)
+    return limits
+
+
+_task_executor = None
+_task_executor_lock = threading.Lock()
+
+
+def get_task_executor() -> BoundedExecutor:
+    """获取进程级后台任务执行器"""
+    global _task_executor
+    if _task_executor is None:
+        with _task_executor_lock:
+            if _task_executor is None:
+                _task_executor = BoundedExecutor(
+                    'bg-task',
+                    Config.TASK_EXECUTOR_WORKERS,
+                    Config.TASK_EXECUTOR_QUEUE_LIMIT,
+                    _parse_limits(Config.TASK_EXECUTOR_QUEUE_LIMITS),
+                )
+    return _task_executor
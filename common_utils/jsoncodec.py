@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+统一 JSON 编解码
+
+告警接收、卡片渲染、DB JSON 列、WS 事件桥接都在热路径上反复编解码 JSON。
+本模块在安装了 orjson 时使用 orjson，否则回退到标准库 json，两种后端输出一致：
+
+- 紧凑分隔符（',' / ':'），默认 ensure_ascii=False
+- ensure_ascii=True 走标准库 C 编码器（alert_data.alertlabels 依赖 \\uXXXX 转义做 LIKE 查询，
+  写库时必须与存量数据一致；对 orjson 输出再做转义反而比标准库慢）
+- datetime / dataclass 等非原生类型统一交给 default 处理，与标准库行为一致
+- orjson 不支持的输入（超出 64 位的整数、NaN 字面量等）自动回退标准库
+- 唯一差异：浮点 NaN / Infinity 在 orjson 下序列化为 null（标准库输出的是非法 JSON 字面量）
+
+另提供 Flask JSON Provider，使 request.json / jsonify 走同一套编解码。
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:  # 可选依赖，未安装时使用标准库
+    orjson = None
+
+BACKEND = 'orjson' if orjson is not None else 'json'
+
+JSONDecodeError = json.JSONDecodeError
+
+# orjson 将超出 u64 的整数解析为 float，标准库保持精确整数：含 20 位以上连续数字的输入交给标准库。
+# 数字统一映射为 '0' 后做子串查找，比正则扫描快一个数量级
+_DIGITS_TO_ZERO = bytes.maketrans(b'123456789', b'000000000')
+_LONG_DIGITS = b'0' * 20
+
+if orjson is not None:
+    _BASE_OPTS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+    _ORJSON_ERRORS = (orjson.JSONEncodeError, OverflowError)
+
+
+def _stdlib_dumps(obj, ensure_ascii, sort_keys, default, indent) -> str:
+    if indent is None:
+        return json.dumps(obj, ensure_ascii=ensure_ascii, sort_keys=sort_keys, default=default,
+                          separators=(',', ':'))
+    return json.dumps(obj, ensure_ascii=ensure_ascii, sort_keys=sort_keys, default=default, indent=indent)
+
+
+def dumps(obj, *, ensure_ascii: bool = False, sort_keys: bool = False, default=None, indent: int = None) -> str:
+    """序列化为 JSON 字符串
+
+    Args:
+        obj: 待序列化对象
+        ensure_ascii: 是否将非 ASCII 字符转义为 \\uXXXX（默认否）
+        sort_keys: 是否按 key 排序
+        default: 无法原生序列化的对象的转换函数
+        indent: 缩进（仅调试输出使用，走标准库）
+    """
+    if orjson is None or ensure_ascii or indent is not None:
+        return _stdlib_dumps(obj, ensure_ascii, sort_keys, default, indent)
+    try:
+        option = (_BASE_OPTS | orjson.OPT_SORT_KEYS) if sort_keys else _BASE_OPTS
+        return orjson.dumps(obj, default=default, option=option).decode()
+    except _ORJSON_ERRORS:
+        return _stdlib_dumps(obj, ensure_ascii, sort_keys, default, indent)
+
+
+def dumpb(obj, **kwargs) -> bytes:
+    """序列化为 UTF-8 编码的 JSON bytes（写文件 / 网络时省去一次 encode）"""
+    if orjson is not None and not kwargs:
+        try:
+            return orjson.dumps(obj, option=_BASE_OPTS)
+        except _ORJSON_ERRORS:
+            pass
+    return dumps(obj, **kwargs).encode()
+
+
+def loads(data):
+    """反序列化 JSON（str / bytes）"""
+    if orjson is None:
+        return json.loads(data)
+    try:
+        raw = data.encode() if isinstance(data, str) else data
+        if isinstance(raw, bytes) and _LONG_DIGITS in raw.translate(_DIGITS_TO_ZERO):
+            return json.loads(data)
+        return orjson.loads(raw)
+    except (UnicodeEncodeError, orjson.JSONDecodeError):
+        # NaN / Infinity / 孤立代理字符 / 非 str 输入等，交给标准库处理（结果或异常与标准库一致）
+        return json.loads(data)
+
+
+def install_flask_provider(app) -> None:
+    """为 Flask 应用安装基于本模块的 JSON Provider（request.json / jsonify）"""
+    from flask.json.provider import DefaultJSONProvider
+
+    class CodecJSONProvider(DefaultJSONProvider):
+        # 响应体不再转义中文，体积更小；解析结果与标准库一致
+        ensure_ascii = False
+
+        def dumps(self, obj, **kwargs) -> str:
+            kwargs.pop('separators', None)
+            if set(kwargs) - {'default', 'ensure_ascii', 'sort_keys', 'indent'}:
+                return super().dumps(obj, **kwargs)
+            return dumps(obj,
+                         ensure_ascii=kwargs.get('ensure_ascii', self.ensure_ascii),
+                         sort_keys=kwargs.get('sort_keys', self.sort_keys),
+                         default=kwargs.get('default', self.default),
+                         indent=kwargs.get('indent'))
+
+        def loads(self, s, **kwargs):
+            if kwargs:
+                return super().loads(s, **kwargs)
+            return loads(s)
+
+    app.json = CodecJSONProvider(app)
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+延迟重试调度器（时间轮）
+
+认领 incident、认领后原地更新卡片原先在循环里 time.sleep 退避重试，每次重试都占住一个
+后台工作线程直到退避结束。RetryScheduler 把"等待"交给单个时间轮线程：
+
+- 首次尝试在调用方线程执行，失败后按带抖动的指数退避登记到时间轮
+  （RETRY_BASE_DELAY × 2^(n-1)，上限 RETRY_MAX_DELAY，实际取 [d/2, d] 内随机值）
+- 到期的重试提交到后台任务执行器（与首次尝试同一任务类型），执行器繁忙时延后再提交，不计入次数
+- 同一 (kind, key) 只保留一个待重试任务：再次 run 会取消旧任务并立即尝试；可显式 cancel，
+  已到期、正在执行的任务被取消后不再调用 fn，也不再登记下一次重试
+- 尝试次数记录在已注册快照的 TTLCache 中，进程重启 / 用户再次点击后沿用已用次数，
+  不会重新获得完整的重试预算（待执行的闭包本身不持久化）
+"""
+
+import logging
+import math
+import random
+import threading
+import time
+
+from config.config import Config
+from .executor import get_task_executor
+from .snapshot import register_cache
+from .ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# 时间轮刻度（秒）与槽数，一圈覆盖 _TICK * _SLOTS 秒，更长的延迟按圈数计
+_TICK = 0.5
+_SLOTS = 256
+# 执行器拒绝时延后再提交的秒数
+_REJECTED_DELAY = 1.0
+# 尝试次数记录保留时长（秒）
+_ATTEMPTS_TTL = 3600
+
+
+class _RetryTask:
+    __slots__ = ('kind', 'key', 'fn', 'on_give_up', 'max_attempts', 'base_delay', 'max_delay',
+                 'rounds', 'cancelled')
+
+    def __init__(self, kind, key, fn, on_give_up, max_attempts, base_delay, max_delay):
+        self.kind = kind
+        self.key = key
+        self.fn = fn
+        self.on_give_up = on_give_up
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rounds = 0
+        self.cancelled = False
+
+
+class RetryScheduler:
+    """单线程时间轮 + 后台任务执行器"""
+
+    def __init__(self, submit=None, attempts: TTLCache = None, tick: float = _TICK, slots: int = _SLOTS):
+        """
+        Args:
+            submit: 提交函数 submit(kind, fn) → bool，默认后台任务执行器
+            attempts: 尝试次数记录（key 为 "kind:key"）
+            tick: 时间轮刻度（秒）
+            slots: 时间轮槽数
+        """
+        self._submit = submit or get_task_executor().submit
+        self._attempts = attempts if attempts is not None else TTLCache(_ATTEMPTS_TTL, name='retry_attempts')
+        self._tick = tick
+        self._wheel = [[] for _ in range(max(1, slots))]
+        self._cursor = 0
+        self._lock = threading.Lock()
+        # (kind, key) → 待重试任务
+        self._tasks = {}
+        self._stop = threading.Event()
+        self._thread = None
+        # kind → 计数
+        self._succeeded = {}
+        self._retried = {}
+        self._gave_up = {}
+        self._cancelled = {}
+        self._deferred = {}
+
+    def run(self, kind: str, key: str, fn, on_give_up=None, max_attempts: int = None,
+            base_delay: float = None, max_delay: float = None) -> bool:
+        """
+        在当前线程立即尝试一次，失败后登记延迟重试
+
+        Args:
+            kind: 任务类型（同时作为执行器任务类型）
+            key: 任务标识，同一 (kind, key) 只保留一个待重试任务
+            fn: 无参函数，返回真值表示成功，返回假值或抛出异常表示失败
+            on_give_up: 次数用尽后的回调 on_give_up(last_error)，last_error 为最后一次异常或 None
+            max_attempts: 最大尝试次数（含首次，默认 RETRY_MAX_ATTEMPTS）
+            base_delay: 首次重试的退避基数（秒，默认 RETRY_BASE_DELAY）
+            max_delay: 单次退避上限（秒，默认 RETRY_MAX_DELAY）
+
+        Returns:
+            bool: 首次尝试是否成功
+        """
+        task = _RetryTask(
+            kind, key, fn, on_give_up,
+            max(1, max_attempts or Config.RETRY_MAX_ATTEMPTS),
+            Config.RETRY_BASE_DELAY if base_delay is None else base_delay,
+            Config.RETRY_MAX_DELAY if max_delay is None else max_delay,
+        )
+        # 新的尝试取代尚未执行的旧重试
+        self.cancel(kind, key, count=False)
+        return self._attempt(task)
+
+    def cancel(self, kind: str, key: str, count: bool = True) -> bool:
+        """取消待重试任务，返回是否存在该任务"""
+        with self._lock:
+            task = self._tasks.pop((kind, key), None)
+            if task is None:
+                return False
+            task.cancelled = True
+            if count:
+                self._cancelled[kind] = self._cancelled.get(kind, 0) + 1
+        return True
+
+    def stop(self) -> int:
+        """停止时间轮，返回被丢弃的待重试任务数"""
+        self._stop.set()
+        with self._lock:
+            dropped = len(self._tasks)
+            for task in self._tasks.values():
+                task.cancelled = True
+            self._tasks.clear()
+        if dropped:
+            logger.warning("延迟重试调度器退出，丢弃 %d 个待重试任务", dropped)
+        return dropped
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = {}
+            for kind, _ in self._tasks:
+                pending[kind] = pending.get(kind, 0) + 1
+            kinds = set(pending) | set(self._succeeded) | set(self._retried) | set(self._gave_up)
+            return {
+                "tick_seconds": self._tick,
+                "slots": len(self._wheel),
+                "depth": len(self._tasks),
+                "kinds": {
+                    kind: {
+                        "pending": pending.get(kind, 0),
+                        "retried": self._retried.get(kind, 0),
+                        "succeeded": self._succeeded.get(kind, 0),
+                        "gave_up": self._gave_up.get(kind, 0),
+                        "cancelled": self._cancelled.get(kind, 0),
+                        "deferred": self._deferred.get(kind, 0),
+                    }
+                    for kind in sorted(kinds)
+                },
+            }
+
+    # ── 内部 ──
+    def _attempt(self, task: _RetryTask) -> bool:
+        """执行一次尝试，失败时登记重试或放弃"""
+        if task.cancelled:
+            return False
+        counter_key = f"{task.kind}:{task.key}"
+        attempt = int(self._attempts.get(counter_key, 0)) + 1
+        self._attempts.set(counter_key, attempt)
+        error = None
+        try:
+            ok = bool(task.fn())
+        except Exception as e:
+            ok, error = False, e
+        if ok:
+            self._attempts.pop(counter_key)
+            self._release(task)
+            self._count(self._succeeded, task.kind)
+            if attempt > 1:
+                logger.info("重试成功 %s key=%s（第 %d 次尝试）", task.kind, task.key, attempt)
+            return True
+
+        if task.cancelled:
+            # 执行期间被取消（或被新的 run 取代），不再重试
+            return False
+        if attempt >= task.max_attempts:
+            self._attempts.pop(counter_key)
+            self._release(task)
+            self._count(self._gave_up, task.kind)
+            logger.error("重试次数用尽 %s key=%s（共 %d 次）: %s", task.kind, task.key, attempt, error)
+            if task.on_give_up is not None:
+                try:
+                    task.on_give_up(error)
+                except Exception as e:
+                    logger.error("重试放弃回调异常 %s key=%s: %s", task.kind, task.key, e, exc_info=True)
+            return False
+
+        ceiling = min(task.max_delay, task.base_delay * (2 ** (attempt - 1)))
+        delay = random.uniform(ceiling / 2, ceiling)
+        logger.warning("%s key=%s 第 %d/%d 次尝试失败: %s，%.1fs 后重试",
+                       task.kind, task.key, attempt, task.max_attempts, error, delay)
+        self._schedule(task, delay)
+        return False
+
+    def _schedule(self, task: _RetryTask, delay: float) -> None:
+        ticks = max(1, math.ceil(delay / self._tick))
+        with self._lock:
+            if self._stop.is_set() or task.cancelled:
+                return
+            current = self._tasks.get((task.kind, task.key))
+            if current is not None and current is not task:
+                current.cancelled = True
+            task.rounds = (ticks - 1) // len(self._wheel)
+            self._wheel[(self._cursor + ticks) % len(self._wheel)].append(task)
+            self._tasks[(task.kind, task.key)] = task
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name='retry-wheel', daemon=True)
+                self._thread.start()
+
+    def _release(self, task: _RetryTask) -> None:
+        """任务结束（成功 / 放弃）后移出待重试表"""
+        with self._lock:
+            if self._tasks.get((task.kind, task.key)) is task:
+                del self._tasks[(task.kind, task.key)]
+
+    def _advance(self) -> list:
+        """时间轮前进一格，返回到期任务（执行结束前仍保留在待重试表中，可被取消）"""
+        with self._lock:
+            self._cursor = (self._cursor + 1) % len(self._wheel)
+            slot = self._wheel[self._cursor]
+            due, waiting = [], []
+            for task in slot:
+                if task.cancelled:
+                    continue
+                if task.rounds > 0:
+                    task.rounds -= 1
+                    waiting.append(task)
+                else:
+                    due.append(task)
+            self._wheel[self._cursor] = waiting
+        return due
+
+    def _loop(self) -> None:
+        next_tick = time.monotonic() + self._tick
+        while not self._stop.wait(max(0.0, next_tick - time.monotonic())):
+            # 落后时逐格追赶，保证延迟不被跳过
+            while next_tick <= time.monotonic() and not self._stop.is_set():
+                next_tick += self._tick
+                for task in self._advance():
+                    self._dispatch(task)
+
+    def _dispatch(self, task: _RetryTask) -> None:
+        if self._submit(task.kind, self._attempt, task):
+            self._count(self._retried, task.kind)
+        else:
+            self._count(self._deferred, task.kind)
+            self._schedule(task, _REJECTED_DELAY)
+
+    def _count(self, counter: dict, kind: str) -> None:
+        with self._lock:
+            counter[kind] = counter.get(kind, 0) + 1
+
+
+_retry_scheduler = None
+_retry_scheduler_lock = threading.Lock()
+
+
+def get_retry_scheduler() -> RetryScheduler:
+    """获取进程级延迟重试调度器"""
+    global _retry_scheduler
+    if _retry_scheduler is None:
+        with _retry_scheduler_lock:
+            if _retry_scheduler is None:
+                attempts = TTLCache(_ATTEMPTS_TTL, maxsize=Config.DEDUP_CACHE_MAX_ENTRIES, name='retry_attempts')
+                register_cache('retry_attempts', attempts)
+                _retry_scheduler = RetryScheduler(attempts=attempts)
+    return _retry_scheduler
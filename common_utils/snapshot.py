@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+TTL 缓存本地快照
+
+进程内去重缓存（告警 / 事件 / 回调）在重启后会全部丢失，Grafana repeat_interval
+的重复投递会在重启后的 5~30 分钟内全部变成新卡片。本模块将已注册缓存的未过期条目
+定期（以及 SIGTERM 时）写入本地 gzip JSON 文件，启动时加载并丢弃已过期条目。
+
+- 写入：先写临时文件再 os.replace，保证快照文件始终完整
+- 过期时间以墙钟时间（Unix 秒）保存，跨进程可比较
+- 加载早于缓存注册时（缓存按需创建），条目暂存到注册时再回填
+"""
+
+import gzip
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from . import jsoncodec
+
+logger = logging.getLogger(__name__)
+
+_SNAPSHOT_VERSION = 1
+
+_caches = {}
+_pending = {}
+_lock = threading.Lock()
+_saver_thread = None
+_saver_stop = threading.Event()
+
+
+def register_cache(name: str, cache) -> None:
+    """注册需要快照的 TTLCache，若已加载过同名快照则立即回填"""
+    with _lock:
+        _caches[name] = cache
+        entries = _pending.pop(name, None)
+    if entries:
+        _restore(cache, entries)
+        logger.info("缓存快照回填: %s %d 条", name, len(entries))
+
+
+def _restore(cache, entries: list) -> int:
+    now = time.time()
+    restored = 0
+    for key, value, expires_at in entries:
+        remaining = expires_at - now
+        if remaining > 0:
+            cache.set(key, value, ttl=remaining)
+            restored += 1
+    return restored
+
+
+def save_snapshot(path: str) -> int:
+    """将所有已注册缓存的未过期条目写入快照文件，返回写入条目数"""
+    now = time.time()
+    with _lock:
+        caches = list(_caches.items())
+        # 尚未注册（本进程未用到）的缓存保留加载时的条目，避免被覆盖丢失
+        pending = {name: list(entries) for name, entries in _pending.items()}
+    data = {}
+    total = 0
+    for name, cache in caches:
+        entries = []
+        for key, value, remaining in cache.items():
+            if isinstance(key, str) and isinstance(value, (str, int, float, bool)):
+                entries.append([key, value, round(now + remaining, 3)])
+        data[name] = entries
+        total += len(entries)
+    for name, entries in pending.items():
+        alive = [e for e in entries if e[2] > now]
+        if alive:
+            data[name] = alive
+            total += len(alive)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix='.snapshot-', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6) as f:
+            f.write(jsoncodec.dumpb({"version": _SNAPSHOT_VERSION, "saved_at": now, "caches": data}))
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    logger.debug("缓存快照已保存: %s (%d 条)", path, total)
+    return total
+
+
+def load_snapshot(path: str) -> int:
+    """加载快照，丢弃已过期条目，返回恢复条目数（含暂存待回填的条目）"""
+    if not os.path.exists(path):
+        return 0
+    try:
+        with gzip.open(path, 'rb') as f:
+            snapshot = jsoncodec.loads(f.read())
+    except Exception as e:
+        logger.warning("缓存快照读取失败，忽略: %s (%s)", path, e)
+        return 0
+    if snapshot.get("version") != _SNAPSHOT_VERSION:
+        logger.warning("缓存快照版本不匹配，忽略: %s", snapshot.get("version"))
+        return 0
+
+    now = time.time()
+    total = 0
+    for name, entries in (snapshot.get("caches") or {}).items():
+        alive = [tuple(e) for e in entries if len(e) == 3 and e[2] > now]
+        if not alive:
+            continue
+        with _lock:
+            cache = _caches.get(name)
+            if cache is None:
+                _pending[name] = alive
+        if cache is not None:
+            _restore(cache, alive)
+        total += len(alive)
+    logger.info("缓存快照已加载: %s (%d 条未过期，快照时间 %s)", path, total,
+                time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(snapshot.get("saved_at", 0))))
+    return total
+
+
+def start_periodic_snapshot(path: str, interval: float) -> None:
+    """启动后台线程定期保存快照（interval<=0 时不启动）"""
+    global _saver_thread
+    if interval <= 0 or _saver_thread is not None:
+        return
+
+    def loop():
+        while not _saver_stop.wait(interval):
+            try:
+                save_snapshot(path)
+            except Exception as e:
+                logger.error("缓存快照保存失败: %s", e)
+
+    _saver_thread = threading.Thread(target=loop, name='cache-snapshot', daemon=True)
+    _saver_thread.start()
+    logger.info("缓存快照已启用: %s，每 %ss 保存一次", path, interval)
+
+
+def stop_periodic_snapshot() -> None:
+    _saver_stop.set()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+带 TTL 与容量上限的线程安全缓存
+
+用于告警 / 事件 / 回调的去重状态，替代"dict + 全局锁 + 每次全量扫描过期"的写法：
+
+- 过期清理：每个分片维护 (过期时间, key) 小顶堆，每次访问只弹出已到期的堆顶，摊还 O(log n)
+- 容量上限：每个分片为 LRU（OrderedDict），超出容量淘汰最久未使用的条目
+- 分片锁：key 按哈希落到不同分片，各分片独立加锁，降低高并发下的锁竞争
+- 统计：命中、未命中、LRU 淘汰、过期清理次数
+"""
+
+import heapq
+import itertools
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+# 进程内所有具名缓存，用于健康检查汇总统计
+_registry = weakref.WeakValueDictionary()
+_registry_lock = threading.Lock()
+
+_MISSING = object()
+
+
+class _Shard:
+    """单个分片：LRU 字典 + 过期堆 + 独立锁"""
+
+    __slots__ = ('lock', 'data', 'heap', 'hits', 'misses', 'evictions', 'expirations')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # key -> (expire_at, value)
+        self.data = OrderedDict()
+        # (expire_at, seq, key)，key 被覆盖后旧堆项成为过期项，弹出时按 expire_at 比对跳过
+        self.heap = []
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+
+class TTLCache:
+    """分片 LRU + TTL 缓存"""
+
+    def __init__(self, ttl: float, maxsize: int = 100000, shards: int = 16, name: str = None,
+                 clock=time.monotonic):
+        """
+        Args:
+            ttl: 默认过期时间（秒），set 时可按 key 覆盖
+            maxsize: 最大条目数（按分片均分，超出后淘汰最久未使用的条目）
+            shards: 分片数
+            name: 缓存名称，设置后可通过 cache_stats() 汇总统计
+            clock: 时钟函数，默认 time.monotonic
+        """
+        if ttl <= 0:
+            raise ValueError("ttl 必须大于 0")
+        if maxsize <= 0:
+            raise ValueError("maxsize 必须大于 0")
+        shards = max(1, min(shards, maxsize))
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.name = name
+        self._clock = clock
+        self._shards = [_Shard() for _ in range(shards)]
+        self._shard_maxsize = -(-maxsize // shards)
+        # 堆项序号，过期时间相同时避免比较 key
+        self._seq = itertools.count()
+        if name:
+            with _registry_lock:
+                _registry[name] = self
+
+    def _shard(self, key) -> _Shard:
+        return self._shards[hash(key) % len(self._shards)]
+
+    def _purge(self, shard: _Shard, now: float) -> None:
+        """弹出已到期的堆顶（调用方持有分片锁）"""
+        heap = shard.heap
+        data = shard.data
+        while heap and heap[0][0] <= now:
+            expire_at, _, key = heapq.heappop(heap)
+            entry = data.get(key)
+            # 仅当堆项与当前条目的过期时间一致时才删除（否则是被覆盖前的旧堆项）
+            if entry is not None and entry[0] == expire_at:
+                del data[key]
+                shard.expirations += 1
+        # 覆盖写入过多导致旧堆项堆积时重建堆，保证堆大小与条目数同阶
+        if len(heap) > 2 * len(data) + 64:
+            shard.heap = [(exp, next(self._seq), k) for k, (exp, _) in data.items()]
+            heapq.heapify(shard.heap)
+
+    def _insert(self, shard: _Shard, key, value, ttl, now: float) -> None:
+        """写入条目并维护 LRU 容量（调用方持有分片锁）"""
+        expire_at = now + (self.ttl if ttl is None else ttl)
+        shard.data[key] = (expire_at, value)
+        shard.data.move_to_end(key)
+        heapq.heappush(shard.heap, (expire_at, next(self._seq), key))
+        while len(shard.data) > self._shard_maxsize:
+            shard.data.popitem(last=False)
+            shard.evictions += 1
+
+    def get(self, key, default=None):
+        """读取未过期的值，命中时刷新 LRU 顺序（不延长 TTL）"""
+        shard = self._shard(key)
+        now = self._clock()
+        with shard.lock:
+            self._purge(shard, now)
+            entry = shard.data.get(key)
+            if entry is None:
+                shard.misses += 1
+                return default
+            shard.hits += 1
+            shard.data.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value=True, ttl: float = None) -> None:
+        """写入或覆盖，TTL 从当前时刻重新计算"""
+        shard = self._shard(key)
+        now = self._clock()
+        with shard.lock:
+            self._purge(shard, now)
+            self._insert(shard, key, value, ttl, now)
+
+    def check_and_set(self, key, value=True, ttl: float = None) -> bool:
+        """原子地检查并写入：已存在返回 True（不刷新 TTL），否则写入并返回 False"""
+        shard = self._shard(key)
+        now = self._clock()
+        with shard.lock:
+            self._purge(shard, now)
+            if key in shard.data:
+                shard.hits += 1
+                shard.data.move_to_end(key)
+                return True
+            shard.misses += 1
+            self._insert(shard, key, value, ttl, now)
+            return False
+
+    def pop(self, key, default=None):
+        """删除并返回条目值"""
+        shard = self._shard(key)
+        with shard.lock:
+            entry = shard.data.pop(key, _MISSING)
+        if entry is _MISSING:
+            return default
+        return entry[1]
+
+    def items(self) -> list:
+        """返回未过期条目的快照：[(key, value, 剩余秒数), ...]"""
+        now = self._clock()
+        result = []
+        for shard in self._shards:
+            with shard.lock:
+                self._purge(shard, now)
+                result.extend((k, v, exp - now) for k, (exp, v) in shard.data.items())
+        return result
+
+    def clear(self) -> None:
+        for shard in self._shards:
+            with shard.lock:
+                shard.data.clear()
+                shard.heap.clear()
+
+    def __contains__(self, key) -> bool:
+        shard = self._shard(key)
+        now = self._clock()
+        with shard.lock:
+            self._purge(shard, now)
+            return key in shard.data
+
+    def __len__(self) -> int:
+        return sum(len(shard.data) for shard in self._shards)
+
+    def stats(self) -> dict:
+        """命中 / 未命中 / 淘汰 / 过期统计"""
+        hits = misses = evictions = expirations = size = 0
+        for shard in self._shards:
+            with shard.lock:
+                hits += shard.hits
+                misses += shard.misses
+                evictions += shard.evictions
+                expirations += shard.expirations
+                size += len(shard.data)
+        total = hits + misses
+        return {
+            "size": size,
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+            "evictions": evictions,
+            "expirations": expirations,
+        }
+
+
+def cache_stats() -> dict:
+    """汇总所有具名缓存的统计信息"""
+    with _registry_lock:
+        caches = list(_registry.items())
+    return {name: cache.stats() for name, cache in caches}
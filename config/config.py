@@ -30,12 +30,104 @@ class Config:
     MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD", "")
     MYSQL_DATABASE = os.getenv("MYSQL_DATABASE", "alert_db")
     MYSQL_CHARSET = os.getenv("MYSQL_CHARSET", "utf8mb4")
+
+    # ==================== 存储后端配置 ====================
+    # mysql: 默认，生产环境使用；sqlite: 嵌入式存储（WAL 模式），适合边缘小规模部署和本地压测
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "mysql").lower()
+    # SQLite 数据库文件路径（STORAGE_BACKEND=sqlite 时生效）
+    SQLITE_PATH = os.getenv("SQLITE_PATH", "data/alert_bot.db")
     
     # ==================== 服务配置 ====================
     HOST = os.getenv("HOST", "0.0.0.0")
     PORT = int(os.getenv("PORT", "3000"))
     DEBUG = os.getenv("DEBUG", "False").lower() == "true"
     
+    # ==================== 告警接收配置 ====================
+    # async: 校验后入队立即返回 202，由工作线程异步处理；sync: 请求内同步处理（旧行为）
+    ALERT_INGEST_MODE = os.getenv("ALERT_INGEST_MODE", "async").lower()
+    # 异步队列容量与工作线程数
+    ALERT_INGEST_QUEUE_SIZE = int(os.getenv("ALERT_INGEST_QUEUE_SIZE", "1000"))
+    ALERT_INGEST_WORKERS = int(os.getenv("ALERT_INGEST_WORKERS", "4"))
+    # 队列满时的策略：reject 返回 503 由 Grafana 重试；sync 退化为同步处理
+    ALERT_INGEST_FULL_POLICY = os.getenv("ALERT_INGEST_FULL_POLICY", "reject").lower()
+    # 队列按告警级别出队（urgent=phone/p0 → critical → warning → info）；
+    # 不高于 ALERT_INGEST_SHED_PRIORITY 的告警排队超过 ALERT_INGEST_AGE_BUDGET 秒后丢弃，队列满时可被更高级别挤出
+    ALERT_INGEST_AGE_BUDGET = float(os.getenv("ALERT_INGEST_AGE_BUDGET", "60"))
+    ALERT_INGEST_SHED_PRIORITY = os.getenv("ALERT_INGEST_SHED_PRIORITY", "info").lower()
+    # 同一批次命中多个路由时的并行处理线程数（1 表示串行）
+    ALERT_ROUTE_PARALLELISM = int(os.getenv("ALERT_ROUTE_PARALLELISM", "8"))
+    # 批次拆分聚合后多个子批次的并行处理线程数（1 表示串行）
+    ALERT_SUBPAYLOAD_PARALLELISM = int(os.getenv("ALERT_SUBPAYLOAD_PARALLELISM", "4"))
+    # 请求体完全相同的 webhook 在该秒数内直接返回 200，不解析不处理（0 表示关闭）
+    ALERT_RAW_DEDUP_TTL = float(os.getenv("ALERT_RAW_DEDUP_TTL", "30"))
+    # 合并窗口（路由 coalesce_window）单桶 alert 数上限，达到后立即发送；窗口秒数上限
+    ALERT_COALESCE_MAX_ALERTS = int(os.getenv("ALERT_COALESCE_MAX_ALERTS", "50"))
+    ALERT_COALESCE_MAX_WINDOW = float(os.getenv("ALERT_COALESCE_MAX_WINDOW", "60"))
+    # 告警风暴：同一群组 ALERT_STORM_WINDOW 秒内卡片数达到阈值后改为周期摘要（0 表示关闭）
+    ALERT_STORM_THRESHOLD = int(os.getenv("ALERT_STORM_THRESHOLD", "30"))
+    ALERT_STORM_WINDOW = float(os.getenv("ALERT_STORM_WINDOW", "60"))
+    ALERT_STORM_DIGEST_INTERVAL = float(os.getenv("ALERT_STORM_DIGEST_INTERVAL", "60"))
+    # 告警抖动：ALERT_FLAP_WINDOW 秒内状态切换的加权分数达到阈值后汇总到抖动卡片（0 表示关闭）
+    ALERT_FLAP_THRESHOLD = float(os.getenv("ALERT_FLAP_THRESHOLD", "0"))
+    ALERT_FLAP_WINDOW = float(os.getenv("ALERT_FLAP_WINDOW", "3600"))
+    # 未恢复卡片原地更新：新实例并入已有 biz 卡片，PATCH / 回写按防抖秒数合并（TTL=0 表示关闭）
+    ALERT_CARD_UPDATE_DEBOUNCE = float(os.getenv("ALERT_CARD_UPDATE_DEBOUNCE", "3"))
+    ALERT_OPEN_CARD_TTL = float(os.getenv("ALERT_OPEN_CARD_TTL", "86400"))
+    
+    # ==================== 后台任务执行器配置 ====================
+    # 卡片回调 / 飞书事件 / 电话告警回退共用的线程数，以及每种任务类型的未完成任务上限
+    TASK_EXECUTOR_WORKERS = int(os.getenv("TASK_EXECUTOR_WORKERS", "16"))
+    TASK_EXECUTOR_QUEUE_LIMIT = int(os.getenv("TASK_EXECUTOR_QUEUE_LIMIT", "100"))
+    # 按类型覆盖上限，格式 kind=limit,kind=limit（类型：silence / cancel_silence / ack_incident / feishu_event / phone_fallback）
+    TASK_EXECUTOR_QUEUE_LIMITS = os.getenv("TASK_EXECUTOR_QUEUE_LIMITS", "feishu_event=500")
+    # 延迟重试（认领 incident / 认领后原地更新卡片）：最大尝试次数（含首次）、退避基数与单次退避上限（秒）
+    RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "3"))
+    RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "2"))
+    RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "30"))
+
+    # ==================== 卡片回调配置 ====================
+    # 按钮回调同步等待操作结果的最长秒数（飞书要求 3 秒内响应），完成时新卡片随响应返回，超时则稍后 PATCH
+    CARD_CALLBACK_DEADLINE = float(os.getenv("CARD_CALLBACK_DEADLINE", "2.5"))
+    # 卡片状态缓存（message_id → 卡片当前 JSON）的保留时长（秒）与最大条目数，未命中时回退读取 alert_data
+    CARD_STATE_TTL = float(os.getenv("CARD_STATE_TTL", "86400"))
+    CARD_STATE_MAX_ENTRIES = int(os.getenv("CARD_STATE_MAX_ENTRIES", "10000"))
+
+    # ==================== 外部依赖熔断配置 ====================
+    # 飞书 / Flashcat / Alertmanager / Grafana 请求的熔断与并发隔离
+    CIRCUIT_BREAKER_ENABLED = os.getenv("CIRCUIT_BREAKER_ENABLED", "true").lower() == "true"
+    # 统计最近多少次调用，窗口内调用数不足 CIRCUIT_MIN_CALLS 时不打开
+    CIRCUIT_WINDOW = int(os.getenv("CIRCUIT_WINDOW", "20"))
+    CIRCUIT_MIN_CALLS = int(os.getenv("CIRCUIT_MIN_CALLS", "10"))
+    # 失败率阈值；慢调用耗时阈值（秒）与慢调用比例阈值
+    CIRCUIT_FAILURE_RATE = float(os.getenv("CIRCUIT_FAILURE_RATE", "0.5"))
+    CIRCUIT_SLOW_CALL_SECONDS = float(os.getenv("CIRCUIT_SLOW_CALL_SECONDS", "5"))
+    CIRCUIT_SLOW_CALL_RATE = float(os.getenv("CIRCUIT_SLOW_CALL_RATE", "0.8"))
+    # 打开后多久进入半开（秒），半开时放行的探测请求数
+    CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+    CIRCUIT_HALF_OPEN_PROBES = int(os.getenv("CIRCUIT_HALF_OPEN_PROBES", "2"))
+    # 按依赖的并发上限，格式 dependency=limit,...；已满时最多等待 CIRCUIT_BULKHEAD_WAIT 秒
+    CIRCUIT_BULKHEAD_LIMITS = os.getenv("CIRCUIT_BULKHEAD_LIMITS", "feishu=32,flashcat=8,alertmanager=16,grafana=16")
+    CIRCUIT_BULKHEAD_WAIT = float(os.getenv("CIRCUIT_BULKHEAD_WAIT", "1"))
+
+    # ==================== 去重缓存配置 ====================
+    # 告警 / 事件 / 回调去重缓存的最大条目数（超出后按 LRU 淘汰）
+    DEDUP_CACHE_MAX_ENTRIES = int(os.getenv("DEDUP_CACHE_MAX_ENTRIES", "100000"))
+    # 告警去重状态后端：memory（进程内，默认）/ db（alert_dedup 表，多副本共享）/ redis（多副本共享）
+    DEDUP_BACKEND = os.getenv("DEDUP_BACKEND", "memory").lower()
+    # Redis 地址与 key 前缀（DEDUP_BACKEND=redis 时生效）
+    DEDUP_REDIS_URL = os.getenv("DEDUP_REDIS_URL", "redis://localhost:6379/0")
+    DEDUP_KEY_PREFIX = os.getenv("DEDUP_KEY_PREFIX", "alertbot:dedup:")
+    # 进程内去重缓存本地快照文件（留空禁用），定期及 SIGTERM 时保存，启动时加载
+    CACHE_SNAPSHOT_PATH = os.getenv("CACHE_SNAPSHOT_PATH", "data/cache_snapshot.json.gz")
+    # 快照定期保存间隔（秒），0 表示仅在 SIGTERM 时保存
+    CACHE_SNAPSHOT_INTERVAL = int(os.getenv("CACHE_SNAPSHOT_INTERVAL", "60"))
+    
+    # ==================== 告警状态索引配置 ====================
+    # 进程内 fingerprint → (maid, message_id, startsAt, siblings) 索引，resolved 处理优先查内存
+    ALERT_STATE_ENABLED = os.getenv("ALERT_STATE_ENABLED", "true").lower() == "true"
+    # 索引最大记录数（按 LRU 淘汰，淘汰后未命中时查库重建）
+    ALERT_STATE_MAX_ENTRIES = int(os.getenv("ALERT_STATE_MAX_ENTRIES", "50000"))
+    
     # ==================== 日志配置 ====================
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
     
@@ -50,6 +142,16 @@ class Config:
     # ==================== Grafana配置 ====================
     GRAFANA_API_KEY = os.getenv("GRAFANA_API_KEY", "")
 
+    # ==================== 静默 API 配置 ====================
+    # 批量创建 / 删除静默的并发数、单次请求读超时（秒）、整体截止时间（秒）
+    SILENCE_API_PARALLELISM = int(os.getenv("SILENCE_API_PARALLELISM", "8"))
+    SILENCE_API_TIMEOUT = float(os.getenv("SILENCE_API_TIMEOUT", "10"))
+    SILENCE_API_DEADLINE = float(os.getenv("SILENCE_API_DEADLINE", "30"))
+    # 逐实例 matchers 合并为覆盖静默时，单个正则交替的取值数上限
+    SILENCE_MATCHER_MAX_VALUES = int(os.getenv("SILENCE_MATCHER_MAX_VALUES", "100"))
+    # 活跃静默本地索引同步周期（秒，0 表示关闭）
+    SILENCE_SYNC_INTERVAL = float(os.getenv("SILENCE_SYNC_INTERVAL", "30"))
+
     # ==================== Flashcat oncall 配置 ====================
     # Flashcat API key，用于查询排班信息
     FLASHCAT_APP_KEY = os.getenv("FLASHCAT_APP_KEY", "")
@@ -61,6 +163,12 @@ class Config:
     FLASHCAT_PHONE_INTEGRATION_KEY = os.getenv("FLASHCAT_PHONE_INTEGRATION_KEY", "ea9548ec10fa549699a6c0544a21bf0a895")
     # Flashcat incident channel_id（创建电话告警 incident 时使用）
     FLASHCAT_CHANNEL_ID = os.getenv("FLASHCAT_CHANNEL_ID", "")
+    # oncall 名单缓存最长秒数（以 Flashcat 班次结束时间为准，不超过该值；0 表示关闭，每条告警实时查询）
+    ONCALL_CACHE_MAX_TTL = float(os.getenv("ONCALL_CACHE_MAX_TTL", "3600"))
+    # 名单过期前提前后台刷新的秒数
+    ONCALL_REFRESH_LEAD = float(os.getenv("ONCALL_REFRESH_LEAD", "60"))
+    # 相同 firing 实例集合的电话告警在该秒数内只创建一次 incident（多路由、重复投递共享）
+    PHONE_INCIDENT_DEDUP_TTL = float(os.getenv("PHONE_INCIDENT_DEDUP_TTL", "600"))
     
     @classmethod
     def get_config_db_config(cls):
@@ -90,13 +198,29 @@ class Config:
         if not cls.APP_SECRET:
             errors.append("APP_SECRET 未配置")
         
-        # 验证MySQL配置
-        if not cls.MYSQL_HOST:
-            errors.append("MYSQL_HOST 未配置")
-        if not cls.MYSQL_USER:
-            errors.append("MYSQL_USER 未配置")
-        if not cls.MYSQL_PASSWORD:
-            errors.append("MYSQL_PASSWORD 未配置")
+        # 验证存储配置（仅 MySQL 后端需要数据库连接信息）
+        if cls.STORAGE_BACKEND not in ("mysql", "sqlite"):
+            errors.append(f"STORAGE_BACKEND 不支持: {cls.STORAGE_BACKEND}（可选 mysql / sqlite）")
+        elif cls.STORAGE_BACKEND == "mysql":
+            if not cls.MYSQL_HOST:
+                errors.append("MYSQL_HOST 未配置")
+            if not cls.MYSQL_USER:
+                errors.append("MYSQL_USER 未配置")
+            if not cls.MYSQL_PASSWORD:
+                errors.append("MYSQL_PASSWORD 未配置")
+        elif not cls.SQLITE_PATH:
+            errors.append("SQLITE_PATH 未配置")
+        
+        # 验证告警接收配置
+        if cls.ALERT_INGEST_MODE not in ("async", "sync"):
+            errors.append(f"ALERT_INGEST_MODE 不支持: {cls.ALERT_INGEST_MODE}（可选 async / sync）")
+        if cls.DEDUP_BACKEND not in ("memory", "db", "redis"):
+            errors.append(f"DEDUP_BACKEND 不支持: {cls.DEDUP_BACKEND}（可选 memory / db / redis）")
+        if cls.ALERT_INGEST_FULL_POLICY not in ("reject", "sync"):
+            errors.append(f"ALERT_INGEST_FULL_POLICY 不支持: {cls.ALERT_INGEST_FULL_POLICY}（可选 reject / sync）")
+        if cls.ALERT_INGEST_SHED_PRIORITY not in ("none", "info", "warning", "critical"):
+            errors.append(f"ALERT_INGEST_SHED_PRIORITY 不支持: {cls.ALERT_INGEST_SHED_PRIORITY}"
+                          "（可选 none / info / warning / critical）")
         
         if errors:
             error_msg = "\n".join(errors)
@@ -114,6 +238,8 @@ class Config:
                 "LARK_HOST": cls.LARK_HOST,
             },
             "数据库配置": {
+                "backend": cls.STORAGE_BACKEND,
+                "sqlite_path": cls.SQLITE_PATH if cls.STORAGE_BACKEND == "sqlite" else None,
                 "host": cls.MYSQL_HOST,
                 "port": cls.MYSQL_PORT,
                 "user": cls.MYSQL_USER,
@@ -125,6 +251,76 @@ class Config:
                 "port": cls.PORT,
                 "debug": cls.DEBUG,
                 "log_level": cls.LOG_LEVEL,
+            },
+            "告警接收配置": {
+                "mode": cls.ALERT_INGEST_MODE,
+                "queue_size": cls.ALERT_INGEST_QUEUE_SIZE,
+                "workers": cls.ALERT_INGEST_WORKERS,
+                "full_policy": cls.ALERT_INGEST_FULL_POLICY,
+                "age_budget": cls.ALERT_INGEST_AGE_BUDGET,
+                "shed_priority": cls.ALERT_INGEST_SHED_PRIORITY,
+                "route_parallelism": cls.ALERT_ROUTE_PARALLELISM,
+                "subpayload_parallelism": cls.ALERT_SUBPAYLOAD_PARALLELISM,
+                "raw_dedup_ttl": cls.ALERT_RAW_DEDUP_TTL,
+                "coalesce_max_alerts": cls.ALERT_COALESCE_MAX_ALERTS,
+                "coalesce_max_window": cls.ALERT_COALESCE_MAX_WINDOW,
+                "storm_threshold": cls.ALERT_STORM_THRESHOLD,
+                "storm_window": cls.ALERT_STORM_WINDOW,
+                "storm_digest_interval": cls.ALERT_STORM_DIGEST_INTERVAL,
+                "flap_threshold": cls.ALERT_FLAP_THRESHOLD,
+                "flap_window": cls.ALERT_FLAP_WINDOW,
+                "card_update_debounce": cls.ALERT_CARD_UPDATE_DEBOUNCE,
+                "open_card_ttl": cls.ALERT_OPEN_CARD_TTL,
+            },
+            "后台任务执行器": {
+                "workers": cls.TASK_EXECUTOR_WORKERS,
+                "queue_limit": cls.TASK_EXECUTOR_QUEUE_LIMIT,
+                "queue_limits": cls.TASK_EXECUTOR_QUEUE_LIMITS,
+                "retry_max_attempts": cls.RETRY_MAX_ATTEMPTS,
+                "retry_base_delay": cls.RETRY_BASE_DELAY,
+                "retry_max_delay": cls.RETRY_MAX_DELAY,
+            },
+            "卡片回调配置": {
+                "deadline": cls.CARD_CALLBACK_DEADLINE,
+                "state_ttl": cls.CARD_STATE_TTL,
+                "state_max_entries": cls.CARD_STATE_MAX_ENTRIES,
+            },
+            "外部依赖熔断": {
+                "enabled": cls.CIRCUIT_BREAKER_ENABLED,
+                "window": cls.CIRCUIT_WINDOW,
+                "min_calls": cls.CIRCUIT_MIN_CALLS,
+                "failure_rate": cls.CIRCUIT_FAILURE_RATE,
+                "slow_call_seconds": cls.CIRCUIT_SLOW_CALL_SECONDS,
+                "slow_call_rate": cls.CIRCUIT_SLOW_CALL_RATE,
+                "open_seconds": cls.CIRCUIT_OPEN_SECONDS,
+                "half_open_probes": cls.CIRCUIT_HALF_OPEN_PROBES,
+                "bulkhead_limits": cls.CIRCUIT_BULKHEAD_LIMITS,
+                "bulkhead_wait": cls.CIRCUIT_BULKHEAD_WAIT,
+            },
+            "去重配置": {
+                "backend": cls.DEDUP_BACKEND,
+                "max_entries": cls.DEDUP_CACHE_MAX_ENTRIES,
+                "redis_url": cls.DEDUP_REDIS_URL if cls.DEDUP_BACKEND == "redis" else None,
+                "snapshot_path": cls.CACHE_SNAPSHOT_PATH or None,
+                "snapshot_interval": cls.CACHE_SNAPSHOT_INTERVAL,
+            },
+            "静默 API 配置": {
+                "parallelism": cls.SILENCE_API_PARALLELISM,
+                "timeout": cls.SILENCE_API_TIMEOUT,
+                "deadline": cls.SILENCE_API_DEADLINE,
+                "matcher_max_values": cls.SILENCE_MATCHER_MAX_VALUES,
+                "sync_interval": cls.SILENCE_SYNC_INTERVAL,
+            },
+            "告警状态索引": {
+                "enabled": cls.ALERT_STATE_ENABLED,
+                "max_entries": cls.ALERT_STATE_MAX_ENTRIES,
+            },
+            "oncall 名单缓存": {
+                "max_ttl": cls.ONCALL_CACHE_MAX_TTL,
+                "refresh_lead": cls.ONCALL_REFRESH_LEAD,
+            },
+            "电话告警": {
+                "incident_dedup_ttl": cls.PHONE_INCIDENT_DEDUP_TTL,
             }
         }
         return config_info
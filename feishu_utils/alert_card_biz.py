@@ -7,8 +7,9 @@
 - resolved: 绿色标题，时长展示，无静默按钮
 """
 
-import json
 from datetime import datetime
+from common_utils import jsoncodec
+from alerts_format.alert_batch import severity_priority
 
 
 def _parse_ts(ts: str) -> datetime | None:
@@ -220,7 +221,7 @@ def build_biz_firing_card(
         },
         "elements": elements,
     }
-    return json.dumps(card, ensure_ascii=False)
+    return jsoncodec.dumps(card)
 
 
 def build_biz_resolved_card(
@@ -299,4 +300,90 @@ def build_biz_resolved_card(
         },
         "elements": elements,
     }
-    return json.dumps(card, ensure_ascii=False)
+    return jsoncodec.dumps(card)
+
+
+def build_storm_digest_card(counts: dict, links: dict, started_at: float, ended_at: float,
+                            storm_active: bool) -> str:
+    """
+    构建告警风暴摘要卡片 JSON 字符串
+
+    :param counts: {(alertname, severity): 告警条数}
+    :param links: {alertname: 详情链接}（无链接的 alertname 不展示按钮）
+    :param started_at: 本期摘要起始时间（Unix 秒）
+    :param ended_at: 本期摘要结束时间（Unix 秒）
+    :param storm_active: 风暴是否仍在持续（False 表示已恢复正常发送，本卡片为最后一期）
+    :return: str, 序列化好的卡片 JSON
+    """
+    by_name = {}
+    for (alertname, severity), n in counts.items():
+        by_name.setdefault(alertname, {})[severity or '-'] = n
+    total = sum(counts.values())
+    period = (f"{datetime.fromtimestamp(started_at).strftime('%H:%M:%S')} ~ "
+              f"{datetime.fromtimestamp(ended_at).strftime('%H:%M:%S')}")
+
+    elements = [{
+        "tag": "div",
+        "text": {"tag": "lark_md", "content": f"⏱ **汇总时段：** {period}\n📊 **告警条数：** {total}"},
+    }, {"tag": "hr"}]
+    for alertname, severities in sorted(by_name.items(), key=lambda item: -sum(item[1].values())):
+        detail = " / ".join(f"{sev} × {n}" for sev, n in
+                            sorted(severities.items(), key=lambda kv: (-severity_priority(kv[0]), -kv[1])))
+        line = f"**{alertname}**：{detail}"
+        if links.get(alertname):
+            line += f"  [详情]({links[alertname]})"
+        elements.append({"tag": "div", "text": {"tag": "lark_md", "content": line}})
+    elements.append({
+        "tag": "note",
+        "elements": [{"tag": "plain_text", "content":
+                      "发送速率超过阈值，单条告警卡片已暂停，按周期汇总发送" if storm_active
+                      else "发送速率已回落，恢复单条告警卡片发送"}],
+    })
+
+    card = {
+        "config": {"wide_screen_mode": True},
+        "header": {
+            "title": {"tag": "plain_text", "content": "🌪 告警风暴摘要" if storm_active else "🌤 告警风暴已结束"},
+            "template": "red" if storm_active else "green",
+        },
+        "elements": elements,
+    }
+    return jsoncodec.dumps(card)
+
+
+def build_flapping_card(entries: list, window: float) -> str:
+    """
+    构建抖动告警汇总卡片 JSON 字符串（原地更新，需 update_multi）
+
+    :param entries: [{alertname, fingerprint, status, transitions, changed_at}, ...]
+                    changed_at 为最近一次状态切换时间（Unix 秒）
+    :param window: 统计切换次数的时间窗口（秒）
+    :return: str, 序列化好的卡片 JSON
+    """
+    elements = []
+    for entry in sorted(entries, key=lambda e: -e['changed_at']):
+        icon = "🔴" if entry['status'] == 'firing' else "🟢"
+        changed = datetime.fromtimestamp(entry['changed_at']).strftime('%H:%M:%S')
+        elements.append({
+            "tag": "div",
+            "text": {"tag": "lark_md", "content":
+                     f"{icon} **{entry['alertname']}**  `{entry['fingerprint'][:12]}`\n"
+                     f"当前 {entry['status']} · {window / 60:.0f} 分钟内切换 {entry['transitions']} 次 · 最近切换 {changed}"},
+        })
+    if not elements:
+        elements.append({"tag": "div", "text": {"tag": "lark_md", "content": "✅ 当前没有抖动中的告警"}})
+    elements.append({
+        "tag": "note",
+        "elements": [{"tag": "plain_text", "content":
+                      "抖动期间单条告警卡片与恢复回复暂停，本卡片原地更新；状态稳定后恢复正常通知"}],
+    })
+
+    card = {
+        "config": {"wide_screen_mode": True, "update_multi": True},
+        "header": {
+            "title": {"tag": "plain_text", "content": f"🔁 抖动告警（{len(entries)}）"},
+            "template": "orange" if entries else "green",
+        },
+        "elements": elements,
+    }
+    return jsoncodec.dumps(card)
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+告警合并窗口模块
+
+Grafana 经常把同一条规则的多个实例拆成间隔一两秒的多次 webhook 推送，
+_group_and_aggregate_by_alertname 只能在单次请求内聚合，于是同一事件会发出多张卡片。
+
+路由配置了 coalesce_window（秒）时，firing 子批次按 (alertname, tenant) 缓冲，
+窗口内后续请求的同名子批次并入同一个桶，满足以下任一条件时合并为一个批次交给处理函数：
+- 超时：距桶内第一个子批次到达满 coalesce_window 秒（后台线程触发）
+- 满额：桶内 alert 数达到 ALERT_COALESCE_MAX_ALERTS（由当前请求线程直接处理）
+- 恢复：同 (alertname, tenant) 的 resolved 批次到达（先发 firing 卡片，恢复通知才能回复到话题）
+- 退出：进程收到 SIGTERM 时全部刷出
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config.config import Config
+from alerts_format.alert_batch import AlertBatch
+
+logger = logging.getLogger(__name__)
+
+
+class _Bucket:
+    """同一 (alertname, tenant) 在窗口内缓冲的子批次"""
+
+    __slots__ = ('batches', 'dedup_entries', 'routes', 'alerts', 'deadline', 'context')
+
+    def __init__(self, deadline: float, context):
+        self.batches = []
+        self.dedup_entries = []
+        self.routes = 0
+        self.alerts = 0
+        self.deadline = deadline
+        self.context = context
+
+
+def merge_unique(batches: list) -> AlertBatch:
+    """合并子批次，同一 fingerprint 只保留最后到达的实例"""
+    merged = AlertBatch.merge(batches)
+    latest = {}
+    for alert in merged.alerts:
+        latest[alert.fingerprint or id(alert)] = alert
+    if len(latest) == len(merged.alerts):
+        return merged
+    return AlertBatch(merged.payload, tuple(latest.values()), merged.common_labels,
+                      original_status=merged.original_status, aggregated=True)
+
+
+class AlertCoalescer:
+    """按 key 缓冲子批次，超时 / 满额 / 显式取出时合并"""
+
+    def __init__(self, handler, max_alerts: int = None, workers: int = 2, clock=time.monotonic):
+        """
+        Args:
+            handler: 合并后的处理函数 handler(batch, dedup_entries, context)
+            max_alerts: 单个桶的 alert 数上限，达到后立即刷出
+            workers: 超时刷出的处理线程数
+            clock: 时钟函数，默认 time.monotonic
+        """
+        self._handler = handler
+        self._max_alerts = max_alerts or Config.ALERT_COALESCE_MAX_ALERTS
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._buckets = {}
+        # (deadline, seq, key)，桶被提前取出后堆项作废，弹出时按 deadline 比对跳过
+        self._heap = []
+        self._seq = itertools.count()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='alert-coalesce')
+        self._thread = None
+        # 计数器
+        self._buffered = 0
+        self._flushes = {'timeout': 0, 'size': 0, 'resolved': 0, 'shutdown': 0}
+        self._alerts_flushed = 0
+        self._cards_saved = 0
+        self._rows_saved = 0
+
+    def add(self, key, batch: AlertBatch, window: float, routes: int, dedup_entry=None, context=None):
+        """
+        缓冲子批次
+
+        Returns:
+            满额时返回 (合并批次, dedup_entries, context) 由调用方立即处理，否则返回 None
+        """
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = _Bucket(self._clock() + window, context)
+                heapq.heappush(self._heap, (bucket.deadline, next(self._seq), key))
+                self._ensure_thread()
+                self._wakeup.notify()
+            bucket.batches.append(batch)
+            if dedup_entry is not None:
+                bucket.dedup_entries.append(dedup_entry)
+            bucket.routes = max(bucket.routes, routes)
+            bucket.alerts += len(batch.alerts)
+            self._buffered += 1
+            if bucket.alerts < self._max_alerts:
+                return None
+            del self._buckets[key]
+            return self._finish(bucket, 'size')
+
+    def take(self, key):
+        """取出 key 对应的桶（resolved 到达时调用），无缓冲时返回 None"""
+        with self._lock:
+            bucket = self._buckets.pop(key, None)
+            return self._finish(bucket, 'resolved') if bucket else None
+
+    def flush_all(self) -> int:
+        """在当前线程刷出全部缓冲（进程退出时调用），返回刷出的桶数"""
+        with self._lock:
+            buckets = list(self._buckets.values())
+            self._buckets.clear()
+            ready = [self._finish(bucket, 'shutdown') for bucket in buckets]
+        for item in ready:
+            self._run(item)
+        return len(ready)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "pending_buckets": len(self._buckets),
+                "pending_alerts": sum(b.alerts for b in self._buckets.values()),
+                "max_alerts": self._max_alerts,
+                "buffered_batches": self._buffered,
+                "flushes": dict(self._flushes),
+                "alerts_flushed": self._alerts_flushed,
+                "cards_saved": self._cards_saved,
+                "db_rows_saved": self._rows_saved,
+            }
+
+    # ── 内部 ──
+    def _finish(self, bucket: _Bucket, reason: str) -> tuple:
+        """合并桶内子批次并累计节省量（调用方持有锁）"""
+        saved = (len(bucket.batches) - 1) * bucket.routes
+        self._flushes[reason] += 1
+        self._alerts_flushed += bucket.alerts
+        # 每个子批次原本在每个路由各发一张卡片、写一行 alert_data
+        self._cards_saved += saved
+        self._rows_saved += saved
+        logger.info("合并窗口刷出 (%s): %d 个子批次 / %d 条 alert 合并为 1 个批次",
+                    reason, len(bucket.batches), bucket.alerts)
+        return merge_unique(bucket.batches), bucket.dedup_entries, bucket.context
+
+    def _run(self, item: tuple) -> None:
+        try:
+            self._handler(*item)
+        except Exception as e:
+            logger.error("合并批次处理异常: %s", e, exc_info=True)
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._timer_loop, name='alert-coalesce-timer', daemon=True)
+            self._thread.start()
+
+    def _timer_loop(self) -> None:
+        while True:
+            with self._lock:
+                now = self._clock()
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    deadline, _, key = heapq.heappop(self._heap)
+                    bucket = self._buckets.get(key)
+                    if bucket is not None and bucket.deadline == deadline:
+                        del self._buckets[key]
+                        due.append(self._finish(bucket, 'timeout'))
+                if not due:
+                    timeout = self._heap[0][0] - now if self._heap else None
+                    self._wakeup.wait(timeout)
+                    continue
+            for item in due:
+                self._executor.submit(self._run, item)
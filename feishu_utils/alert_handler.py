@@ -4,162 +4,83 @@
 处理来自 Alertmanager 的告警请求
 """
 
-import hashlib
-import json
 import logging
-import threading
-import time
+from concurrent.futures import ThreadPoolExecutor
 
 from config.config import Config
+from common_utils import jsoncodec
+from common_utils.executor import get_task_executor
+from alerts_format.dedup_store import get_dedup_store
+from alerts_format.alert_batch import AlertBatch, normalize_severity, severity_priority
 
-# ── 告警去重缓存（基于 fingerprint+status 哈希）──
-_alert_dedup_cache: dict[str, float] = {}
-_alert_dedup_lock = threading.Lock()
 _ALERT_DEDUP_TTL = 300  # 秒（5分钟）：防止 Grafana repeat_interval 重复投递同一 firing 告警
-
-# ── resolved 去重缓存（30 分钟 TTL，覆盖多个 Grafana repeat_interval 周期）──
-_resolved_dedup_cache: dict[str, float] = {}
-_resolved_dedup_lock = threading.Lock()
 _RESOLVED_DEDUP_TTL = 1800  # 秒（30分钟）：防止 Grafana repeat_interval 重复投递同一 resolved 告警
 
-# ── alertname+labels 维度去重缓存 ──
+# 去重状态统一存放在 DedupStore（DEDUP_BACKEND=memory|db|redis），按命名空间区分三层去重：
+# ── alert：告警去重（基于 fingerprint+status 哈希）──
+_DEDUP_NS_ALERT = 'alert'
+# ── resolved：resolved 去重（30 分钟 TTL，覆盖多个 Grafana repeat_interval 周期）──
+_DEDUP_NS_RESOLVED = 'resolved'
+# ── alert_label：alertname+labels 维度去重 ──
 # Grafana 不同评估周期的 fingerprint 可能不同（value 变化导致），
 # 单靠 fingerprint 去重无法拦截"同一告警规则重复触发"的情况。
 # 额外维护一个基于 alertname + group_id 的去重维度，
 # TTL 与 _ALERT_DEDUP_TTL 一致，确保同一告警在冷却期内不重复发送。
-_alert_label_dedup_cache: dict[str, float] = {}
-_alert_label_dedup_lock = threading.Lock()
-
-
-def _make_dedup_key(data: dict) -> str:
-    """用所有 firing alert 的 fingerprint 生成去重 key（仅用于 firing 批次）"""
-    pairs = sorted(
-        a.get('fingerprint', '')
-        for a in data.get('alerts', [])
-        if a.get('status') == 'firing'
-    )
-    raw = json.dumps(pairs, ensure_ascii=False, sort_keys=True)
-    return hashlib.md5(raw.encode()).hexdigest()
+_DEDUP_NS_LABEL = 'alert_label'
 
+_DEDUP_TTLS = {
+    _DEDUP_NS_ALERT: _ALERT_DEDUP_TTL,
+    _DEDUP_NS_RESOLVED: _RESOLVED_DEDUP_TTL,
+    _DEDUP_NS_LABEL: _ALERT_DEDUP_TTL,
+}
 
-def _make_label_dedup_key(data: dict, group_id: str) -> str:
-    """用 alertname + group_id 生成语义级去重 key（仅用于 firing 批次）。
 
-    fingerprint 去重只能拦截 Grafana repeat_interval 的完全相同重发，
-    但不同评估周期因 value 变化导致 fingerprint 不同时，同一告警仍会重复发送。
-    本 key 基于 alertname + group_id，确保同一告警规则在同一群组的冷却期内不重复。
-    """
-    alertname = ''
-    common_labels = data.get('commonLabels', {})
-    if isinstance(common_labels, dict):
-        alertname = common_labels.get('alertname', '')
-    if not alertname:
-        alerts = data.get('alerts', [])
-        if alerts:
-            alertname = alerts[0].get('labels', {}).get('alertname', '')
-    raw = json.dumps({'alertname': alertname, 'group_id': group_id}, ensure_ascii=False, sort_keys=True)
-    return hashlib.md5(raw.encode()).hexdigest()
-
-
-def _is_all_resolved(data: dict) -> bool:
-    """判断是否为纯 resolved 批次。
-
-    关键：必须同时满足两个条件：
-    1. 原始顶层 status='resolved'（Grafana 主动发送的恢复通知）
-    2. 所有 alert 的 status 都是 resolved
-
-    当 Grafana 未开启恢复通知时，顶层 status='firing'，即使批次中混有 resolved
-    实例（或拆分后产生的 resolved 子批次），也不应触发恢复通知路径。
-    """
-    original_status = data.get('_original_status', data.get('status', ''))
-    alerts = data.get('alerts', [])
-    return (original_status == 'resolved'
-            and bool(alerts)
-            and all(a.get('status') == 'resolved' for a in alerts))
-
-
-def _clear_dedup_for_resolved(data: dict) -> None:
+def _clear_dedup_for_resolved(batch: AlertBatch) -> None:
     """resolved 批次到来时，清除对应 fingerprint 组合的 firing 去重缓存
     防止 firing→resolved→firing 在 5 分钟内第二次 firing 被拦截"""
     # 用 resolved 批次的 fingerprint 重建一个假设的 firing key——即如果这些指纹全部 firing 时的 key
-    pairs = sorted(a.get('fingerprint', '') for a in data.get('alerts', []))
-    raw = json.dumps(pairs, ensure_ascii=False, sort_keys=True)
-    key = hashlib.md5(raw.encode()).hexdigest()
-    with _alert_dedup_lock:
-        _alert_dedup_cache.pop(key, None)
-
-
-def _make_resolved_dedup_key(data: dict) -> str:
-    """用所有 resolved alert 的 fingerprint 生成 resolved 去重 key"""
-    pairs = sorted(
-        a.get('fingerprint', '')
-        for a in data.get('alerts', [])
-        if a.get('status') == 'resolved'
-    )
-    raw = json.dumps(pairs, ensure_ascii=False, sort_keys=True)
-    return hashlib.md5(raw.encode()).hexdigest()
+    _evict_dedup(batch.all_fingerprint_key, namespace=_DEDUP_NS_ALERT)
 
 
-def _clear_resolved_dedup_for_firing(data: dict) -> None:
+def _clear_resolved_dedup_for_firing(batch: AlertBatch) -> None:
     """firing 批次到来时，清除对应 fingerprint 的 resolved 去重缓存
     防止 resolved→firing→resolved 在 30 分钟内第二次 resolved 被拦截"""
-    pairs = sorted(
-        a.get('fingerprint', '')
-        for a in data.get('alerts', [])
-        if a.get('status') == 'firing'
-    )
-    raw = json.dumps(pairs, ensure_ascii=False, sort_keys=True)
-    key = hashlib.md5(raw.encode()).hexdigest()
-    with _resolved_dedup_lock:
-        _resolved_dedup_cache.pop(key, None)
+    _evict_dedup(batch.firing_dedup_key, namespace=_DEDUP_NS_RESOLVED)
 
 
-def _is_duplicate(key: str, cache: dict = None, lock: threading.Lock = None,
-                  ttl: int = _ALERT_DEDUP_TTL) -> bool:
-    """通用去重检查，支持自定义缓存、锁和 TTL
+def _is_duplicate(key: str, namespace: str = _DEDUP_NS_ALERT) -> bool:
+    """通用去重检查，按命名空间使用对应的 TTL
 
     Args:
         key: 去重 key
-        cache: 缓存字典，默认使用 _alert_dedup_cache
-        lock: 线程锁，默认使用 _alert_dedup_lock
-        ttl: 缓存 TTL（秒），默认 5 分钟
+        namespace: 去重命名空间，默认 alert（fingerprint 级别）
     """
-    if cache is None:
-        cache = _alert_dedup_cache
-    if lock is None:
-        lock = _alert_dedup_lock
-    now = time.time()
-    with lock:
-        # 清理过期记录
-        expired = [k for k, t in cache.items() if now - t > ttl]
-        for k in expired:
-            del cache[k]
-        if key in cache:
-            return True
-        cache[key] = now
-        return False
-
-
-def _evict_dedup(key: str, cache: dict = None, lock: threading.Lock = None) -> None:
+    return _is_duplicate_many([key], namespace)[0]
+
+
+def _is_duplicate_many(keys: list, namespace: str) -> list:
+    """批量去重检查（共享后端下一次往返），返回与 keys 对应的是否重复列表"""
+    ttl = _DEDUP_TTLS[namespace]
+    return get_dedup_store().check_and_set_many([(namespace, key, ttl) for key in keys])
+
+
+def _evict_dedup(key: str, namespace: str = _DEDUP_NS_ALERT) -> None:
     """撤销去重缓存中的 key，用于处理失败后允许 Grafana 重试。
 
     _is_duplicate() 在处理前就写入缓存，若处理失败（无匹配配置、发送异常等），
     缓存残留会阻止 Grafana 的后续重试投递，导致恢复告警永久丢失。
     本函数在各失败返回路径调用，撤销对应的缓存条目。
     """
-    if cache is None:
-        cache = _alert_dedup_cache
-    if lock is None:
-        lock = _alert_dedup_lock
-    if not key:
-        return
-    with lock:
-        cache.pop(key, None)
+    _evict_dedup_many([(namespace, key)])
+
+
+def _evict_dedup_many(entries: list) -> None:
+    """批量撤销去重缓存，entries 为 [(namespace, key), ...]，空 key 自动忽略"""
+    get_dedup_store().evict_many(entries)
 from alerts_format.flashcat_utils import get_oncall_open_ids, send_phone_alert, create_phone_incident
 from alerts_format.alert_json_format import (
     extract_all_labels,
     extract_alertids,
-    extract_alertname,
     extract_alert_raw,
     extract_grafana_urls,
     extract_fingerprints,
@@ -171,48 +92,130 @@ from alerts_format.db_utils import (
 )
 from alerts_format.savedb import (
     update_message_id,
-    update_incident_id,
-    save_card_content,
     get_message_id_by_fingerprint,
     get_alerttime_by_fingerprint,
     get_all_fingerprints_by_fingerprint,
+    mark_fingerprints_resolved,
+    filter_still_firing,
 )
-from feishu_utils.event_handler import alert_to_feishu
+from feishu_utils.event_handler import build_alert_card
 from feishu_utils.alert_card_biz import build_biz_firing_card, build_biz_resolved_card
+from feishu_utils.alert_coalescer import AlertCoalescer
+from feishu_utils.storm_guard import get_storm_guard
+from feishu_utils.flap_detector import get_flap_detector, get_flap_board
+from feishu_utils.open_cards import OpenCardTracker
+from feishu_utils.phone_incidents import PhoneIncidentTracker
+from feishu_utils import card_state
+from alerts_format.silence_index import get_silence_index, silence_source
 
 logger = logging.getLogger(__name__)
 
+# ── 路由并行处理线程池 ──
+# 同一批次命中多个路由（多播）时，各路由的 DB 写入与飞书发送相互独立，
+# 放入有界线程池并行执行，批次耗时由"各路由之和"降为"最慢路由"。
+_route_executor = ThreadPoolExecutor(
+    max_workers=max(1, Config.ALERT_ROUTE_PARALLELISM),
+    thread_name_prefix='alert-route',
+)
+
+# ── 子批次并行处理线程池 ──
+# 多 tenant / 多 alertname 的批次拆分聚合后得到多个相互独立的子批次，
+# 并行调用 process_alert_request。子批次自身不会再拆分（单条 alert 或 _aggregated），
+# 因此不会向本线程池嵌套提交任务，不存在线程池自锁。
+_subpayload_executor = ThreadPoolExecutor(
+    max_workers=max(1, Config.ALERT_SUBPAYLOAD_PARALLELISM),
+    thread_name_prefix='alert-sub',
+)
+
+
+def _flush_coalesced(batch: AlertBatch, dedup_entries: list, feishu_client):
+    """处理合并窗口刷出的批次；全部路由失败时一并撤销各子批次的 fingerprint 去重缓存"""
+    result, status_code = process_alert_request(batch, feishu_client, coalesced=True)
+    if status_code >= 500:
+        _evict_dedup_many(dedup_entries)
+    return result, status_code
+
+
+# ── 跨请求合并窗口 ──
+# 路由配置 coalesce_window > 0 时，firing 子批次按 (alertname, tenant) 缓冲，窗口结束后合并发送
+_coalescer = AlertCoalescer(_flush_coalesced)
+
+
+def _coalesce_key(batch: AlertBatch) -> tuple:
+    """合并窗口分桶 key：(alertname, tenant)，公共标签缺失时取第一条 alert 的标签"""
+    tenant = batch.common_labels_dict.get('tenant', '')
+    if not tenant and batch.alerts:
+        tenant = batch.alerts[0].labels.get('tenant', '')
+    return batch.label_alertname, tenant
+
+
+def _coalesce_window(configs: list) -> float:
+    """命中路由中最大的 coalesce_window（秒），受 ALERT_COALESCE_MAX_WINDOW 限制"""
+    window = max((float(c.get('coalesce_window') or 0) for c in configs), default=0)
+    return min(window, Config.ALERT_COALESCE_MAX_WINDOW)
+
+
+def flush_coalesced_alerts() -> int:
+    """刷出合并窗口中的全部缓冲（进程退出时调用）"""
+    return _coalescer.flush_all()
+
+
+def coalescer_stats() -> dict:
+    return _coalescer.stats()
+
+
+# ── 未恢复卡片原地更新 ──
+# biz 卡片发送后按 (alertname, group_id) 跟踪，恢复前的新实例并入原卡片（ALERT_OPEN_CARD_TTL=0 关闭）
+_open_cards = (OpenCardTracker(lambda severities: _determine_alert_severity(severities))
+               if Config.ALERT_OPEN_CARD_TTL > 0 else None)
+
+
+def flush_open_cards() -> int:
+    """写入全部待防抖的卡片更新（进程退出时调用）"""
+    return _open_cards.flush_all() if _open_cards is not None else 0
+
+
+def release_open_card(message_id: str) -> None:
+    """卡片状态由按钮回调接管（如已静默）后停止跟踪，避免后续合并重建卡片覆盖回调渲染的内容"""
+    if _open_cards is not None:
+        _open_cards.release(message_id)
+
+
+def open_card_stats() -> dict:
+    return _open_cards.stats() if _open_cards is not None else {"enabled": False}
+
+
+# ── 电话告警 incident ──
+# 每个批次只创建一次（多路由、重复投递共享），后台创建，返回后为已发送的卡片补充认领按钮
+_phone_incidents = PhoneIncidentTracker(lambda data: _create_phone_incident(data))
+
+
+def phone_incident_stats() -> dict:
+    return _phone_incidents.stats()
+
 
-def _split_by_alert(data: dict) -> list:
+def _is_phone_batch(batch: AlertBatch) -> bool:
+    """批次中含 phone 级别的 firing 实例"""
+    return any(a.labels.get('severity') == 'phone' for a in batch.alerts if a.status != 'resolved')
+
+
+def _split_by_alert(batch: AlertBatch) -> list:
     """
-    将批量 payload 拆分为单条 alert 的子 payload 列表，用于独立路由。
+    将批量 payload 拆分为单条 alert 的子批次列表，用于独立路由。
 
     当 Grafana 将多个不同 tenant 的告警打包到同一批次时，commonLabels 中不含 tenant，
     导致 extract_all_labels 只能取第一条 alert 的 tenant 进行路由，造成路由错误。
     拆分后每条 alert 独立路由，避免被错误投递到其他群组。
 
-    关键：记录原始批次的顶层 status。Grafana 未开启恢复通知时，顶层 status='firing'，
+    关键：子批次记录原始批次的顶层 status。Grafana 未开启恢复通知时，顶层 status='firing'，
     批次中可能混有 resolved 实例。拆分后这些 resolved 子批次不应触发恢复通知。
+    子批次的公共标签为该 alert 自身的 labels，保证路由时拿到正确的 tenant 等标签。
     """
-    alerts = data.get('alerts', [])
-    if len(alerts) <= 1:
-        return [data]
-    # 记录原始顶层状态（Grafana webhook 顶层 status：firing / resolved）
-    original_status = data.get('status', '')
-    sub_payloads = []
-    for alert in alerts:
-        sub = dict(data)
-        sub['alerts'] = [alert]
-        # 保留原始顶层状态，供 _is_all_resolved 判断使用
-        sub['_original_status'] = original_status
-        # 用该 alert 自身的 labels 覆盖 commonLabels，保证路由时拿到正确的 tenant 等标签
-        sub['commonLabels'] = {k: v for k, v in alert.get('labels', {}).items()}
-        sub_payloads.append(sub)
-    return sub_payloads
-
-
-def _group_and_aggregate_by_alertname(sub_payloads: list) -> list:
-    """将拆分后的子 payload 按 alertname 聚合，同 alertname 的 firing 子 payload 合并为一个批次。
+    return batch.split()
+
+
+def _group_and_aggregate_by_alertname(sub_batches: list) -> list:
+    """将拆分后的子批次按 alertname 聚合，同 alertname 的 firing 子批次合并为一个批次。
 
     解决问题：Grafana 将同一告警规则下多个 pod 的实例打包到同一批次，
     拆分后每个 pod 独立路由导致发送多条卡片。聚合后同 alertname 的 firing
@@ -220,23 +223,22 @@ def _group_and_aggregate_by_alertname(sub_payloads: list) -> list:
 
     仅聚合 firing 子批次；resolved 子批次（原始顶层 status=resolved）保持独立。
     """
-    firing_groups: dict[str, list] = {}   # alertname -> [sub_payload, ...]
-    resolved_payloads: list = []
+    firing_groups: dict[str, list] = {}   # alertname -> [sub_batch, ...]
+    resolved_batches: list = []
 
-    for sub in sub_payloads:
-        original_status = sub.get('_original_status', '')
-        alert_status = sub.get('alerts', [{}])[0].get('status', '')
+    for sub in sub_batches:
+        alert_status = sub.alerts[0].status if sub.alerts else ''
 
         # 只有原始顶层 status=resolved 的 resolved 子批次才走恢复通知路径，保持独立
-        if original_status == 'resolved' and alert_status == 'resolved':
-            resolved_payloads.append(sub)
+        if sub.original_status == 'resolved' and alert_status == 'resolved':
+            resolved_batches.append(sub)
             continue
 
         # firing 子批次（含原始顶层 firing 中的 resolved 实例）按 alertname + tenant 聚合
         # 仅 alertname 相同但 tenant 不同时不能合并，否则路由匹配会只取第一条 alert
         # 的 tenant，导致另一个 tenant 的告警被路由到错误的群组。
-        alertname = sub.get('commonLabels', {}).get('alertname', '')
-        tenant = sub.get('commonLabels', {}).get('tenant', '')
+        alertname = sub.common_labels_dict.get('alertname', '')
+        tenant = sub.common_labels_dict.get('tenant', '')
         if not alertname:
             # 无 alertname 无法聚合，保持独立
             firing_groups.setdefault(f'__no_name_{id(sub)}', []).append(sub)
@@ -249,68 +251,59 @@ def _group_and_aggregate_by_alertname(sub_payloads: list) -> list:
         if len(group) == 1:
             aggregated.append(group[0])
         else:
-            # 合并同 alertname 的子 payload
-            merged = dict(group[0])
-            merged['alerts'] = []
-            for sub in group:
-                merged['alerts'].extend(sub.get('alerts', []))
-            # 合并 commonLabels：取所有子批次的交集（相同 key 且相同 value 才保留），
-            # 避免首个子批次的特有标签（如不同 model）被误当作公共标签
-            sub_label_dicts = [sub.get('commonLabels', {}) for sub in group]
-            merged_common = {}
-            if sub_label_dicts:
-                first = sub_label_dicts[0]
-                for k, v in first.items():
-                    if all(d.get(k) == v for d in sub_label_dicts[1:]):
-                        merged_common[k] = v
-            merged['commonLabels'] = merged_common
-            # 标记为已聚合，防止递归调用 process_alert_request 时再次拆分
-            merged['_aggregated'] = True
+            # 合并同 alertname 的子批次，公共标签取交集，避免首个子批次的特有标签
+            # （如不同 model）被误当作公共标签；合并结果标记为已聚合，不再拆分
+            aggregated.append(AlertBatch.merge(group))
             # name 格式为 "alertname||tenant"，拆分后分别记录
             parts = name.split('||', 1)
             log_name = parts[0] if parts else name
             log_tenant = parts[1] if len(parts) > 1 else ''
             logger.info("聚合同 alertname '%s' tenant='%s' 的 %d 个子批次",
                         log_name, log_tenant, len(group))
-            aggregated.append(merged)
 
-    return aggregated + resolved_payloads
+    return aggregated + resolved_batches
 
 
-def process_alert_request(data, feishu_client):
+def process_alert_request(data, feishu_client, coalesced: bool = False):
     """
     处理告警请求
     
     Args:
-        data: 告警请求数据
+        data: 告警请求数据（webhook dict，或拆分 / 聚合后的 AlertBatch 子批次）
         feishu_client: 飞书客户端实例
+        coalesced: 是否为合并窗口刷出的批次（各子批次缓冲前已通过 fingerprint 去重，不再重复检查与缓冲）
     
     Returns:
         tuple: (response_dict, status_code)
     """
     try:
         active_dedup_key = None
-        active_dedup_cache = None
-        active_dedup_lock = None
+        active_dedup_ns = _DEDUP_NS_ALERT
 
         # 参数验证
         if not data:
             logger.error("请求体不能为空")
             return {"code": 400, "msg": "请求体不能为空"}, 400
 
-        # 若批次中含多条 alert，拆分为单条子 payload 分别路由，再按 alertname 聚合
-        # 已聚合的批次（_aggregated=True）跳过拆分，直接走单批次处理流程
-        sub_payloads = _split_by_alert(data) if not data.get('_aggregated') else [data]
+        # payload 只解析一次，拆分 / 聚合 / 去重 / 路由 / 入库 / 卡片构建均复用同一批次对象
+        batch = AlertBatch.of(data)
+
+        # 若批次中含多条 alert，拆分为单条子批次分别路由，再按 alertname 聚合
+        # 已聚合的批次跳过拆分，直接走单批次处理流程
+        sub_payloads = _split_by_alert(batch) if not batch.aggregated else [batch]
         if len(sub_payloads) > 1:
             # 按 alertname 聚合同名 firing 子批次，减少发送的卡片数量
             sub_payloads = _group_and_aggregate_by_alertname(sub_payloads)
             logger.info("批次含 %d 条 alert，拆分+聚合后 %d 个子批次独立路由",
-                        len(data.get('alerts', [])), len(sub_payloads))
+                        len(batch.alerts), len(sub_payloads))
             all_responses = []
             all_failed = 0
             all_total = 0
-            for sub in sub_payloads:
-                resp, _ = process_alert_request(sub, feishu_client)
+            futures = [_subpayload_executor.submit(process_alert_request, sub, feishu_client)
+                       for sub in sub_payloads]
+            # 按子批次顺序汇总结果，保证合并后的 data 顺序与串行处理一致
+            for future in futures:
+                resp, _ = future.result()
                 summary = resp.get('summary', {})
                 all_total += summary.get('total', 1)
                 all_failed += summary.get('failed', 0)
@@ -329,51 +322,88 @@ def process_alert_request(data, feishu_client):
         # - resolved 批次：30 分钟内相同 fingerprint 组合只处理一次（防 Grafana repeat_interval 重复投递恢复通知）
         # - 双向清除：resolved 到来时清 firing 缓存（防 firing→resolved→firing 漏发），
         #   firing 到来时清 resolved 缓存（防 resolved→firing→resolved 漏发恢复通知）
-        if _is_all_resolved(data):
-            _clear_dedup_for_resolved(data)
-            resolved_key = _make_resolved_dedup_key(data)
-            if _is_duplicate(resolved_key, cache=_resolved_dedup_cache,
-                             lock=_resolved_dedup_lock, ttl=_RESOLVED_DEDUP_TTL):
+        if coalesced:
+            pass
+        elif batch.is_all_resolved:
+            _clear_dedup_for_resolved(batch)
+            _phone_incidents.forget(batch.alertname, batch.fingerprints)
+            resolved_key = batch.resolved_dedup_key
+            if _is_duplicate(resolved_key, namespace=_DEDUP_NS_RESOLVED):
                 logger.info("恢复告警重复，已跳过 (resolved_dedup_key=%s)", resolved_key)
                 return {"code": 0, "msg": "duplicate, skipped"}, 200
             active_dedup_key = resolved_key
-            active_dedup_cache = _resolved_dedup_cache
-            active_dedup_lock = _resolved_dedup_lock
+            active_dedup_ns = _DEDUP_NS_RESOLVED
         else:
             # firing 到来时清除对应 fingerprint 的 resolved 缓存
-            _clear_resolved_dedup_for_firing(data)
-            dedup_key = _make_dedup_key(data)
+            _clear_resolved_dedup_for_firing(batch)
+            dedup_key = batch.firing_dedup_key
             if _is_duplicate(dedup_key):
                 logger.info("告警重复，已跳过 (dedup_key=%s)", dedup_key)
                 return {"code": 0, "msg": "duplicate, skipped"}, 200
             active_dedup_key = dedup_key
-            active_dedup_cache = _alert_dedup_cache
-            active_dedup_lock = _alert_dedup_lock
+            active_dedup_ns = _DEDUP_NS_ALERT
 
         # 查找匹配的告警配置
-        configs = _find_alert_configs(data)
+        configs = _find_alert_configs(batch)
         
         # 未找到任何配置，返回404
         if not configs:
             logger.error("未找到任何匹配的告警配置")
-            _evict_dedup(active_dedup_key, cache=active_dedup_cache, lock=active_dedup_lock)
+            _evict_dedup(active_dedup_key, namespace=active_dedup_ns)
             return {
                 "error": "未找到匹配的告警配置",
-                "alertids": extract_alertids(data),
-                "labels": extract_all_labels(data)
+                "alertids": extract_alertids(batch),
+                "labels": extract_all_labels(batch)
             }, 404
         
+        # 抖动检测：全部实例都处于抖动状态的批次不再单独发卡片 / 回复（也不入库），
+        # 汇总到各群组的抖动告警卡片中原地更新
+        flap_detector = get_flap_detector()
+        if flap_detector is not None and not coalesced:
+            flapping = flap_detector.observe([(a.fingerprint, a.status) for a in batch.alerts if a.fingerprint],
+                                             batch.label_alertname)
+            if flapping and flapping.issuperset(batch.fingerprints):
+                board = get_flap_board()
+                for gid in dict.fromkeys(config_row.get('group_id', '') for config_row in configs):
+                    board.hold(gid, batch.fingerprints, feishu_client)
+                    if batch.is_all_resolved:
+                        # 不走恢复通知，但仍需关闭未恢复卡片并标记恢复，
+                        # 否则之后的 firing 会并入已过时的卡片
+                        mark_fingerprints_resolved(batch.fingerprints, gid)
+                        if _open_cards is not None:
+                            _open_cards.close(batch.alertname, gid)
+                logger.info("告警 '%s' 处于抖动状态，已汇总到抖动卡片 (%d 个实例)",
+                            batch.alertname, len(flapping))
+                return {"code": 0, "msg": "flapping, held back"}, 200
+
+        # 跨请求合并窗口：firing 子批次缓冲，窗口结束 / 满额时合并为一个批次发送；
+        # resolved 到达时先刷出同名缓冲，保证恢复通知能回复到 firing 卡片的话题
+        coalesce_key = _coalesce_key(batch)
+        if batch.is_all_resolved:
+            pending = _coalescer.take(coalesce_key)
+            if pending:
+                _flush_coalesced(*pending)
+        elif not coalesced:
+            window = _coalesce_window(configs)
+            if window > 0:
+                ready = _coalescer.add(coalesce_key, batch, window, len(configs),
+                                       (active_dedup_ns, active_dedup_key), feishu_client)
+                if ready is None:
+                    logger.info("告警进入合并窗口 (alertname='%s', window=%ss)", coalesce_key[0], window)
+                    return {"code": 0, "msg": "coalesced",
+                            "summary": {"total": 0, "success": 0, "failed": 0}}, 202
+                return _flush_coalesced(*ready)
+
         # 提取 alertname 作为标题
-        alertname = extract_alertname(data)
+        alertname = batch.alertname
 
         # resolved 批次到来时，清除对应的语义去重缓存
         # 防止 firing→resolved→firing 中第二轮 firing 被语义去重拦截
-        if _is_all_resolved(data):
-            for config_row in configs:
-                gid = config_row.get('group_id', '')
-                label_key = _make_label_dedup_key(data, gid)
-                _evict_dedup(label_key, cache=_alert_label_dedup_cache,
-                             lock=_alert_label_dedup_lock)
+        if batch.is_all_resolved:
+            _evict_dedup_many([
+                (_DEDUP_NS_LABEL, batch.label_dedup_key(config_row.get('group_id', '')))
+                for config_row in configs
+            ])
 
         # 去重逻辑（第二层：alertname+group_id 语义级别，仅 firing）
         # fingerprint 去重只能拦截完全相同的重发，但 Grafana 不同评估周期
@@ -382,24 +412,56 @@ def process_alert_request(data, feishu_client):
         # 的冷却期内不重复发送。
         label_keys_to_evict = []
         label_dedup_skipped = set()  # 被语义去重跳过的 config 索引集合
-        if not _is_all_resolved(data):
+        # 以下路由不再走语义去重与发送，直接记为成功（不占用语义去重 key）：
+        # - 上游已有活跃静默覆盖全部 firing 实例（静默生效前后的竞争窗口内仍可能投递）
+        # - 已有未恢复卡片的 biz 路由：新实例并入原卡片，不再发新消息 / 写新行（电话告警照常发送）
+        handled_routes = {}  # config 索引 → 响应附加字段
+        silence_index = get_silence_index()
+        firing_labels = [a.labels for a in batch.alerts if a.status != 'resolved']
+        if silence_index is not None and firing_labels:
+            for idx, config_row in enumerate(configs):
+                silence_ids = silence_index.silenced(silence_source(config_row), firing_labels)
+                if all(silence_ids):
+                    logger.info("告警 '%s' 已被静默 %s 覆盖，跳过发送 group_id=%s",
+                                alertname, silence_ids[0], config_row.get('group_id'))
+                    handled_routes[idx] = {'skipped': True, 'reason': f'已被静默 {silence_ids[0]} 覆盖'}
+        if _open_cards is not None and not batch.is_all_resolved and not _is_phone_batch(batch):
             for idx, config_row in enumerate(configs):
+                if idx not in handled_routes and config_row.get('template_type') == 'biz':
+                    message_id = _open_cards.merge(alertname, config_row.get('group_id', ''), batch)
+                    if message_id:
+                        handled_routes[idx] = {'message_id': message_id, 'merged': True}
+        handled_responses = [
+            dict({'alert_id': configs[idx].get('alert_id'), 'group_id': configs[idx].get('group_id'),
+                  'success': True}, **result)
+            for idx, result in handled_routes.items()
+        ]
+        if handled_routes and len(handled_routes) == len(configs):
+            logger.info("告警 '%s' 的 %d 个路由均已静默或并入未恢复卡片", alertname, len(handled_routes))
+            return {"code": 0, "msg": "silenced or merged into open card", "data": handled_responses,
+                    "summary": {"total": len(configs), "success": len(configs), "failed": 0}}, 200
+        if not batch.is_all_resolved:
+            # 所有路由的语义 key 一次性批量检查（已静默 / 已并入卡片的路由不参与，不占用 key）
+            label_routes = [(idx, config_row) for idx, config_row in enumerate(configs)
+                            if idx not in handled_routes]
+            label_keys = [batch.label_dedup_key(config_row.get('group_id', ''))
+                          for _, config_row in label_routes]
+            label_dups = _is_duplicate_many(label_keys, _DEDUP_NS_LABEL)
+            for (idx, config_row), label_key, is_dup in zip(label_routes, label_keys, label_dups):
                 gid = config_row.get('group_id', '')
-                label_key = _make_label_dedup_key(data, gid)
-                if _is_duplicate(label_key, cache=_alert_label_dedup_cache,
-                                 lock=_alert_label_dedup_lock, ttl=_ALERT_DEDUP_TTL):
+                if is_dup:
                     logger.info("告警语义重复 (alertname='%s', group_id='%s')，跳过该路由",
                                 alertname, gid)
                     label_dedup_skipped.add(idx)
                 else:
                     label_keys_to_evict.append(label_key)
-            if len(label_dedup_skipped) == len(configs):
+            if not handled_routes and len(label_dedup_skipped) == len(configs):
                 # 所有路由都命中语义去重，跳过整个批次
-                _evict_dedup(active_dedup_key, cache=active_dedup_cache, lock=active_dedup_lock)
+                _evict_dedup(active_dedup_key, namespace=active_dedup_ns)
                 return {"code": 0, "msg": "duplicate (alertname), skipped"}, 200
         
         # 处理每个匹配的配置
-        responses = []
+        responses = handled_responses
         failed_count = 0
         
         # 有效路由数 = 总路由数 - 被语义去重跳过的路由数
@@ -407,45 +469,30 @@ def process_alert_request(data, feishu_client):
         logger.info("开始处理告警，共匹配 %d 个路由（%d 个被语义去重跳过）",
                     len(configs), len(label_dedup_skipped))
         
-        for idx, config_row in enumerate(configs):
-            if idx in label_dedup_skipped:
-                continue
-            try:
-                logger.info("处理路由 [%d/%d]: group_id=%s", 
-                           idx + 1, len(configs), config_row.get('group_id'))
-                
-                # 处理单个配置的告警
-                response = _process_single_alert_config(
-                    data, 
-                    config_row, 
-                    alertname, 
-                    feishu_client
-                )
-                
-                if response:
-                    responses.append(response)
-                else:
-                    # 记录失败但继续处理其他路由
-                    failed_count += 1
-                    logger.error("路由 [%d/%d] 发送失败: group_id=%s", 
-                               idx + 1, len(configs), config_row.get('group_id'))
-                    responses.append({
-                        'alert_id': config_row.get('alert_id'),
-                        'group_id': config_row.get('group_id'),
-                        'success': False,
-                        'error': '发送失败'
-                    })
-                    
-            except Exception as e:
-                # 记录异常但继续处理其他路由
+        active_routes = [(idx, config_row) for idx, config_row in enumerate(configs)
+                         if idx not in label_dedup_skipped and idx not in handled_routes]
+        # phone 级别仅 firing 时触发电话：整批只创建一个 Flashcat incident，各路由卡片共享
+        phone_incident = None
+        if active_routes and not batch.is_all_resolved and _is_phone_batch(batch):
+            logger.info("📞 触发电话告警（firing），创建 Flashcat incident")
+            phone_incident = _phone_incidents.start(alertname, batch)
+        if len(active_routes) == 1:
+            # 单路由直接在当前线程处理，避免线程池调度开销
+            route_results = [_process_route(active_routes[0][0], len(configs), active_routes[0][1],
+                                            batch, alertname, feishu_client, phone_incident)]
+        else:
+            futures = [
+                _route_executor.submit(_process_route, idx, len(configs), config_row,
+                                       batch, alertname, feishu_client, phone_incident)
+                for idx, config_row in active_routes
+            ]
+            # 按路由顺序收集结果，保证 responses 顺序与串行处理一致
+            route_results = [f.result() for f in futures]
+
+        for response, failed in route_results:
+            responses.append(response)
+            if failed:
                 failed_count += 1
-                logger.error("路由 [%d/%d] 处理异常: %s", idx + 1, len(configs), str(e), exc_info=True)
-                responses.append({
-                    'alert_id': config_row.get('alert_id'),
-                    'group_id': config_row.get('group_id'),
-                    'success': False,
-                    'error': str(e)
-                })
         
         # 统计结果
         success_count = effective_total - failed_count
@@ -455,9 +502,8 @@ def process_alert_request(data, feishu_client):
         # 如果所有路由都失败，撤销所有去重缓存以允许 Grafana 重试
         if effective_total > 0 and failed_count == effective_total:
             logger.error("所有路由发送失败，撤销去重缓存以允许 Grafana 重试 (key=%s)", active_dedup_key)
-            _evict_dedup(active_dedup_key, cache=active_dedup_cache, lock=active_dedup_lock)
-            for lk in label_keys_to_evict:
-                _evict_dedup(lk, cache=_alert_label_dedup_cache, lock=_alert_label_dedup_lock)
+            _evict_dedup_many([(active_dedup_ns, active_dedup_key)] +
+                              [(_DEDUP_NS_LABEL, lk) for lk in label_keys_to_evict])
             return {
                 "code": 500, 
                 "msg": "所有路由发送失败", 
@@ -478,22 +524,65 @@ def process_alert_request(data, feishu_client):
         
     except Exception as e:
         logger.error("处理告警请求失败: %s", e, exc_info=True)
-        _evict_dedup(active_dedup_key, cache=active_dedup_cache, lock=active_dedup_lock)
+        _evict_dedup(active_dedup_key, namespace=active_dedup_ns)
         return {"code": 500, "msg": str(e)}, 500
 
 
-def _find_alert_configs(data):
+def _process_route(idx, total, config_row, batch, alertname, feishu_client, phone_incident=None):
+    """
+    处理单个路由，捕获所有异常，在路由线程池中执行
+
+    Returns:
+        tuple: (response, failed)，failed 为 True 表示该路由发送失败
+    """
+    try:
+        logger.info("处理路由 [%d/%d]: group_id=%s", 
+                   idx + 1, total, config_row.get('group_id'))
+        
+        # 处理单个配置的告警
+        response = _process_single_alert_config(
+            batch, 
+            config_row, 
+            alertname, 
+            feishu_client,
+            phone_incident,
+        )
+        
+        if response:
+            return response, False
+        # 记录失败但继续处理其他路由
+        logger.error("路由 [%d/%d] 发送失败: group_id=%s", 
+                   idx + 1, total, config_row.get('group_id'))
+        return {
+            'alert_id': config_row.get('alert_id'),
+            'group_id': config_row.get('group_id'),
+            'success': False,
+            'error': '发送失败'
+        }, True
+            
+    except Exception as e:
+        # 记录异常但继续处理其他路由
+        logger.error("路由 [%d/%d] 处理异常: %s", idx + 1, total, str(e), exc_info=True)
+        return {
+            'alert_id': config_row.get('alert_id'),
+            'group_id': config_row.get('group_id'),
+            'success': False,
+            'error': str(e)
+        }, True
+
+
+def _find_alert_configs(batch):
     """
     查找匹配的告警配置
     
     Args:
-        data: 告警数据
+        batch: 告警批次（AlertBatch）
     
     Returns:
         list: 匹配的配置列表
     """
     configs = []
-    all_labels = extract_all_labels(data)
+    all_labels = extract_all_labels(batch)
     
     # 1. 尝试通过标签匹配查询（现在返回所有匹配的配置）
     if all_labels:
@@ -513,7 +602,7 @@ def _find_alert_configs(data):
     
     # 2. 如果通过标签匹配未查询到配置，尝试通过alertid匹配查询配置
     if not configs:
-        alertids = extract_alertids(data)
+        alertids = extract_alertids(batch)
         logger.info("尝试通过alertid匹配查询，提取到的alertid： %s", alertids)
         
         if alertids:
@@ -530,29 +619,30 @@ def _find_alert_configs(data):
     return configs
 
 
-def _process_single_alert_config(data, config_row, alertname, feishu_client):
+def _process_single_alert_config(batch, config_row, alertname, feishu_client, phone_incident=None):
     """
     处理单个告警配置
 
     Args:
-        data: 告警数据
+        batch: 告警批次（AlertBatch）
         config_row: 配置行
         alertname: 告警名称
         feishu_client: 飞书客户端实例
+        phone_incident: 批次级电话告警 incident（PhoneIncident），非电话告警为 None
 
     Returns:
         dict: 处理结果
     """
     # 解包 4-tuple（新签名）
     alerts, severities, maid, grafana_urls = alert_data_api(
-        data,
+        batch,
         config_row.get('project'),
         config_row.get('alertmanager_url'),
         group_id=config_row.get('group_id'),
     )
 
     # 判断是否为 resolved 告警（原始顶层 status=resolved 且所有 alert 都是 resolved）
-    is_resolved = _is_all_resolved(data)
+    is_resolved = batch.is_all_resolved
 
     # 判断是否符合 @ 条件（恢复通知不艾特任何人，只在 firing 时艾特）
     rank = config_row.get('rank', '')
@@ -572,7 +662,7 @@ def _process_single_alert_config(data, config_row, alertname, feishu_client):
         if config_row.get('oncall_sync'):
             mentioned_user_list = _get_oncall_mentioned_users(config_row)
         else:
-            mentioned_user_list = json.loads(config_row['users']) if config_row.get('users') else []
+            mentioned_user_list = jsoncodec.loads(config_row['users']) if config_row.get('users') else []
         logger.info("符合@条件的告警级别 %s | 此告警的级别 %s | 艾特用户数 %d",
                     rank, severities, len(mentioned_user_list))
     else:
@@ -585,16 +675,9 @@ def _process_single_alert_config(data, config_row, alertname, feishu_client):
     template_type = config_row.get('template_type', 'ops')
     group_id = config_row['group_id']
 
-    # phone 级别仅 firing 时触发电话，resolved 不打电话
-    # 创建 Flashcat incident 以触发电话通知，返回 incident_id 用于卡片认领按钮
-    incident_id = None
-    if is_phone_alert and not is_resolved:
-        logger.info("📞 触发电话告警（firing），创建 Flashcat incident")
-        incident_id = _create_phone_incident(data, maid)
-
     # ---------- resolved 告警：尝试在话题中回复 ----------
     if is_resolved:
-        fingerprints = extract_fingerprints(data)
+        fingerprints = extract_fingerprints(batch)
         thread_message_id = ''
         for fp in fingerprints:
             mid = get_message_id_by_fingerprint(fp, group_id=group_id)
@@ -609,13 +692,21 @@ def _process_single_alert_config(data, config_row, alertname, feishu_client):
         if fingerprints:
             all_original_fps = get_all_fingerprints_by_fingerprint(fingerprints, group_id=group_id)
             resolved_set = set(fingerprints)
-            if all_original_fps and not resolved_set.issuperset(all_original_fps):
-                remaining = [fp for fp in all_original_fps if fp not in resolved_set]
+            remaining = [fp for fp in all_original_fps if fp not in resolved_set]
+            if remaining:
+                # 之前批次已恢复的实例不再等待
+                remaining = filter_still_firing(remaining, group_id)
+            if remaining and _open_cards is not None:
+                # 并入未恢复卡片的实例逐条恢复：先同步到卡片，再按卡片上的最新状态判断
+                _open_cards.merge(alertname, group_id, batch)
+                remaining = _open_cards.still_firing(alertname, group_id, remaining)
+            if remaining:
                 logger.info(
                     "⏸ 部分恢复检测：原始 %d 个实例，当前 resolved %d 个，"
                     "仍有 %d 个实例未恢复，跳过恢复通知 group_id=%s",
                     len(all_original_fps), len(fingerprints), len(remaining), group_id
                 )
+                mark_fingerprints_resolved(fingerprints, group_id)
                 return {
                     'alert_id': config_row.get('alert_id'),
                     'group_id': group_id,
@@ -625,7 +716,7 @@ def _process_single_alert_config(data, config_row, alertname, feishu_client):
                 }
 
         if template_type == 'biz':
-            raw_alerts = extract_alert_raw(data)
+            raw_alerts = extract_alert_raw(batch)
             # 用 DB 中存储的实际触发时间覆盖 Grafana resolved 包中的 startsAt
             # （Grafana 在 resolved 通知里会将 startsAt 重置为恢复时间，导致持续时长为 0）
             for ra in raw_alerts:
@@ -634,7 +725,7 @@ def _process_single_alert_config(data, config_row, alertname, feishu_client):
                     db_start = get_alerttime_by_fingerprint(fp, group_id=group_id)
                     if db_start:
                         ra['startsAt'] = db_start
-            common_labels = data.get('commonLabels', {})
+            common_labels = batch.common_labels_dict
             content = build_biz_resolved_card(alertname, raw_alerts, grafana_urls, common_labels, mentioned_user_list)
         else:
             string_alert_info = _build_alert_message(alerts)
@@ -654,6 +745,9 @@ def _process_single_alert_config(data, config_row, alertname, feishu_client):
         try:
             feishu_client.reply_message(thread_message_id, 'interactive', content, reply_in_thread=True)
             logger.info("✅ 已在话题中回复恢复通知，原消息: %s", thread_message_id)
+            mark_fingerprints_resolved(fingerprints, group_id)
+            if _open_cards is not None:
+                _open_cards.close(alertname, group_id)
             return {'alert_id': config_row.get('alert_id'), 'group_id': group_id, 'success': True}
         except Exception as e:
             # 话题回复失败，不降级为新消息，避免恢复通知脱离上下文
@@ -666,12 +760,25 @@ def _process_single_alert_config(data, config_row, alertname, feishu_client):
             }
 
     # ---------- firing 告警（含混合状态）----------
+    # 告警风暴：该群发送速率超过阈值时，单条卡片并入周期摘要（电话告警仍单独发送）
+    storm_guard = get_storm_guard()
+    if storm_guard is not None:
+        items = [(alertname, a.labels.get('severity') or alert_severity)
+                 for a in batch.alerts if a.status != 'resolved'] or [(alertname, alert_severity)]
+        link = grafana_urls.get('panelURL') or grafana_urls.get('generatorURL') or grafana_urls.get('dashboardURL')
+        if not storm_guard.admit(group_id, items, link, feishu_client, exempt=is_phone_alert):
+            logger.info("群组 %s 处于告警风暴模式，告警 '%s' 并入摘要", group_id, alertname)
+            return {'alert_id': config_row.get('alert_id'), 'group_id': group_id,
+                    'success': True, 'digested': True}
+
     # firing 告警永远发新消息，不回复旧话题。
     # 原因：混合状态时若复用旧 message_id，会导致"恢复后再触发"的新告警
     # 被错误地回复到上一轮已结束的话题中。
+    # incident 已创建完成时卡片直接带认领按钮，否则先发送，创建完成后补充
+    incident_id = (phone_incident.incident_id or None) if phone_incident is not None else None
     if template_type == 'biz':
-        raw_alerts = extract_alert_raw(data)
-        common_labels = data.get('commonLabels', {})
+        raw_alerts = extract_alert_raw(batch)
+        common_labels = batch.common_labels_dict
         content = build_biz_firing_card(
             alertname, alert_severity, raw_alerts, grafana_urls, maid, common_labels, mentioned_user_list, incident_id
         )
@@ -684,28 +791,29 @@ def _process_single_alert_config(data, config_row, alertname, feishu_client):
             logger.error("biz 卡片发送失败: %s", e)
             message_id = ''
     else:
-        # ops 模板走原有 alert_to_feishu
         string_alert_info = _build_alert_message(alerts)
-        message_id = alert_to_feishu(
-            feishu_client,
-            string_alert_info,
-            mentioned_user_list,
-            group_id,
-            alertname=alertname,
-            severity=alert_severity,
-            maid=maid,
-            incident_id=incident_id,
-        )
-        # ops 模板卡片在 alert_to_feishu 内部构建，无 content 变量
-        content = None
+        content = build_alert_card(string_alert_info, mentioned_user_list, alertname=alertname,
+                                   severity=alert_severity, maid=maid, incident_id=incident_id)
+        try:
+            message_id = feishu_client.send("chat_id", group_id, "interactive", content)
+        except Exception as e:
+            logger.error("ops 卡片发送失败: %s", e)
+            message_id = ''
 
     if message_id:
         # 保存 message_id 供后续 resolved/静默话题回复
         if maid:
-            update_message_id(maid, message_id)
-            # 保存原始卡片 JSON，认领时原地更新卡片使用（仅 biz 模板）
-            if incident_id and content:
-                save_card_content(maid, content)
+            # 同一次 UPDATE 保存原始卡片 JSON，卡片回调（静默 / 认领）据此渲染新状态
+            update_message_id(maid, message_id, content)
+        card_state.remember(message_id, content)
+        if phone_incident is not None and maid:
+            _phone_incidents.attach(phone_incident, maid, message_id, feishu_client, incident_id)
+        # 无认领状态的 biz 卡片登记为未恢复卡片，恢复前的新实例原地并入
+        if (_open_cards is not None and template_type == 'biz' and content and maid
+                and not is_phone_alert):
+            starts_at = (batch.firing_record[2] if batch.firing_record else '') or ''
+            _open_cards.open(alertname, group_id, maid, message_id, feishu_client, batch, grafana_urls,
+                             mentioned_user_list, starts_at)
         logger.info("✅ 发送告警信息成功，群组: %s，级别: %s", group_id, alert_severity)
         return {
             'alert_id': config_row.get('alert_id'),
@@ -751,15 +859,14 @@ def _get_oncall_mentioned_users(config_row: dict) -> list:
     return get_oncall_open_ids(app_key, schedule_id)
 
 
-def _create_phone_incident(data: dict, maid: str) -> str:
-    """创建 Flashcat incident 以触发电话告警，并将 incident_id 入库
+def _create_phone_incident(data: dict) -> str:
+    """创建 Flashcat incident 以触发电话告警
 
     通过 incident/create API 创建 Critical 级别 incident，Flashcat 会根据
-    channel 通知策略触发电话通知。创建成功后将 incident_id 写入 alert_data 表。
+    channel 通知策略触发电话通知。incident_id 由 PhoneIncidentTracker 写入各路由的 alert_data。
 
     Args:
         data: 原始告警数据
-        maid: 告警记录 ID，用于将 incident_id 写入 DB
 
     Returns:
         str: 创建成功返回 incident_id，失败返回 None
@@ -777,9 +884,6 @@ def _create_phone_incident(data: dict, maid: str) -> str:
     incident_id = create_phone_incident(data, app_key, channel_id)
     if incident_id:
         logger.info("📞 Flashcat incident 创建成功: incident_id=%s", incident_id)
-        # 将 incident_id 入库，供后续认领按钮使用
-        if maid:
-            update_incident_id(maid, incident_id)
         return incident_id
     else:
         logger.error("📞 Flashcat incident 创建失败，回退到旧接口")
@@ -792,14 +896,14 @@ def _create_phone_incident(data: dict, maid: str) -> str:
                     logger.info("📞 电话告警（回退旧接口）已成功触发")
                 else:
                     logger.error("📞 电话告警（回退旧接口）触发失败")
-            t = threading.Thread(target=_do_send_fallback, daemon=True)
-            t.start()
+            # 执行器繁忙时在当前线程发送，电话告警不丢弃
+            if not get_task_executor().submit('phone_fallback', _do_send_fallback):
+                _do_send_fallback()
         return None
 
 
 def _build_ops_resolved_content(string_alert_info: str, alertname: str, mentioned_user_list: list = None) -> str:
     """将 ops 格式告警信息包装成绿色恢复卡片 JSON"""
-    import json as _json
     from feishu_utils.event_handler import _get_current_time
     elements = []
     if mentioned_user_list:
@@ -819,7 +923,7 @@ def _build_ops_resolved_content(string_alert_info: str, alertname: str, mentione
         },
         "elements": elements,
     }
-    return _json.dumps(card, ensure_ascii=False)
+    return jsoncodec.dumps(card)
 
 
 def _build_alert_message(alerts):
@@ -859,30 +963,6 @@ def _determine_alert_severity(severities):
     Returns:
         str: 最终告警级别
     """
-    # 数字级别映射（1=最低，5=最高）
-    numeric_severity_map = {
-        "5": "critical",
-        "4": "critical", 
-        "3": "warning",
-        "2": "info",
-        "1": "info"
-    }
-    
-    severity_priority = {
-        "critical": 4, 
-        "warning": 3, 
-        "info": 2, 
-        "success": 1,
-        "resolved": 0,
-        # P 级别：p0 最高，p3 最低
-        "p0": 5,
-        "p1": 4,
-        "p2": 3,
-        "p3": 2,
-        # 电话告警，与 p0 同优先级
-        "phone": 5,
-    }
-    
     alert_severity = "warning"  # 默认级别
     
     if severities:
@@ -896,13 +976,11 @@ def _determine_alert_severity(severities):
             sev_str = str(sev)
             
             # 如果是数字，转换为对应的级别名称
+            sev_lower = normalize_severity(sev_str)
             if sev_str.isdigit():
-                sev_lower = numeric_severity_map.get(sev_str, "warning")
                 logger.info("数字级别 %s 映射为 %s", sev_str, sev_lower)
-            else:
-                sev_lower = sev_str.lower()
             
-            priority = severity_priority.get(sev_lower, 0)
+            priority = severity_priority(sev_lower)
             if priority > max_priority:
                 max_priority = priority
                 alert_severity = sev_lower
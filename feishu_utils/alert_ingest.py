@@ -0,0 +1,514 @@
+#!/usr/bin/env python3
+"""
+告警异步接收模块
+
+/api/v1/alerts 在 async 模式下只做基础校验并入队，立即返回 202，
+由有界工作线程池从队列中取出 payload 调用 process_alert_request 处理。
+避免飞书 / Flashcat / 数据库等下游变慢时 Grafana webhook 超时并重复投递。
+队列按告警级别出队（phone / p0 最先），过载时丢弃排队过久的低级别告警。
+
+队列满时按 ALERT_INGEST_FULL_POLICY 处理：
+- reject: 返回 503，由 Grafana 稍后重试（计入 dropped）
+- sync  : 退化为同步处理，保证不丢告警（计入 sync_fallback）
+
+Grafana HA 多实例 / 超时重投会把字节完全相同的请求体重复推送，RawBodyDedup 在解析 JSON 之前
+对原始请求体做非加密哈希，短 TTL 内命中的请求直接返回 200，跳过解析与后续全部处理。
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import Counter, deque
+
+from config.config import Config
+from common_utils import jsoncodec
+from common_utils.ttl_cache import TTLCache
+from alerts_format.alert_batch import SEVERITY_PRIORITY, severity_priority
+
+try:
+    import xxhash
+except ImportError:  # 可选依赖，未安装时使用内置 hash（SipHash）
+    xxhash = None
+
+logger = logging.getLogger(__name__)
+
+
+# 队列优先级（数值越小越先出队）
+PRIORITY_NAMES = ('urgent', 'critical', 'warning', 'info')
+# 级别优先级（alert_batch.SEVERITY_PRIORITY）→ 队列优先级：phone / p0 → urgent，critical / p1 → critical，
+# warning / p2 → warning，其余（info / p3 / success / resolved）→ info；未标注或未知级别按 warning 处理
+_TIER_BY_RANK = {5: 0, 4: 1, 3: 2}
+_WARNING_RANK = SEVERITY_PRIORITY["warning"]
+# 每个优先级保留的最近等待时长样本数（用于分位数）
+_LATENCY_SAMPLES = 512
+# 丢弃汇总日志的最小间隔（秒）
+_SHED_LOG_INTERVAL = 10
+
+
+def payload_priority(data) -> int:
+    """payload 中最高告警级别对应的队列优先级"""
+    severities = [(alert.get("labels") or {}).get("severity") for alert in data.get("alerts") or []
+                  if isinstance(alert, dict)]
+    severities.append((data.get("commonLabels") or {}).get("severity"))
+    ranks = [severity_priority(sev, _WARNING_RANK) for sev in severities if sev]
+    return _TIER_BY_RANK.get(max(ranks, default=_WARNING_RANK), len(PRIORITY_NAMES) - 1)
+
+
+def _payload_alertname(data) -> str:
+    alertname = (data.get("commonLabels") or {}).get("alertname")
+    if not alertname and data.get("alerts"):
+        alertname = (data["alerts"][0].get("labels") or {}).get("alertname")
+    return alertname or "unknown"
+
+
+def _percentile(samples, q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)
+
+
+class _TierStats:
+    """单个优先级的计数与等待时长样本"""
+
+    __slots__ = ('depth', 'enqueued', 'processed', 'failed', 'shed', 'max_wait', 'waits', 'latencies')
+
+    def __init__(self):
+        self.depth = 0
+        self.enqueued = 0
+        self.processed = 0
+        self.failed = 0
+        self.shed = 0
+        self.max_wait = 0.0
+        self.waits = deque(maxlen=_LATENCY_SAMPLES)
+        self.latencies = deque(maxlen=_LATENCY_SAMPLES)
+
+
+class AlertIngestQueue:
+    """有界告警优先级队列 + 固定数量工作线程
+
+    按 payload 中最高告警级别出队（urgent → critical → warning → info，同级先进先出），
+    洪峰中的低级别告警不再拖慢电话 / p0 告警。低优先级（不高于 shed_priority）的告警：
+    - 排队超过 age_budget 秒后出队时直接丢弃，不再处理
+    - 队列已满时被更高优先级的新告警挤出（同级中最早入队的先被挤出）
+    丢弃的告警按 alertname 计数，周期性汇总到日志，并在 stats() 中展示。
+    """
+
+    def __init__(self, handler, maxsize: int = 1000, workers: int = 4, name: str = "alert-ingest",
+                 age_budget: float = None, shed_priority: str = None, priority=payload_priority):
+        """
+        Args:
+            handler: 处理函数，签名 handler(payload) -> (response_dict, status_code)
+            maxsize: 队列容量
+            workers: 工作线程数
+            name: 线程名前缀
+            age_budget: 低优先级告警的排队时长上限（秒，0 表示不按排队时长丢弃）
+            shed_priority: 可丢弃的最高优先级（PRIORITY_NAMES 之一，"none" 表示不丢弃）
+            priority: 优先级函数 priority(payload) → PRIORITY_NAMES 下标
+        """
+        self._handler = handler
+        self._priority = priority
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._maxsize = maxsize
+        self._workers = workers
+        self._name = name
+        self._age_budget = Config.ALERT_INGEST_AGE_BUDGET if age_budget is None else age_budget
+        shed_priority = shed_priority or Config.ALERT_INGEST_SHED_PRIORITY
+        # 优先级下标 >= _shed_from 的告警可被丢弃
+        self._shed_from = (PRIORITY_NAMES.index(shed_priority) if shed_priority in PRIORITY_NAMES
+                           else len(PRIORITY_NAMES))
+        self._threads = []
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stopping = False
+        # 计数器
+        self._enqueued = 0
+        self._processed = 0
+        self._failed = 0
+        self._dropped = 0
+        self._sync_fallback = 0
+        self._busy = 0
+        self._last_wait = 0.0
+        self._max_wait = 0.0
+        self._tiers = [_TierStats() for _ in PRIORITY_NAMES]
+        self._shed_names = Counter()
+        self._shed_pending = Counter()
+        # 首次丢弃立即记录日志
+        self._shed_logged_at = time.monotonic() - _SHED_LOG_INTERVAL
+
+    def start(self) -> None:
+        """启动工作线程（幂等）"""
+        with self._start_lock:
+            if self._threads:
+                return
+            for i in range(self._workers):
+                t = threading.Thread(target=self._worker_loop, name=f"{self._name}-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+            logger.info("告警异步队列已启动: workers=%d, capacity=%d", self._workers, self._maxsize)
+
+    def submit(self, payload) -> bool:
+        """入队，队列已满且无可挤出的低优先级告警时返回 False（调用方决定拒绝或同步处理）"""
+        if not self._threads:
+            self.start()
+        priority = self._priority(payload)
+        evicted = None
+        with self._cond:
+            if self._stopping:
+                full = True
+            else:
+                full = len(self._heap) >= self._maxsize
+                if full:
+                    evicted = self._evict_below(priority)
+                    full = evicted is None
+                if not full:
+                    with self._stats_lock:
+                        self._enqueued += 1
+                        self._tiers[priority].enqueued += 1
+                        self._tiers[priority].depth += 1
+                    heapq.heappush(self._heap, (priority, next(self._seq), time.monotonic(), payload))
+                    self._cond.notify()
+        if evicted is not None:
+            self._shed(evicted[0], evicted[3], time.monotonic() - evicted[2], "队列已满，被高优先级告警挤出")
+        if full:
+            if self._stopping:
+                logger.warning("告警队列已停止，%s 级告警入队失败", PRIORITY_NAMES[priority])
+            else:
+                logger.warning("告警队列已满 (capacity=%d)，%s 级告警入队失败", self._maxsize, PRIORITY_NAMES[priority])
+            return False
+        return True
+
+    def record_overflow(self, handled_inline: bool) -> None:
+        """记录入队失败后的去向：同步处理（sync_fallback）或拒绝（dropped）"""
+        with self._stats_lock:
+            if handled_inline:
+                self._sync_fallback += 1
+            else:
+                self._dropped += 1
+
+    def _evict_below(self, priority: int):
+        """挤出比 priority 低且可丢弃的告警中优先级最低、最早入队的一条（持有 _cond 时调用）"""
+        victim = None
+        for pos, item in enumerate(self._heap):
+            if item[0] > priority and item[0] >= self._shed_from:
+                if victim is None or (item[0], -item[1]) > (self._heap[victim][0], -self._heap[victim][1]):
+                    victim = pos
+        if victim is None:
+            return None
+        item = self._heap[victim]
+        self._heap[victim] = self._heap[-1]
+        self._heap.pop()
+        heapq.heapify(self._heap)
+        return item
+
+    def _shed(self, priority: int, payload, wait: float, reason: str) -> None:
+        """丢弃低优先级告警：计数并按间隔汇总日志"""
+        alertname = _payload_alertname(payload)
+        now = time.monotonic()
+        with self._stats_lock:
+            self._tiers[priority].shed += 1
+            self._tiers[priority].depth -= 1
+            self._shed_names[alertname] += 1
+            if len(self._shed_names) > 200:
+                self._shed_names = Counter(dict(self._shed_names.most_common(100)))
+            self._shed_pending[alertname] += 1
+            if now - self._shed_logged_at < _SHED_LOG_INTERVAL:
+                return
+            pending, self._shed_pending = self._shed_pending, Counter()
+            elapsed, self._shed_logged_at = now - self._shed_logged_at, now
+        logger.warning("过去 %.0fs 丢弃低优先级告警 %d 条（最近一条 %s 级，排队 %.1fs，%s）: %s",
+                       elapsed, sum(pending.values()), PRIORITY_NAMES[priority], wait, reason,
+                       ", ".join(f"{name}×{count}" for name, count in pending.most_common(10)))
+
+    def _worker_loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._heap and not self._stopping:
+                    self._cond.wait()
+                if not self._heap:
+                    # 退出中且已排空
+                    return
+                priority, _, enqueued_at, payload = heapq.heappop(self._heap)
+            started = time.monotonic()
+            wait = started - enqueued_at
+            if 0 < self._age_budget < wait and priority >= self._shed_from:
+                self._shed(priority, payload, wait, f"超过排队时长上限 {self._age_budget:.0f}s")
+                continue
+            tier = self._tiers[priority]
+            with self._stats_lock:
+                self._busy += 1
+                self._last_wait = wait
+                self._max_wait = max(self._max_wait, wait)
+                tier.depth -= 1
+                tier.max_wait = max(tier.max_wait, wait)
+                tier.waits.append(wait)
+            try:
+                _, status_code = self._handler(payload)
+                ok = status_code < 400
+                if not ok:
+                    logger.warning("异步告警处理返回 %s (排队 %.3fs)", status_code, wait)
+            except Exception as e:
+                ok = False
+                logger.error("异步告警处理异常: %s", e, exc_info=True)
+            finally:
+                with self._stats_lock:
+                    self._busy -= 1
+                    self._processed += 1
+                    tier.processed += 1
+                    tier.latencies.append(time.monotonic() - enqueued_at)
+                    if not ok:
+                        self._failed += 1
+                        tier.failed += 1
+
+    def depth(self) -> int:
+        """当前排队数（不计算时延分位数，供入队响应使用）"""
+        with self._cond:
+            return len(self._heap)
+
+    def oldest_age(self) -> float:
+        """最早入队元素已等待的秒数，队列为空返回 0"""
+        with self._cond:
+            oldest = min((item[2] for item in self._heap), default=None)
+        if oldest is None:
+            return 0.0
+        return time.monotonic() - oldest
+
+    def stats(self) -> dict:
+        """队列指标：深度、最老元素等待时长、丢弃数，以及按优先级的排队 / 端到端时延分位数"""
+        oldest_age = self.oldest_age()
+        depth = self.depth()
+        with self._stats_lock:
+            return {
+                "depth": depth,
+                "capacity": self._maxsize,
+                "workers": self._workers,
+                "busy": self._busy,
+                "oldest_age_seconds": round(oldest_age, 3),
+                "last_wait_seconds": round(self._last_wait, 3),
+                "max_wait_seconds": round(self._max_wait, 3),
+                "enqueued": self._enqueued,
+                "processed": self._processed,
+                "failed": self._failed,
+                "dropped": self._dropped,
+                "sync_fallback": self._sync_fallback,
+                "shed": sum(tier.shed for tier in self._tiers),
+                "age_budget_seconds": self._age_budget,
+                "shed_priority": PRIORITY_NAMES[self._shed_from] if self._shed_from < len(PRIORITY_NAMES) else "none",
+                "shed_alertnames": dict(self._shed_names.most_common(10)),
+                "priorities": {
+                    name: {
+                        "depth": tier.depth,
+                        "enqueued": tier.enqueued,
+                        "processed": tier.processed,
+                        "failed": tier.failed,
+                        "shed": tier.shed,
+                        "wait_p50_seconds": _percentile(tier.waits, 0.5),
+                        "wait_p95_seconds": _percentile(tier.waits, 0.95),
+                        "wait_max_seconds": round(tier.max_wait, 3),
+                        "latency_p50_seconds": _percentile(tier.latencies, 0.5),
+                        "latency_p95_seconds": _percentile(tier.latencies, 0.95),
+                    }
+                    for name, tier in zip(PRIORITY_NAMES, self._tiers)
+                },
+            }
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """停止接收并等待队列中已有告警处理完毕（最多 timeout 秒）"""
+        with self._start_lock:
+            if self._stopping or not self._threads:
+                return
+            with self._cond:
+                self._stopping = True
+                self._cond.notify_all()
+        deadline = time.monotonic() + timeout
+        for t in self._threads:
+            t.join(max(0.0, deadline - time.monotonic()))
+        with self._cond:
+            remaining = len(self._heap)
+        logger.info("告警异步队列已停止，剩余 %d 条未处理", remaining)
+
+
+def validate_alert_payload(data) -> str:
+    """入队前的基础校验，返回错误信息（合法返回空字符串）"""
+    if not data:
+        return "请求体不能为空"
+    if not isinstance(data, dict):
+        return "请求体必须为 JSON 对象"
+    alerts = data.get("alerts")
+    if not isinstance(alerts, list) or not alerts:
+        return "alerts 不能为空"
+    return ""
+
+
+class RawBodyDedup:
+    """原始请求体摘要去重（解析前的快速路径）
+
+    摘要为 (长度, 64/128 位哈希)，只在进程内使用，不参与快照。
+    下游处理失败（状态码 >= 400 或异常）时撤销摘要，不影响 Grafana 重试。
+    """
+
+    def __init__(self, ttl: float, maxsize: int = None):
+        self._cache = TTLCache(ttl, maxsize=maxsize or Config.DEDUP_CACHE_MAX_ENTRIES, name='raw_body_dedup')
+        self._stats_lock = threading.Lock()
+        self._checks = 0
+        self._duplicates = 0
+        self._skipped_bytes = 0
+        self._skipped_alerts = 0
+        self._released = 0
+
+    @staticmethod
+    def digest(body: bytes) -> tuple:
+        if xxhash is not None:
+            return len(body), xxhash.xxh3_128_intdigest(body)
+        return len(body), hash(body)
+
+    def claim(self, body: bytes):
+        """占用请求体摘要，返回摘要；TTL 内已出现过相同请求体时返回 None"""
+        key = self.digest(body)
+        # value 为首次请求解析出的 alert 条数，重复命中时累计到 skipped_alerts
+        duplicate = self._cache.check_and_set(key, 0)
+        with self._stats_lock:
+            self._checks += 1
+            if duplicate:
+                self._duplicates += 1
+                self._skipped_bytes += len(body)
+                self._skipped_alerts += self._cache.get(key, 0)
+        return None if duplicate else key
+
+    def record(self, key: tuple, alert_count: int) -> None:
+        """记录首次请求的 alert 条数（仅用于统计跳过的工作量）"""
+        if alert_count:
+            self._cache.set(key, alert_count)
+
+    def release(self, key: tuple) -> None:
+        """处理失败时撤销摘要"""
+        if self._cache.pop(key) is not None:
+            with self._stats_lock:
+                self._released += 1
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "ttl": self._cache.ttl,
+                "hash": "xxh3_128" if xxhash is not None else "builtin",
+                "size": len(self._cache),
+                "checks": self._checks,
+                "duplicates": self._duplicates,
+                "skipped_bytes": self._skipped_bytes,
+                "skipped_alerts": self._skipped_alerts,
+                "released": self._released,
+            }
+
+
+_ingest_queue = None
+_ingest_lock = threading.Lock()
+_raw_dedup = None
+_raw_dedup_lock = threading.Lock()
+
+
+def init_alert_ingest(handler) -> AlertIngestQueue:
+    """按配置创建进程级告警队列（ALERT_INGEST_MODE=sync 时返回 None）"""
+    global _ingest_queue
+    if Config.ALERT_INGEST_MODE != "async":
+        return None
+    with _ingest_lock:
+        if _ingest_queue is None:
+            _ingest_queue = AlertIngestQueue(
+                handler,
+                maxsize=Config.ALERT_INGEST_QUEUE_SIZE,
+                workers=Config.ALERT_INGEST_WORKERS,
+            )
+    return _ingest_queue
+
+
+def get_alert_ingest() -> AlertIngestQueue:
+    """获取进程级告警队列（未启用 async 模式时为 None）"""
+    return _ingest_queue
+
+
+def get_raw_body_dedup():
+    """获取进程级请求体摘要去重（ALERT_RAW_DEDUP_TTL=0 时返回 None）"""
+    global _raw_dedup
+    if Config.ALERT_RAW_DEDUP_TTL <= 0:
+        return None
+    if _raw_dedup is None:
+        with _raw_dedup_lock:
+            if _raw_dedup is None:
+                _raw_dedup = RawBodyDedup(Config.ALERT_RAW_DEDUP_TTL)
+    return _raw_dedup
+
+
+def ingest_raw_alert(body: bytes, handler) -> tuple:
+    """
+    原始请求体入口：先按请求体摘要去重，未命中再解析 JSON 并交给 ingest_alert
+
+    Args:
+        body: 原始请求体
+        handler: 同步处理函数 handler(payload) -> (response_dict, status_code)
+
+    Returns:
+        tuple: (response_dict, status_code)
+    """
+    raw_dedup = get_raw_body_dedup() if body else None
+    key = None
+    if raw_dedup is not None:
+        key = raw_dedup.claim(body)
+        if key is None:
+            logger.info("请求体与近期请求完全相同，跳过处理 (%d 字节)", len(body))
+            return {"code": 0, "msg": "duplicate, skipped"}, 200
+
+    try:
+        data = jsoncodec.loads(body) if body else None
+    except ValueError as e:
+        if key is not None:
+            raw_dedup.release(key)
+        logger.error("告警请求体不是合法 JSON: %s", e)
+        return {"code": 400, "msg": "请求体不是合法 JSON"}, 400
+
+    try:
+        result, status_code = ingest_alert(data, handler)
+    except Exception:
+        if key is not None:
+            raw_dedup.release(key)
+        raise
+    if key is not None:
+        if status_code >= 400:
+            raw_dedup.release(key)
+        elif isinstance(data, dict) and isinstance(data.get("alerts"), list):
+            raw_dedup.record(key, len(data["alerts"]))
+    return result, status_code
+
+
+def ingest_alert(data, handler) -> tuple:
+    """
+    告警接收入口：async 模式入队返回 202，sync 模式或队列满且策略为 sync 时同步处理
+
+    Args:
+        data: webhook payload
+        handler: 同步处理函数 handler(payload) -> (response_dict, status_code)
+
+    Returns:
+        tuple: (response_dict, status_code)
+    """
+    ingest = get_alert_ingest()
+    if ingest is None:
+        return handler(data)
+
+    error = validate_alert_payload(data)
+    if error:
+        logger.error("告警校验失败: %s", error)
+        return {"code": 400, "msg": error}, 400
+
+    if ingest.submit(data):
+        return {"code": 0, "msg": "accepted", "queue_depth": ingest.depth()}, 202
+
+    if Config.ALERT_INGEST_FULL_POLICY == "sync":
+        ingest.record_overflow(handled_inline=True)
+        logger.warning("告警队列已满，退化为同步处理")
+        return handler(data)
+    ingest.record_overflow(handled_inline=False)
+    return {"code": 503, "msg": "告警队列已满，请稍后重试"}, 503
@@ -3,22 +3,70 @@
 飞书卡片交互回调处理模块
 """
 
-import json
 import logging
 import threading
-import time
 from datetime import datetime
-import mysql.connector
 
+from common_utils.ttl_cache import TTLCache
+from common_utils.snapshot import register_cache
+from common_utils import jsoncodec
+from common_utils.executor import get_task_executor
+from common_utils.retry_scheduler import get_retry_scheduler
+from config.config import Config
 from alerts_format.ma import macreate, madelete
+from alerts_format.storage import get_storage, StorageError
 from alerts_format.grafana_silence import grafana_create_silence, grafana_delete_silence
 from alerts_format.flashcat_utils import ack_incident
+from alerts_format.savedb import save_card_content
+from feishu_utils import card_state
+from feishu_utils.alert_handler import release_open_card
 
 logger = logging.getLogger(__name__)
 
+_CALLBACK_CACHE_EXPIRE_SECONDS = 5  # 5秒内相同回调视为重复点击
+
 # 用于去重的缓存（存储最近处理过的回调）
-_callback_cache = {}
-_callback_cache_lock = threading.Lock()
+_callback_cache = TTLCache(_CALLBACK_CACHE_EXPIRE_SECONDS, maxsize=Config.DEDUP_CACHE_MAX_ENTRIES,
+                           name='callback_dedup')
+register_cache('callback_dedup', _callback_cache)
+
+# 截止时间内未完成时的响应（结果稍后由后台任务 PATCH 到卡片）
+_PROCESSING_RESPONSE = {"toast": {"type": "info", "content": "处理中，结果稍后更新到卡片"}}
+
+
+class _CallbackReply:
+    """
+    回调线程与后台任务之间交接响应
+
+    后台任务在 CARD_CALLBACK_DEADLINE 内提交的响应（toast + 新卡片）直接作为回调响应返回；
+    超时后回调先行应答，后台任务的 deliver 返回 False，由其自行调用 API 更新卡片。
+    """
+
+    def __init__(self, detached: bool = False):
+        """
+        Args:
+            detached: 无回调线程等待（非回调触发），deliver 始终返回 False
+        """
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._response = None
+        self._closed = detached
+
+    def deliver(self, response: dict) -> bool:
+        """提交响应，返回 False 表示回调已应答（超时或已有响应）"""
+        with self._lock:
+            if self._closed or self._response is not None:
+                return False
+            self._response = response
+        self._done.set()
+        return True
+
+    def wait(self, timeout: float):
+        """等待响应，超时返回 None（之后的 deliver 均返回 False）"""
+        self._done.wait(timeout)
+        with self._lock:
+            self._closed = True
+            return self._response
 
 
 def _get_current_time():
@@ -31,36 +79,26 @@ def _get_silence_config_by_maid(maid: str) -> dict:
     通过 maid 查找对应的 silence_type 和 grafana_url
     先从 alert_data 查 project，再从 alert_config 查路由配置
     """
-    from config import config
-    connection = None
     try:
-        db_config = config.get_alert_db_config()
-        connection = mysql.connector.connect(**db_config)
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT project FROM alert_data WHERE id = %s", (maid,))
-        row = cursor.fetchone()
+        storage = get_storage()
+        row = storage.get_alert_data(maid, columns=('project',))
         if not row or not row.get('project'):
             return {}
-        project = row['project']
-        cursor.close()
-
-        # 查 alert_config
-        cfg_conn = mysql.connector.connect(**config.get_config_db_config())
-        cfg_cursor = cfg_conn.cursor(dictionary=True)
-        cfg_cursor.execute(
-            "SELECT silence_type, grafana_url FROM alert_config WHERE project = %s LIMIT 1",
-            (project,)
-        )
-        cfg_row = cfg_cursor.fetchone()
-        cfg_cursor.close()
-        cfg_conn.close()
-        return cfg_row or {}
-    except Exception as e:
+        cfg_row = storage.get_alert_config_by_project(row['project'])
+        if not cfg_row:
+            return {}
+        return {'silence_type': cfg_row.get('silence_type'), 'grafana_url': cfg_row.get('grafana_url')}
+    except StorageError as e:
         logger.error("查询 silence_config 失败: %s", e)
         return {}
-    finally:
-        if connection and connection.is_connected():
-            connection.close()
+
+
+def _duration_text(duration) -> str:
+    """静默时长（秒）→ 展示文本（智能显示时间单位）"""
+    duration_hours = duration // 3600
+    if duration_hours >= 24:
+        return f"{duration_hours // 24} 天"
+    return f"{duration_hours} 小时"
 
 
 def create_silence_success_card(maid, duration, operator_id=None):
@@ -74,14 +112,8 @@ def create_silence_success_card(maid, duration, operator_id=None):
     Returns:
         dict: 飞书卡片数据
     """
-    # 智能显示时间单位
-    duration_hours = duration // 3600
-    if duration_hours >= 24:
-        duration_days = duration_hours // 24
-        duration_text = f"{duration_days} 天"
-    else:
-        duration_text = f"{duration_hours} 小时"
-    
+    duration_text = _duration_text(duration)
+
     card_data = {
         "config": {
             "wide_screen_mode": True
@@ -246,16 +278,186 @@ def create_failure_card(maid, action_type="静默", error_message=None):
     return card_data
 
 
-def handle_silence_action(maid, duration, open_message_id, feishu_client, operator_id=None):
+def _button_action(button) -> str:
+    """按钮 value 中的 action（原始卡片 JSON 中 value 完整保留，可能为 dict 或 JSON 字符串）"""
+    value = button.get('value', {})
+    if isinstance(value, str):
+        try:
+            value = jsoncodec.loads(value)
+        except (jsoncodec.JSONDecodeError, TypeError):
+            return ''
+    return value.get('action', '') if isinstance(value, dict) else ''
+
+
+def _append_note(card: dict, text: str, operator_id=None) -> None:
+    """在卡片末尾追加操作记录"""
+    operator_line = f"👤 操作人: <at id=\"{operator_id}\"></at>" if operator_id else "👤 操作人: 未知"
+    elements = card.setdefault('elements', [])
+    elements.append({"tag": "hr"})
+    elements.append({
+        "tag": "note",
+        "elements": [
+            {"tag": "plain_text", "content": f"{text} | {_get_current_time()}"},
+            {"tag": "lark_md", "content": operator_line},
+        ],
+    })
+
+
+def _remove_buttons(card: dict, action_type: str) -> None:
+    """移除指定 action 的按钮（按钮组为空时整行移除）"""
+    elements = []
+    for elem in card.get('elements', []):
+        if isinstance(elem, dict) and elem.get('tag') == 'action':
+            actions = [a for a in elem.get('actions', [])
+                       if not (isinstance(a, dict) and _button_action(a) == action_type)]
+            if not actions:
+                continue
+            elem['actions'] = actions
+        elements.append(elem)
+    card['elements'] = elements
+
+
+def _render_acked(card: dict, operator_id=None) -> dict:
+    """已认领：认领按钮改为禁用（文案不变），追加认领人信息"""
+    for elem in card.get('elements', []):
+        if not isinstance(elem, dict) or elem.get('tag') != 'action':
+            continue
+        for action in elem.get('actions', []):
+            if isinstance(action, dict) and _button_action(action) == 'ack_incident':
+                # 禁用按钮、清空 value 使其不可点击
+                action['type'] = "default"
+                action['disabled'] = True
+                action['value'] = {}
+                action.pop('url', None)
+                action.pop('multi_url', None)
+                action.pop('behaviors', None)
+    operator_line = f"👤 认领人: <at id=\"{operator_id}\"></at>" if operator_id else "👤 认领人: 未知"
+    elements = card.setdefault('elements', [])
+    elements.append({"tag": "hr"})
+    elements.append({
+        "tag": "note",
+        "elements": [
+            {"tag": "plain_text", "content": f"✅ 已认领 | {_get_current_time()}"},
+            {"tag": "lark_md", "content": operator_line},
+        ],
+    })
+    return card
+
+
+def _render_silenced(card: dict, maid, duration, operator_id=None) -> dict:
+    """已静默：追加静默记录与"取消静默"按钮（重复静默时只保留最新的取消按钮）"""
+    _remove_buttons(card, 'cancel_silence')
+    _append_note(card, f"🔕 已静默 {_duration_text(duration)}", operator_id)
+    card['elements'].append({
+        "tag": "action",
+        "actions": [{
+            "tag": "button",
+            "text": {"tag": "plain_text", "content": "🔔 取消静默"},
+            "type": "danger",
+            "value": {"action": "cancel_silence", "maid": maid},
+        }],
+    })
+    return card
+
+
+def _render_silence_cancelled(card: dict, operator_id=None) -> dict:
+    """已取消静默：移除"取消静默"按钮并追加记录"""
+    _remove_buttons(card, 'cancel_silence')
+    _append_note(card, "🔔 已取消静默", operator_id)
+    return card
+
+
+def _patch_card(feishu_client, open_message_id: str, content: str) -> None:
+    """回调已应答后 PATCH 更新卡片（失败由延迟重试调度器退避重试）"""
+    def patch():
+        feishu_client.patch_message(open_message_id, content)
+        logger.info("卡片已原地更新: message_id=%s", open_message_id)
+        return True
+
+    get_retry_scheduler().run(
+        'card_patch', open_message_id, patch,
+        on_give_up=lambda e: logger.error("原地更新卡片失败（重试次数用尽）: message_id=%s: %s", open_message_id, e),
+    )
+
+
+def _update_clicked_card(reply, feishu_client, open_message_id, maid, render, toast: dict, fallback=None) -> bool:
+    """
+    渲染被点击卡片的新状态并交给回调响应
+
+    回调仍在等待时新卡片随响应返回（不再单独调用 PATCH），已超时则 PATCH 更新。
+
+    Args:
+        reply: _CallbackReply
+        feishu_client: 飞书客户端实例
+        open_message_id: 被点击的卡片消息ID
+        maid: 告警ID
+        render: 卡片当前 JSON → 新 JSON
+        toast: 响应中的 toast
+        fallback: 卡片状态未知时替换成的卡片（None 表示仅返回 toast）
+
+    Returns:
+        bool: 卡片是否已更新（状态未知且无 fallback 时为 False）
+    """
+    card = card_state.load(open_message_id, maid)
+    known = card is not None
+    card = render(card) if known else fallback
+    response = {"toast": toast}
+    if card is None:
+        reply.deliver(response)
+        return False
+
+    # 确保 config 中有 update_multi: True（飞书更新共享卡片要求）
+    config = card.get('config', {})
+    if not isinstance(config, dict):
+        config = {}
+    config['update_multi'] = True
+    card['config'] = config
+
+    content = jsoncodec.dumps(card)
+    card_state.remember(open_message_id, content)
+    response["card"] = {"type": "raw", "data": card}
+    if not reply.deliver(response):
+        _patch_card(feishu_client, open_message_id, content)
+    if known:
+        # 回写数据库，进程重启 / 缓存淘汰后仍可基于最新状态渲染
+        save_card_content(maid, content)
+    return True
+
+
+def _reply_failure(feishu_client, open_message_id, maid, action_type, error_message) -> None:
+    """在话题中回复操作失败卡片（含排查建议）"""
+    try:
+        feishu_client.reply_message(
+            open_message_id,
+            "interactive",
+            jsoncodec.dumps(create_failure_card(maid, action_type, error_message)),
+            reply_in_thread=True,
+        )
+    except Exception as e:
+        logger.error("回复%s失败卡片失败: %s", action_type, e)
+
+
+def handle_silence_action(maid, duration, open_message_id, feishu_client, operator_id=None, reply=None):
     """
-    处理静默操作（异步执行）
+    处理静默操作（提交到后台任务执行器异步执行）
+
+    静默成功后被点击的告警卡片追加静默记录与"取消静默"按钮，随回调响应返回；
+    卡片状态未知（如 ops 模板卡片）时沿用话题回复静默成功卡片。
+    实例均已被现有静默覆盖时只返回提示 toast，卡片不变。
 
     Args:
         maid: 告警ID
         duration: 静默时长（秒）
-        open_message_id: 消息ID（用于话题回复）
+        open_message_id: 消息ID（被点击的卡片）
         feishu_client: 飞书客户端实例
+        operator_id: 操作人 open_id
+        reply: _CallbackReply（None 表示无回调等待，结果直接通过 API 更新）
+
+    Returns:
+        bool: 是否已提交（执行器繁忙时为 False）
     """
+    reply = reply or _CallbackReply(detached=True)
+
     def process_silence():
         try:
             duration_hours = duration // 3600
@@ -270,52 +472,61 @@ def handle_silence_action(maid, duration, open_message_id, feishu_client, operat
             else:
                 silence_result = macreate(maid, duration_hours)
 
-            if silence_result.get('success'):
-                silence_card = create_silence_success_card(maid, duration, operator_id)
-                feishu_client.reply_message(
-                    open_message_id,
-                    "interactive",
-                    json.dumps(silence_card),
-                    reply_in_thread=True,
-                )
+            if silence_result.get('already_silenced'):
+                # 未创建新静默：卡片不追加静默记录与"取消静默"按钮（没有可取消的静默）
+                reply.deliver({"toast": {"type": "info", "content": silence_result['message']}})
+                logger.info("告警 %s 已被现有静默覆盖（%s）: %s", maid, silence_type,
+                            silence_result.get('covering_ids'))
+            elif silence_result.get('success'):
+                toast = {"type": "success", "content": f"已静默 {_duration_text(duration)}"}
+                if silence_result.get('failed_count'):
+                    logger.warning("静默部分失败（%s）: %s %s", silence_type, silence_result['message'],
+                                   silence_result.get('errors'))
+                    toast = {"type": "warning", "content": silence_result['message']}
+                # 卡片状态由回调接管，不再并入新实例重建
+                release_open_card(open_message_id)
+                render = lambda card: _render_silenced(card, maid, duration, operator_id)
+                if not _update_clicked_card(reply, feishu_client, open_message_id, maid, render, toast):
+                    silence_card = create_silence_success_card(maid, duration, operator_id)
+                    feishu_client.reply_message(
+                        open_message_id,
+                        "interactive",
+                        jsoncodec.dumps(silence_card),
+                        reply_in_thread=True,
+                    )
                 logger.info("静默操作完成（%s）", silence_type)
             else:
                 error_msg = silence_result.get('message', '未知错误')
-                failure_card = create_failure_card(maid, "静默", error_msg)
-                feishu_client.reply_message(
-                    open_message_id,
-                    "interactive",
-                    json.dumps(failure_card),
-                    reply_in_thread=True,
-                )
+                reply.deliver({"toast": {"type": "error", "content": f"静默失败: {error_msg}"}})
+                _reply_failure(feishu_client, open_message_id, maid, "静默", error_msg)
                 logger.error("静默创建失败")
         except Exception as e:
-            failure_card = create_failure_card(maid, "静默", str(e))
-            try:
-                feishu_client.reply_message(
-                    open_message_id,
-                    "interactive",
-                    json.dumps(failure_card),
-                    reply_in_thread=True,
-                )
-            except Exception:
-                pass
+            reply.deliver({"toast": {"type": "error", "content": f"静默失败: {e}"}})
+            _reply_failure(feishu_client, open_message_id, maid, "静默", str(e))
             logger.error("处理静默时出错: %s", e)
 
-    thread = threading.Thread(target=process_silence)
-    thread.daemon = True
-    thread.start()
+    return get_task_executor().submit('silence', process_silence)
 
 
-def handle_cancel_silence_action(maid, open_message_id, feishu_client, operator_id=None):
+def handle_cancel_silence_action(maid, open_message_id, feishu_client, operator_id=None, reply=None):
     """
-    处理取消静默操作（异步执行）
+    处理取消静默操作（提交到后台任务执行器异步执行）
+
+    取消成功后被点击的卡片移除"取消静默"按钮并追加记录；卡片状态未知时
+    （如旧版话题回复的静默成功卡片）原地替换为"已取消静默"卡片。
 
     Args:
         maid: 告警ID
-        open_message_id: 消息ID（用于话题回复）
+        open_message_id: 消息ID（被点击的卡片）
         feishu_client: 飞书客户端实例
+        operator_id: 操作人 open_id
+        reply: _CallbackReply（None 表示无回调等待，结果直接通过 API 更新）
+
+    Returns:
+        bool: 是否已提交（执行器繁忙时为 False）
     """
+    reply = reply or _CallbackReply(detached=True)
+
     def process_cancel_silence():
         try:
             # 查询 silence_type
@@ -329,40 +540,26 @@ def handle_cancel_silence_action(maid, open_message_id, feishu_client, operator_
                 delete_result = madelete(maid)
 
             if delete_result.get('success'):
-                cancel_card = create_cancel_silence_card(maid, operator_id)
-                feishu_client.reply_message(
-                    open_message_id,
-                    "interactive",
-                    json.dumps(cancel_card),
-                    reply_in_thread=True,
-                )
+                toast = {"type": "success", "content": "已取消静默"}
+                if delete_result.get('failed_count'):
+                    logger.warning("取消静默部分失败（%s）: %s %s", silence_type, delete_result['message'],
+                                   delete_result.get('errors'))
+                    toast = {"type": "warning", "content": delete_result['message']}
+                _update_clicked_card(reply, feishu_client, open_message_id, maid,
+                                     lambda card: _render_silence_cancelled(card, operator_id), toast,
+                                     fallback=create_cancel_silence_card(maid, operator_id))
                 logger.info("取消静默操作完成（%s）", silence_type)
             else:
                 error_msg = delete_result.get('message', '未知错误')
-                failure_card = create_failure_card(maid, "取消静默", error_msg)
-                feishu_client.reply_message(
-                    open_message_id,
-                    "interactive",
-                    json.dumps(failure_card),
-                    reply_in_thread=True,
-                )
+                reply.deliver({"toast": {"type": "error", "content": f"取消静默失败: {error_msg}"}})
+                _reply_failure(feishu_client, open_message_id, maid, "取消静默", error_msg)
                 logger.error("取消静默失败")
         except Exception as e:
-            failure_card = create_failure_card(maid, "取消静默", str(e))
-            try:
-                feishu_client.reply_message(
-                    open_message_id,
-                    "interactive",
-                    json.dumps(failure_card),
-                    reply_in_thread=True,
-                )
-            except Exception:
-                pass
+            reply.deliver({"toast": {"type": "error", "content": f"取消静默失败: {e}"}})
+            _reply_failure(feishu_client, open_message_id, maid, "取消静默", str(e))
             logger.error("处理取消静默时出错: %s", e)
 
-    thread = threading.Thread(target=process_cancel_silence)
-    thread.daemon = True
-    thread.start()
+    return get_task_executor().submit('cancel_silence', process_cancel_silence)
 
 
 def create_ack_success_card(maid, incident_id, operator_id=None):
@@ -418,153 +615,56 @@ def create_ack_success_card(maid, incident_id, operator_id=None):
     return card_data
 
 
-def handle_ack_incident_action(maid, incident_id, open_message_id, feishu_client, operator_id=None):
+def handle_ack_incident_action(maid, incident_id, open_message_id, feishu_client, operator_id=None, reply=None):
     """
-    处理认领告警操作（异步执行）
+    处理认领告警操作（提交到后台任务执行器异步执行）
 
-    1. 调用 Flashcat incident/ack API 认领 incident
-    2. 认领成功后，原地更新原告警卡片：标题改为"已认领"、移除认领按钮、追加认领人信息
-    3. 同时在话题中回复一条认领确认消息
+    1. 调用 Flashcat incident/ack API 认领 incident（失败时由延迟重试调度器按指数退避重试）
+    2. 认领成功后基于卡片状态缓存渲染原告警卡片：认领按钮禁用、追加认领人信息，
+       随回调响应返回（已超时则 PATCH）
+    3. 重试次数用尽后在话题中回复失败卡片
 
     Args:
         maid: 告警ID
         incident_id: Flashcat incident ID
-        open_message_id: 消息ID（触发回调的卡片消息ID，用于原地更新和话题回复）
+        open_message_id: 消息ID（被点击的告警卡片）
         feishu_client: 飞书客户端实例
         operator_id: 操作人 open_id
+        reply: _CallbackReply（None 表示无回调等待，结果直接通过 API 更新）
+
+    Returns:
+        bool: 是否已提交（执行器繁忙时为 False）
     """
+    reply = reply or _CallbackReply(detached=True)
+    app_key = Config.FLASHCAT_APP_KEY
+    if not app_key:
+        logger.error("FLASHCAT_APP_KEY 未配置，无法认领 incident")
+        reply.deliver({"toast": {"type": "error", "content": "认领失败: FLASHCAT_APP_KEY 未配置"}})
+        return True
+
+    def attempt():
+        if not ack_incident(app_key, incident_id):
+            return False
+        _update_clicked_card(reply, feishu_client, open_message_id, maid,
+                             lambda card: _render_acked(card, operator_id),
+                             {"type": "success", "content": "已认领，电话通知将停止"})
+        logger.info("认领告警完成: maid=%s incident_id=%s", maid, incident_id)
+        return True
+
+    def give_up(error):
+        logger.error("认领告警失败: maid=%s incident_id=%s", maid, incident_id)
+        reply.deliver({"toast": {"type": "error", "content": "认领失败，请稍后重试"}})
+        _reply_failure(feishu_client, open_message_id, maid, "认领", str(error) if error else "Flashcat 认领接口调用失败")
+
     def process_ack():
         try:
-            from config.config import Config
-            app_key = Config.FLASHCAT_APP_KEY
-            if not app_key:
-                logger.error("FLASHCAT_APP_KEY 未配置，无法认领 incident")
-                failure_card = create_failure_card(maid, "认领", "FLASHCAT_APP_KEY 未配置")
-                feishu_client.reply_message(
-                    open_message_id,
-                    "interactive",
-                    json.dumps(failure_card),
-                    reply_in_thread=True,
-                )
-                return
-
-            success = ack_incident(app_key, incident_id)
-            if success:
-                # ── 原地更新原告警卡片（认领按钮改为禁用+已认领）──
-                _update_card_after_ack(feishu_client, open_message_id, operator_id, maid)
-                logger.info("认领告警完成: maid=%s incident_id=%s", maid, incident_id)
-            else:
-                logger.error("认领告警失败: maid=%s incident_id=%s", maid, incident_id)
+            # 失败后由延迟重试调度器退避重试，不占用当前线程
+            if not get_retry_scheduler().run('ack_incident', incident_id, attempt, on_give_up=give_up):
+                reply.deliver({"toast": {"type": "warning", "content": "认领请求失败，正在后台重试"}})
         except Exception as e:
             logger.error("处理认领告警时出错: %s", e)
 
-    thread = threading.Thread(target=process_ack)
-    thread.daemon = True
-    thread.start()
-
-
-def _update_card_after_ack(feishu_client, open_message_id, operator_id=None, maid=None):
-    """原地更新告警卡片：认领按钮改为禁用、追加认领人信息
-
-    从数据库读取发送时保存的原始卡片 JSON，修改后 PATCH。
-    不使用飞书 GET API（会剥离按钮 value 导致静默按钮失效）。
-
-    Args:
-        feishu_client: 飞书客户端实例
-        open_message_id: 原告警卡片的消息ID
-        operator_id: 认领人 open_id
-        maid: 告警ID，用于从数据库读取原始卡片 JSON
-    """
-    if not maid:
-        logger.warning("maid 为空，跳过原地更新")
-        return
-
-    # 从数据库读取发送时保存的原始卡片 JSON
-    from alerts_format.savedb import get_card_content
-    content_str = get_card_content(maid)
-    if not content_str:
-        logger.warning("数据库中无原始卡片 JSON，跳过原地更新: maid=%s", maid)
-        return
-
-    try:
-        card = json.loads(content_str)
-    except (json.JSONDecodeError, TypeError):
-        logger.warning("原始卡片 JSON 解析失败，跳过原地更新: maid=%s", maid)
-        return
-
-    if not isinstance(card, dict):
-        logger.warning("原始卡片内容不是 dict，跳过原地更新: maid=%s", maid)
-        return
-
-    logger.debug("原始卡片 elements 数量: %d", len(card.get('elements', [])))
-
-    # ── 遍历 elements，将认领按钮改为禁用 ──
-    operator_line = f"👤 认领人: <at id=\"{operator_id}\"></at>" if operator_id else "👤 认领人: 未知"
-    elements = card.get('elements', [])
-    for elem in elements:
-        if not isinstance(elem, dict) or elem.get('tag') != 'action':
-            continue
-        actions = elem.get('actions', [])
-        for action in actions:
-            if not isinstance(action, dict):
-                continue
-
-            # 通过 value 识别认领按钮（原始卡片 JSON 中 value 完整保留）
-            value = action.get('value', {})
-            is_ack_button = False
-            if isinstance(value, dict) and value.get('action') == 'ack_incident':
-                is_ack_button = True
-            elif isinstance(value, str):
-                try:
-                    parsed_val = json.loads(value)
-                    if parsed_val.get('action') == 'ack_incident':
-                        is_ack_button = True
-                except (json.JSONDecodeError, TypeError):
-                    pass
-
-            if is_ack_button:
-                # 禁用按钮、清空 value 使其不可点击，文案保持不变
-                action['type'] = "default"
-                action['disabled'] = True
-                action['value'] = {}
-                action.pop('url', None)
-                action.pop('multi_url', None)
-                action.pop('behaviors', None)
-                logger.info("认领按钮已改为禁用状态: %s", json.dumps(action, ensure_ascii=False))
-
-    # ── 在卡片末尾追加认领人信息 ──
-    ack_note = {
-        "tag": "note",
-        "elements": [
-            {"tag": "plain_text", "content": f"✅ 已认领 | {_get_current_time()}"},
-            {"tag": "lark_md", "content": operator_line},
-        ],
-    }
-    elements.append({"tag": "hr"})
-    elements.append(ack_note)
-
-    # 确保 config 中有 update_multi: True（飞书 PATCH 要求）
-    config = card.get('config', {})
-    if not isinstance(config, dict):
-        config = {}
-    config['update_multi'] = True
-    card['config'] = config
-
-    # ── 调用 PATCH 接口原地更新（带 retry）──
-    card_json = json.dumps(card, ensure_ascii=False)
-    max_retries = 3
-    for attempt in range(1, max_retries + 1):
-        try:
-            feishu_client.patch_message(open_message_id, card_json)
-            logger.info("原卡片已原地更新为已认领状态: message_id=%s (attempt %d/%d)", open_message_id, attempt, max_retries)
-            return
-        except Exception as e:
-            if attempt < max_retries:
-                wait = attempt * 2
-                logger.warning("原地更新卡片失败 (attempt %d/%d): %s, %d秒后重试", attempt, max_retries, e, wait)
-                time.sleep(wait)
-            else:
-                logger.error("原地更新卡片失败（已重试 %d 次）: %s（不影响认领流程）", max_retries, e)
+    return get_task_executor().submit('ack_incident', process_ack)
 
 
 def parse_callback_data(data):
@@ -603,12 +703,12 @@ def parse_callback_data(data):
         if isinstance(action_value_raw, dict):
             action_value = action_value_raw
         elif isinstance(action_value_raw, str):
-            action_value = json.loads(action_value_raw)
+            action_value = jsoncodec.loads(action_value_raw)
             if isinstance(action_value, str):
-                action_value = json.loads(action_value)
+                action_value = jsoncodec.loads(action_value)
         else:
             action_value = {}
-    except json.JSONDecodeError:
+    except jsoncodec.JSONDecodeError:
         logger.error("解析回调数据失败")
         return None, None, None, None
     
@@ -622,6 +722,16 @@ def parse_callback_data(data):
     return action_type, action_value, open_message_id, open_id
 
 
+def _callback_key(action_type, action_value, open_message_id) -> str:
+    return f"{open_message_id}_{action_type}_{action_value.get('maid')}"
+
+
+def _busy_response(action_type, action_value, open_message_id) -> dict:
+    """后台任务执行器繁忙：撤销去重记录以便用户立即重试，并提示稍后再试"""
+    _callback_cache.pop(_callback_key(action_type, action_value, open_message_id))
+    return {"toast": {"type": "warning", "content": "系统繁忙，请稍后重试"}}
+
+
 def is_duplicate_callback(action_type, action_value, open_message_id):
     """
     检查是否为重复的回调请求（5秒内）
@@ -634,84 +744,82 @@ def is_duplicate_callback(action_type, action_value, open_message_id):
     Returns:
         bool: True 表示重复，False 表示不重复
     """
-    callback_key = f"{open_message_id}_{action_type}_{action_value.get('maid')}"
-    current_time = time.time()
-    
-    with _callback_cache_lock:
-        # 清理5秒前的缓存
-        expired_keys = [k for k, v in _callback_cache.items() if current_time - v > 5]
-        for k in expired_keys:
-            del _callback_cache[k]
-        
-        # 检查是否重复
-        if callback_key in _callback_cache:
-            logger.info("重复回调已忽略")
-            return True
-        
-        # 记录此次回调
-        _callback_cache[callback_key] = current_time
-        return False
+    # 检查并记录此次回调（过期条目由缓存自动清理）
+    if _callback_cache.check_and_set(_callback_key(action_type, action_value, open_message_id)):
+        logger.info("重复回调已忽略")
+        return True
+    return False
+
+
+def _legacy_response(response: dict) -> dict:
+    """旧版回调格式的响应体为卡片 JSON 本身（不支持 toast）"""
+    card = response.get("card") or {}
+    return card.get("data") or {}
 
 
 def process_card_callback(data, feishu_client):
     """
     处理飞书卡片交互回调
-    
+
+    操作提交到后台任务执行器，在 CARD_CALLBACK_DEADLINE 内完成时，toast 与渲染后的新卡片
+    直接作为响应返回（HTTP 与长连接共用），超时则先返回"处理中"，结果由后台任务 PATCH 到卡片。
+
     Args:
         data: 飞书回调数据
         feishu_client: 飞书客户端实例
-    
+
     Returns:
-        dict: 响应数据
+        dict: 响应数据（{"toast": ..., "card": {"type": "raw", "data": ...}}）
     """
     try:
         # 解析回调数据
         action_type, action_value, open_message_id, open_id = parse_callback_data(data)
-        
+
         # 处理 URL 验证
         if action_type == "challenge":
             return {"challenge": action_value}
-        
+
         # 解析失败
         if action_type is None:
             return {}
-        
+
         # 去重检查
         if is_duplicate_callback(action_type, action_value, open_message_id):
             return {}
-        
+
+        maid = action_value.get("maid")
+        reply = _CallbackReply()
+
         # 处理静默操作
         if action_type == "silence":
-            maid = action_value.get("maid")
             duration = action_value.get("duration", 7200)
-            
             logger.info("执行静默操作")
-            handle_silence_action(maid, duration, open_message_id, feishu_client, open_id)
-            return {}
-        
+            submitted = handle_silence_action(maid, duration, open_message_id, feishu_client, open_id, reply)
+
         # 处理取消静默操作
         elif action_type == "cancel_silence":
-            maid = action_value.get("maid")
-            
             logger.info("执行取消静默操作")
-            handle_cancel_silence_action(maid, open_message_id, feishu_client, open_id)
-            return {}
-        
+            submitted = handle_cancel_silence_action(maid, open_message_id, feishu_client, open_id, reply)
+
         # 处理认领告警操作
         elif action_type == "ack_incident":
-            maid = action_value.get("maid")
             incident_id = action_value.get("incident_id")
-            
             logger.info("执行认领告警操作: maid=%s incident_id=%s", maid, incident_id)
-            handle_ack_incident_action(maid, incident_id, open_message_id, feishu_client, open_id)
-            return {}
-        
+            submitted = handle_ack_incident_action(maid, incident_id, open_message_id, feishu_client,
+                                                   open_id, reply)
+
         # 未知操作
-        logger.warning("未知的操作类型: %s", action_type)
-        return {}
-        
+        else:
+            logger.warning("未知的操作类型: %s", action_type)
+            return {}
+
+        if not submitted:
+            response = _busy_response(action_type, action_value, open_message_id)
+        else:
+            response = reply.wait(Config.CARD_CALLBACK_DEADLINE) or _PROCESSING_RESPONSE
+        return response if "event" in data else _legacy_response(response)
+
     except Exception as e:
         logger.error("处理卡片回调失败: %s", e, exc_info=True)
         # 即使失败也要返回空对象，避免用户看到错误提示
         return {}
-
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+告警卡片状态缓存
+
+卡片按钮回调需要基于卡片当前内容渲染新状态（认领按钮禁用、追加静默 / 认领记录等），
+原先每次点击都从 alert_data.card_content 读库，再单独调用 PATCH 接口更新卡片。
+本模块在进程内按 message_id 保存卡片当前 JSON：
+
+- 告警卡片发送、未恢复卡片原地更新、回调渲染新状态后立即登记
+- 未命中时回退读取 alert_data（校验 message_id 与 maid 对应，避免把告警卡片内容套到话题回复卡片上）
+- 超过 CARD_STATE_TTL 或超出 CARD_STATE_MAX_ENTRIES（LRU 淘汰）后再次点击走回退读库
+"""
+
+import logging
+
+from config.config import Config
+from common_utils import jsoncodec
+from common_utils.ttl_cache import TTLCache
+from alerts_format.storage import get_storage, StorageError
+
+logger = logging.getLogger(__name__)
+
+# message_id → 卡片 JSON 字符串（字符串不可变，读取方各自解析后修改）
+_cards = TTLCache(Config.CARD_STATE_TTL, maxsize=Config.CARD_STATE_MAX_ENTRIES, name='card_state')
+
+
+def remember(message_id: str, content: str) -> None:
+    """登记卡片当前内容"""
+    if message_id and content:
+        _cards.set(message_id, content)
+
+
+def load(message_id: str, maid: str = None):
+    """
+    读取卡片当前内容
+
+    Args:
+        message_id: 卡片消息 ID
+        maid: 告警 ID（内存未命中时据此读库）
+
+    Returns:
+        dict: 可修改的卡片 JSON；未知时返回 None
+    """
+    content = _cards.get(message_id)
+    if content is None and maid:
+        try:
+            row = get_storage().get_alert_data(maid, columns=('message_id', 'card_content'))
+        except StorageError as e:
+            logger.error("读取卡片内容失败 maid=%s: %s", maid, e)
+            return None
+        if row and row.get('card_content') and row.get('message_id') == message_id:
+            content = row['card_content']
+            _cards.set(message_id, content)
+    if content is None:
+        return None
+    try:
+        card = jsoncodec.loads(content)
+    except (jsoncodec.JSONDecodeError, TypeError):
+        logger.warning("卡片 JSON 解析失败: message_id=%s", message_id)
+        return None
+    return card if isinstance(card, dict) else None
@@ -4,24 +4,27 @@
 统一处理各类飞书事件，包括机器人进群、用户进群等
 """
 
-import json
 import logging
 import re
-import threading
-import time
 from datetime import datetime
 
 from config.config import Config
+from common_utils.ttl_cache import TTLCache
+from common_utils.snapshot import register_cache
+from common_utils import jsoncodec
+from common_utils.executor import get_task_executor
 from jira_utils.jira_all_class import JiraClient
 from .bot_msg_format import bot_add_msg_to_group, user_add_msg_to_group
 
 logger = logging.getLogger(__name__)
 
-# 用于去重的缓存（存储最近处理过的事件ID）
-_event_cache = {}
-_event_cache_lock = threading.Lock()
 _EVENT_CACHE_EXPIRE_SECONDS = 3600  # 缓存1小时，防止重复处理
 
+# 用于去重的缓存（存储最近处理过的事件ID）
+_event_cache = TTLCache(_EVENT_CACHE_EXPIRE_SECONDS, maxsize=Config.DEDUP_CACHE_MAX_ENTRIES,
+                        name='event_dedup')
+register_cache('event_dedup', _event_cache)
+
 
 def handle_bot_added_to_group(feishu_client, event_data):
     """
@@ -44,7 +47,7 @@ def handle_bot_added_to_group(feishu_client, event_data):
         welcome_text = bot_add_msg_to_group(event_data)
         
         # 发送消息到群聊
-        content = json.dumps({"text": welcome_text})
+        content = jsoncodec.dumps({"text": welcome_text})
         feishu_client.send("chat_id", chat_id, "text", content)
         
         logger.info("✅ 已向群聊 %s 发送机器人打招呼消息", chat_id)
@@ -76,7 +79,7 @@ def handle_user_added_to_group(feishu_client, event_data):
         welcome_text = user_add_msg_to_group(event_data)
         
         # 发送消息到群聊
-        content = json.dumps({"text": welcome_text})
+        content = jsoncodec.dumps({"text": welcome_text})
         feishu_client.send("chat_id", chat_id, "text", content)
         
         logger.info("✅ 已向群聊 %s 发送用户打招呼消息", chat_id)
@@ -114,8 +117,8 @@ def handle_message_received(feishu_client, event_data):
         
         # 解析消息内容
         try:
-            content = json.loads(content_str)
-        except json.JSONDecodeError as e:
+            content = jsoncodec.loads(content_str)
+        except jsoncodec.JSONDecodeError as e:
             logger.error("解析消息内容失败: %s", e)
             return False
         
@@ -200,7 +203,7 @@ def handle_message_received(feishu_client, event_data):
             }
             
             # 使用引用回复（卡片消息）
-            reply_content = json.dumps(card_data)
+            reply_content = jsoncodec.dumps(card_data)
             feishu_client.reply_message(message_id, "interactive", reply_content)
             logger.info("已回复myuid命令给用户 %s", sender_id)
 
@@ -221,7 +224,7 @@ def handle_message_received(feishu_client, event_data):
                         }
                     }]
                 }
-                reply_content = json.dumps(error_card)
+                reply_content = jsoncodec.dumps(error_card)
                 feishu_client.reply_message(message_id, "interactive", reply_content)
                 logger.info("用户 %s 在非群聊环境中使用groupid命令", sender_id)
                 return True
@@ -250,7 +253,7 @@ def handle_message_received(feishu_client, event_data):
             }
             
             # 使用引用回复（卡片消息）
-            reply_content = json.dumps(card_data)
+            reply_content = jsoncodec.dumps(card_data)
             feishu_client.reply_message(message_id, "interactive", reply_content)
             logger.info("已回复groupid命令给用户 %s", sender_id)
 
@@ -272,7 +275,7 @@ def handle_message_received(feishu_client, event_data):
                         }
                     }]
                 }
-                reply_content = json.dumps(error_card)
+                reply_content = jsoncodec.dumps(error_card)
                 feishu_client.reply_message(message_id, "interactive", reply_content)
                 return True
             
@@ -306,7 +309,7 @@ def handle_message_received(feishu_client, event_data):
                         }
                     }]
                 }
-                reply_content = json.dumps(error_card)
+                reply_content = jsoncodec.dumps(error_card)
                 feishu_client.reply_message(message_id, "interactive", reply_content)
                 return True
             
@@ -333,7 +336,7 @@ def handle_message_received(feishu_client, event_data):
                             }
                         }]
                     }
-                    reply_content = json.dumps(error_card)
+                    reply_content = jsoncodec.dumps(error_card)
                     feishu_client.reply_message(message_id, "interactive", reply_content)
                     return True
             
@@ -359,7 +362,7 @@ def handle_message_received(feishu_client, event_data):
                             }
                         }]
                     }
-                    reply_content = json.dumps(success_card)
+                    reply_content = jsoncodec.dumps(success_card)
                 else:
                     error_card = {
                         "config": {"wide_screen_mode": True},
@@ -375,7 +378,7 @@ def handle_message_received(feishu_client, event_data):
                             }
                         }]
                     }
-                    reply_content = json.dumps(error_card)
+                    reply_content = jsoncodec.dumps(error_card)
                 
                 feishu_client.reply_message(message_id, "interactive", reply_content)
                 logger.info("已处理 /jira 命令，邮箱: %s, 结果: %s", email, result['success'])
@@ -396,7 +399,7 @@ def handle_message_received(feishu_client, event_data):
                         }
                     }]
                 }
-                reply_content = json.dumps(error_card)
+                reply_content = jsoncodec.dumps(error_card)
                 feishu_client.reply_message(message_id, "interactive", reply_content)
             
         elif command == "help":
@@ -421,7 +424,7 @@ def handle_message_received(feishu_client, event_data):
                     }
                 ]
             }
-            reply_content = json.dumps(card_data)
+            reply_content = jsoncodec.dumps(card_data)
             feishu_client.reply_message(message_id, "interactive", reply_content)
             logger.info("已回复help命令给用户 %s", sender_id)
         else:
@@ -435,190 +438,209 @@ def handle_message_received(feishu_client, event_data):
         return False
 
 
-def alert_to_feishu(feishu_client, alert_data, mentioned_user_list, group_id, alertname="告警通知", severity="warning", maid=None, incident_id=None):
+def build_alert_card(alert_data, mentioned_user_list, alertname="告警通知", severity="warning", maid=None, incident_id=None) -> str:
     """
-    处理告警信息发送到飞书（卡片格式）
-    
+    构建 ops 模板告警卡片 JSON
+
     Args:
-        feishu_client: 飞书API客户端实例
         alert_data: 告警信息内容
         mentioned_user_list: 被@的用户ID列表（open_id）
-        group_id: 群组ID
         alertname: 告警名称，用作卡片标题
         severity: 告警级别 (critical/warning/info/success)，默认warning
         maid: 告警MAID，用于静默功能
         incident_id: Flashcat incident ID，用于电话告警认领按钮
-        
+
     Returns:
-        int: HTTP状态码
+        str: 卡片 JSON
     """
-    try:
-        # 告警级别对应的卡片颜色
-        color_map = {
-            "critical": "red",
-            "warning": "orange", 
-            "info": "blue",
-            "success": "green",
-            # P 级别
-            "p0": "red",
-            "p1": "orange",
-            "p2": "yellow",
-            "p3": "blue",
-            # 电话告警，与 P0 同级
-            "phone": "red",
-        }
-        template_color = color_map.get(severity.lower(), "orange")
-
-        # 标题中的级别标签
-        severity_label_map = {
-            "p0": "P0", "p1": "P1", "p2": "P2", "p3": "P3",
-            "critical": "critical", "warning": "warning", "info": "info",
-            "phone": "Phone",
-        }
-        severity_label = severity_label_map.get(severity.lower(), "") if severity else ""
-
-        # 构建标题（使用 alertname）
-        title_content = f"🔔 {alertname}" + (f"  [{severity_label}]" if severity_label else "")
-        
-        # 构建卡片元素列表
-        elements = []
-        
-        # 如果有艾特人员，在最前面添加艾特区域（显眼位置）
-        if mentioned_user_list:
-            mention_content = ""
-            for user_id in mentioned_user_list:
-                mention_content += f'<at id="{user_id}"></at> '
-            
-            elements.append({
-                "tag": "div",
-                "text": {
-                    "tag": "lark_md",
-                    "content": f"**📢 通知人员：** {mention_content}"
-                }
-            })
-            elements.append({
-                "tag": "hr"
-            })
+    # 告警级别对应的卡片颜色
+    color_map = {
+        "critical": "red",
+        "warning": "orange", 
+        "info": "blue",
+        "success": "green",
+        # P 级别
+        "p0": "red",
+        "p1": "orange",
+        "p2": "yellow",
+        "p3": "blue",
+        # 电话告警，与 P0 同级
+        "phone": "red",
+    }
+    template_color = color_map.get(severity.lower(), "orange")
+
+    # 标题中的级别标签
+    severity_label_map = {
+        "p0": "P0", "p1": "P1", "p2": "P2", "p3": "P3",
+        "critical": "critical", "warning": "warning", "info": "info",
+        "phone": "Phone",
+    }
+    severity_label = severity_label_map.get(severity.lower(), "") if severity else ""
+
+    # 构建标题（使用 alertname）
+    title_content = f"🔔 {alertname}" + (f"  [{severity_label}]" if severity_label else "")
+    
+    # 构建卡片元素列表
+    elements = []
+    
+    # 如果有艾特人员，在最前面添加艾特区域（显眼位置）
+    if mentioned_user_list:
+        mention_content = ""
+        for user_id in mentioned_user_list:
+            mention_content += f'<at id="{user_id}"></at> '
         
-        # 添加告警详细信息
         elements.append({
             "tag": "div",
             "text": {
                 "tag": "lark_md",
-                "content": alert_data
+                "content": f"**📢 通知人员：** {mention_content}"
             }
         })
-        
-        # 添加分隔线和时间戳
         elements.append({
             "tag": "hr"
         })
-        elements.append({
-            "tag": "note",
-            "elements": [
-                {
+    
+    # 添加告警详细信息
+    elements.append({
+        "tag": "div",
+        "text": {
+            "tag": "lark_md",
+            "content": alert_data
+        }
+    })
+    
+    # 添加分隔线和时间戳
+    elements.append({
+        "tag": "hr"
+    })
+    elements.append({
+        "tag": "note",
+        "elements": [
+            {
+                "tag": "plain_text",
+                "content": f"⏰ 发送时间: {_get_current_time()}"
+            }
+        ]
+    })
+    
+    # 如果有MAID，添加静默时间选择按钮
+    if maid:
+        silence_actions = [
+            {
+                "tag": "button",
+                "text": {
                     "tag": "plain_text",
-                    "content": f"⏰ 发送时间: {_get_current_time()}"
-                }
-            ]
-        })
-        
-        # 如果有MAID，添加静默时间选择按钮
-        if maid:
-            silence_actions = [
-                {
-                    "tag": "button",
-                    "text": {
-                        "tag": "plain_text",
-                        "content": "🔕 静默2小时"
-                    },
-                    "type": "primary",
-                    "value": json.dumps({
-                        "action": "silence",
-                        "maid": maid,
-                        "duration": 7200  # 2小时
-                    })
+                    "content": "🔕 静默2小时"
                 },
-                {
-                    "tag": "button",
-                    "text": {
-                        "tag": "plain_text",
-                        "content": "🔕 静默12小时"
-                    },
-                    "type": "primary",
-                    "value": json.dumps({
-                        "action": "silence",
-                        "maid": maid,
-                        "duration": 43200  # 12小时
-                    })
+                "type": "primary",
+                "value": jsoncodec.dumps({
+                    "action": "silence",
+                    "maid": maid,
+                    "duration": 7200  # 2小时
+                })
+            },
+            {
+                "tag": "button",
+                "text": {
+                    "tag": "plain_text",
+                    "content": "🔕 静默12小时"
                 },
-                {
-                    "tag": "button",
-                    "text": {
-                        "tag": "plain_text",
-                        "content": "🔕 静默24小时"
-                    },
-                    "type": "primary",
-                    "value": json.dumps({
-                        "action": "silence",
-                        "maid": maid,
-                        "duration": 86400  # 24小时
-                    })
+                "type": "primary",
+                "value": jsoncodec.dumps({
+                    "action": "silence",
+                    "maid": maid,
+                    "duration": 43200  # 12小时
+                })
+            },
+            {
+                "tag": "button",
+                "text": {
+                    "tag": "plain_text",
+                    "content": "🔕 静默24小时"
                 },
-                {
-                    "tag": "button",
-                    "text": {
-                        "tag": "plain_text",
-                        "content": "🔕 静默3天"
-                    },
-                    "type": "primary",
-                    "value": json.dumps({
-                        "action": "silence",
-                        "maid": maid,
-                        "duration": 259200  # 3天
-                    })
-                }
-            ]
-            
-            # 电话告警时添加认领按钮
-            if incident_id:
-                silence_actions.insert(0, {
-                    "tag": "button",
-                    "text": {
-                        "tag": "plain_text",
-                        "content": "📞 认领告警"
-                    },
-                    "type": "danger",
-                    "value": json.dumps({
-                        "action": "ack_incident",
-                        "maid": maid,
-                        "incident_id": incident_id
-                    })
+                "type": "primary",
+                "value": jsoncodec.dumps({
+                    "action": "silence",
+                    "maid": maid,
+                    "duration": 86400  # 24小时
                 })
-            
-            elements.append({
-                "tag": "action",
-                "actions": silence_actions
-            })
-        
-        # 构建飞书卡片消息
-        card_data = {
-            "config": {
-                "wide_screen_mode": True,
-                "update_multi": True
             },
-            "header": {
-                "title": {
+            {
+                "tag": "button",
+                "text": {
+                    "tag": "plain_text",
+                    "content": "🔕 静默3天"
+                },
+                "type": "primary",
+                "value": jsoncodec.dumps({
+                    "action": "silence",
+                    "maid": maid,
+                    "duration": 259200  # 3天
+                })
+            }
+        ]
+        
+        # 电话告警时添加认领按钮
+        if incident_id:
+            silence_actions.insert(0, {
+                "tag": "button",
+                "text": {
                     "tag": "plain_text",
-                    "content": title_content
+                    "content": "📞 认领告警"
                 },
-                "template": template_color
+                "type": "danger",
+                "value": jsoncodec.dumps({
+                    "action": "ack_incident",
+                    "maid": maid,
+                    "incident_id": incident_id
+                })
+            })
+        
+        elements.append({
+            "tag": "action",
+            "actions": silence_actions
+        })
+    
+    # 构建飞书卡片消息
+    card_data = {
+        "config": {
+            "wide_screen_mode": True,
+            "update_multi": True
+        },
+        "header": {
+            "title": {
+                "tag": "plain_text",
+                "content": title_content
             },
-            "elements": elements
-        }
+            "template": template_color
+        },
+        "elements": elements
+    }
+
+    return jsoncodec.dumps(card_data)
+
+
+def alert_to_feishu(feishu_client, alert_data, mentioned_user_list, group_id, alertname="告警通知", severity="warning", maid=None, incident_id=None):
+    """
+    处理告警信息发送到飞书（卡片格式）
+    
+    Args:
+        feishu_client: 飞书API客户端实例
+        alert_data: 告警信息内容
+        mentioned_user_list: 被@的用户ID列表（open_id）
+        group_id: 群组ID
+        alertname: 告警名称，用作卡片标题
+        severity: 告警级别 (critical/warning/info/success)，默认warning
+        maid: 告警MAID，用于静默功能
+        incident_id: Flashcat incident ID，用于电话告警认领按钮
         
+    Returns:
+        int: HTTP状态码
+    """
+    try:
+        content = build_alert_card(alert_data, mentioned_user_list, alertname, severity, maid, incident_id)
+
         # 发送卡片消息
-        content = json.dumps(card_data)
         message_id = feishu_client.send("chat_id", group_id, "interactive", content)
 
         logger.info("✅ 已向群聊 %s 发送告警卡片消息, message_id=%s", group_id, message_id)
@@ -650,22 +672,11 @@ def _is_duplicate_event(event_id):
     if not event_id:
         return False
     
-    current_time = time.time()
-    
-    with _event_cache_lock:
-        # 清理过期缓存（1小时前的事件）
-        expired_keys = [k for k, v in _event_cache.items() if current_time - v > _EVENT_CACHE_EXPIRE_SECONDS]
-        for k in expired_keys:
-            del _event_cache[k]
-        
-        # 检查是否重复
-        if event_id in _event_cache:
-            logger.warning("检测到重复事件，已忽略: event_id=%s", event_id)
-            return True
-        
-        # 记录此次事件
-        _event_cache[event_id] = current_time
-        return False
+    # 检查并记录此次事件（过期条目由缓存自动清理）
+    if _event_cache.check_and_set(event_id):
+        logger.warning("检测到重复事件，已忽略: event_id=%s", event_id)
+        return True
+    return False
 
 
 def _process_event_async(feishu_client, event_type, data):
@@ -754,14 +765,9 @@ def feishu_event(feishu_client, data):
         return {"challenge": challenge}, 200
     
     # 其他所有事件：先返回200，再异步处理
-    # 这样可以避免飞书因超时而重试推送
-    if data:
-        thread = threading.Thread(
-            target=_process_event_async_wrapper,
-            args=(feishu_client, data),
-            daemon=True
-        )
-        thread.start()
+    # 这样可以避免飞书因超时而重试推送；后台任务执行器繁忙时返回 503，由飞书稍后重推
+    if data and not get_task_executor().submit('feishu_event', _process_event_async_wrapper, feishu_client, data):
+        return {"code": 503, "msg": "busy"}, 503
     
     # 立即返回200，告诉飞书"我收到了"
     return {"code": 0, "msg": "success"}, 200
@@ -5,7 +5,8 @@
 """
 
 import logging
-import requests
+
+from common_utils.circuit_breaker import guarded_session
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +31,8 @@ class FeishuApiClient:
         self._lark_host = lark_host
         self._tenant_access_token = ""
         self._bot_open_id = ""  # 懒加载缓存 bot 自身的 open_id
+        # 经熔断与并发隔离的会话，飞书接口不可用时快速失败（同时复用连接）
+        self._session = guarded_session('feishu', pool_maxsize=32)
     
     @property
     def tenant_access_token(self):
@@ -77,7 +80,7 @@ class FeishuApiClient:
         
         # 发送请求
         logger.info("发送消息: %s=%s, msg_type=%s", receive_id_type, receive_id, msg_type)
-        resp = requests.post(url=url, headers=headers, json=req_body, timeout=10)
+        resp = self._session.post(url=url, headers=headers, json=req_body, timeout=10)
         
         # 检查响应
         self._check_error_response(resp)
@@ -97,7 +100,7 @@ class FeishuApiClient:
             headers = {
                 "Authorization": f"Bearer {self._tenant_access_token}",
             }
-            resp = requests.get(url, headers=headers, timeout=10)
+            resp = self._session.get(url, headers=headers, timeout=10)
             data = resp.json()
             self._bot_open_id = (data.get('bot') or {}).get('open_id', '')
             logger.info("Bot open_id: %s", self._bot_open_id)
@@ -130,7 +133,7 @@ class FeishuApiClient:
 
         logger.info("回复消息: message_id=%s, msg_type=%s, reply_in_thread=%s",
                     message_id, msg_type, reply_in_thread)
-        resp = requests.post(url=url, headers=headers, json=req_body, timeout=10)
+        resp = self._session.post(url=url, headers=headers, json=req_body, timeout=10)
         self._check_error_response(resp)
         logger.info("消息回复成功")
         return resp.json()
@@ -155,7 +158,7 @@ class FeishuApiClient:
             "Authorization": f"Bearer {self.tenant_access_token}",
         }
         try:
-            resp = requests.get(url=url, headers=headers, timeout=10)
+            resp = self._session.get(url=url, headers=headers, timeout=10)
             self._check_error_response(resp)
             data = resp.json()
             items = (data.get('data') or {}).get('items') or []
@@ -184,7 +187,7 @@ class FeishuApiClient:
             "content": content,
         }
         logger.info("更新消息: message_id=%s", message_id)
-        resp = requests.patch(url=url, headers=headers, json=req_body, timeout=10)
+        resp = self._session.patch(url=url, headers=headers, json=req_body, timeout=10)
         self._check_error_response(resp)
         logger.info("消息更新成功: message_id=%s", message_id)
         return resp.json()
@@ -202,7 +205,7 @@ class FeishuApiClient:
         }
         
         logger.debug("获取tenant_access_token...")
-        response = requests.post(url, json=req_body, timeout=10)
+        response = self._session.post(url, json=req_body, timeout=10)
         
         self._check_error_response(response)
         
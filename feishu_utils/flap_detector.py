@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+告警抖动检测模块
+
+_clear_dedup_for_resolved / _clear_resolved_dedup_for_firing 在每次状态切换时有意重置去重，
+因此反复抖动的告警每隔几分钟就会产生"firing 卡片 → resolved 回复 → firing 卡片"，
+每次都伴随入库与发送。
+
+FlapDetector 为每个 fingerprint 记录最近的状态切换时间（定长环形缓冲，array 紧凑存储），
+按线性衰减加权计算抖动分数：窗口内每次切换的权重为 1 - 距今时长 / ALERT_FLAP_WINDOW。
+- 分数达到 ALERT_FLAP_THRESHOLD → 进入抖动状态
+- 抖动中的 fingerprint 分数回落到阈值一半以下 → 退出抖动状态（滞回，避免在阈值附近反复切换）
+
+抖动中的告警不再单独发卡片 / 回复，而是汇总到每个群组一张"抖动告警"卡片中原地更新（FlapBoard）。
+"""
+
+import logging
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+from config.config import Config
+from feishu_utils.alert_card_biz import build_flapping_card
+
+logger = logging.getLogger(__name__)
+
+
+class _History:
+    """单个 fingerprint 的状态切换环形缓冲"""
+
+    __slots__ = ('times', 'pos', 'count', 'status', 'flapping', 'alertname', 'changed_at')
+
+    def __init__(self, size: int, status: str, alertname: str):
+        self.times = array('d', bytes(8 * size))
+        self.pos = 0
+        self.count = 0
+        self.status = status
+        self.flapping = False
+        self.alertname = alertname
+        self.changed_at = time.time()
+
+    def push(self, ts: float) -> None:
+        self.times[self.pos] = ts
+        self.pos = (self.pos + 1) % len(self.times)
+        self.count = min(self.count + 1, len(self.times))
+
+    def recent(self):
+        """从新到旧遍历切换时间"""
+        size = len(self.times)
+        for i in range(1, self.count + 1):
+            yield self.times[(self.pos - i) % size]
+
+
+class FlapDetector:
+    """fingerprint → 切换历史的 LRU 索引"""
+
+    # 每个 fingerprint 保留的最近切换次数
+    HISTORY_SIZE = 16
+
+    def __init__(self, threshold: float = None, window: float = None, max_entries: int = None,
+                 clock=time.monotonic):
+        """
+        Args:
+            threshold: 进入抖动状态的分数阈值（退出阈值为其一半）
+            window: 切换计分窗口（秒）
+            max_entries: 最多跟踪的 fingerprint 数（超出按 LRU 淘汰）
+            clock: 时钟函数，默认 time.monotonic
+        """
+        self._threshold = threshold or Config.ALERT_FLAP_THRESHOLD
+        self._window = window or Config.ALERT_FLAP_WINDOW
+        self._max_entries = max_entries or Config.ALERT_STATE_MAX_ENTRIES
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._histories = OrderedDict()
+        self._transitions = 0
+        self._flap_starts = 0
+        self._flap_ends = 0
+
+    @property
+    def window(self) -> float:
+        return self._window
+
+    def observe(self, states: list, alertname: str = '') -> set:
+        """
+        记录一批告警的当前状态，返回其中处于抖动状态的 fingerprint
+
+        Args:
+            states: [(fingerprint, status), ...]
+            alertname: 告警名称（抖动卡片展示用）
+
+        状态与上次相同（重复投递）时不计为切换，但仍按当前时间重新计分，
+        切换停止后分数随时间衰减，抖动状态得以退出。
+        """
+        now = self._clock()
+        flapping = set()
+        with self._lock:
+            for fp, status in states:
+                history = self._histories.get(fp)
+                if history is None:
+                    self._histories[fp] = _History(self.HISTORY_SIZE, status, alertname)
+                    continue
+                self._histories.move_to_end(fp)
+                if history.status != status:
+                    history.status = status
+                    history.changed_at = time.time()
+                    history.push(now)
+                    self._transitions += 1
+                    if alertname:
+                        history.alertname = alertname
+                if history.count:
+                    self._update(fp, history, now)
+                if history.flapping:
+                    flapping.add(fp)
+            while len(self._histories) > self._max_entries:
+                self._histories.popitem(last=False)
+        return flapping
+
+    def snapshot(self, fingerprints) -> list:
+        """抖动卡片展示用：返回仍在抖动的 fingerprint 的当前信息（顺带按当前时间重新评估）"""
+        now = self._clock()
+        entries = []
+        with self._lock:
+            for fp in fingerprints:
+                history = self._histories.get(fp)
+                if history is None:
+                    continue
+                self._update(fp, history, now)
+                if history.flapping:
+                    entries.append({
+                        'fingerprint': fp,
+                        'alertname': history.alertname,
+                        'status': history.status,
+                        'transitions': sum(1 for ts in history.recent() if now - ts <= self._window),
+                        'changed_at': history.changed_at,
+                    })
+        return entries
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "threshold": self._threshold,
+                "window_seconds": self._window,
+                "tracked": len(self._histories),
+                "flapping": sum(1 for h in self._histories.values() if h.flapping),
+                "transitions": self._transitions,
+                "flap_starts": self._flap_starts,
+                "flap_ends": self._flap_ends,
+            }
+
+    # ── 内部 ──
+    def _score(self, history: _History, now: float) -> float:
+        score = 0.0
+        for ts in history.recent():
+            age = now - ts
+            if age > self._window:
+                break
+            score += 1.0 - age / self._window
+        return score
+
+    def _update(self, fp: str, history: _History, now: float) -> None:
+        """按滞回阈值更新抖动状态（调用方持有锁）"""
+        score = self._score(history, now)
+        if not history.flapping and score >= self._threshold:
+            history.flapping = True
+            self._flap_starts += 1
+            logger.warning("🔁 告警进入抖动状态: alertname=%s fingerprint=%s score=%.2f",
+                           history.alertname, fp, score)
+        elif history.flapping and score < self._threshold / 2:
+            history.flapping = False
+            self._flap_ends += 1
+            logger.info("告警抖动结束: alertname=%s fingerprint=%s score=%.2f", history.alertname, fp, score)
+
+
+class FlapBoard:
+    """每个群组一张抖动告警卡片，首次发送后通过 PATCH 原地更新"""
+
+    def __init__(self, detector: FlapDetector):
+        self._detector = detector
+        self._lock = threading.Lock()
+        # group_id → [message_id, {fingerprint}, 发送 / 更新锁]
+        self._boards = {}
+        self._updates = 0
+        self._failures = 0
+
+    def hold(self, group_id: str, fingerprints: list, feishu_client) -> bool:
+        """将抖动中的 fingerprint 加入群组卡片并刷新，返回是否成功"""
+        with self._lock:
+            board = self._boards.get(group_id)
+            if board is None:
+                board = self._boards[group_id] = [None, set(), threading.Lock()]
+        with board[2]:
+            board[1].update(fingerprints)
+            entries = self._detector.snapshot(list(board[1]))
+            board[1].intersection_update(e['fingerprint'] for e in entries)
+            content = build_flapping_card(entries, self._detector.window)
+            try:
+                if board[0]:
+                    feishu_client.patch_message(board[0], content)
+                else:
+                    board[0] = feishu_client.send("chat_id", group_id, "interactive", content) or None
+                ok = bool(board[0])
+            except Exception as e:
+                logger.error("抖动告警卡片更新失败 group_id=%s: %s", group_id, e)
+                # 原卡片可能已被删除，下次重新发送
+                board[0] = None
+                ok = False
+        with self._lock:
+            if ok:
+                self._updates += 1
+            else:
+                self._failures += 1
+        return ok
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "boards": len(self._boards),
+                "card_updates": self._updates,
+                "card_failures": self._failures,
+            }
+
+
+_flap_detector = None
+_flap_board = None
+_flap_lock = threading.Lock()
+
+
+def get_flap_detector():
+    """获取进程级抖动检测（ALERT_FLAP_THRESHOLD=0 时返回 None）"""
+    global _flap_detector, _flap_board
+    if Config.ALERT_FLAP_THRESHOLD <= 0:
+        return None
+    if _flap_detector is None:
+        with _flap_lock:
+            if _flap_detector is None:
+                detector = FlapDetector()
+                _flap_board = FlapBoard(detector)
+                _flap_detector = detector
+    return _flap_detector
+
+
+def get_flap_board():
+    """获取进程级抖动告警卡片（未启用抖动检测时返回 None）"""
+    return _flap_board if get_flap_detector() is not None else None
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+未恢复告警卡片跟踪模块
+
+原先同一告警已有未恢复的卡片时，每个新的 firing 批次都会发新消息、写新的 alert_data 行
+（或在语义去重冷却期内被直接丢弃）。本模块按 (alertname, group_id) 跟踪已发送且未恢复的 biz 卡片：
+
+- 新实例到达时并入原卡片：立即更新告警状态索引（resolved 可反查到原话题），
+  卡片 PATCH 与 alert_data 回写（alertlabels / fingerprints / card_content）按
+  ALERT_CARD_UPDATE_DEBOUNCE 防抖，短时间内的多次变化只写一次
+- 全部实例恢复（恢复通知已回复到话题）后关闭，之后的 firing 才会发新卡片
+- 超过 ALERT_OPEN_CARD_TTL 未更新的卡片不再跟踪
+- 卡片被静默后由按钮回调接管状态（card_state），不再跟踪
+
+仅跟踪 biz 模板且无电话告警（无认领状态）的卡片；进程重启后跟踪状态丢失，下次 firing 发新卡片。
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from config.config import Config
+from common_utils.ttl_cache import TTLCache
+from alerts_format.savedb import index_merged_fingerprints, save_merged_alert
+from feishu_utils.alert_card_biz import build_biz_firing_card
+from feishu_utils import card_state
+
+logger = logging.getLogger(__name__)
+
+
+class OpenCard:
+    """一张未恢复的告警卡片及其构建参数"""
+
+    __slots__ = ('alertname', 'group_id', 'maid', 'message_id', 'client', 'grafana_urls', 'common_labels',
+                 'mentions', 'starts_at', 'raws', 'matchers', 'severities', 'lock', 'io_lock', 'timer', 'dirty')
+
+    def __init__(self, alertname, group_id, maid, message_id, client, batch, grafana_urls, mentions, starts_at):
+        self.alertname = alertname
+        self.group_id = group_id
+        self.maid = maid
+        self.message_id = message_id
+        self.client = client
+        self.grafana_urls = grafana_urls
+        self.common_labels = dict(batch.common_labels_dict)
+        self.mentions = mentions
+        self.starts_at = starts_at
+        # fingerprint → 原始 alert（卡片展示，保持首次出现顺序，状态取最新）
+        self.raws = OrderedDict()
+        # fingerprint → 静默 matchers（仅 firing 实例，对应 alert_data.alertlabels / fingerprints）
+        self.matchers = OrderedDict()
+        self.severities = []
+        self.lock = threading.Lock()
+        self.io_lock = threading.Lock()
+        self.timer = None
+        self.dirty = False
+        self.absorb(batch)
+
+    def absorb(self, batch) -> list:
+        """并入批次中的实例，返回新增的 firing fingerprint（调用方持有 lock）"""
+        added = []
+        for alert in batch.alerts:
+            fp = alert.fingerprint
+            if not fp:
+                continue
+            previous = self.raws.get(fp)
+            if previous is None or previous.get('status') != alert.status:
+                self.dirty = True
+            self.raws[fp] = alert.raw
+            if alert.status != 'resolved' and fp not in self.matchers:
+                self.matchers[fp] = alert.matcher
+                added.append(fp)
+                if alert.labels.get('severity'):
+                    self.severities.append(alert.labels['severity'])
+        labels = batch.common_labels_dict
+        self.common_labels = {k: v for k, v in self.common_labels.items() if labels.get(k) == v}
+        return added
+
+
+class OpenCardTracker:
+    """(alertname, group_id) → OpenCard"""
+
+    def __init__(self, severity_of, debounce: float = None, ttl: float = None):
+        """
+        Args:
+            severity_of: 告警级别列表 → 卡片级别（与首次发送时的规则一致）
+            debounce: 卡片更新防抖秒数
+            ttl: 卡片跟踪时长（秒，每次合并后重新计时）
+        """
+        self._severity_of = severity_of
+        self._debounce = Config.ALERT_CARD_UPDATE_DEBOUNCE if debounce is None else debounce
+        self._cards = TTLCache(ttl or Config.ALERT_OPEN_CARD_TTL, maxsize=Config.DEDUP_CACHE_MAX_ENTRIES,
+                               name='open_cards')
+        self._stats_lock = threading.Lock()
+        self._opened = 0
+        self._merged_batches = 0
+        self._merged_instances = 0
+        self._writes = 0
+        self._write_failures = 0
+
+    def open(self, alertname, group_id, maid, message_id, feishu_client, batch, grafana_urls,
+             mentions, starts_at) -> None:
+        """firing 卡片发送成功后登记"""
+        card = OpenCard(alertname, group_id, maid, message_id, feishu_client, batch, grafana_urls,
+                        mentions, starts_at)
+        card.dirty = False
+        self._cards.set((alertname, group_id), card)
+        with self._stats_lock:
+            self._opened += 1
+
+    def merge(self, alertname: str, group_id: str, batch) -> str:
+        """
+        将批次并入已有卡片
+
+        Returns:
+            str: 并入的卡片 message_id；该群组没有未恢复的卡片时返回空字符串
+        """
+        key = (alertname, group_id)
+        card = self._cards.get(key)
+        if card is None:
+            return ''
+        with card.lock:
+            added = card.absorb(batch)
+            if added:
+                index_merged_fingerprints(card.maid, group_id, list(card.matchers), card.starts_at,
+                                          card.message_id)
+            schedule = card.dirty and card.timer is None
+            if schedule:
+                if self._debounce > 0:
+                    card.timer = threading.Timer(self._debounce, self._flush, (card,))
+                    card.timer.daemon = True
+                    card.timer.start()
+        # 重新计时，持续有新实例的卡片不会过期
+        self._cards.set(key, card)
+        with self._stats_lock:
+            self._merged_batches += 1
+            self._merged_instances += len(added)
+        if added:
+            logger.info("告警 '%s' 新增 %d 个实例并入已有卡片 %s (group_id=%s)",
+                        alertname, len(added), card.message_id, group_id)
+        if schedule and self._debounce <= 0:
+            self._flush(card)
+        return card.message_id
+
+    def still_firing(self, alertname: str, group_id: str, fingerprints: list) -> list:
+        """过滤掉卡片上已记录为恢复的实例（恢复通知按实例逐条到达，部分恢复检测据此判断）"""
+        card = self._cards.get((alertname, group_id))
+        if card is None:
+            return fingerprints
+        with card.lock:
+            return [fp for fp in fingerprints
+                    if fp not in card.raws or card.raws[fp].get('status') != 'resolved']
+
+    def close(self, alertname: str, group_id: str) -> None:
+        """全部实例恢复后关闭卡片（未写入的变更立即写入）"""
+        card = self._cards.pop((alertname, group_id))
+        if card is not None:
+            self._flush(card)
+
+    def release(self, message_id: str) -> None:
+        """停止跟踪指定消息的卡片（未写入的变更先写入），之后的 firing 发新卡片"""
+        for key, card, _ in self._cards.items():
+            if card.message_id == message_id:
+                self._cards.pop(key)
+                self._flush(card)
+                return
+
+    def flush_all(self) -> int:
+        """立即写入全部待更新卡片（进程退出时调用），返回写入的卡片数"""
+        cards = [card for _, card, _ in self._cards.items() if card.dirty]
+        for card in cards:
+            self._flush(card)
+        return len(cards)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "open_cards": len(self._cards),
+                "debounce_seconds": self._debounce,
+                "opened": self._opened,
+                "merged_batches": self._merged_batches,
+                "merged_instances": self._merged_instances,
+                "card_writes": self._writes,
+                "write_failures": self._write_failures,
+            }
+
+    # ── 内部 ──
+    def _flush(self, card: OpenCard) -> None:
+        """PATCH 卡片并回写 alert_data（同一卡片的写入串行执行）"""
+        with card.io_lock:
+            with card.lock:
+                if card.timer is not None:
+                    card.timer.cancel()
+                    card.timer = None
+                if not card.dirty:
+                    return
+                card.dirty = False
+                content = build_biz_firing_card(
+                    card.alertname, self._severity_of(card.severities), list(card.raws.values()),
+                    card.grafana_urls, card.maid, card.common_labels, card.mentions,
+                )
+                matchers = list(card.matchers.values())
+                fingerprints = list(card.matchers)
+            if not content:
+                # 实例已全部恢复，保留卡片最后一次的内容（恢复通知在话题中回复）
+                return
+            started = time.monotonic()
+            card_state.remember(card.message_id, content)
+            ok = save_merged_alert(card.maid, matchers, fingerprints, content)
+            try:
+                card.client.patch_message(card.message_id, content)
+            except Exception as e:
+                ok = False
+                logger.error("原地更新告警卡片失败 message_id=%s: %s", card.message_id, e)
+            with self._stats_lock:
+                self._writes += 1
+                if not ok:
+                    self._write_failures += 1
+            logger.info("告警卡片已原地更新: message_id=%s, 实例 %d 个 (%.3fs)",
+                        card.message_id, len(fingerprints), time.monotonic() - started)
+
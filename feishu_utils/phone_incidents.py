@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+电话告警 incident 批次级创建
+
+电话告警原先在每个路由的处理流程中同步创建 Flashcat incident：同一批告警命中 3 个路由
+就创建 3 个 incident、给值班人打 3 次电话，且每张卡片发送前都要串行等待 incident 接口返回。
+本模块把 incident 创建提升到批次级：
+
+- 按 alertname + firing fingerprint 集合去重（PHONE_INCIDENT_DEDUP_TTL 秒内只创建一次），
+  拆分 / 聚合后的子批次、多路由共享同一个 incident；实例恢复后清除，再次触发时重新创建
+- 在后台任务执行器中异步创建，卡片立即发送；执行器繁忙时同步创建（电话告警不丢弃）
+- incident_id 返回后，已发送的卡片从卡片状态缓存（card_state）取当前 JSON，插入认领按钮后
+  PATCH 更新，并将 incident_id 写入各路由的 alert_data
+"""
+
+import hashlib
+import logging
+import threading
+
+from config.config import Config
+from common_utils import jsoncodec
+from common_utils.executor import get_task_executor
+from common_utils.retry_scheduler import get_retry_scheduler
+from common_utils.ttl_cache import TTLCache
+from alerts_format.savedb import update_incident_id, save_card_content
+from feishu_utils import card_state
+
+logger = logging.getLogger(__name__)
+
+
+class PhoneIncident:
+    """一次电话告警对应的 Flashcat incident（创建中 / 已完成）"""
+
+    __slots__ = ('key', 'alertname', 'fingerprints', 'incident_id', 'done', 'waiters', 'lock')
+
+    def __init__(self, key: str, alertname: str, fingerprints: frozenset = frozenset()):
+        self.key = key
+        self.alertname = alertname
+        self.fingerprints = fingerprints
+        self.incident_id = ''
+        self.done = False
+        # 卡片已发送、等待 incident_id 的路由：[(maid, message_id, feishu_client)]
+        self.waiters = []
+        self.lock = threading.Lock()
+
+
+def _ack_button(maid: str, incident_id: str) -> dict:
+    return {
+        "tag": "button",
+        "text": {"tag": "plain_text", "content": "📞 认领告警"},
+        "type": "danger",
+        "value": {"action": "ack_incident", "maid": maid, "incident_id": incident_id},
+    }
+
+
+def _with_ack_button(card: dict, maid: str, incident_id: str) -> dict:
+    """在静默按钮前插入认领按钮（与发送时即带 incident_id 的卡片布局一致）"""
+    for elem in card.get('elements', []):
+        if not isinstance(elem, dict) or elem.get('tag') != 'action':
+            continue
+        actions = elem.get('actions', [])
+        for pos, action in enumerate(actions):
+            value = action.get('value') if isinstance(action, dict) else None
+            if isinstance(value, str):
+                try:
+                    value = jsoncodec.loads(value)
+                except (jsoncodec.JSONDecodeError, TypeError):
+                    value = None
+            if isinstance(value, dict) and value.get('action') == 'silence':
+                actions.insert(pos, _ack_button(maid, incident_id))
+                return card
+    card.setdefault('elements', []).append({"tag": "action", "actions": [_ack_button(maid, incident_id)]})
+    return card
+
+
+class PhoneIncidentTracker:
+    """(alertname, firing fingerprints) → PhoneIncident"""
+
+    def __init__(self, create, ttl: float = None):
+        """
+        Args:
+            create: 创建函数 create(payload) → incident_id（失败返回空值，自行回退旧接口）
+            ttl: 去重时长（秒）
+        """
+        self._create = create
+        self._incidents = TTLCache(ttl or Config.PHONE_INCIDENT_DEDUP_TTL,
+                                   maxsize=Config.DEDUP_CACHE_MAX_ENTRIES, name='phone_incidents')
+        self._stats_lock = threading.Lock()
+        self._created = 0
+        self._failed = 0
+        self._deduplicated = 0
+        self._patched = 0
+
+    def start(self, alertname: str, batch) -> PhoneIncident:
+        """批次需要电话通知时调用：已有相同 incident 时复用，否则后台创建"""
+        fingerprints = sorted(a.fingerprint for a in batch.alerts if a.status != 'resolved' and a.fingerprint)
+        digest = hashlib.sha1('\n'.join(fingerprints).encode('utf-8')).hexdigest()
+        key = f"{alertname}:{digest}"
+        incident = PhoneIncident(key, alertname, frozenset(fingerprints))
+        if self._incidents.check_and_set(key, incident):
+            existing = self._incidents.get(key)
+            if existing is not None:
+                with self._stats_lock:
+                    self._deduplicated += 1
+                logger.info("📞 告警 '%s' 的电话 incident 已创建或创建中，复用", alertname)
+                return existing
+            self._incidents.set(key, incident)
+        payload = batch.to_payload()
+        if not get_task_executor().submit('phone_incident', self._run, incident, payload):
+            # 执行器繁忙时在当前线程创建，电话告警不丢弃
+            self._run(incident, payload)
+        return incident
+
+    def forget(self, alertname: str, fingerprints) -> int:
+        """
+        resolved 批次到来时调用：清除包含这些实例的 incident，使下一轮 firing 重新创建并打电话
+        （与 firing 去重缓存在 resolved 时清除一致）
+
+        Returns:
+            int: 清除的 incident 数
+        """
+        resolved = set(fingerprints)
+        stale = [incident for _, incident, _ in self._incidents.items()
+                 if incident.alertname == alertname and not resolved.isdisjoint(incident.fingerprints)]
+        for incident in stale:
+            if self._incidents.get(incident.key) is incident:
+                self._incidents.pop(incident.key)
+        if stale:
+            logger.info("📞 告警 '%s' 已恢复，清除 %d 个电话 incident 去重记录", alertname, len(stale))
+        return len(stale)
+
+    def attach(self, incident: PhoneIncident, maid: str, message_id: str, feishu_client,
+               sent_incident_id: str = None) -> None:
+        """
+        卡片发送成功后登记
+
+        Args:
+            incident: start 返回的 PhoneIncident
+            maid: 该路由的告警ID
+            message_id: 卡片消息ID
+            feishu_client: 飞书客户端实例
+            sent_incident_id: 发送时卡片已带的 incident_id（已有认领按钮，只需入库）
+        """
+        if sent_incident_id:
+            update_incident_id(maid, sent_incident_id)
+            return
+        with incident.lock:
+            if not incident.done:
+                incident.waiters.append((maid, message_id, feishu_client))
+                return
+        if incident.incident_id:
+            self._apply(incident.incident_id, maid, message_id, feishu_client)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "tracked": len(self._incidents),
+                "created": self._created,
+                "failed": self._failed,
+                "deduplicated": self._deduplicated,
+                "cards_patched": self._patched,
+            }
+
+    # ── 内部 ──
+    def _run(self, incident: PhoneIncident, payload: dict) -> None:
+        incident_id = ''
+        try:
+            incident_id = self._create(payload) or ''
+        finally:
+            with incident.lock:
+                incident.incident_id = incident_id
+                incident.done = True
+                waiters, incident.waiters = incident.waiters, []
+            with self._stats_lock:
+                if incident_id:
+                    self._created += 1
+                else:
+                    self._failed += 1
+            if not incident_id:
+                # 创建失败不占用去重窗口，同一批告警再次推送时重新创建
+                if self._incidents.get(incident.key) is incident:
+                    self._incidents.pop(incident.key)
+        if incident_id:
+            for maid, message_id, feishu_client in waiters:
+                self._apply(incident_id, maid, message_id, feishu_client)
+
+    def _apply(self, incident_id: str, maid: str, message_id: str, feishu_client) -> None:
+        """incident_id 入库，并为已发送的卡片补上认领按钮"""
+        update_incident_id(maid, incident_id)
+        card = card_state.load(message_id, maid)
+        if card is None:
+            logger.warning("卡片状态未知，无法补充认领按钮: message_id=%s", message_id)
+            return
+        content = jsoncodec.dumps(_with_ack_button(card, maid, incident_id))
+        card_state.remember(message_id, content)
+
+        def patch():
+            feishu_client.patch_message(message_id, content)
+            logger.info("📞 卡片已补充认领按钮: message_id=%s incident_id=%s", message_id, incident_id)
+            return True
+
+        get_retry_scheduler().run(
+            'card_patch', message_id, patch,
+            on_give_up=lambda e: logger.error("补充认领按钮失败（重试次数用尽）: message_id=%s: %s", message_id, e),
+        )
+        save_card_content(maid, content)
+        with self._stats_lock:
+            self._patched += 1
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+告警风暴摘要模块
+
+数百条不同告警在一分钟内涌入同一个群时，逐条发卡片会触发飞书限流，群聊也无法阅读。
+StormGuard 按 group_id 统计滑动窗口内的卡片发送次数：
+
+- 窗口内次数达到 ALERT_STORM_THRESHOLD → 进入风暴模式，后续 firing 卡片不再单独发送，
+  按 (alertname, severity) 计数，每 ALERT_STORM_DIGEST_INTERVAL 秒发送一张摘要卡片
+- 窗口内次数回落到阈值一半以下 → 退出风暴模式，发送最后一期摘要后恢复单条发送
+- 每次模式切换都记录日志；电话告警始终单独发送（仍计入速率）
+
+告警数据照常入库（MAID、静默不受影响），仅卡片发送被汇总。
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+
+from config.config import Config
+from alerts_format.alert_batch import normalize_severity
+from feishu_utils.alert_card_biz import build_storm_digest_card
+
+logger = logging.getLogger(__name__)
+
+
+class _GroupState:
+    """单个群组的发送速率与待汇总计数"""
+
+    __slots__ = ('sends', 'storm', 'since', 'counts', 'links', 'period_start', 'client')
+
+    def __init__(self, threshold: int):
+        # 只需判断窗口内次数是否达到阈值，保留最近 threshold 次即可
+        self.sends = deque(maxlen=threshold)
+        self.storm = False
+        self.since = 0.0
+        self.counts = {}
+        self.links = {}
+        self.period_start = 0.0
+        self.client = None
+
+
+class StormGuard:
+    """按群组的滑动窗口速率检测 + 周期摘要"""
+
+    def __init__(self, threshold: int = None, window: float = None, interval: float = None,
+                 clock=time.monotonic):
+        """
+        Args:
+            threshold: 窗口内卡片数阈值
+            window: 滑动窗口秒数
+            interval: 风暴期间摘要卡片发送间隔秒数
+            clock: 时钟函数，默认 time.monotonic
+        """
+        self._threshold = max(2, threshold or Config.ALERT_STORM_THRESHOLD)
+        self._window = window or Config.ALERT_STORM_WINDOW
+        self._interval = interval or Config.ALERT_STORM_DIGEST_INTERVAL
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._groups = {}
+        self._stop = threading.Event()
+        self._thread = None
+        # 计数器
+        self._storms = 0
+        self._absorbed = 0
+        self._digests = 0
+        self._digest_failures = 0
+
+    def admit(self, group_id: str, items: list, link: str, feishu_client, exempt: bool = False) -> bool:
+        """
+        记录一次卡片发送并判断是否放行
+
+        Args:
+            group_id: 目标群组
+            items: [(alertname, severity), ...] 本卡片包含的告警，被汇总时计入摘要
+            link: 详情链接（Grafana panel / 告警源）
+            feishu_client: 飞书客户端（摘要卡片发送使用）
+            exempt: 是否豁免汇总（电话告警）
+
+        Returns:
+            bool: True 表示照常发送，False 表示已并入摘要
+        """
+        now = self._clock()
+        with self._lock:
+            state = self._groups.get(group_id)
+            if state is None:
+                state = self._groups[group_id] = _GroupState(self._threshold)
+            state.sends.append(now)
+            state.client = feishu_client
+            if not state.storm and self._rate(state, now) >= self._threshold:
+                state.storm = True
+                state.since = now
+                state.period_start = time.time()
+                self._storms += 1
+                logger.warning("🌪 群组 %s 进入告警风暴模式：%.0fs 内 %d 张卡片，改为每 %.0fs 发送摘要",
+                               group_id, self._window, self._threshold, self._interval)
+                self._ensure_thread()
+            if exempt or not state.storm:
+                return True
+            # 级别统一小写 / 数字映射为名称，Critical、critical、5 计入同一档
+            for alertname, severity in items:
+                key = (alertname, normalize_severity(severity) if severity else '')
+                state.counts[key] = state.counts.get(key, 0) + 1
+            if link:
+                for alertname, _ in items:
+                    state.links.setdefault(alertname, link)
+            self._absorbed += 1
+            return False
+
+    def tick(self) -> None:
+        """发送到期的摘要、检查风暴是否结束（后台线程周期调用）"""
+        now = self._clock()
+        due = []
+        with self._lock:
+            for group_id, state in list(self._groups.items()):
+                if not state.storm:
+                    if not state.sends or now - state.sends[-1] > self._window:
+                        del self._groups[group_id]
+                    continue
+                ended = self._rate(state, now) < self._threshold // 2
+                if ended:
+                    state.storm = False
+                    logger.warning("🌤 群组 %s 告警风暴结束（持续 %.0fs），恢复单条发送",
+                                   group_id, now - state.since)
+                if state.counts:
+                    due.append((group_id, state.client, state.counts, state.links,
+                                state.period_start, not ended))
+                    state.counts, state.links = {}, {}
+                state.period_start = time.time()
+        for group_id, client, counts, links, started_at, active in due:
+            self._send_digest(group_id, client, counts, links, started_at, active)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "threshold": self._threshold,
+                "window_seconds": self._window,
+                "digest_interval_seconds": self._interval,
+                "storming_groups": [g for g, s in self._groups.items() if s.storm],
+                "storms": self._storms,
+                "absorbed_cards": self._absorbed,
+                "digests_sent": self._digests,
+                "digest_failures": self._digest_failures,
+            }
+
+    def stop(self) -> None:
+        """停止后台线程并立即发出待汇总的摘要"""
+        self._stop.set()
+        self.tick()
+
+    # ── 内部 ──
+    def _rate(self, state: _GroupState, now: float) -> int:
+        """窗口内的发送次数（调用方持有锁）"""
+        sends = state.sends
+        while sends and now - sends[0] > self._window:
+            sends.popleft()
+        return len(sends)
+
+    def _send_digest(self, group_id, client, counts, links, started_at, active) -> None:
+        content = build_storm_digest_card(counts, links, started_at, time.time(), active)
+        try:
+            message_id = client.send("chat_id", group_id, "interactive", content)
+        except Exception as e:
+            logger.error("风暴摘要发送异常 group_id=%s: %s", group_id, e)
+            message_id = None
+        with self._lock:
+            if message_id:
+                self._digests += 1
+            else:
+                self._digest_failures += 1
+        if message_id:
+            logger.info("风暴摘要已发送 group_id=%s：%d 条告警", group_id, sum(counts.values()))
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='storm-digest', daemon=True)
+            self._thread.start()
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self._interval):
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error("风暴摘要周期任务异常: %s", e, exc_info=True)
+
+
+_storm_guard = None
+_storm_guard_lock = threading.Lock()
+
+
+def get_storm_guard():
+    """获取进程级风暴检测（ALERT_STORM_THRESHOLD=0 时返回 None）"""
+    global _storm_guard
+    if Config.ALERT_STORM_THRESHOLD <= 0:
+        return None
+    if _storm_guard is None:
+        with _storm_guard_lock:
+            if _storm_guard is None:
+                _storm_guard = StormGuard()
+    return _storm_guard
@@ -6,7 +6,6 @@
 Flask 的 /webhook/event 和 /api/card_callback 路由作为备用保留。
 """
 
-import json
 import logging
 import threading
 
@@ -18,6 +17,7 @@ from lark_oapi.event.callback.model.p2_card_action_trigger import (
 
 from feishu_utils.event_handler import _process_event_async_wrapper
 from feishu_utils.callback_handler import process_card_callback
+from common_utils import jsoncodec
 
 logger = logging.getLogger(__name__)
 
@@ -28,7 +28,7 @@ def _make_event_bridge(feishu_client, event_label: str):
     """
     def bridge(data) -> None:
         try:
-            raw = json.loads(lark.JSON.marshal(data))
+            raw = jsoncodec.loads(lark.JSON.marshal(data))
             logger.debug("WS 收到事件 [%s]: %s", event_label, raw)
             _process_event_async_wrapper(feishu_client, raw)
         except Exception as e:
@@ -42,13 +42,14 @@ def _make_card_action_bridge(feishu_client):
     """
     def bridge(data: P2CardActionTrigger) -> P2CardActionTriggerResponse:
         try:
-            raw = json.loads(lark.JSON.marshal(data))
+            raw = jsoncodec.loads(lark.JSON.marshal(data))
             logger.debug("WS 收到卡片回调: %s", raw)
-            process_card_callback(raw, feishu_client)
+            response = process_card_callback(raw, feishu_client)
         except Exception as e:
             logger.error("WS 卡片回调处理失败: %s", e, exc_info=True)
-        # 飞书要求必须返回响应对象，返回空 toast 即可
-        return P2CardActionTriggerResponse({})
+            response = None
+        # 飞书要求必须返回响应对象：含 toast 与渲染后的新卡片，无提示时返回空对象即可
+        return P2CardActionTriggerResponse(response or {})
     return bridge
 
 
@@ -1,5 +1,6 @@
 import logging
-import json
+
+from common_utils import jsoncodec
 
 logger = logging.getLogger(__name__)
 
@@ -19,7 +20,7 @@ def json_processing(group_id, data, feishu_client):
         webhook_type = data.get("object_kind")
         pipeline_status = data.get("object_attributes", {}).get("status")
         logger.info(f"Received GitLab webhook type: {webhook_type}")
-        logger.debug(f"GitLab webhook data: {json.dumps(data, indent=2)}")
+        logger.debug(f"GitLab webhook data: {jsoncodec.dumps(data, indent=2)}")
         
         if webhook_type == "pipeline" and (pipeline_status == "success" or pipeline_status == "failed"):
             # 初始化变量
@@ -115,7 +116,7 @@ def json_processing(group_id, data, feishu_client):
                         }
                     ]
                 }
-                feishu_client.send("chat_id", group_id, "interactive", json.dumps(card_data))
+                feishu_client.send("chat_id", group_id, "interactive", jsoncodec.dumps(card_data))
                 logger.info(f"Gitlab pipeline success: {pipeline_id}")
                 return {"code": 0, "msg": "success"}, 200
             elif pipeline_status == "failed":
@@ -141,7 +142,7 @@ def json_processing(group_id, data, feishu_client):
                         }
                     ]
                 }
-                feishu_client.send("chat_id", group_id, "interactive", json.dumps(card_data))
+                feishu_client.send("chat_id", group_id, "interactive", jsoncodec.dumps(card_data))
                 logger.info(f"Gitlab pipeline failed: {pipeline_id}")
                 return {"code": 0, "msg": "success"}, 200
             else:
@@ -220,7 +221,7 @@ def json_processing(group_id, data, feishu_client):
                     }
                 ]
             }
-            feishu_client.send("chat_id", group_id, "interactive", json.dumps(card_data))
+            feishu_client.send("chat_id", group_id, "interactive", jsoncodec.dumps(card_data))
             logger.info(f"Gitlab push: {push_commit_id}")
             return {"code": 0, "msg": "success"}, 200
 
@@ -20,8 +20,20 @@ CREATE TABLE IF NOT EXISTS alert_config (
     grafana_url VARCHAR(255) DEFAULT NULL COMMENT 'Grafana地址(静默类型为grafana时使用)',
     oncall_sync TINYINT(1) NOT NULL DEFAULT 0 COMMENT 'oncall同步开关: 0=使用静态users列表, 1=从Flashcat同步当前oncall人员',
     flashcat_schedule_id VARCHAR(64) DEFAULT NULL COMMENT 'Flashcat排班ID（覆盖全局FLASHCAT_SCHEDULE_ID配置）',
+    coalesce_window INT NOT NULL DEFAULT 0 COMMENT '合并窗口秒数: 同名告警多次推送在窗口内合并为一张卡片, 0=不合并',
     UNIQUE KEY uq_alert_id (alert_id)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='Prometheus告警配置表';
+-- 已有库升级：补充 coalesce_window 列（列已存在时跳过，可重复执行）
+SET @ddl = (
+    SELECT IF(COUNT(*) = 0,
+              'ALTER TABLE alert_config ADD COLUMN coalesce_window INT NOT NULL DEFAULT 0 COMMENT ''合并窗口秒数: 同名告警多次推送在窗口内合并为一张卡片, 0=不合并''',
+              'SELECT 1')
+    FROM information_schema.COLUMNS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'alert_config' AND COLUMN_NAME = 'coalesce_window'
+);
+PREPARE stmt FROM @ddl;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
 
 -- 告警数据表
 CREATE TABLE IF NOT EXISTS alert_data (
@@ -48,4 +60,11 @@ CREATE TABLE IF NOT EXISTS feishu_users (
     updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
     UNIQUE KEY uq_name (name),
     UNIQUE KEY uq_open_id (open_id)
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='飞书用户 name→open_id 映射表';
\ No newline at end of file
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='飞书用户 name→open_id 映射表';
+-- 告警去重表（DEDUP_BACKEND=db 时使用，多副本共享去重状态）
+CREATE TABLE IF NOT EXISTS alert_dedup (
+    dedup_key VARCHAR(191) PRIMARY KEY COMMENT '去重 key（命名空间:哈希）',
+    owner CHAR(32) NOT NULL COMMENT '占用方令牌（同批次 INSERT IGNORE 后据此判断是否占用成功）',
+    expires_at BIGINT NOT NULL COMMENT '过期时间（Unix 毫秒）',
+    KEY idx_expires_at (expires_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='告警去重表';
@@ -4,20 +4,36 @@
 提供HTTP API接口，支持向飞书群聊发送消息
 """
 
-import json
 import logging
 import re
+import signal
 import sys
 from flask import Flask, jsonify, request as flask_request, send_from_directory
-import mysql.connector
 
 # 导入配置和API客户端
 from config import config
 from feishu_utils.feishu_api import FeishuApiClient, FeishuApiException
 from feishu_utils.event_handler import feishu_event
 from feishu_utils.callback_handler import process_card_callback
-from feishu_utils.alert_handler import process_alert_request
+from feishu_utils.alert_handler import (
+    process_alert_request, flush_coalesced_alerts, coalescer_stats, flush_open_cards, open_card_stats,
+    phone_incident_stats,
+)
+from feishu_utils.alert_ingest import init_alert_ingest, get_alert_ingest, get_raw_body_dedup, ingest_raw_alert
+from feishu_utils.storm_guard import get_storm_guard
+from feishu_utils.flap_detector import get_flap_detector, get_flap_board
 from feishu_utils.ws_client import start_ws_client_in_thread
+from alerts_format.storage import get_storage, DuplicateKeyError
+from alerts_format.dedup_store import get_dedup_store
+from alerts_format.alert_state import get_alert_state
+from alerts_format.silence_index import get_silence_index
+from alerts_format.oncall_cache import get_oncall_cache, invalidate_oncall_users
+from common_utils.ttl_cache import cache_stats
+from common_utils.executor import get_task_executor
+from common_utils.retry_scheduler import get_retry_scheduler
+from common_utils.circuit_breaker import circuit_breaker_stats
+from common_utils.snapshot import load_snapshot, save_snapshot, start_periodic_snapshot, stop_periodic_snapshot
+from common_utils import jsoncodec
 
 # gitlab webhook 消息处理
 from gitlab_utils.pipeline_msg_format import json_processing
@@ -42,11 +58,22 @@ except ValueError as e:
     sys.exit(1)
 
 app = Flask(__name__, static_folder='static', static_url_path='/static')
+# request.json / jsonify 使用统一 JSON 编解码（安装 orjson 时自动加速）
+jsoncodec.install_flask_provider(app)
 
 # 初始化飞书API客户端
 feishu_client = FeishuApiClient(config.APP_ID, config.APP_SECRET, config.LARK_HOST)
 
 
+def _handle_alert(data):
+    """同步处理告警（异步队列工作线程与 sync 模式共用）"""
+    return process_alert_request(data, feishu_client)
+
+
+# 初始化告警异步接收队列（ALERT_INGEST_MODE=sync 时为 None）
+init_alert_ingest(_handle_alert)
+
+
 @app.errorhandler(404)
 def handle_404(error):
     """处理404错误"""
@@ -82,11 +109,13 @@ def handle_error(error):
 def alert_api():
     """
     告警API
-    委托给 alert_handler 模块处理具体逻辑
+    与近期请求体完全相同时直接返回 200；
+    async 模式下校验后入队立即返回 202，sync 模式委托给 alert_handler 模块同步处理
     """
-    logger.debug("Received alert request: %s", flask_request.json)
-    data = flask_request.json
-    result, status_code = process_alert_request(data, feishu_client)
+    body = flask_request.get_data(cache=False)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Received alert request: %s", body.decode(errors='replace'))
+    result, status_code = ingest_raw_alert(body, _handle_alert)
     return jsonify(result), status_code
 
 
@@ -125,7 +154,7 @@ def send_message_api():
         
         # 将content转换为JSON字符串
         if isinstance(content, dict):
-            content_str = json.dumps(content)
+            content_str = jsoncodec.dumps(content)
         else:
             content_str = content
         
@@ -179,7 +208,7 @@ def send_text_api():
         chat_id = data.get("chat_id")
         open_id = data.get("open_id")
         
-        content = json.dumps({"text": text})
+        content = jsoncodec.dumps({"text": text})
         
         if chat_id:
             # 发送到群聊
@@ -245,13 +274,35 @@ def index():
 @app.route("/api/health", methods=["GET"])
 def health_check():
     """健康检查接口"""
+    ingest = get_alert_ingest()
+    alert_state = get_alert_state()
+    raw_dedup = get_raw_body_dedup()
+    storm_guard = get_storm_guard()
+    flap_detector = get_flap_detector()
+    silence_index = get_silence_index()
+    oncall_cache = get_oncall_cache()
     return jsonify({
         "code": 0,
         "msg": "service is running",
         "data": {
             "app_id": config.APP_ID,
             "lark_host": config.LARK_HOST,
-            "config": config.show_config()
+            "config": config.show_config(),
+            "alert_ingest": ingest.stats() if ingest else {"mode": "sync"},
+            "raw_body_dedup": raw_dedup.stats() if raw_dedup else {"enabled": False},
+            "dedup": get_dedup_store().stats(),
+            "alert_state": alert_state.stats() if alert_state else {"enabled": False},
+            "coalescer": coalescer_stats(),
+            "open_cards": open_card_stats(),
+            "phone_incidents": phone_incident_stats(),
+            "storm_guard": storm_guard.stats() if storm_guard else {"enabled": False},
+            "flap": dict(flap_detector.stats(), **get_flap_board().stats()) if flap_detector else {"enabled": False},
+            "silence_index": silence_index.stats() if silence_index else {"enabled": False},
+            "oncall_cache": oncall_cache.stats() if oncall_cache else {"enabled": False},
+            "task_executor": get_task_executor().stats(),
+            "retry_scheduler": get_retry_scheduler().stats(),
+            "circuit_breakers": circuit_breaker_stats(),
+            "caches": cache_stats()
         }
     })
 
@@ -260,15 +311,7 @@ def health_check():
 def get_alert_rules():
     """获取所有告警规则"""
     try:
-        db_config = config.get_config_db_config()
-        conn = mysql.connector.connect(**db_config)
-        cursor = conn.cursor(dictionary=True)
-        
-        cursor.execute("SELECT * FROM alert_config ORDER BY id DESC")
-        rules = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
+        rules = get_storage().list_alert_configs()
         
         return jsonify({
             "code": 0,
@@ -292,44 +335,28 @@ def create_alert_rule():
             if field not in data:
                 return jsonify({"code": 400, "msg": f"缺少必填字段: {field}"}), 400
         
-        db_config = config.get_config_db_config()
-        conn = mysql.connector.connect(**db_config)
-        cursor = conn.cursor()
-        
         # 将users和label_rules转换为JSON字符串
-        users_json = json.dumps(data['users']) if isinstance(data['users'], list) else data['users']
-        label_rules_json = json.dumps(data.get('label_rules')) if data.get('label_rules') else None
-        
-        sql = """
-            INSERT INTO alert_config 
-            (group_id, users, alert_id, `rank`, alertmanager_url, project, remark, label_rules,
-             template_type, silence_type, grafana_url, oncall_sync, flashcat_schedule_id)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        
-        values = (
-            data['group_id'],
-            users_json,
-            data['alert_id'],
-            data['rank'],
-            data.get('alertmanager_url') or None,
-            data['project'],
-            data.get('remark'),
-            label_rules_json,
-            data.get('template_type', 'ops'),
-            data.get('silence_type', 'alertmanager'),
-            data.get('grafana_url') or None,
-            int(data.get('oncall_sync', 0)),
-            data.get('flashcat_schedule_id') or None
-        )
-        
-        cursor.execute(sql, values)
-        conn.commit()
-        
-        rule_id = cursor.lastrowid
+        users_json = jsoncodec.dumps(data['users']) if isinstance(data['users'], list) else data['users']
+        label_rules_json = jsoncodec.dumps(data.get('label_rules')) if data.get('label_rules') else None
+        
+        values = {
+            'group_id': data['group_id'],
+            'users': users_json,
+            'alert_id': data['alert_id'],
+            'rank': data['rank'],
+            'alertmanager_url': data.get('alertmanager_url') or None,
+            'project': data['project'],
+            'remark': data.get('remark'),
+            'label_rules': label_rules_json,
+            'template_type': data.get('template_type', 'ops'),
+            'silence_type': data.get('silence_type', 'alertmanager'),
+            'grafana_url': data.get('grafana_url') or None,
+            'oncall_sync': int(data.get('oncall_sync', 0)),
+            'flashcat_schedule_id': data.get('flashcat_schedule_id') or None,
+            'coalesce_window': int(data.get('coalesce_window') or 0),
+        }
         
-        cursor.close()
-        conn.close()
+        rule_id = get_storage().create_alert_config(values)
         
         return jsonify({
             "code": 0,
@@ -337,11 +364,9 @@ def create_alert_rule():
             "data": {"id": rule_id}
         })
         
-    except mysql.connector.Error as e:
-        if e.errno == 1062:  # 重复键错误
-            return jsonify({"code": 400, "msg": "alert_id已存在"}), 400
-        logger.error("创建告警规则失败: %s", e, exc_info=True)
-        return jsonify({"code": 500, "msg": str(e)}), 500
+    except DuplicateKeyError:
+        # 重复键错误
+        return jsonify({"code": 400, "msg": "alert_id已存在"}), 400
     except Exception as e:
         logger.error("创建告警规则失败: %s", e, exc_info=True)
         return jsonify({"code": 500, "msg": str(e)}), 500
@@ -353,65 +378,42 @@ def update_alert_rule(rule_id):
     try:
         data = flask_request.json
         
-        db_config = config.get_config_db_config()
-        conn = mysql.connector.connect(**db_config)
-        cursor = conn.cursor()
-        
-        # 构建更新SQL
-        update_fields = []
-        values = []
+        # 收集需要更新的字段
+        fields = {}
         
         if 'group_id' in data:
-            update_fields.append('group_id = %s')
-            values.append(data['group_id'])
+            fields['group_id'] = data['group_id']
         if 'users' in data:
-            update_fields.append('users = %s')
-            values.append(json.dumps(data['users']) if isinstance(data['users'], list) else data['users'])
+            fields['users'] = jsoncodec.dumps(data['users']) if isinstance(data['users'], list) else data['users']
         if 'alert_id' in data:
-            update_fields.append('alert_id = %s')
-            values.append(data['alert_id'])
+            fields['alert_id'] = data['alert_id']
         if 'rank' in data:
-            update_fields.append('`rank` = %s')
-            values.append(data['rank'])
+            fields['rank'] = data['rank']
         if 'alertmanager_url' in data:
-            update_fields.append('alertmanager_url = %s')
-            values.append(data['alertmanager_url'])
+            fields['alertmanager_url'] = data['alertmanager_url']
         if 'project' in data:
-            update_fields.append('project = %s')
-            values.append(data['project'])
+            fields['project'] = data['project']
         if 'remark' in data:
-            update_fields.append('remark = %s')
-            values.append(data['remark'])
+            fields['remark'] = data['remark']
         if 'label_rules' in data:
-            update_fields.append('label_rules = %s')
-            values.append(json.dumps(data['label_rules']) if data['label_rules'] else None)
+            fields['label_rules'] = jsoncodec.dumps(data['label_rules']) if data['label_rules'] else None
         if 'template_type' in data:
-            update_fields.append('template_type = %s')
-            values.append(data['template_type'])
+            fields['template_type'] = data['template_type']
         if 'silence_type' in data:
-            update_fields.append('silence_type = %s')
-            values.append(data['silence_type'])
+            fields['silence_type'] = data['silence_type']
         if 'grafana_url' in data:
-            update_fields.append('grafana_url = %s')
-            values.append(data.get('grafana_url') or None)
+            fields['grafana_url'] = data.get('grafana_url') or None
         if 'oncall_sync' in data:
-            update_fields.append('oncall_sync = %s')
-            values.append(int(data.get('oncall_sync', 0)))
+            fields['oncall_sync'] = int(data.get('oncall_sync', 0))
         if 'flashcat_schedule_id' in data:
-            update_fields.append('flashcat_schedule_id = %s')
-            values.append(data.get('flashcat_schedule_id') or None)
+            fields['flashcat_schedule_id'] = data.get('flashcat_schedule_id') or None
+        if 'coalesce_window' in data:
+            fields['coalesce_window'] = int(data.get('coalesce_window') or 0)
         
-        if not update_fields:
+        if not fields:
             return jsonify({"code": 400, "msg": "没有可更新的字段"}), 400
         
-        values.append(rule_id)
-        sql = f"UPDATE alert_config SET {', '.join(update_fields)} WHERE id = %s"
-        
-        cursor.execute(sql, values)
-        conn.commit()
-        
-        cursor.close()
-        conn.close()
+        get_storage().update_alert_config(rule_id, fields)
         
         return jsonify({
             "code": 0,
@@ -427,15 +429,7 @@ def update_alert_rule(rule_id):
 def delete_alert_rule(rule_id):
     """删除告警规则"""
     try:
-        db_config = config.get_config_db_config()
-        conn = mysql.connector.connect(**db_config)
-        cursor = conn.cursor()
-        
-        cursor.execute("DELETE FROM alert_config WHERE id = %s", (rule_id,))
-        conn.commit()
-        
-        cursor.close()
-        conn.close()
+        get_storage().delete_alert_config(rule_id)
         
         return jsonify({
             "code": 0,
@@ -457,13 +451,7 @@ def delete_alert_rule(rule_id):
 def list_feishu_users():
     """获取飞书用户列表"""
     try:
-        db_config = config.get_config_db_config()
-        conn = mysql.connector.connect(**db_config)
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT id, name, open_id, remark, created_at, updated_at FROM feishu_users ORDER BY id ASC")
-        rows = cursor.fetchall()
-        cursor.close()
-        conn.close()
+        rows = get_storage().list_feishu_users()
         for row in rows:
             if row.get("created_at"):
                 row["created_at"] = str(row["created_at"])
@@ -490,31 +478,25 @@ def create_feishu_users():
     items = data if isinstance(data, list) else [data]
 
     results = {"success": 0, "failed": 0, "errors": []}
+    rows = []
+    for item in items:
+        name = (item.get("name") or "").strip()
+        open_id = (item.get("open_id") or "").strip()
+        remark = (item.get("remark") or "").strip() or None
+        if not name or not open_id:
+            results["failed"] += 1
+            results["errors"].append(f"name/open_id 不能为空: {item}")
+            continue
+        rows.append((name, open_id, remark))
     try:
-        db_config = config.get_config_db_config()
-        conn = mysql.connector.connect(**db_config)
-        cursor = conn.cursor()
-        for item in items:
-            name = (item.get("name") or "").strip()
-            open_id = (item.get("open_id") or "").strip()
-            remark = (item.get("remark") or "").strip() or None
-            if not name or not open_id:
-                results["failed"] += 1
-                results["errors"].append(f"name/open_id 不能为空: {item}")
-                continue
-            try:
-                cursor.execute(
-                    "INSERT INTO feishu_users (name, open_id, remark) VALUES (%s, %s, %s) "
-                    "ON DUPLICATE KEY UPDATE open_id=VALUES(open_id), remark=VALUES(remark)",
-                    (name, open_id, remark),
-                )
-                results["success"] += 1
-            except Exception as row_err:
+        row_errors = get_storage().upsert_feishu_users(rows)
+        invalidate_oncall_users()
+        for (name, _, _), row_err in zip(rows, row_errors):
+            if row_err:
                 results["failed"] += 1
                 results["errors"].append(f"{name}: {row_err}")
-        conn.commit()
-        cursor.close()
-        conn.close()
+            else:
+                results["success"] += 1
     except Exception as e:
         logger.error("写入飞书用户失败: %s", e, exc_info=True)
         return jsonify({"code": 500, "msg": str(e)}), 500
@@ -526,22 +508,12 @@ def create_feishu_users():
 def update_feishu_user(user_id):
     """更新飞书用户"""
     data = flask_request.json or {}
-    fields, values = [], []
-    for col in ("name", "open_id", "remark"):
-        if col in data:
-            fields.append(f"{col} = %s")
-            values.append(data[col])
+    fields = {col: data[col] for col in ("name", "open_id", "remark") if col in data}
     if not fields:
         return jsonify({"code": 400, "msg": "没有可更新的字段"}), 400
-    values.append(user_id)
     try:
-        db_config = config.get_config_db_config()
-        conn = mysql.connector.connect(**db_config)
-        cursor = conn.cursor()
-        cursor.execute(f"UPDATE feishu_users SET {', '.join(fields)} WHERE id = %s", values)
-        conn.commit()
-        cursor.close()
-        conn.close()
+        get_storage().update_feishu_user(user_id, fields)
+        invalidate_oncall_users()
         return jsonify({"code": 0, "msg": "更新成功"})
     except Exception as e:
         logger.error("更新飞书用户失败: %s", e, exc_info=True)
@@ -552,13 +524,8 @@ def update_feishu_user(user_id):
 def delete_feishu_user(user_id):
     """删除飞书用户"""
     try:
-        db_config = config.get_config_db_config()
-        conn = mysql.connector.connect(**db_config)
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM feishu_users WHERE id = %s", (user_id,))
-        conn.commit()
-        cursor.close()
-        conn.close()
+        get_storage().delete_feishu_user(user_id)
+        invalidate_oncall_users()
         return jsonify({"code": 0, "msg": "删除成功"})
     except Exception as e:
         logger.error("删除飞书用户失败: %s", e, exc_info=True)
@@ -579,8 +546,8 @@ def _extract_alertnames_from_labels(alertlabels_json):
     if not alertlabels_json:
         return names
     try:
-        data = json.loads(alertlabels_json) if isinstance(alertlabels_json, str) else alertlabels_json
-    except (json.JSONDecodeError, TypeError):
+        data = jsoncodec.loads(alertlabels_json) if isinstance(alertlabels_json, str) else alertlabels_json
+    except (jsoncodec.JSONDecodeError, TypeError):
         return names
     for group in data.get('matchers', []):
         for m in group.get('matchers', []):
@@ -624,20 +591,9 @@ def alert_stats_top():
         start_iso = start_dt.strftime('%Y-%m-%d')
         end_iso = (end_dt + timedelta(days=1)).strftime('%Y-%m-%d')
 
-        db_config = config.get_config_db_config()
-        conn = mysql.connector.connect(**db_config)
-        cursor = conn.cursor(dictionary=True)
-
-        cursor.execute(
-            "SELECT id, alertlabels, project, alerttime "
-            "FROM alert_data "
-            "WHERE alerttime >= %s AND alerttime < %s "
-            "ORDER BY alerttime DESC",
-            (start_iso, end_iso)
+        rows = get_storage().list_alert_data_between(
+            start_iso, end_iso, ('id', 'alertlabels', 'project', 'alerttime')
         )
-        rows = cursor.fetchall()
-        cursor.close()
-        conn.close()
 
         # 在 Python 层聚合 alertname 计数
         stats = {}  # alertname -> count
@@ -700,23 +656,13 @@ def alert_stats_details():
         start_iso = start_dt.strftime('%Y-%m-%d')
         end_iso = (end_dt + timedelta(days=1)).strftime('%Y-%m-%d')
 
-        db_config = config.get_config_db_config()
-        conn = mysql.connector.connect(**db_config)
-        cursor = conn.cursor(dictionary=True)
-
-        # 先用 MySQL JSON_SEARCH 做粗筛：alertlabels 中包含 alertname 标签值匹配的记录
+        # 先在存储层按 alertname 粗筛（MySQL JSON_SEARCH / SQLite LIKE），
         # 再在 Python 层精确过滤
-        cursor.execute(
-            "SELECT id, alertlabels, project, alerttime, silenceid, group_id "
-            "FROM alert_data "
-            "WHERE alerttime >= %s AND alerttime < %s "
-            "AND JSON_SEARCH(alertlabels, 'one', %s, NULL, '$**.value') IS NOT NULL "
-            "ORDER BY alerttime DESC",
-            (start_iso, end_iso, alertname)
+        rows = get_storage().list_alert_data_between(
+            start_iso, end_iso,
+            ('id', 'alertlabels', 'project', 'alerttime', 'silenceid', 'group_id'),
+            alertname=alertname,
         )
-        rows = cursor.fetchall()
-        cursor.close()
-        conn.close()
 
         # 过滤出包含该 alertname 的记录，并提取完整标签
         details = []
@@ -729,8 +675,8 @@ def alert_stats_details():
             silence_ids = []
             if row.get('silenceid'):
                 try:
-                    silence_ids = json.loads(row['silenceid']) if isinstance(row['silenceid'], str) else row['silenceid']
-                except (json.JSONDecodeError, TypeError):
+                    silence_ids = jsoncodec.loads(row['silenceid']) if isinstance(row['silenceid'], str) else row['silenceid']
+                except (jsoncodec.JSONDecodeError, TypeError):
                     silence_ids = []
 
             details.append({
@@ -770,8 +716,8 @@ def _extract_all_labels(alertlabels_json, target_alertname=None):
     if not alertlabels_json:
         return None
     try:
-        data = json.loads(alertlabels_json) if isinstance(alertlabels_json, str) else alertlabels_json
-    except (json.JSONDecodeError, TypeError):
+        data = jsoncodec.loads(alertlabels_json) if isinstance(alertlabels_json, str) else alertlabels_json
+    except (jsoncodec.JSONDecodeError, TypeError):
         return None
 
     merged_labels = {}
@@ -822,6 +768,46 @@ def webhook_event():
     return jsonify(result), status_code
 
 
+def _shutdown_step(desc: str, fn, *args, **kwargs):
+    """执行一个退出步骤，失败只记录日志，不影响后续步骤"""
+    try:
+        fn(*args, **kwargs)
+    except Exception as e:
+        logger.error("退出时%s失败: %s", desc, e)
+
+
+def _shutdown(signum, frame):
+    """SIGTERM：排空告警队列、保存缓存快照后退出"""
+    logger.info("收到信号 %s，准备退出", signum)
+    ingest = get_alert_ingest()
+    if ingest:
+        _shutdown_step("排空告警队列", ingest.stop, timeout=10)
+    # 合并窗口中尚未发送的告警立即发出
+    _shutdown_step("发送合并窗口中的告警", flush_coalesced_alerts)
+    storm_guard = get_storm_guard()
+    if storm_guard:
+        _shutdown_step("发送告警风暴摘要", storm_guard.stop)
+    # 防抖中的卡片更新立即写入
+    _shutdown_step("写入待更新卡片", flush_open_cards)
+    silence_index = get_silence_index()
+    if silence_index:
+        _shutdown_step("停止静默同步", silence_index.stop)
+    oncall_cache = get_oncall_cache()
+    if oncall_cache:
+        _shutdown_step("停止值班缓存刷新", oncall_cache.stop)
+    # 等待进行中的回调 / 事件处理完成
+    _shutdown_step("停止重试调度", get_retry_scheduler().stop)
+    _shutdown_step("等待后台任务完成", get_task_executor().shutdown, timeout=10)
+    if config.CACHE_SNAPSHOT_PATH:
+        _shutdown_step("停止定时快照", stop_periodic_snapshot)
+        try:
+            count = save_snapshot(config.CACHE_SNAPSHOT_PATH)
+            logger.info("缓存快照已保存: %d 条", count)
+        except Exception as e:
+            logger.error("退出前保存缓存快照失败: %s", e)
+    sys.exit(0)
+
+
 if __name__ == "__main__":
     logger.info("=" * 60)
     logger.info("飞书Bot AlertBot 启动中...")
@@ -831,10 +817,13 @@ if __name__ == "__main__":
     
     # 显示配置信息
     logger.info("数据库配置:")
-    logger.info("  MySQL: %s:%s/%s", 
-                config.MYSQL_HOST, 
-                config.MYSQL_PORT, 
-                config.MYSQL_DATABASE)
+    if config.STORAGE_BACKEND == "sqlite":
+        logger.info("  SQLite: %s", config.SQLITE_PATH)
+    else:
+        logger.info("  MySQL: %s:%s/%s", 
+                    config.MYSQL_HOST, 
+                    config.MYSQL_PORT, 
+                    config.MYSQL_DATABASE)
     logger.info("=" * 60)
     
     logger.info("WEB界面:")
@@ -855,6 +844,25 @@ if __name__ == "__main__":
     logger.info("🎨 管理页面: http://%s:%s/", config.HOST, config.PORT)
     logger.info("=" * 60)
 
+    # 加载去重缓存快照（丢弃已过期条目），避免重启后 Grafana 重复投递变成新卡片
+    if config.CACHE_SNAPSHOT_PATH:
+        load_snapshot(config.CACHE_SNAPSHOT_PATH)
+        start_periodic_snapshot(config.CACHE_SNAPSHOT_PATH, config.CACHE_SNAPSHOT_INTERVAL)
+    signal.signal(signal.SIGTERM, _shutdown)
+
+    # 初始化去重存储（db 后端在此检查 alert_dedup 表，缺表时启动日志即报错）
+    get_dedup_store()
+
+    # 启动告警异步处理工作线程
+    ingest = get_alert_ingest()
+    if ingest:
+        ingest.start()
+
+    # 启动活跃静默同步
+    silence_index = get_silence_index()
+    if silence_index:
+        silence_index.start()
+
     # 启动飞书 WebSocket 长连接（守护线程，自动重连）
     start_ws_client_in_thread(config.APP_ID, config.APP_SECRET, feishu_client, debug=config.DEBUG)
 
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+告警合并窗口测试脚本
+检查 AlertCoalescer 的四种刷出方式：超时（后台线程）、满额、resolved 取出、退出时全部刷出，
+以及合并后同一 fingerprint 只保留最后到达的实例。
+
+用法:
+    python test/alert_coalescer_check.py
+"""
+
+import threading
+
+from check_utils import check, wait_until, run_checks  # 须先于项目模块导入（设置 sys.path）
+
+from alerts_format.alert_batch import AlertBatch
+from feishu_utils.alert_coalescer import AlertCoalescer
+
+
+def _batch(alertname, fingerprints, value='1'):
+    return AlertBatch.from_payload({
+        'status': 'firing',
+        'commonLabels': {'alertname': alertname},
+        'alerts': [{
+            'status': 'firing',
+            'labels': {'alertname': alertname, 'instance': fp},
+            'annotations': {'value': value},
+            'fingerprint': fp,
+        } for fp in fingerprints],
+    })
+
+
+class Recorder:
+    """记录刷出的合并批次"""
+
+    def __init__(self):
+        self.flushed = []
+        self.event = threading.Event()
+
+    def __call__(self, batch, dedup_entries, context):
+        self.flushed.append((batch, dedup_entries, context))
+        self.event.set()
+
+
+def run_suite() -> bool:
+    ok = True
+    recorder = Recorder()
+    coalescer = AlertCoalescer(recorder, max_alerts=5, workers=1)
+
+    ok &= check("首个子批次进入缓冲", coalescer.add('CPU', _batch('CPU', ['a']), 0.3, 2, 'k1', 'ctx') is None)
+    coalescer.add('CPU', _batch('CPU', ['b']), 0.3, 2, 'k2')
+    coalescer.add('CPU', _batch('CPU', ['a'], value='2'), 0.3, 2, 'k3')
+    ok &= check("窗口内不刷出", recorder.flushed == [])
+    ok &= check("超时后由后台线程刷出", wait_until(lambda: len(recorder.flushed) == 1), coalescer.stats())
+    if recorder.flushed:
+        batch, entries, context = recorder.flushed[0]
+        fingerprints = sorted(a.fingerprint for a in batch.alerts)
+        ok &= check("同一 fingerprint 只保留一条", fingerprints == ['a', 'b'], fingerprints)
+        latest = [a for a in batch.alerts if a.fingerprint == 'a']
+        ok &= check("保留最后到达的实例", latest and latest[0].raw['annotations']['value'] == '2')
+        ok &= check("去重 key 与上下文随批次传递", entries == ['k1', 'k2', 'k3'] and context == 'ctx',
+                    (entries, context))
+    ok &= check("节省卡片数 = (子批次数 - 1) × 路由数", coalescer.stats()["cards_saved"] == 4, coalescer.stats())
+
+    coalescer.add('Disk', _batch('Disk', ['d1', 'd2', 'd3']), 60, 1)
+    full = coalescer.add('Disk', _batch('Disk', ['d4', 'd5']), 60, 1)
+    ok &= check("满额时由调用方立即处理", full is not None and len(full[0].alerts) == 5)
+
+    coalescer.add('Mem', _batch('Mem', ['m1']), 60, 1)
+    taken = coalescer.take('Mem')
+    ok &= check("resolved 到达时取出缓冲", taken is not None and len(taken[0].alerts) == 1)
+    ok &= check("无缓冲时 take 返回 None", coalescer.take('Mem') is None)
+
+    coalescer.add('Net', _batch('Net', ['n1']), 60, 1)
+    coalescer.add('Io', _batch('Io', ['i1']), 60, 1)
+    ok &= check("退出时全部刷出", coalescer.flush_all() == 2 and len(recorder.flushed) == 3,
+                len(recorder.flushed))
+    ok &= check("刷出方式计数",
+                coalescer.stats()["flushes"] == {'timeout': 1, 'size': 1, 'resolved': 1, 'shutdown': 2},
+                coalescer.stats()["flushes"])
+    return ok
+
+
+if __name__ == "__main__":
+    run_checks("🧺 AlertCoalescer", run_suite)
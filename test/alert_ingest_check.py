@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+告警异步队列优先级与丢弃测试脚本
+单工作线程 + 闸门阻塞处理函数，检查 AlertIngestQueue 按优先级出队、队列已满时挤出
+低优先级告警、超过排队时长上限的低优先级告警被丢弃，以及高优先级告警永不丢弃。
+
+用法:
+    python test/alert_ingest_check.py
+"""
+
+import time
+import threading
+
+from check_utils import check, wait_until, run_checks  # 须先于项目模块导入（设置 sys.path）
+
+from feishu_utils.alert_ingest import AlertIngestQueue, payload_priority, PRIORITY_NAMES
+
+
+def _payload(severity, alertname='A'):
+    labels = {'severity': severity} if severity else {}
+    return {'commonLabels': {'alertname': alertname}, 'alerts': [{'labels': labels}]}
+
+
+class GatedHandler:
+    """处理函数替身：闸门打开前阻塞，记录处理顺序"""
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.order = []
+
+    def __call__(self, payload):
+        self.gate.wait(5)
+        self.order.append(payload['commonLabels']['alertname'])
+        return {}, 200
+
+
+def run_suite() -> bool:
+    ok = True
+    tiers = [PRIORITY_NAMES[payload_priority(_payload(s))] for s in ('phone', 'P1', 'warning', 'info', None)]
+    ok &= check("级别映射为优先级档位（未标注按 warning）",
+                tiers == ['urgent', 'critical', 'warning', 'info', 'warning'], tiers)
+
+    handler = GatedHandler()
+    queue = AlertIngestQueue(handler, maxsize=4, workers=1, age_budget=0, shed_priority='info')
+    queue.submit(_payload('info', 'busy'))
+    # 工作线程取走第一条后阻塞在闸门上，后续告警全部排队
+    wait_until(lambda: queue.depth() == 0)
+    for severity, name in (('info', 'i1'), ('warning', 'w1'), ('info', 'i2'), ('critical', 'c1')):
+        queue.submit(_payload(severity, name))
+    ok &= check("depth 返回排队数", queue.depth() == 4, queue.depth())
+
+    ok &= check("队列已满时挤出低优先级告警", queue.submit(_payload('phone', 'p1')) is True)
+    ok &= check("再次挤出剩余低优先级告警", queue.submit(_payload('warning', 'w2')) is True)
+    ok &= check("无可挤出告警时入队失败", queue.submit(_payload('warning', 'w3')) is False)
+    stats = queue.stats()
+    ok &= check("同级中最早入队的先被挤出", stats["shed_alertnames"] == {'i1': 1, 'i2': 1},
+                stats["shed_alertnames"])
+
+    handler.gate.set()
+    ok &= check("全部处理完毕", wait_until(lambda: len(handler.order) == 5), handler.order)
+    ok &= check("按优先级出队，同级先进先出", handler.order == ['busy', 'p1', 'c1', 'w1', 'w2'], handler.order)
+    queue.stop(2)
+
+    handler = GatedHandler()
+    queue = AlertIngestQueue(handler, maxsize=10, workers=1, age_budget=0.2, shed_priority='info')
+    queue.submit(_payload('critical', 'busy'))
+    wait_until(lambda: queue.depth() == 0)
+    queue.submit(_payload('info', 'stale'))
+    queue.submit(_payload('critical', 'urgent'))
+    time.sleep(0.3)
+    handler.gate.set()
+    ok &= check("超过排队时长的低优先级告警被丢弃",
+                wait_until(lambda: len(handler.order) == 2) and handler.order == ['busy', 'urgent']
+                and queue.stats()["shed"] == 1, (handler.order, queue.stats()["shed"]))
+    queue.stop(2)
+    ok &= check("停止后拒绝入队", queue.submit(_payload('phone')) is False)
+    return ok
+
+
+if __name__ == "__main__":
+    run_checks("📥 AlertIngestQueue", run_suite)
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+JSON 编解码基准测试脚本
+对比标准库 json（改造前各调用点的写法）与 common_utils.jsoncodec（当前后端）在热路径上的吞吐：
+
+- webhook 解析      : Grafana payload（N 条 alert）→ dict
+- 卡片渲染          : biz firing 卡片 dict → str（ensure_ascii=False）
+- alertlabels 入库  : matchers dict → str（ensure_ascii=True）
+- 卡片回调解析      : 卡片 JSON str → dict
+
+未安装 orjson 时 jsoncodec 回退标准库，两列结果应基本持平。
+
+用法:
+    python test/bench_json_codec.py
+    python test/bench_json_codec.py --alerts 50 --seconds 2
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common_utils import jsoncodec  # noqa: E402
+from alerts_format.alert_batch import AlertBatch  # noqa: E402
+from alerts_format.alert_json_format import extract_alert_raw, extract_grafana_urls  # noqa: E402
+from feishu_utils.alert_card_biz import build_biz_firing_card  # noqa: E402
+
+
+def build_payload(n: int) -> dict:
+    """构建含 n 条 alert 的 Grafana webhook payload"""
+    alerts = []
+    for i in range(n):
+        alerts.append({
+            "status": "firing",
+            "labels": {
+                "alertname": "GPU 利用率过高",
+                "tenant": "训练平台",
+                "severity": "warning",
+                "instance": f"10.0.{i // 250}.{i % 250}:9400",
+                "pod": f"trainer-{i}-7c9d5f8b6-x2k4p",
+                "namespace": "ml-train",
+                "model_name": "deepseek-v3",
+                "nvidia_com_gpu_product": "NVIDIA-H800",
+                "app_kubernetes_io_name": "trainer",
+            },
+            "annotations": {
+                "summary": f"GPU {i} 利用率持续 5 分钟超过 95%",
+                "description": "当前值 97.3%，请检查训练任务是否异常",
+            },
+            "startsAt": "2026-01-01T08:00:00+08:00",
+            "endsAt": "0001-01-01T00:00:00Z",
+            "generatorURL": f"https://grafana.example.com/alerting/grafana/abc{i}/view",
+            "fingerprint": f"{i:016x}",
+            "silenceURL": "https://grafana.example.com/alerting/silence/new",
+            "dashboardURL": "https://grafana.example.com/d/gpu",
+            "panelURL": "https://grafana.example.com/d/gpu?viewPanel=2",
+            "values": {"A": 97.3},
+        })
+    return {
+        "receiver": "feishu",
+        "status": "firing",
+        "alerts": alerts,
+        "groupLabels": {"alertname": "GPU 利用率过高"},
+        "commonLabels": {"alertname": "GPU 利用率过高", "tenant": "训练平台", "severity": "warning"},
+        "commonAnnotations": {},
+        "externalURL": "https://grafana.example.com/",
+        "version": "1",
+        "groupKey": "{}:{alertname=\"GPU 利用率过高\"}",
+        "truncatedAlerts": 0,
+    }
+
+
+def bench(func, seconds: float) -> float:
+    """在 seconds 内反复执行 func，返回每秒次数"""
+    func()
+    count = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while True:
+        for _ in range(20):
+            func()
+        count += 20
+        now = time.perf_counter()
+        if now >= deadline:
+            return count / (now - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="JSON 编解码基准测试")
+    parser.add_argument("--alerts", type=int, default=20, help="payload 中的 alert 数 (默认: 20)")
+    parser.add_argument("--seconds", type=float, default=1.0, help="每项测试时长 (默认: 1 秒)")
+    args = parser.parse_args()
+
+    payload = build_payload(args.alerts)
+    payload_bytes = json.dumps(payload).encode()
+    batch = AlertBatch.from_payload(payload)
+    card_str = build_biz_firing_card(
+        batch.alertname, "warning", extract_alert_raw(batch), extract_grafana_urls(batch),
+        "bench_maid", batch.common_labels_dict, [], None,
+    )
+    card = json.loads(card_str)
+    matchers = {"matchers": [{"matchers": [{"name": k, "value": v, "isRegex": False, "isEqual": True}
+                                           for k, v in a["labels"].items()]} for a in payload["alerts"]]}
+
+    cases = [
+        ("webhook 解析", lambda: json.loads(payload_bytes), lambda: jsoncodec.loads(payload_bytes)),
+        ("卡片渲染", lambda: json.dumps(card, ensure_ascii=False), lambda: jsoncodec.dumps(card)),
+        ("alertlabels 入库", lambda: json.dumps(matchers), lambda: jsoncodec.dumps(matchers, ensure_ascii=True)),
+        ("卡片回调解析", lambda: json.loads(card_str), lambda: jsoncodec.loads(card_str)),
+    ]
+
+    print("=" * 72)
+    print(f"📦 jsoncodec 后端: {jsoncodec.BACKEND}  |  payload {len(payload_bytes)} 字节 / "
+          f"{args.alerts} 条 alert  |  卡片 {len(card_str.encode())} 字节")
+    print("=" * 72)
+    print(f"{'场景':<16}{'标准库 (次/秒)':>16}{'jsoncodec (次/秒)':>20}{'加速比':>10}")
+    all_ok = True
+    for name, before, after in cases:
+        # 结果一致性校验：解码结果相同；编码结果解码后相同
+        same = (jsoncodec.loads(after()) == json.loads(before())) if isinstance(before(), str) else after() == before()
+        all_ok &= same
+        ops_before = bench(before, args.seconds)
+        ops_after = bench(after, args.seconds)
+        print(f"{name:<16}{ops_before:>16,.0f}{ops_after:>20,.0f}{ops_after / ops_before:>9.2f}x"
+              f"{'' if same else '  ❌ 结果不一致'}")
+
+    print()
+    print("✅ 结果一致" if all_ok else "❌ 存在结果不一致的场景")
+    sys.exit(0 if all_ok else 1)
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+检查脚本公共工具
+test/ 下各 *_check.py 脚本共用：导入时把仓库根目录加入 sys.path，
+并提供用例断言、可控时钟、条件等待与统一的运行入口。
+
+用法（在检查脚本中，先于项目模块导入）:
+    from check_utils import check, run_checks
+"""
+
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def check(name, cond, detail=None) -> bool:
+    """打印单条用例结果，失败时附带 detail"""
+    print(f"  {'✅' if cond else '❌'} {name}{'' if cond else f'  {detail}'}")
+    return bool(cond)
+
+
+def wait_until(cond, timeout: float = 3.0) -> bool:
+    """轮询等待 cond() 为真（后台线程 / 定时器相关用例）"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if cond():
+            return True
+        time.sleep(0.02)
+    return cond()
+
+
+class FakeClock:
+    """可手动推进的单调时钟，传给模块的 clock 参数"""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+def section(title: str) -> None:
+    print("=" * 60)
+    print(title)
+    print("=" * 60)
+
+
+def run_checks(title: str, suite, *args) -> None:
+    """执行 suite(*args)（返回是否全部通过），打印汇总并以退出码结束进程"""
+    section(title)
+    ok = suite(*args)
+    print()
+    print("✅ 全部通过" if ok else "❌ 存在失败用例")
+    sys.exit(0 if ok else 1)
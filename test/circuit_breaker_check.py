@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+熔断器与并发隔离测试脚本
+使用可控时钟驱动 CircuitBreaker，检查 关闭 → 打开 → 半开 → 关闭 / 重新打开 的状态迁移、
+慢调用熔断、非网络异常不计失败，以及 Bulkhead 并发已满时的拒绝。
+
+用法:
+    python test/circuit_breaker_check.py
+"""
+
+import threading
+
+import requests
+
+from check_utils import check, FakeClock, run_checks  # 须先于项目模块导入（设置 sys.path）
+
+from common_utils.circuit_breaker import (
+    CircuitBreaker, Bulkhead, CircuitOpenError, BulkheadFullError, CLOSED, OPEN, HALF_OPEN,
+)
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+def _fail():
+    raise requests.exceptions.ConnectionError("connection refused")
+
+
+def _call(breaker, fn):
+    """调用并吞掉异常，返回异常类型（成功返回 None）"""
+    try:
+        breaker.call(fn)
+    except Exception as e:
+        return type(e)
+    return None
+
+
+def run_suite() -> bool:
+    clock = FakeClock()
+    breaker = CircuitBreaker('check', window=4, min_calls=4, failure_rate=0.5, slow_call_seconds=5,
+                             slow_call_rate=0, open_seconds=30, half_open_probes=2, clock=clock)
+    ok = True
+
+    for _ in range(3):
+        _call(breaker, _fail)
+    ok &= check("调用数不足 min_calls 时不打开", breaker.state == CLOSED, breaker.stats())
+    _call(breaker, lambda: FakeResponse(200))
+    ok &= check("失败率达到阈值后打开", breaker.state == OPEN, breaker.stats())
+    ok &= check("打开期间直接失败", _call(breaker, lambda: FakeResponse(200)) is CircuitOpenError)
+
+    clock.now += 30
+    ok &= check("open_seconds 后进入半开", breaker.state == HALF_OPEN)
+    ok &= check("半开探测失败重新打开", _call(breaker, _fail) is requests.exceptions.ConnectionError
+                and breaker.state == OPEN, breaker.stats())
+
+    clock.now += 30
+    ok &= check("第一个探测成功后仍为半开",
+                _call(breaker, lambda: FakeResponse(200)) is None and breaker.state == HALF_OPEN)
+    ok &= check("全部探测成功后关闭",
+                _call(breaker, lambda: FakeResponse(204)) is None and breaker.state == CLOSED, breaker.stats())
+    ok &= check("关闭后窗口清空", breaker.stats()["window_calls"] == 0, breaker.stats())
+
+    for _ in range(4):
+        _call(breaker, lambda: FakeResponse(503))
+    ok &= check("5xx 计为失败", breaker.state == OPEN, breaker.stats())
+
+    lenient = CircuitBreaker('lenient', window=4, min_calls=2, failure_rate=0.5, clock=clock)
+    for _ in range(4):
+        _call(lenient, lambda: 1 / 0)
+    ok &= check("非网络异常不计为失败", lenient.state == CLOSED, lenient.stats())
+
+    slow = CircuitBreaker('slow', window=4, min_calls=2, failure_rate=1, slow_call_seconds=5,
+                          slow_call_rate=0.5, clock=clock)
+
+    def slow_call():
+        clock.now += 6
+        return FakeResponse(200)
+
+    _call(slow, slow_call)
+    _call(slow, slow_call)
+    ok &= check("慢调用比例达到阈值后打开", slow.state == OPEN, slow.stats())
+
+    bulkhead = Bulkhead('check', 1, wait=0)
+    guarded = CircuitBreaker('guarded', bulkhead=bulkhead, clock=clock)
+    entered, release = threading.Event(), threading.Event()
+
+    def hold():
+        entered.set()
+        release.wait(2)
+        return FakeResponse(200)
+
+    worker = threading.Thread(target=guarded.call, args=(hold,))
+    worker.start()
+    entered.wait(2)
+    ok &= check("并发已满时拒绝", _call(guarded, lambda: FakeResponse(200)) is BulkheadFullError)
+    release.set()
+    worker.join()
+    ok &= check("释放后恢复放行", _call(guarded, lambda: FakeResponse(200)) is None)
+    ok &= check("并发隔离计数", bulkhead.stats() == {"limit": 1, "active": 0, "rejected": 1}, bulkhead.stats())
+    return ok
+
+
+if __name__ == "__main__":
+    run_checks("⚡ CircuitBreaker / Bulkhead", run_suite)
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+告警去重存储一致性测试脚本
+对 memory / db(SQLite|MySQL) / redis 三类 DedupStore 执行同一组用例，
+并模拟两个副本共享同一后端时同一告警只被占用一次。
+
+redis 后端默认使用本地 FakeRedis（实现 SET NX PX / DEL / pipeline），无需真实 Redis；
+传 --redis-url 时连接真实 Redis（需安装 redis 包）。
+
+用法:
+    python test/dedup_store_check.py
+    python test/dedup_store_check.py --backend db --storage mysql
+    python test/dedup_store_check.py --backend redis --redis-url redis://localhost:6379/0
+"""
+
+import os
+import sys
+import time
+import uuid
+import argparse
+import tempfile
+import threading
+
+from check_utils import check, section  # 须先于项目模块导入（设置 sys.path）
+
+from alerts_format.storage import SQLiteStorage, MySQLStorage
+from alerts_format.dedup_store import (
+    MemoryDedupStore, DatabaseDedupStore, RedisDedupStore,
+)
+
+
+class FakeRedis:
+    """进程内 Redis 替身，仅实现去重存储用到的命令"""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+        self.round_trips = 0
+
+    def _alive(self, key, now):
+        entry = self._data.get(key)
+        if entry and entry[1] <= now:
+            del self._data[key]
+            return None
+        return entry
+
+    def _set(self, key, value, nx=False, px=None):
+        now = time.monotonic()
+        if nx and self._alive(key, now):
+            return None
+        self._data[key] = (value, now + px / 1000 if px else float('inf'))
+        return True
+
+    def set(self, key, value, nx=False, px=None):
+        with self._lock:
+            self.round_trips += 1
+            return self._set(key, value, nx, px)
+
+    def delete(self, *keys):
+        with self._lock:
+            self.round_trips += 1
+            return sum(1 for k in keys if self._data.pop(k, None) is not None)
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+
+class _FakePipeline:
+    def __init__(self, client: FakeRedis):
+        self._client = client
+        self._commands = []
+
+    def set(self, key, value, nx=False, px=None):
+        self._commands.append((key, value, nx, px))
+        return self
+
+    def execute(self):
+        with self._client._lock:
+            self._client.round_trips += 1
+            return [self._client._set(*cmd) for cmd in self._commands]
+
+
+def run_suite(make_store) -> bool:
+    """make_store() 每次调用返回一个共享同一后端的新实例（模拟一个副本）"""
+    replica_a, replica_b = make_store(), make_store()
+    ns = f"t{uuid.uuid4().hex[:6]}"
+    ok = True
+
+    ok &= check("首次占用返回不重复", replica_a.check_and_set(ns, "k1", 60) is False)
+    ok &= check("同副本再次占用返回重复", replica_a.check_and_set(ns, "k1", 60) is True)
+    ok &= check("不同命名空间互不影响", replica_a.check_and_set(ns + "x", "k1", 60) is False)
+
+    result = replica_a.check_and_set_many([(ns, "k1", 60), (ns, "k2", 60), (ns, "k2", 60), (ns, "k3", 60)])
+    ok &= check("批量占用（含批内重复）", result == [True, False, True, False], result)
+
+    replica_a.evict_many([(ns, "k2"), (ns, ""), (ns, "missing")])
+    ok &= check("批量撤销后可再次占用", replica_a.check_and_set(ns, "k2", 60) is False)
+
+    ok &= check("短 TTL 过期前重复", replica_a.check_and_set(ns, "short", 1) is False
+                and replica_a.check_and_set(ns, "short", 1) is True)
+    time.sleep(1.2)
+    ok &= check("短 TTL 过期后可再次占用", replica_a.check_and_set(ns, "short", 1) is False)
+
+    shared = replica_a.name != 'memory'
+    if shared:
+        # 两个副本并发争抢同一批 key，每个 key 只能被占用一次
+        keys = [f"race{i}" for i in range(50)]
+        results = {}
+
+        def claim(name, store):
+            results[name] = store.check_and_set_many([(ns, k, 60) for k in keys])
+
+        threads = [threading.Thread(target=claim, args=(n, s)) for n, s in (("a", replica_a), ("b", replica_b))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        winners = [(not a) + (not b) for a, b in zip(results["a"], results["b"])]
+        ok &= check("双副本并发占用：每个 key 恰好一个副本成功", all(w == 1 for w in winners), winners)
+        ok &= check("副本 B 撤销后副本 A 可重新占用",
+                    (replica_b.evict(ns, "race0"), replica_a.check_and_set(ns, "race0", 60))[1] is False)
+
+    ok &= check("统计信息", replica_a.stats()["checks"] > 0, replica_a.stats())
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="告警去重存储一致性测试")
+    parser.add_argument("--backend", choices=["memory", "db", "redis", "all"], default="all",
+                        help="测试的去重后端 (默认: all)")
+    parser.add_argument("--storage", choices=["sqlite", "mysql"], default="sqlite",
+                        help="db 后端使用的存储 (默认: sqlite 临时库)")
+    parser.add_argument("--redis-url", default="", help="真实 Redis 地址（留空使用 FakeRedis）")
+    args = parser.parse_args()
+
+    backends = ["memory", "db", "redis"] if args.backend == "all" else [args.backend]
+    all_ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in backends:
+            section(f"📦 去重后端: {backend}")
+            if backend == "memory":
+                memory = MemoryDedupStore(maxsize=1000)
+                all_ok &= run_suite(lambda: memory)
+            elif backend == "db":
+                storage = SQLiteStorage(os.path.join(tmp, "dedup.db")) if args.storage == "sqlite" else MySQLStorage()
+                all_ok &= run_suite(lambda: DatabaseDedupStore(storage))
+            else:
+                if args.redis_url:
+                    import redis
+                    client = redis.Redis.from_url(args.redis_url)
+                else:
+                    client = FakeRedis()
+                all_ok &= run_suite(lambda: RedisDedupStore(client=client, prefix="alertbot:test:"))
+                if isinstance(client, FakeRedis):
+                    print(f"  ℹ️  FakeRedis 往返次数: {client.round_trips}")
+            print()
+
+    print("✅ 全部通过" if all_ok else "❌ 存在失败用例")
+    sys.exit(0 if all_ok else 1)
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+告警抖动检测测试脚本
+使用可控时钟驱动 FlapDetector，检查切换计分、滞回阈值与停止切换后的分数衰减。
+
+用法:
+    python test/flap_detector_check.py
+"""
+
+from check_utils import check, FakeClock, run_checks  # 须先于项目模块导入（设置 sys.path）
+
+from feishu_utils.flap_detector import FlapDetector
+
+
+def run_suite() -> bool:
+    clock = FakeClock()
+    detector = FlapDetector(threshold=3, window=600, max_entries=100, clock=clock)
+    ok = True
+
+    ok &= check("首次出现不计为抖动", detector.observe([("fp1", "firing")], "A") == set())
+    ok &= check("重复投递不计为切换",
+                detector.observe([("fp1", "firing")], "A") == set() and detector.stats()["transitions"] == 0)
+
+    status = "firing"
+    flapping = set()
+    for _ in range(4):
+        clock.now += 10
+        status = "resolved" if status == "firing" else "firing"
+        flapping = detector.observe([("fp1", status)], "A")
+    ok &= check("窗口内频繁切换进入抖动状态", flapping == {"fp1"}, detector.stats())
+    ok &= check("其他 fingerprint 不受影响", detector.observe([("fp2", "firing")], "B") == set())
+
+    # 停止切换：同一状态持续投递，分数随时间线性衰减后退出抖动
+    clock.now += 200
+    ok &= check("衰减未过半阈值时仍在抖动", detector.observe([("fp1", status)], "A") == {"fp1"})
+    clock.now += 250
+    ok &= check("停止切换后重复投递即可退出抖动", detector.observe([("fp1", status)], "A") == set(),
+                detector.stats())
+    ok &= check("退出计数", detector.stats()["flap_ends"] == 1, detector.stats())
+
+    clock.now += 10
+    status = "resolved" if status == "firing" else "firing"
+    ok &= check("退出后单次切换不会重新进入抖动", detector.observe([("fp1", status)], "A") == set())
+
+    small = FlapDetector(threshold=3, window=600, max_entries=2, clock=clock)
+    small.observe([("a", "firing"), ("b", "firing"), ("c", "firing")])
+    ok &= check("超出上限按 LRU 淘汰", small.stats()["tracked"] == 2, small.stats())
+    return ok
+
+
+if __name__ == "__main__":
+    run_checks("🔁 FlapDetector", run_suite)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+oncall 名单缓存测试脚本
+使用可控时钟与 Flashcat / feishu_users 替身驱动 OncallCache，检查缓存命中不发请求、
+过期前后台刷新、Flashcat 不可用时沿用过期名单且不重复请求、姓名映射失效后重新查库。
+
+用法:
+    python test/oncall_cache_check.py
+"""
+
+from check_utils import check, FakeClock, wait_until, run_checks  # 须先于项目模块导入（设置 sys.path）
+
+from alerts_format.oncall_cache import OncallCache
+
+
+class FakeFlashcat:
+    """fetch(app_key, schedule_id) → (names, ends_at)，down 时返回 None"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.calls = 0
+        self.down = False
+        self.names = ['alice', 'bob']
+        self.ends_at = clock.now + 600
+
+    def __call__(self, app_key, schedule_id):
+        self.calls += 1
+        return None if self.down else (list(self.names), self.ends_at)
+
+
+class FakeUsers:
+    """lookup(names) → {name: open_id}，不在表中的姓名不返回"""
+
+    def __init__(self):
+        self.lookups = []
+        self.table = {'alice': 'ou_alice', 'bob': 'ou_bob', 'carol': 'ou_carol'}
+
+    def __call__(self, names):
+        self.lookups.append(sorted(names))
+        return {name: self.table[name] for name in names if name in self.table}
+
+
+def run_suite() -> bool:
+    clock = FakeClock()
+    flashcat = FakeFlashcat(clock)
+    users = FakeUsers()
+    cache = OncallCache(max_ttl=3600, lead=60, fetch=flashcat, lookup=users, clock=clock)
+    ok = True
+
+    ok &= check("首次查询同步拉取", cache.open_ids('key', 1) == ['ou_alice', 'ou_bob'] and flashcat.calls == 1)
+    ok &= check("命中缓存不请求 Flashcat、不查库",
+                cache.open_ids('key', 1) == ['ou_alice', 'ou_bob'] and flashcat.calls == 1
+                and len(users.lookups) == 1, (flashcat.calls, users.lookups))
+
+    # 班次结束前 lead 秒内由后台线程刷新
+    flashcat.names, flashcat.ends_at = ['carol', 'dave'], clock.now + 1800
+    clock.advance(550)
+    cache._wake.set()
+    ok &= check("过期前后台刷新", wait_until(lambda: flashcat.calls == 2), flashcat.calls)
+    ok &= check("刷新后返回新名单（不在表中的姓名跳过）", cache.open_ids('key', 1) == ['ou_carol'])
+
+    flashcat.down = True
+    clock.advance(1800)
+    cache._wake.set()
+    ok &= check("Flashcat 不可用时后台刷新失败", wait_until(lambda: flashcat.calls == 3), flashcat.calls)
+    ok &= check("沿用过期名单", cache.open_ids('key', 1) == ['ou_carol'])
+    ok &= check("重试间隔内不重复请求", flashcat.calls == 3 and cache.stats()["stale_hits"] >= 1, cache.stats())
+
+    users.table['dave'] = 'ou_dave'
+    ok &= check("姓名映射已缓存（含不在表中的姓名）", cache.open_ids('key', 1) == ['ou_carol'])
+    cache.invalidate_users()
+    ok &= check("feishu_users 变更后重新查库", cache.open_ids('key', 1) == ['ou_carol', 'ou_dave']
+                and users.lookups[-1] == ['carol', 'dave'], users.lookups)
+    cache.stop()
+    return ok
+
+
+if __name__ == "__main__":
+    run_checks("📇 OncallCache", run_suite)
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+未恢复告警卡片跟踪测试脚本
+使用临时 SQLite 存储与记录调用的飞书客户端替身，检查 OpenCardTracker 的
+并入、防抖写入、flush_all（进程退出）与 release（卡片被静默）。
+
+用法:
+    python test/open_cards_check.py
+"""
+
+import os
+import tempfile
+
+from check_utils import check, run_checks  # 须先于项目模块导入（设置 sys.path）
+
+from alerts_format.storage import SQLiteStorage, set_storage
+from alerts_format.alert_batch import AlertBatch
+from feishu_utils.open_cards import OpenCardTracker
+
+
+class FakeFeishuClient:
+    """记录 patch_message 调用"""
+
+    def __init__(self):
+        self.patches = []
+
+    def patch_message(self, message_id, content):
+        self.patches.append(message_id)
+
+
+def _batch(alertname, fingerprints, status='firing'):
+    return AlertBatch.from_payload({
+        'status': status,
+        'commonLabels': {'alertname': alertname, 'team': 'ops'},
+        'alerts': [{
+            'status': status,
+            'labels': {'alertname': alertname, 'team': 'ops', 'severity': 'warning', 'instance': fp},
+            'annotations': {},
+            'startsAt': '2026-01-01T00:00:00Z',
+            'endsAt': '0001-01-01T00:00:00Z',
+            'fingerprint': fp,
+        } for fp in fingerprints],
+    })
+
+
+def run_suite() -> bool:
+    client = FakeFeishuClient()
+    # 防抖足够长，写入只会由 flush_all / release 触发
+    tracker = OpenCardTracker(lambda severities: 'warning', debounce=3600, ttl=3600)
+    ok = True
+
+    ok &= check("无未恢复卡片时不并入", tracker.merge('CPU', 'oc_a', _batch('CPU', ['fp1'])) == '')
+    tracker.open('CPU', 'oc_a', 'maid-a', 'om_a', client, _batch('CPU', ['fp1']), {}, [], '2026-01-01 00:00:00')
+    tracker.open('Disk', 'oc_b', 'maid-b', 'om_b', client, _batch('Disk', ['fp9']), {}, [], '2026-01-01 00:00:00')
+
+    ok &= check("新实例并入已有卡片", tracker.merge('CPU', 'oc_a', _batch('CPU', ['fp2'])) == 'om_a')
+    ok &= check("其他群组不并入", tracker.merge('CPU', 'oc_x', _batch('CPU', ['fp3'])) == '')
+    ok &= check("防抖期内不写入", client.patches == [], client.patches)
+    ok &= check("未恢复实例过滤", tracker.still_firing('CPU', 'oc_a', ['fp1', 'fp2']) == ['fp1', 'fp2'])
+
+    ok &= check("flush_all 只写入有变更的卡片", tracker.flush_all() == 1 and client.patches == ['om_a'],
+                client.patches)
+    ok &= check("flush_all 后无待写入", tracker.flush_all() == 0)
+
+    tracker.merge('Disk', 'oc_b', _batch('Disk', ['fp10']))
+    tracker.release('om_b')
+    ok &= check("release 先写入未写变更", client.patches == ['om_a', 'om_b'], client.patches)
+    ok &= check("release 后不再并入", tracker.merge('Disk', 'oc_b', _batch('Disk', ['fp11'])) == '')
+    tracker.release('om_unknown')
+
+    tracker.merge('CPU', 'oc_a', _batch('CPU', ['fp1', 'fp2'], status='resolved'))
+    ok &= check("恢复实例从 still_firing 中剔除", tracker.still_firing('CPU', 'oc_a', ['fp1', 'fp2']) == [])
+    tracker.close('CPU', 'oc_a')
+    ok &= check("close 后不再跟踪", tracker.stats()["open_cards"] == 0, tracker.stats())
+    return ok
+
+
+def run_with_storage() -> bool:
+    with tempfile.TemporaryDirectory() as tmp:
+        set_storage(SQLiteStorage(os.path.join(tmp, 'open_cards.db')))
+        return run_suite()
+
+
+if __name__ == "__main__":
+    run_checks("🗂  OpenCardTracker", run_with_storage)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+电话告警 incident 去重测试脚本
+使用记录调用的创建函数替身驱动 PhoneIncidentTracker，检查同一批告警只创建一次、
+实例恢复后再次触发重新创建，以及创建失败不占用去重窗口。
+
+用法:
+    python test/phone_incidents_check.py
+"""
+
+import threading
+
+from check_utils import check, wait_until, run_checks  # 须先于项目模块导入（设置 sys.path）
+
+from alerts_format.alert_batch import AlertBatch
+from feishu_utils.phone_incidents import PhoneIncidentTracker
+
+
+def _batch(alertname, fingerprints, status='firing'):
+    return AlertBatch.from_payload({
+        'status': status,
+        'commonLabels': {'alertname': alertname},
+        'alerts': [{
+            'status': status,
+            'labels': {'alertname': alertname, 'instance': fp},
+            'annotations': {},
+            'fingerprint': fp,
+        } for fp in fingerprints],
+    })
+
+
+class FakeCreate:
+    """create(payload) → incident_id，fail 时返回空串"""
+
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+        self.lock = threading.Lock()
+
+    def __call__(self, payload):
+        with self.lock:
+            self.calls += 1
+            return '' if self.fail else f"inc-{self.calls}"
+
+
+def run_suite() -> bool:
+    create = FakeCreate()
+    tracker = PhoneIncidentTracker(create, ttl=600)
+    ok = True
+
+    first = tracker.start('Down', _batch('Down', ['a', 'b']))
+    ok &= check("首次触发创建 incident", wait_until(lambda: first.done) and first.incident_id == 'inc-1',
+                first.incident_id)
+    again = tracker.start('Down', _batch('Down', ['b', 'a']))
+    ok &= check("同一批告警复用 incident", again is first and create.calls == 1, create.calls)
+    ok &= check("其他告警不受影响", tracker.forget('Other', ['a']) == 0 and tracker.stats()["tracked"] == 1)
+
+    ok &= check("恢复时清除 incident", tracker.forget('Down', ['a']) == 1 and tracker.stats()["tracked"] == 0,
+                tracker.stats())
+    refired = tracker.start('Down', _batch('Down', ['a', 'b']))
+    ok &= check("恢复后再次触发重新创建", wait_until(lambda: refired.done)
+                and refired is not first and refired.incident_id == 'inc-2', refired.incident_id)
+
+    create.fail = True
+    failed = tracker.start('Disk', _batch('Disk', ['d1']))
+    ok &= check("创建失败", wait_until(lambda: failed.done) and failed.incident_id == '')
+    ok &= check("创建失败不占用去重窗口", tracker.stats()["tracked"] == 1, tracker.stats())
+    create.fail = False
+    retried = tracker.start('Disk', _batch('Disk', ['d1']))
+    ok &= check("失败后同一批告警重新创建", wait_until(lambda: retried.done)
+                and retried.incident_id == 'inc-4' and create.calls == 4, create.calls)
+    ok &= check("计数", tracker.stats()["created"] == 3 and tracker.stats()["failed"] == 1
+                and tracker.stats()["deduplicated"] == 1, tracker.stats())
+    return ok
+
+
+if __name__ == "__main__":
+    run_checks("📞 PhoneIncidentTracker", run_suite)
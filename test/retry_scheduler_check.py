@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+延迟重试调度器测试脚本
+使用小刻度时间轮与真实后台执行器，检查退避重试、次数用尽、执行器拒绝延后，
+以及各阶段取消：待重试时取消、到期执行中取消、被新的 run 取代。
+
+用法:
+    python test/retry_scheduler_check.py
+"""
+
+import time
+import threading
+
+from check_utils import check, wait_until, run_checks  # 须先于项目模块导入（设置 sys.path）
+
+from common_utils.executor import BoundedExecutor
+from common_utils.retry_scheduler import RetryScheduler
+from common_utils.ttl_cache import TTLCache
+
+
+def run_suite() -> bool:
+    executor = BoundedExecutor('retry-check', 4, 100)
+    scheduler = RetryScheduler(submit=executor.submit, attempts=TTLCache(60), tick=0.02, slots=8)
+    ok = True
+
+    calls = []
+    ok &= check("首次失败返回 False",
+                scheduler.run('t', 'flaky', lambda: calls.append(1) or len(calls) >= 3, base_delay=0.05) is False)
+    ok &= check("退避重试直到成功", wait_until(lambda: len(calls) == 3), calls)
+
+    gave_up = []
+    scheduler.run('t', 'broken', lambda: 1 / 0, on_give_up=gave_up.append, max_attempts=2, base_delay=0.05)
+    ok &= check("次数用尽调用 on_give_up", wait_until(lambda: len(gave_up) == 1)
+                and isinstance(gave_up[0], ZeroDivisionError), gave_up)
+
+    pending = []
+    scheduler.run('t', 'pending', lambda: pending.append(1) and False, base_delay=0.2)
+    ok &= check("取消待重试任务", scheduler.cancel('t', 'pending') is True)
+    time.sleep(0.4)
+    ok &= check("待重试任务取消后不再执行", pending == [1], pending)
+
+    # 到期任务在执行器中运行时被取消：本次结束后不再登记重试
+    started, release, running = threading.Event(), threading.Event(), []
+
+    def slow():
+        running.append(1)
+        if len(running) > 1:
+            started.set()
+            release.wait(2)
+        return False
+
+    scheduler.run('t', 'inflight', slow, base_delay=0.05, max_attempts=5)
+    ok &= check("重试已开始执行", started.wait(2))
+    ok &= check("执行中的任务可取消", scheduler.cancel('t', 'inflight') is True)
+    release.set()
+    time.sleep(0.4)
+    ok &= check("执行中取消后不再重试", len(running) == 2, running)
+
+    # 被新的 run 取代：旧重试到期后不再调用旧 fn
+    old, new = [], []
+    scheduler.run('t', 'replaced', lambda: old.append(1) and False, base_delay=0.1)
+    scheduler.run('t', 'replaced', lambda: new.append(1) or True)
+    time.sleep(0.4)
+    ok &= check("被取代的旧任务不再执行", old == [1] and new == [1], (old, new))
+
+    ok &= check("结束后无待重试任务", scheduler.stats()["depth"] == 0, scheduler.stats())
+
+    stopped = []
+    scheduler.run('t', 'stopped', lambda: stopped.append(1) and False, base_delay=0.2)
+    ok &= check("stop 丢弃待重试任务", scheduler.stop() == 1)
+    time.sleep(0.4)
+    ok &= check("stop 后不再执行", stopped == [1], stopped)
+    executor.shutdown(timeout=2)
+    return ok
+
+
+if __name__ == "__main__":
+    run_checks("🔁 RetryScheduler", run_suite)
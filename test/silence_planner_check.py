@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+静默 matchers 最小化测试脚本
+随机生成多维 label 组合，检查 plan_silences 生成的覆盖静默恰好匹配原有实例：
+不漏匹配任何实例，也不多匹配实例之外的任何 label 组合。
+
+用法:
+    python test/silence_planner_check.py
+    python test/silence_planner_check.py --trials 2000 --seed 7
+"""
+
+import re
+import random
+import argparse
+import itertools
+
+from check_utils import check, run_checks  # 须先于项目模块导入（设置 sys.path）
+
+from alerts_format.silence_planner import plan_silences
+
+
+def _instance(labels: dict) -> dict:
+    return {'matchers': [{'name': k, 'value': v, 'isRegex': False, 'isEqual': True} for k, v in labels.items()]}
+
+
+def _matches(silence: list, labels: dict) -> bool:
+    """按 Alertmanager 语义判断静默是否匹配（正则全量锚定，缺失 label 视为空串）"""
+    for m in silence:
+        value = labels.get(m['name'], '')
+        if m['isRegex']:
+            if not re.fullmatch(m['value'], value):
+                return False
+        elif value != m['value']:
+            return False
+    return True
+
+
+def run_suite(trials: int, seed: int) -> bool:
+    rng = random.Random(seed)
+    ok = True
+
+    mismatch = None
+    for trial in range(trials):
+        dims = {d: [f'{d}{i}' for i in range(rng.randint(1, 4))] for d in 'abcd'}
+        universe = [dict(zip(dims, combo), alertname='X') for combo in itertools.product(*dims.values())]
+        chosen = rng.sample(universe, rng.randint(1, len(universe)))
+        plan = plan_silences([_instance(c) for c in chosen], max_values=rng.choice([1, 2, 100]))
+        for labels in universe:
+            if any(_matches(s, labels) for s in plan) != (labels in chosen):
+                mismatch = (trial, labels)
+                break
+        if mismatch:
+            break
+    ok &= check(f"随机组合覆盖恰好等于原实例（{trials} 轮）", mismatch is None, mismatch)
+
+    pods = [_instance({'alertname': 'PodDown', 'pod': f'web-{i}.x|(y)'}) for i in range(50)]
+    plan = plan_silences(pods, max_values=100)
+    ok &= check("单维度差异合并为一条正则静默", len(plan) == 1, len(plan))
+    ok &= check("正则元字符按字面匹配",
+                _matches(plan[0], {'alertname': 'PodDown', 'pod': 'web-3.x|(y)'})
+                and not _matches(plan[0], {'alertname': 'PodDown', 'pod': 'web-3axy'}))
+    ok &= check("取值数超过上限时拆分", len(plan_silences(pods, max_values=20)) == 3)
+
+    duplicated = plan_silences([_instance({'alertname': 'A', 'pod': 'p1'})] * 3)
+    ok &= check("重复实例只生成一条静默", len(duplicated) == 1, duplicated)
+
+    regex = {'matchers': [{'name': 'pod', 'value': 'p.*', 'isRegex': True, 'isEqual': True}]}
+    planned = plan_silences([regex, _instance({'alertname': 'A', 'pod': 'p1'})])
+    ok &= check("非精确匹配的 matchers 原样保留", regex['matchers'] in planned, planned)
+
+    mixed = plan_silences([_instance({'alertname': 'A', 'pod': 'p1'}),
+                           _instance({'alertname': 'A', 'pod': 'p2', 'node': 'n1'})])
+    ok &= check("label 名集合不同的实例不合并", len(mixed) == 2, mixed)
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="静默 matchers 最小化测试")
+    parser.add_argument("--trials", type=int, default=300, help="随机组合轮数 (默认: 300)")
+    parser.add_argument("--seed", type=int, default=1, help="随机种子 (默认: 1)")
+    args = parser.parse_args()
+
+    run_checks("🔕 plan_silences", run_suite, args.trials, args.seed)
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+存储后端一致性测试脚本
+对 MySQL / SQLite 两种 AlertStorage 实现执行同一组用例，验证返回结构与行为一致
+
+用法:
+    python test/storage_conformance.py --backend sqlite
+    python test/storage_conformance.py --backend mysql      # 使用 .env 中的 MySQL 配置（会写入测试数据后清理）
+    python test/storage_conformance.py --backend all
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from alerts_format.storage import (  # noqa: E402
+    MySQLStorage, SQLiteStorage, DuplicateKeyError,
+)
+
+
+class Checker:
+    """简单断言收集器"""
+
+    def __init__(self, backend: str):
+        self.backend = backend
+        self.passed = 0
+        self.failed = 0
+
+    def check(self, name: str, cond: bool, detail=None):
+        if cond:
+            self.passed += 1
+            print(f"  ✅ {name}")
+        else:
+            self.failed += 1
+            print(f"  ❌ {name}  {detail if detail is not None else ''}")
+
+
+def run_suite(storage, c: Checker):
+    tag = uuid.uuid4().hex[:8]
+    alert_id = f"conf_{tag}"
+    project = f"conf_project_{tag}"
+    group_id = f"oc_conf_{tag}"
+    user_names = [f"conf_user_{tag}_a", f"conf_user_{tag}_b"]
+    maids = [f"conf_{tag}_1", f"conf_{tag}_2"]
+    rule_id = None
+
+    try:
+        # ── alert_config ──
+        print("[alert_config]")
+        rule_id = storage.create_alert_config({
+            'group_id': group_id,
+            'users': json.dumps(["张三"]),
+            'alert_id': alert_id,
+            'rank': 'P1',
+            'alertmanager_url': None,
+            'project': project,
+            'remark': 'conformance',
+            'label_rules': json.dumps({"service": f"^{tag}$"}),
+            'template_type': 'ops',
+            'silence_type': 'alertmanager',
+            'grafana_url': None,
+            'oncall_sync': 0,
+            'flashcat_schedule_id': None,
+        })
+        c.check("create_alert_config 返回自增 id", isinstance(rule_id, int) and rule_id > 0, rule_id)
+
+        try:
+            storage.create_alert_config({'group_id': group_id, 'users': '[]', 'alert_id': alert_id,
+                                         'rank': 'P1', 'project': project})
+            c.check("重复 alert_id 抛出 DuplicateKeyError", False)
+        except DuplicateKeyError:
+            c.check("重复 alert_id 抛出 DuplicateKeyError", True)
+
+        row = storage.get_alert_config_by_alertid(alert_id)
+        c.check("get_alert_config_by_alertid 返回 dict", isinstance(row, dict) and row['project'] == project, row)
+        c.check("JSON 列以字符串返回", isinstance(row and row['users'], str), row and type(row['users']))
+        c.check("rank 列可读", row and row['rank'] == 'P1')
+
+        row = storage.get_alert_config_by_project(project)
+        c.check("get_alert_config_by_project", row and row['alert_id'] == alert_id)
+        c.check("不存在的 alert_id 返回 None", storage.get_alert_config_by_alertid(f"none_{tag}") is None)
+
+        storage.update_alert_config(rule_id, {'rank': 'P0', 'remark': 'updated', 'unknown_col': 'x'})
+        row = storage.get_alert_config_by_alertid(alert_id)
+        c.check("update_alert_config 忽略非白名单列", row and row['rank'] == 'P0' and row['remark'] == 'updated')
+
+        ids = [r['id'] for r in storage.list_alert_configs()]
+        c.check("list_alert_configs 包含新规则", rule_id in ids)
+        ids = [r['id'] for r in storage.list_label_rule_configs()]
+        c.check("list_label_rule_configs 包含带 label_rules 的规则", rule_id in ids)
+
+        # ── feishu_users ──
+        print("[feishu_users]")
+        errors = storage.upsert_feishu_users([
+            (user_names[0], f"ou_{tag}_a", None),
+            (user_names[1], f"ou_{tag}_b", "备注"),
+        ])
+        c.check("upsert_feishu_users 全部成功", errors == [None, None], errors)
+        errors = storage.upsert_feishu_users([(user_names[0], f"ou_{tag}_a2", "更新")])
+        c.check("upsert_feishu_users 同名覆盖", errors == [None], errors)
+
+        mapping = storage.get_open_ids_by_names(user_names + [f"missing_{tag}"])
+        c.check("get_open_ids_by_names", mapping == {user_names[0]: f"ou_{tag}_a2", user_names[1]: f"ou_{tag}_b"},
+                mapping)
+        c.check("get_open_ids_by_names 空列表", storage.get_open_ids_by_names([]) == {})
+
+        users = [u for u in storage.list_feishu_users() if u['name'] in user_names]
+        c.check("list_feishu_users 返回时间字段", len(users) == 2 and all(u.get('created_at') for u in users), users)
+        user_b = next((u for u in users if u['name'] == user_names[1]), None)
+        if user_b:
+            storage.update_feishu_user(user_b['id'], {'remark': 'changed'})
+            user_b = next(u for u in storage.list_feishu_users() if u['id'] == user_b['id'])
+            c.check("update_feishu_user", user_b['remark'] == 'changed', user_b)
+
+        # ── alert_data ──
+        print("[alert_data]")
+        labels = [{"key": "alertname", "value": f"ConfAlert_{tag}"}, {"key": "instance", "value": "10.0.0.1"}]
+        storage.insert_alert_data(maids[0], json.dumps(labels, ensure_ascii=False), project,
+                                  "2026-01-01T08:00:00", json.dumps([f"fp_{tag}_1", f"fp_{tag}_2"]), group_id)
+        time.sleep(1.1)  # created_at 精度为秒，保证第二条记录更新
+        storage.insert_alert_data(maids[1], json.dumps(labels, ensure_ascii=False), project,
+                                  "2026-01-01T09:00:00", json.dumps([f"fp_{tag}_2", f"fp_{tag}_3"]), group_id)
+
+        try:
+            storage.insert_alert_data(maids[0], "[]", project, "2026-01-01T08:00:00", "[]", group_id)
+            c.check("重复 maid 抛出 DuplicateKeyError", False)
+        except DuplicateKeyError:
+            c.check("重复 maid 抛出 DuplicateKeyError", True)
+
+        n = storage.update_alert_data(maids[0], message_id=f"om_{tag}_1", incident_id="inc_1",
+                                      card_content='{"a": 1}', silenceid='["s1"]')
+        c.check("update_alert_data 返回影响行数", n == 1, n)
+        c.check("update_alert_data 无可更新列返回 0", storage.update_alert_data(maids[0], bogus=1) == 0)
+
+        row = storage.get_alert_data(maids[0], columns=('message_id', 'incident_id', 'card_content', 'silenceid'))
+        c.check("get_alert_data", row == {'message_id': f"om_{tag}_1", 'incident_id': 'inc_1',
+                                          'card_content': '{"a": 1}', 'silenceid': '["s1"]'}, row)
+        c.check("get_alert_data 不存在返回 None", storage.get_alert_data(f"none_{tag}") is None)
+
+        t = storage.get_alerttime_by_fingerprint(f"fp_{tag}_2", group_id)
+        c.check("get_alerttime_by_fingerprint 取最新记录", t == "2026-01-01T09:00:00", t)
+        c.check("get_alerttime_by_fingerprint 未命中返回空串",
+                storage.get_alerttime_by_fingerprint(f"fp_{tag}_x", group_id) == '')
+        c.check("get_alerttime_by_fingerprint 按 group 隔离",
+                storage.get_alerttime_by_fingerprint(f"fp_{tag}_1", "oc_other") == '')
+
+        mid = storage.get_message_id_by_fingerprint(f"fp_{tag}_2", group_id)
+        c.check("get_message_id_by_fingerprint 跳过空 message_id", mid == f"om_{tag}_1", mid)
+
+        rows = storage.list_alert_data_by_fingerprint(f"fp_{tag}_2", group_id)
+        c.check("list_alert_data_by_fingerprint 按插入时间倒序", [r['id'] for r in rows] == [maids[1], maids[0]],
+                rows)
+        c.check("list_alert_data_by_fingerprint JSON 列以字符串返回",
+                rows and isinstance(rows[0]['fingerprints'], str), rows)
+
+        fps = storage.get_all_fingerprints_by_fingerprints([f"fp_{tag}_1", ""], group_id)
+        c.check("get_all_fingerprints_by_fingerprints 单跳扩展", fps == {f"fp_{tag}_1", f"fp_{tag}_2"}, fps)
+        fps = storage.get_all_fingerprints_by_fingerprints([f"fp_{tag}_2"], group_id)
+        c.check("get_all_fingerprints_by_fingerprints 合并多行",
+                fps == {f"fp_{tag}_1", f"fp_{tag}_2", f"fp_{tag}_3"}, fps)
+
+        rows = storage.list_alert_data_between("2026-01-01T00:00:00", "2026-01-02T00:00:00",
+                                               ('id', 'alertlabels', 'project', 'alerttime'))
+        ours = [r['id'] for r in rows if r['id'] in maids]
+        c.check("list_alert_data_between 按 alerttime 倒序", ours == [maids[1], maids[0]], ours)
+        rows = storage.list_alert_data_between("2026-01-01T00:00:00", "2026-01-02T00:00:00",
+                                               ('id', 'group_id'), alertname=f"ConfAlert_{tag}")
+        c.check("list_alert_data_between 按 alertname 过滤", sorted(r['id'] for r in rows) == sorted(maids), rows)
+        rows = storage.list_alert_data_between("2026-01-01T00:00:00", "2026-01-02T00:00:00",
+                                               ('id',), alertname=f"Other_{tag}")
+        c.check("list_alert_data_between alertname 未命中", not rows, rows)
+    finally:
+        _cleanup(storage, rule_id, user_names, maids)
+
+
+def _cleanup(storage, rule_id, user_names, maids):
+    """清理测试数据（MySQL 后端会写入真实库）"""
+    try:
+        if rule_id:
+            storage.delete_alert_config(rule_id)
+        for u in storage.list_feishu_users():
+            if u['name'] in user_names:
+                storage.delete_feishu_user(u['id'])
+        for maid in maids:
+            storage._execute("DELETE FROM alert_data WHERE id = %s", (maid,))
+    except Exception as e:
+        print(f"⚠️  清理测试数据失败: {e}")
+
+
+def run_backend(backend: str) -> bool:
+    print("=" * 60)
+    print(f"📦 存储后端: {backend}")
+    print("=" * 60)
+    c = Checker(backend)
+    start = time.time()
+    if backend == 'sqlite':
+        with tempfile.TemporaryDirectory() as tmp:
+            run_suite(SQLiteStorage(os.path.join(tmp, 'conformance.db')), c)
+    else:
+        run_suite(MySQLStorage(), c)
+    print(f"\n结果: {c.passed} 通过, {c.failed} 失败, 耗时 {time.time() - start:.2f}s\n")
+    return c.failed == 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="存储后端一致性测试")
+    parser.add_argument(
+        "--backend",
+        choices=["sqlite", "mysql", "all"],
+        default="sqlite",
+        help="测试的存储后端 (默认: sqlite)",
+    )
+    args = parser.parse_args()
+
+    backends = ["sqlite", "mysql"] if args.backend == "all" else [args.backend]
+    ok = all([run_backend(b) for b in backends])
+    print("✅ 全部通过" if ok else "❌ 存在失败用例")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+告警风暴摘要测试脚本
+使用可控时钟驱动 StormGuard（摘要由脚本手动 tick，后台线程间隔设为很长），检查进入 / 退出风暴模式、
+风暴期间卡片并入摘要、电话告警豁免、级别归一化计数，以及摘要卡片发送。
+
+用法:
+    python test/storm_guard_check.py
+"""
+
+import json
+
+from check_utils import check, FakeClock, run_checks  # 须先于项目模块导入（设置 sys.path）
+
+from feishu_utils.storm_guard import StormGuard
+
+
+class FakeFeishuClient:
+    """记录发送的卡片标题与正文"""
+
+    def __init__(self):
+        self.cards = []
+
+    def send(self, receive_id_type, receive_id, msg_type, content):
+        card = json.loads(content)
+        self.cards.append((receive_id, card['header']['title']['content'],
+                           ' '.join(e['text']['content'] for e in card['elements'] if e.get('tag') == 'div')))
+        return f"om_{len(self.cards)}"
+
+
+def run_suite() -> bool:
+    clock = FakeClock()
+    client = FakeFeishuClient()
+    guard = StormGuard(threshold=4, window=60, interval=3600, clock=clock)
+    ok = True
+
+    admitted = [guard.admit('oc_a', [('CPU', 'warning')], '', client) for _ in range(3)]
+    ok &= check("低于阈值时照常发送", all(admitted) and not guard.stats()["storming_groups"])
+    ok &= check("达到阈值的那张卡片并入摘要", guard.admit('oc_a', [('CPU', 'warning')], '', client) is False)
+    ok &= check("进入风暴模式", guard.stats()["storming_groups"] == ['oc_a'], guard.stats())
+    ok &= check("其他群组不受影响", guard.admit('oc_b', [('CPU', 'warning')], '', client) is True)
+
+    for severity in ('Critical', 'critical', '5', 'P0', 'p0'):
+        guard.admit('oc_a', [('Disk', severity)], 'http://grafana/d/disk', client)
+    ok &= check("电话告警豁免汇总", guard.admit('oc_a', [('Disk', 'phone')], '', client, exempt=True) is True)
+
+    guard.tick()
+    ok &= check("风暴期间按周期发送摘要", len(client.cards) == 1 and client.cards[0][0] == 'oc_a', client.cards)
+    body = client.cards[0][2] if client.cards else ''
+    ok &= check("级别归一化后合并计数", 'critical × 3' in body and 'p0 × 2' in body, body)
+    ok &= check("摘要附带详情链接", 'http://grafana/d/disk' in body, body)
+    ok &= check("无新增告警时不发空摘要", (guard.tick(), len(client.cards))[1] == 1, client.cards)
+
+    guard.admit('oc_a', [('CPU', 'warning')], '', client)
+    clock.advance(120)
+    guard.tick()
+    ok &= check("速率回落后退出风暴并发送最后一期", not guard.stats()["storming_groups"]
+                and len(client.cards) == 2 and client.cards[1][1] == '🌤 告警风暴已结束', client.cards)
+    ok &= check("退出后恢复单条发送", guard.admit('oc_a', [('CPU', 'warning')], '', client) is True)
+    ok &= check("计数", guard.stats()["storms"] == 1 and guard.stats()["digests_sent"] == 2, guard.stats())
+    return ok
+
+
+if __name__ == "__main__":
+    run_checks("🌪 StormGuard", run_suite)